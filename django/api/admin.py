@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Case, Evidence, MFTEntry, AmcacheEntry
+from .models import Case, Evidence, MFTEntry, AmcacheEntry, ParseJob, UploadSession, ZipMember
 
 @admin.register(Case)
 class CaseAdmin(admin.ModelAdmin):
@@ -13,4 +13,19 @@ class EvidenceAdmin(admin.ModelAdmin):
     list_filter = ("parse_status",)
 
 admin.site.register(MFTEntry)
-admin.site.register(AmcacheEntry)
\ No newline at end of file
+admin.site.register(AmcacheEntry)
+
+@admin.register(ParseJob)
+class ParseJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "evidence", "status", "attempts", "worker", "created_at", "finished_at")
+    list_filter = ("status",)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ("id", "filename", "status", "total_size", "hashed_upto", "total_chunks", "evidence", "created_at")
+    list_filter = ("status",)
+
+@admin.register(ZipMember)
+class ZipMemberAdmin(admin.ModelAdmin):
+    list_display = ("id", "evidence", "path", "size", "compressed_size")
+    search_fields = ("path",)
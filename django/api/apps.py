@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_delete
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .models import Evidence, MFTEntry, SecurityEvent
+        from .utils import aggregates, partitions, search, timeline
+
+        # ตาราง artifact แบ่ง partition ตาม evidence (PostgreSQL) — ดู utils/partitions.py
+        post_migrate.connect(partitions.on_post_migrate, sender=self)
+        # trigram index สำหรับช่องค้นหา (pg_trgm) — สร้างบน parent หลังแปลงเป็น partitioned แล้ว
+        post_migrate.connect(search.on_post_migrate, sender=self)
+        pre_delete.connect(partitions.on_evidence_delete, sender=Evidence)
+        # สรุปของ security events นับตอน ingest และสลับ / ลบไปพร้อมแถว — ดู utils/aggregates.py
+        partitions.register_derived(SecurityEvent, aggregates.STORE)
+        # bucket ของ timeline (นาที / ชั่วโมง / วัน) ก็เช่นกัน — ดู utils/timeline.py
+        partitions.register_derived(SecurityEvent, timeline.SECURITY_STORE)
+        partitions.register_derived(MFTEntry, timeline.MFT_STORE)
@@ -0,0 +1,114 @@
+import csv
+import tempfile
+import time
+from itertools import zip_longest
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.csvheader import _norm_key, read_compiled
+from api.utils.ingest import (
+    MFT_FIELDS, EVTX_FIELDS, MFT_TS_FIELDS, EVTX_TS_FIELDS, _EVTX_CORE_KEYS,
+    _batched, _canon_row, _pick_fields, _parse_ts_guess, _mft_values, _evtx_values,
+)
+from api.utils.timestamps import TimestampDecoder
+from api.utils.synthetic import write_mftecmd_csv, write_evtxecmd_csv
+
+
+def _legacy_ts(p, fields):
+    for f in fields:
+        p[f] = _parse_ts_guess(p[f])
+    return p
+
+
+def _legacy_mft(f, normalize):
+    for raw in csv.DictReader(f):
+        p = _pick_fields(_canon_row(raw), MFT_FIELDS)
+        yield _mft_values(_legacy_ts(p, MFT_TS_FIELDS)) if normalize else p
+
+
+def _compiled_mft(f, normalize):
+    ch, rows = read_compiled(f, MFT_FIELDS)
+    if not normalize:
+        yield from map(ch.pick, rows)
+        return
+    ts = TimestampDecoder(MFT_TS_FIELDS)
+    for batch in _batched(map(ch.pick, rows)):
+        for p in ts.decode(batch):
+            yield _mft_values(p)
+
+
+def _legacy_evtx(f, normalize):
+    for raw in csv.DictReader(f):
+        p = _pick_fields(_canon_row(raw), EVTX_FIELDS)
+        ed = {k: v for k, v in raw.items() if v not in (None, "") and _norm_key(k) not in _EVTX_CORE_KEYS}
+        yield _evtx_values(_legacy_ts(p, EVTX_TS_FIELDS), ed) if normalize else (p, ed)
+
+
+def _compiled_evtx(f, normalize):
+    ch, rows = read_compiled(f, EVTX_FIELDS)
+    cols = ch.columns(exclude=_EVTX_CORE_KEYS)
+    if not normalize:
+        for row in rows:
+            yield ch.pick(row), ch.raw(row, cols)
+        return
+    ts = TimestampDecoder(EVTX_TS_FIELDS)
+    for batch in _batched((ch.pick(row), ch.raw(row, cols)) for row in rows):
+        ts.decode([p for p, _ in batch])
+        for p, ed in batch:
+            yield _evtx_values(p, ed)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark CSV → row normalization (rows/s): legacy per-row _canon_row/_pick/_parse_ts_guess "
+            "vs compiled header + batched TimestampDecoder, on synthetic MFTECmd/EvtxECmd CSVs")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000, help="rows per synthetic CSV")
+        parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+        parser.add_argument("--mft-csv", help="use an existing MFTECmd CSV instead of a synthetic one")
+        parser.add_argument("--evtx-csv", help="use an existing EvtxECmd CSV instead of a synthetic one")
+        parser.add_argument("--pick-only", action="store_true",
+                            help="measure header/column resolution only (skip timestamp parsing, describe_event)")
+        parser.add_argument("--verify", action="store_true",
+                            help="also check that both paths produce identical rows")
+
+    def _time(self, fn, path: Path, encoding: str, normalize: bool, repeat: int):
+        best, rows = None, 0
+        for _ in range(repeat):
+            with open(path, "r", newline="", errors="ignore", encoding=encoding) as f:
+                t0 = time.perf_counter()
+                rows = sum(1 for _ in fn(f, normalize))
+                dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return rows, best
+
+    def _verify(self, label, path: Path, encoding: str, legacy, compiled, normalize: bool):
+        with open(path, "r", newline="", errors="ignore", encoding=encoding) as a, \
+                open(path, "r", newline="", errors="ignore", encoding=encoding) as b:
+            for i, (x, y) in enumerate(zip_longest(legacy(a, normalize), compiled(b, normalize))):
+                if x != y:
+                    raise CommandError(f"{label}: row {i} differs\nlegacy:   {x!r}\ncompiled: {y!r}")
+
+    def handle(self, *args, **opts):
+        normalize = not opts["pick_only"]
+        repeat = max(1, opts["repeat"])
+        with tempfile.TemporaryDirectory(prefix="bench_ingest_") as tmp:
+            tmp = Path(tmp)
+            mft = Path(opts["mft_csv"]) if opts["mft_csv"] else write_mftecmd_csv(tmp / "mft.csv", opts["rows"])
+            evtx = Path(opts["evtx_csv"]) if opts["evtx_csv"] else write_evtxecmd_csv(tmp / "evtx.csv", opts["rows"])
+
+            cases = (
+                ("MFTECmd", mft, "utf-8", _legacy_mft, _compiled_mft),
+                ("EvtxECmd", evtx, "utf-8-sig", _legacy_evtx, _compiled_evtx),
+            )
+            self.stdout.write(f"mode: {'full normalize' if normalize else 'pick only'}, best of {repeat}")
+            for label, path, enc, legacy, compiled in cases:
+                n0, t0 = self._time(legacy, path, enc, normalize, repeat)
+                n1, t1 = self._time(compiled, path, enc, normalize, repeat)
+                if opts["verify"]:
+                    self._verify(label, path, enc, legacy, compiled, normalize)
+                self.stdout.write(
+                    f"{label:9s} rows={n1:>9,d}  legacy {n0 / t0:>10,.0f} rows/s  "
+                    f"compiled {n1 / t1:>10,.0f} rows/s  x{t0 / t1:.2f}"
+                )
@@ -0,0 +1,73 @@
+import shutil
+import statistics
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.executors import EXECUTORS, ParserJob, get_executor
+
+
+class Command(BaseCommand):
+    help = ("Compare parser executors (docker-run / docker-exec / local): cold-start overhead of a no-op "
+            "in each backend, and optionally wall time per artifact for real parses")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", default=",".join(EXECUTORS),
+                            help=f"comma separated (default: {','.join(EXECUTORS)})")
+        parser.add_argument("--repeat", type=int, default=5, help="runs per backend / artifact (median reported)")
+        parser.add_argument("--mft", help="sample $MFT under MEDIA_ROOT")
+        parser.add_argument("--amcache", help="sample Amcache.hve under MEDIA_ROOT")
+        parser.add_argument("--evtx-dir", help="sample winevt/Logs directory under MEDIA_ROOT")
+
+    def _stats(self, times):
+        return f"median {statistics.median(times):7.3f}s  min {min(times):7.3f}s"
+
+    def handle(self, *args, **opts):
+        repeat = max(1, opts["repeat"])
+        samples = [(kind, Path(p).resolve(), name) for kind, p, name in (
+            ("mft", opts["mft"], "mft.csv"),
+            ("amcache", opts["amcache"], "amcache.csv"),
+            ("evtx-dir", opts["evtx_dir"], "evtx_all.csv"),
+        ) if p]
+        media = Path(settings.MEDIA_ROOT).resolve()
+        for kind, p, _ in samples:
+            if not p.exists():
+                raise CommandError(f"{kind}: {p} not found")
+            if media not in p.parents:
+                raise CommandError(f"{kind}: {p} must be under MEDIA_ROOT ({media}) so containers can see it")
+
+        out_root = media / "parsed" / f"_bench-{uuid.uuid4().hex[:8]}"
+        try:
+            for name in [b.strip() for b in opts["backends"].split(",") if b.strip()]:
+                try:
+                    ex = get_executor(name)
+                except ValueError as e:
+                    raise CommandError(str(e))
+                ready, why = ex.available()
+                if not ready:
+                    self.stdout.write(f"{name:11s} skipped: {why.splitlines()[0] if why else 'not available'}")
+                    continue
+
+                probes = []
+                for _ in range(repeat):
+                    res = ex.probe()
+                    if not res.ok:
+                        raise CommandError(f"{name}: probe failed (rc={res.rc})\n{res.output[-1000:]}")
+                    probes.append(res.elapsed)
+                startup = statistics.median(probes)
+                self.stdout.write(f"{name:11s} no-op      {self._stats(probes)}")
+
+                for kind, path, csv_name in samples:
+                    times = []
+                    for i in range(repeat):
+                        out_dir = out_root / name / f"{kind}-{i}"
+                        res = ex.run(ParserJob(kind, path, out_dir, csv_name, label=f"bench-{uuid.uuid4().hex[:8]}"))
+                        if not res.ok:
+                            raise CommandError(f"{name} {kind}: rc={res.rc}\n{res.output[-1000:]}")
+                        times.append(res.elapsed)
+                    self.stdout.write(f"{name:11s} {kind:10s} {self._stats(times)}  "
+                                      f"(~{startup / statistics.median(times):.0%} backend start-up)")
+        finally:
+            shutil.rmtree(out_root, ignore_errors=True)
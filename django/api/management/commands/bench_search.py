@@ -0,0 +1,98 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.models import AmcacheEntry, Case, Evidence, MFTEntry, SecurityEvent
+from api.utils.partitions import replacing_rows
+from api.utils.pgcopy import make_sink
+from api.utils.search import AMCACHE_SEARCH, MFT_SEARCH, SECURITY_SEARCH, contains_filter
+from api.utils.synthetic import NEEDLES, artifact_values
+
+
+# kind → (model, คอลัมน์ที่ค้น, การเรียงของหน้า result, คอลัมน์ที่หน้า result ดึง)
+KINDS = {
+    "mft": (MFTEntry, MFT_SEARCH, "entry_number",
+            ("entry_number", "file_name", "full_path", "size_bytes", "created_ts", "modified_ts", "is_directory")),
+    "amcache": (AmcacheEntry, AMCACHE_SEARCH, "app_name",
+                ("app_name", "version", "publisher", "install_date", "file_path")),
+    "evtx": (SecurityEvent, SECURITY_SEARCH, "-timestamp",
+             ("timestamp", "event_id", "message", "user_name", "computer", "event_data")),
+}
+DEFAULT_QUERIES = (NEEDLES[0], "psexesvc.exe", "Temp\\backup", "corporation", "sync")
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the substring search (q) of the MFT / Amcache / Security event row APIs: legacy icontains "
+            "(UPPER LIKE, sequential scan) vs ILIKE served by pg_trgm GIN indexes, on one evidence's rows")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--evidence", type=int, help="search an existing evidence instead of a synthetic one")
+        parser.add_argument("--rows", type=int, default=5_000_000, help="rows per table of the synthetic evidence")
+        parser.add_argument("--kinds", default="mft,amcache,evtx", help=f"comma separated, any of: {','.join(KINDS)}")
+        parser.add_argument("--queries", default=",".join(DEFAULT_QUERIES), help="comma separated search strings")
+        parser.add_argument("--repeat", type=int, default=3, help="runs per query (median reported)")
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--explain", action="store_true", help="print the plan of each trigram query")
+        parser.add_argument("--keep", action="store_true", help="keep the synthetic evidence afterwards")
+
+    def _load(self, ev, kind: str, rows: int) -> None:
+        model = KINDS[kind][0]
+        t0 = time.perf_counter()
+        with replacing_rows(model, ev) as table:
+            with make_sink(model, ev, 5000, table) as sink:
+                for values in artifact_values(kind, rows):
+                    sink.add(values)
+        with connection.cursor() as cur:
+            cur.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        self.stdout.write(f"loaded {kind}: {rows:,} rows in {time.perf_counter() - t0:.1f}s")
+
+    def _run(self, ev, kind: str, q: str, legacy: bool, repeat: int, page_size: int):
+        model, terms, order, fields = KINDS[kind]
+        qs = model.objects.filter(evidence=ev).filter(contains_filter(terms, q, legacy=legacy))
+        times, total = [], 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            total = qs.count()                                               # เหมือน API: นับ + หน้าแรก
+            list(qs.order_by(order).values(*fields)[:page_size])
+            times.append((time.perf_counter() - t0) * 1000)
+        return total, statistics.median(times), qs
+
+    def handle(self, *args, **opts):
+        kinds = [k.strip() for k in opts["kinds"].split(",") if k.strip()]
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise CommandError(f"unknown kind(s): {', '.join(sorted(unknown))}")
+        queries = [q for q in opts["queries"].split(",") if q]
+        repeat = max(1, opts["repeat"])
+
+        synthetic = opts["evidence"] is None
+        if synthetic:
+            case = Case.objects.create(case_number=f"_bench_search_{uuid.uuid4().hex[:8]}", title="bench_search")
+            ev = Evidence.objects.create(case=case, original_filename="bench_search", stored_path="")
+        else:
+            ev = Evidence.objects.filter(pk=opts["evidence"]).first()
+            if ev is None:
+                raise CommandError(f"evidence {opts['evidence']} not found")
+
+        try:
+            if synthetic:
+                for kind in kinds:
+                    self._load(ev, kind, opts["rows"])
+            self.stdout.write(f"evidence {ev.pk}, {connection.vendor}, median of {repeat} (count + first page)")
+            for kind in kinds:
+                for q in queries:
+                    n0, t0, _ = self._run(ev, kind, q, True, repeat, opts["page_size"])
+                    n1, t1, qs = self._run(ev, kind, q, False, repeat, opts["page_size"])
+                    if n0 != n1:
+                        raise CommandError(f"{kind} {q!r}: legacy found {n0} rows, trigram found {n1}")
+                    self.stdout.write(f"{kind:8s} {q!r:22s} hits={n1:>9,d}  icontains {t0:>9.1f} ms  "
+                                      f"trigram {t1:>9.1f} ms  x{t0 / t1 if t1 else 0:.1f}")
+                    if opts["explain"]:
+                        for line in qs.explain().splitlines():
+                            self.stdout.write(f"    {line}")
+        finally:
+            if synthetic and not opts["keep"]:
+                case.delete()
@@ -0,0 +1,171 @@
+import json
+import shutil
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.csvheader import read_compiled
+from api.utils.evtx_fanout import evtx_files
+from api.utils.evtx_native import EvtxReader, flatten_payload
+from api.utils.executors import ParserJob, get_executor
+from api.utils.ingest import EVTX_FIELDS, EVTX_TS_FIELDS, _EVTX_CORE_KEYS, _batched
+from api.utils.timestamps import TimestampDecoder
+
+
+DEFAULT_FIELDS = ("event_id", "timestamp", "provider", "level", "computer", "user_sid",
+                  "process_id", "thread_id", "payload")
+ALL_FIELDS = DEFAULT_FIELDS + ("task", "opcode", "keywords")
+_TS_SLACK = timedelta(microseconds=1)
+
+
+def _payload(ed: dict) -> dict:
+    """ค่าใน EventData / UserData จาก Payload JSON (ทั้งสองฝั่งใช้รูปแบบ JSON เดียวกัน)"""
+    try:
+        payload = json.loads(ed.get("Payload") or "{}")
+    except ValueError:
+        return {"(invalid Payload)": ed.get("Payload", "")[:80]}
+    return dict(flatten_payload(payload)) if isinstance(payload, dict) else {}
+
+
+def _index(rows, fields) -> dict:
+    """(channel, record id) → {ฟิลด์: ค่า} (ถอดเวลาด้วย TimestampDecoder แบบเดียวกับตอน ingest)"""
+    ts, out = TimestampDecoder(EVTX_TS_FIELDS), {}
+    for batch in _batched(rows):
+        ts.decode([p for p, _ in batch])
+        for p, ed in batch:
+            rec = {f: (p.get(f) or "") for f in fields if f != "payload"}
+            if "payload" in fields:
+                rec["payload"] = _payload(ed)
+            out[(p["channel"].lower(), p["record_id"].strip())] = rec
+    return out
+
+
+def _same(field: str, a, b) -> bool:
+    if field == "timestamp" and a and b:
+        # FILETIME มีความละเอียด 100ns → ปัดเป็น microsecond ต่างกันได้ 1 หน่วยตามเครื่องมือ
+        return abs(a - b) <= _TS_SLACK
+    if field in ("keywords", "level", "provider", "computer", "user_sid"):
+        return str(a).strip().lower() == str(b).strip().lower()
+    if field in ("process_id", "thread_id", "event_id"):
+        return str(a).strip().lstrip("0") == str(b).strip().lstrip("0")
+    return a == b
+
+
+class Command(BaseCommand):
+    help = ("Parity check of the native EVTX reader against EvtxECmd: parse the same .evtx files with both "
+            "(or compare with an existing evtx_all.csv) and report per-field mismatches keyed by channel + record id")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help=".evtx files or directories (under MEDIA_ROOT unless --csv)")
+        parser.add_argument("--csv", help="existing EvtxECmd CSV of the same files (skip running the parser)")
+        parser.add_argument("--backend", default=None, help="parser executor for EvtxECmd (default: PARSER_EXECUTOR)")
+        parser.add_argument("--fields", default=",".join(DEFAULT_FIELDS),
+                            help=f"comma separated, any of: {','.join(ALL_FIELDS)}")
+        parser.add_argument("--show", type=int, default=5, help="example mismatches printed per field")
+
+    def _native(self, files, fields):
+        readers = [EvtxReader(p) for p in files]
+        t0 = time.perf_counter()
+        index = _index((row for r in readers for row in r.rows()), fields)
+        elapsed = time.perf_counter() - t0
+        errors = sum(r.errors for r in readers)
+        for r in readers:
+            for s in r.error_samples:
+                self.stdout.write(f"  ! native {s}")
+        return index, elapsed, errors
+
+    def _evtxecmd_csv(self, files, opts, media: Path, out_root: Path) -> Path:
+        if opts["csv"]:
+            csv_path = Path(opts["csv"]).resolve()
+            if not csv_path.exists():
+                raise CommandError(f"{csv_path} not found")
+            return csv_path
+        for p in files:
+            if media not in p.parents:
+                raise CommandError(f"{p} must be under MEDIA_ROOT ({media}) so the parser can see it")
+        try:
+            ex = get_executor(opts["backend"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        ready, why = ex.available()
+        if not ready:
+            raise CommandError(f"{ex.name}: {why.splitlines()[0] if why else 'not available'} (use --csv)")
+        # EvtxECmd รับทั้งโฟลเดอร์ → ลิงก์ไฟล์ที่เลือกไว้ในโฟลเดอร์ของตัวเอง
+        in_dir = out_root / "in"
+        in_dir.mkdir(parents=True)
+        for i, p in enumerate(files):
+            (in_dir / f"{i}__{p.name}").symlink_to(p)
+        res = ex.run(ParserJob("evtx-dir", in_dir, out_root / "out", "evtx_all.csv",
+                               label=f"parity-{uuid.uuid4().hex[:8]}"))
+        if not res.ok:
+            raise CommandError(f"EvtxECmd failed (rc={res.rc})\n{res.output[-1000:]}")
+        self.evtxecmd_elapsed = res.elapsed
+        return out_root / "out" / "evtx_all.csv"
+
+    def handle(self, *args, **opts):
+        fields = tuple(f.strip() for f in opts["fields"].split(",") if f.strip())
+        unknown = set(fields) - set(ALL_FIELDS)
+        if unknown:
+            raise CommandError(f"unknown field(s): {', '.join(sorted(unknown))}")
+
+        files = []
+        for raw in opts["paths"]:
+            p = Path(raw).resolve()
+            if not p.exists():
+                raise CommandError(f"{p} not found")
+            files.extend(evtx_files(p) if p.is_dir() else [p])
+        if not files:
+            raise CommandError("no .evtx files found")
+
+        media = Path(settings.MEDIA_ROOT).resolve()
+        out_root = media / "parsed" / f"_parity-{uuid.uuid4().hex[:8]}"
+        self.evtxecmd_elapsed = None
+        try:
+            native, native_elapsed, native_errors = self._native(files, fields)
+            csv_path = self._evtxecmd_csv(files, opts, media, out_root)
+            t0 = time.perf_counter()
+            with open(csv_path, "r", newline="", errors="ignore", encoding="utf-8-sig") as r:
+                ch, rows = read_compiled(r, EVTX_FIELDS)
+                cols = ch.columns(exclude=_EVTX_CORE_KEYS)
+                ref = _index(((ch.pick(row), ch.raw(row, cols)) for row in rows), fields)
+            read_elapsed = time.perf_counter() - t0
+        finally:
+            shutil.rmtree(out_root, ignore_errors=True)
+
+        self.stdout.write(f"files: {len(files)}")
+        self.stdout.write(f"native:   {len(native):8d} records  {native_elapsed:7.2f}s  ({native_errors} decode error(s))")
+        ec_time = f"{self.evtxecmd_elapsed:7.2f}s parse + " if self.evtxecmd_elapsed is not None else ""
+        self.stdout.write(f"EvtxECmd: {len(ref):8d} records  {ec_time}{read_elapsed:.2f}s read")
+
+        missing = sorted(set(ref) - set(native))
+        extra = sorted(set(native) - set(ref))
+        for label, keys in (("missing from native", missing), ("only in native", extra)):
+            if keys:
+                sample = ", ".join(f"{c}#{r}" for c, r in keys[:opts["show"]])
+                self.stdout.write(f"{label}: {len(keys)} (e.g. {sample})")
+
+        diffs, examples = Counter(), {}
+        for key in set(ref) & set(native):
+            a, b = native[key], ref[key]
+            for f in fields:
+                if not _same(f, a[f], b[f]):
+                    diffs[f] += 1
+                    examples.setdefault(f, [])
+                    if len(examples[f]) < opts["show"]:
+                        examples[f].append((key, a[f], b[f]))
+        compared = len(set(ref) & set(native))
+        self.stdout.write(f"compared: {compared} records x {len(fields)} fields")
+        for f in fields:
+            self.stdout.write(f"  {f:11s} {'ok' if not diffs[f] else f'{diffs[f]} mismatch(es)'}")
+            for (c, r), mine, theirs in examples.get(f, []):
+                self.stdout.write(f"      {c}#{r}: native={mine!r}  evtxecmd={theirs!r}")
+
+        if missing or extra or diffs:
+            raise CommandError(f"parity check failed: {len(missing)} missing, {len(extra)} extra, "
+                               f"{sum(diffs.values())} field mismatch(es)")
+        self.stdout.write(self.style.SUCCESS("parity OK"))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import SecurityEvent
+from api.utils import aggregates, respcache, timeline
+from api.utils.security_describer import promoted_columns
+
+
+COLUMNS = ("src_ip", "logon_type", "domain", "actor", "process", "auth_package", "failure_reason", "command_line")
+
+
+class Command(BaseCommand):
+    help = ("Fill the promoted SecurityEvent columns (src_ip, logon_type, actor, ...) from event_data for rows "
+            "ingested before those columns existed (re-parsing the evidence does the same)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--evidence", type=int, action="append", help="only this evidence (repeatable)")
+        parser.add_argument("--batch", type=int, default=5000, help="rows per UPDATE batch")
+        parser.add_argument("--all", action="store_true",
+                            help="recompute every row, not only rows whose columns are all empty")
+
+    def handle(self, *args, **opts):
+        qs = SecurityEvent.objects.all()
+        if opts["evidence"]:
+            qs = qs.filter(evidence_id__in=opts["evidence"])
+        if not opts["all"]:
+            qs = qs.filter(src_ip__isnull=True, logon_type="", domain="", actor="", process="",
+                           auth_package="", failure_reason="", command_line="")
+        batch = max(1, opts["batch"])
+
+        last, updated, touched = 0, 0, set()
+        while True:
+            rows = list(qs.filter(pk__gt=last).order_by("pk").only("pk", "evidence_id", "event_data")[:batch])
+            if not rows:
+                break
+            for r in rows:
+                ed = r.event_data if isinstance(r.event_data, dict) else {}
+                for k, v in promoted_columns(ed, ed.get("__norm") or {}).items():
+                    setattr(r, k, v)
+            with transaction.atomic():
+                SecurityEvent.objects.bulk_update(rows, COLUMNS, batch_size=batch)
+            updated += len(rows)
+            touched.update(r.evidence_id for r in rows)
+            last = rows[-1].pk
+            self.stdout.write(f"updated {updated:,} rows", ending="\r")
+        # แถวเปลี่ยนนอก pipeline → สรุป (logon_type / src_ip / user มาจากคอลัมน์ที่เพิ่งเติม) และ timeline
+        # ที่นับไว้ตอน ingest ไม่ตรงกับแถวแล้ว → สร้างใหม่จากแถวจริง แล้วค่อยทิ้ง response ที่ cache ไว้
+        for ev_id in sorted(touched):
+            aggregates.rebuild(ev_id)
+            timeline.rebuild(ev_id, "security")
+        respcache.bump(touched)
+        self.stdout.write(f"updated {updated:,} rows")
@@ -0,0 +1,64 @@
+import signal
+import threading
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.utils.jobs import worker_loop, default_worker_id
+
+
+def _child_main(poll_interval: float):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    worker_loop(default_worker_id(), poll_interval=poll_interval, stop=stop)
+
+
+class Command(BaseCommand):
+    help = "Run background parse workers (claim ParseJob rows with SELECT ... FOR UPDATE SKIP LOCKED)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int,
+            default=int(getattr(settings, "PARSE_WORKER_PROCESSES", 1)),
+            help="number of worker processes on this host",
+        )
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true",
+                            help="drain the queue once and exit (single process)")
+
+    def handle(self, *args, **opts):
+        processes = max(1, opts["processes"])
+        poll = opts["poll_interval"]
+
+        if opts["once"]:
+            n = worker_loop(default_worker_id(), poll_interval=poll, once=True)
+            self.stdout.write(f"processed {n} job(s)")
+            return
+
+        if processes == 1:
+            self.stdout.write(f"worker {default_worker_id()} started")
+            _child_main(poll)
+            return
+
+        # fork หลาย process: ปิด connection ของ parent ก่อน ไม่ให้ลูกใช้ socket ร่วมกัน
+        connections.close_all()
+        procs = []
+        for _ in range(processes):
+            p = multiprocessing.Process(target=_child_main, args=(poll,), daemon=False)
+            p.start()
+            procs.append(p)
+        self.stdout.write(f"started {processes} worker processes: {[p.pid for p in procs]}")
+
+        def _shutdown(*_):
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+        for p in procs:
+            p.join()
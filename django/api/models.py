@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from pathlib import Path
+import uuid
+
+from .utils.fts import EventDocument
 
 User = get_user_model()
 
@@ -72,12 +76,18 @@ class Evidence(TimeStamped):
     amcache_csv_path = models.CharField(max_length=512, blank=True)
     parse_log = models.TextField(blank=True)
 
+    # ตัวกรอง EVTX ตอน ingest (api.utils.evtx_profiles): "" = EVTX_INGEST_PROFILE, "custom" = ใช้ evtx_allowlist
+    evtx_profile = models.CharField(max_length=64, blank=True)
+    evtx_allowlist = models.JSONField(default=dict, blank=True)  # {"Security": [4624, 4625], "System": "*"}
+
     parse_status = models.CharField(max_length=8, choices=ParseStatus.choices, default=ParseStatus.PENDING)
     parse_progress = models.PositiveSmallIntegerField(default=0)  # 0..100
     parse_message = models.TextField(blank=True)
 
     # summary หลัง parse (เอาไว้โชว์ผลเบื้องต้น)
     summary = models.JSONField(default=dict, blank=True)  # {"mft":12345,"amcache":678,"events":321}
+    # เพิ่มทุกครั้งที่ ingest จบ (แถว artifact อาจเปลี่ยน) — เป็นส่วนหนึ่งของ key ใน cache ของ response (utils/respcache.py)
+    data_version = models.PositiveIntegerField(default=0)
 
     def __str__(self) -> str:
         return self.original_filename
@@ -120,10 +130,17 @@ class MFTEntry(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["evidence", "entry_number"]),
             models.Index(fields=["evidence", "is_directory"]),
-            models.Index(fields=["evidence", "created_ts"]),
-            models.Index(fields=["evidence", "modified_ts"]),
+            # (evidence, คอลัมน์ที่ sort ได้, id) → keyset pagination ของ mft_rows_api (utils/paging.py)
+            models.Index(fields=["evidence", "entry_number", "id"]),
+            models.Index(fields=["evidence", "file_name", "id"]),
+            models.Index(fields=["evidence", "full_path", "id"]),
+            models.Index(fields=["evidence", "size_bytes", "id"]),
+            models.Index(fields=["evidence", "created_ts", "id"]),
+            models.Index(fields=["evidence", "modified_ts", "id"]),
+            # สี่เวลา MACB ครบ → stream ของ super-timeline (utils/supertimeline.py) อ่านตาม index ทุกตัว
+            models.Index(fields=["evidence", "accessed_ts", "id"]),
+            models.Index(fields=["evidence", "mft_changed_ts", "id"]),
         ]
 
 
@@ -141,7 +158,12 @@ class AmcacheEntry(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["evidence", "install_date"]),
+            # keyset pagination ของ amcache_rows_api
+            models.Index(fields=["evidence", "app_name", "id"]),
+            models.Index(fields=["evidence", "version", "id"]),
+            models.Index(fields=["evidence", "publisher", "id"]),
+            models.Index(fields=["evidence", "install_date", "id"]),
+            models.Index(fields=["evidence", "file_path", "id"]),
         ]
 
 
@@ -164,12 +186,176 @@ class SecurityEvent(models.Model):
     thread_id  = models.IntegerField(null=True, blank=True)
     message    = models.TextField(blank=True)
     event_data = models.JSONField(null=True, blank=True)
+    # ค่าที่ normalize แล้ว (describe_event + fallback คีย์ดิบ) เก็บเป็นคอลัมน์ตอน ingest
+    # → หน้า result sort / filter / แสดงผลจากคอลัมน์ตรง ๆ ไม่ต้องขุด event_data ทีละแถว
+    src_ip         = models.GenericIPAddressField(null=True, blank=True)     # inet บน PostgreSQL
+    logon_type     = models.CharField(max_length=32, blank=True)
+    domain         = models.CharField(max_length=256, blank=True)
+    actor          = models.CharField(max_length=256, blank=True)
+    process        = models.TextField(blank=True)
+    auth_package   = models.CharField(max_length=64, blank=True)
+    failure_reason = models.CharField(max_length=256, blank=True)
+    command_line   = models.TextField(blank=True)
+    # tsvector ของ message + คีย์สำคัญใน event_data (PostgreSQL คำนวณเองตอน INSERT) — ดู utils/fts.py
+    search_vector = models.GeneratedField(expression=EventDocument(), output_field=SearchVectorField(),
+                                          db_persist=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=["evidence", "event_id"]),
-            models.Index(fields=["evidence", "timestamp"]),
             models.Index(fields=["evidence", "channel", "event_id"]),
-            models.Index(fields=["evidence", "user_name"]),
-            models.Index(fields=["evidence", "computer"]),
+            # keyset pagination ของ security_events_rows_api
+            # (message ไม่มี: คำอธิบายยาวเกินขนาด entry ของ B-tree ได้ → sort ตาม message เป็น top-N sort)
+            models.Index(fields=["evidence", "timestamp", "id"]),
+            models.Index(fields=["evidence", "event_id", "id"]),
+            models.Index(fields=["evidence", "actor", "id"]),
+            models.Index(fields=["evidence", "src_ip", "id"]),
+            models.Index(fields=["evidence", "computer", "id"]),
+            models.Index(fields=["evidence", "logon_type", "event_id"]),
+        ]
+
+
+class SecurityEventStat(models.Model):
+    """
+    จำนวน SecurityEvent ต่อค่า (histogram) ของ evidence — นับระหว่าง ingest (utils/aggregates.py)
+    dim: total / event_id / channel / user / computer / logon_type / src_ip / hour (key = "YYYY-MM-DDTHH" UTC)
+    slot: "" = ของแถวที่ใช้อยู่, อื่น ๆ = ชื่อตาราง staging ที่กำลังโหลด (สลับเข้าพร้อมแถว — utils/partitions.py)
+    """
+    evidence = models.ForeignKey(Evidence, on_delete=models.CASCADE, related_name="security_stats")
+    slot = models.CharField(max_length=96, blank=True)
+    dim = models.CharField(max_length=16)
+    key = models.CharField(max_length=256, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["evidence", "slot", "dim", "key"], name="uniq_security_stat_key"),
+        ]
+
+
+class TimelineBucket(models.Model):
+    """
+    จำนวนเหตุการณ์ต่อช่วงเวลา (UTC) ของ evidence — นับระหว่าง ingest (utils/timeline.py)
+    source: security (SecurityEvent.timestamp) / mft_created / mft_modified
+    resolution: minute / hour / day (bucket = ต้นช่วง) และ total (bucket = 1970-01-01, count = จำนวนแถวทั้งหมดของ source)
+    event_id / channel: ของ security (ให้กรองได้โดยไม่ต้องแตะตารางดิบ), source อื่นเป็น 0 / ""
+    slot: เหมือน SecurityEventStat ("" = ของแถวที่ใช้อยู่, อื่น ๆ = ตาราง staging)
+    """
+    evidence = models.ForeignKey(Evidence, on_delete=models.CASCADE, related_name="timeline_buckets")
+    slot = models.CharField(max_length=96, blank=True)
+    source = models.CharField(max_length=16)
+    resolution = models.CharField(max_length=8)
+    bucket = models.DateTimeField()
+    event_id = models.IntegerField(default=0)
+    channel = models.CharField(max_length=128, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # ลำดับคอลัมน์ = ลำดับที่ API ใช้: evidence/source/resolution เท่ากัน แล้วช่วงของ bucket
+            models.UniqueConstraint(fields=["evidence", "slot", "source", "resolution", "bucket", "event_id", "channel"],
+                                    name="uniq_timeline_bucket"),
+        ]
+
+
+# ---------- Background jobs (manage.py run_workers) ----------
+class ParseJob(TimeStamped):
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    class Kind(models.TextChoices):
+        PARSE = "PARSE", "Parse + ingest"
+
+    evidence = models.ForeignKey(Evidence, on_delete=models.CASCADE, related_name="parse_jobs")
+    kind = models.CharField(max_length=16, choices=Kind.choices, default=Kind.PARSE)
+    status = models.CharField(max_length=8, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    options = models.JSONField(default=dict, blank=True)   # พารามิเตอร์จาก request (เผื่อใช้ภายหลัง)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+
+    # worker ที่ถือ job อยู่ (hostname:pid) + heartbeat เอาไว้ตรวจ worker ที่ตายกลางทาง
+    worker = models.CharField(max_length=128, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    error = models.TextField(blank=True)
+    result = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"]),
+            models.Index(fields=["evidence", "status"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"ParseJob#{self.id} ev={self.evidence_id} {self.status}"
+
+
+# ---------- Chunked upload ----------
+
+class UploadSession(TimeStamped):
+    """
+    อัปโหลดไฟล์หลักฐานเป็นชิ้น ๆ (init → PUT chunk N → complete)
+    ไฟล์ปลายทางเขียนตรงตำแหน่งด้วย pwrite ที่ MEDIA_ROOT/uploads/<id>.part
+    complete แล้วจึงสร้าง Evidence และย้ายไฟล์ไป evidence_zips/<evidence_id>.zip
+    """
+    class Status(models.TextChoices):
+        UPLOADING = "UPLOADING", "Uploading"
+        COMPLETE = "COMPLETE", "Complete"
+        ABORTED = "ABORTED", "Aborted"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    total_chunks = models.PositiveIntegerField()
+
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.UPLOADING, db_index=True)
+    received = models.JSONField(default=list, blank=True)      # index ของ chunk ที่เขียนลงดิสก์แล้ว
+    hashed_upto = models.PositiveIntegerField(default=0)        # chunk 0..hashed_upto-1 ถูกรวมเข้า sha256 แล้ว
+    hash_state = models.BinaryField(null=True, blank=True)      # midstate ของ sha256 ณ hashed_upto (worker ไหนก็ต่อได้)
+    sha256 = models.CharField(max_length=64, blank=True)
+
+    # ฟิลด์ฟอร์มเดิมของ upload (case_id, source_system, acquisition_tool, notes, uploaded_by)
+    meta = models.JSONField(default=dict, blank=True)
+    uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    evidence = models.OneToOneField(Evidence, null=True, blank=True, on_delete=models.SET_NULL,
+                                    related_name="upload_session")
+
+    def __str__(self) -> str:
+        return f"UploadSession {self.id} {self.filename} {self.status}"
+
+    @property
+    def part_abspath(self) -> Path:
+        return Path(settings.MEDIA_ROOT) / "uploads" / f"{self.id}.part"
+
+    def chunk_length(self, index: int) -> int:
+        start = index * self.chunk_size
+        return max(0, min(self.chunk_size, self.total_size - start))
+
+
+# ---------- Zip central directory (index ตอนอัปโหลด) ----------
+
+class ZipMember(models.Model):
+    """
+    รายการไฟล์ใน ZIP ของ evidence (อ่านจาก central directory อย่างเดียว ไม่แตกไฟล์)
+    ใช้หา $MFT / Amcache.hve / winevt/Logs และเลือกแตกเฉพาะไฟล์ที่ parser ต้องใช้
+    """
+    evidence = models.ForeignKey(Evidence, on_delete=models.CASCADE, related_name="zip_members")
+    path = models.TextField()                               # ชื่อใน zip (posix, relative)
+    name_lower = models.CharField(max_length=255)           # ชื่อไฟล์ (ตัวเล็ก) สำหรับค้นตามชื่อ
+    size = models.BigIntegerField(default=0)                # uncompressed
+    compressed_size = models.BigIntegerField(default=0)
+    crc = models.BigIntegerField(default=0)                 # CRC-32 จาก central directory
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["evidence", "name_lower"]),
         ]
+
+    def __str__(self) -> str:
+        return self.path
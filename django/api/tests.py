@@ -1,3 +1,1226 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import struct
+import tempfile
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import signing
+from django.core.management import call_command
+from django.db import connection
+from django.http import JsonResponse, QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .models import AmcacheEntry, Case, Evidence, MFTEntry, ParseJob, SecurityEvent, TimelineBucket, UploadSession
+from .utils import (aggregates, evtx_native, jobs, mft_native, paging, parallel_ingest, parse_cache, partitions,
+                    respcache, supertimeline, timeline, uploads)
+from .utils.csvheader import read_compiled
+from .utils.ingest import EVTX_FIELDS, EVTX_TS_FIELDS, _EVTX_CORE_KEYS, _evtx_values, flatten_payload, ingest_csv_to_db
+from .utils.parse_cache import clone_source
+from .utils.partitions import ensure_partition
+from .utils.pgcopy import BulkCreateSink, CopySink
+from .utils.security_describer import _inet, promoted_columns
+from .utils.sha256state import AVAILABLE as SHA256_STATE, Sha256
+from .utils.synthetic import EVTXECMD_HEADER
+from .utils.timestamps import TimestampDecoder
+
+
+def _evidence(**kw) -> Evidence:
+    case, _ = Case.objects.get_or_create(case_number="T-1", defaults={"title": "tests"})
+    ev = Evidence.objects.create(case=case, original_filename="t.zip", stored_path="t.zip", **kw)
+    for model in (MFTEntry, AmcacheEntry, SecurityEvent):
+        ensure_partition(model, ev.pk)
+    return ev
+
+
+class InetColumnTests(SimpleTestCase):
+    """SecurityEvent.src_ip: ค่าที่ PostgreSQL inet ไม่รับต้องไม่หลุดไปถึง COPY (ทั้ง chunk จะ fail)"""
+
+    def test_placeholders_are_null(self):
+        for v in ("-", "LOCAL", "", "   ", None, "not-an-ip"):
+            self.assertIsNone(_inet(v), v)
+
+    def test_ipv4_mapped_is_unwrapped(self):
+        self.assertEqual(_inet("::ffff:1.2.3.4"), "1.2.3.4")
+
+    def test_zone_id_is_dropped(self):
+        self.assertEqual(_inet("fe80::1%11"), "fe80::1")
+        self.assertEqual(_inet("::1%3"), "::1")
+
+    def test_plain_addresses_are_normalized(self):
+        self.assertEqual(_inet(" 10.0.0.5 "), "10.0.0.5")
+        self.assertEqual(_inet("2001:DB8::1"), "2001:db8::1")
+
+    def test_promoted_src_ip(self):
+        cols = promoted_columns({"IpAddress": "fe80::1%11"}, {})
+        self.assertEqual(cols["src_ip"], "fe80::1")
+
+
+class CloneSourceTests(TestCase):
+    """parse cache: clone แถวจาก evidence อื่นได้เฉพาะเมื่อแถวยังเป็นผลของ parse รอบที่ record ไว้"""
+
+    def setUp(self):
+        self.src = _evidence(parse_status=Evidence.ParseStatus.DONE, data_version=3)
+        AmcacheEntry.objects.bulk_create(AmcacheEntry(evidence=self.src, app_name=f"a{i}", file_path="x")
+                                         for i in range(3))
+        self.manifest = {"ingested": {"api.AmcacheEntry": {"evidence_id": self.src.pk, "rows": 3, "data_version": 3}}}
+        self.dst = _evidence()
+
+    def test_done_source_with_same_version(self):
+        self.assertEqual(clone_source(self.manifest, AmcacheEntry, self.dst.pk), self.src.pk)
+
+    def test_version_moved_on(self):
+        Evidence.objects.filter(pk=self.src.pk).update(data_version=4)
+        self.assertIsNone(clone_source(self.manifest, AmcacheEntry, self.dst.pk))
+
+    def test_source_not_done(self):
+        for status in (Evidence.ParseStatus.FAILED, Evidence.ParseStatus.RUNNING):
+            Evidence.objects.filter(pk=self.src.pk).update(parse_status=status)
+            self.assertIsNone(clone_source(self.manifest, AmcacheEntry, self.dst.pk), status)
+
+    def test_reparse_of_the_source_itself(self):
+        # evidence เดียวกันกำลัง parse ซ้ำ (RUNNING) แต่ version ยังไม่ขยับ → ใช้แถวเดิมได้
+        Evidence.objects.filter(pk=self.src.pk).update(parse_status=Evidence.ParseStatus.RUNNING)
+        self.assertEqual(clone_source(self.manifest, AmcacheEntry, self.src.pk), self.src.pk)
+
+    def test_row_count_mismatch_and_legacy_record(self):
+        AmcacheEntry.objects.filter(evidence=self.src, app_name="a0").delete()
+        self.assertIsNone(clone_source(self.manifest, AmcacheEntry, self.dst.pk))
+        legacy = {"ingested": {"api.AmcacheEntry": {"evidence_id": self.src.pk, "rows": 2}}}
+        self.assertIsNone(clone_source(legacy, AmcacheEntry, self.dst.pk))
+
+
+class ParseCacheFilesTests(SimpleTestCase):
+    """ไฟล์ใน cache เป็น hardlink เดียวกับ parsed/<id>/ → รัน parser ใหม่ต้องไม่แก้ของที่แชร์ / evict นับเฉพาะที่ได้คืน"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media = Path(tmp.name)
+
+    def parsed(self, ev_id, text=None) -> Path:
+        d = self.media / "parsed" / str(ev_id)
+        d.mkdir(parents=True, exist_ok=True)
+        if text is not None:
+            (d / "evtx_all.csv").write_text(text)
+            (d / "evtxecmd.log").write_text("log " + text)
+        return d
+
+    def store(self, key, d):
+        return parse_cache.store(key, "evtx-dir", "a" * 64, "img", parse_cache.collect_outputs("evtx-dir", d))
+
+    def test_rerun_does_not_rewrite_shared_inodes(self):
+        first = self.parsed(1, "v1")
+        manifest = self.store("k1", first)
+        other = self.parsed(2)
+        parse_cache.materialize(manifest, other)
+        self.assertEqual((other / "evtx_all.csv").stat().st_nlink, 3)
+
+        parse_cache.clear_outputs("evtx-dir", first, "evtx_all.csv")
+        self.assertEqual(list(first.iterdir()), [])
+        for name in ("evtx_all.csv", "evtxecmd.log"):   # parser เขียนแบบ truncate (">$log", --csv)
+            with open(first / name, "w") as f:
+                f.write("v2")
+        self.assertEqual((parse_cache.cache_root() / "k1" / "evtx_all.csv").read_text(), "v1")
+        self.assertEqual((other / "evtx_all.csv").read_text(), "v1")
+        self.assertEqual((other / "evtxecmd.log").read_text(), "log v1")
+
+    def test_evict_skips_entries_still_linked(self):
+        self.store("linked", self.parsed(1, "x" * 1000))
+        self.store("owned", self.parsed(2, "y" * 1000))
+        for name in ("evtx_all.csv", "evtxecmd.log"):
+            (self.media / "parsed" / "2" / name).unlink()     # evidence 2 ถูกลบ → cache ถือไฟล์ไว้คนเดียว
+        entries = {d.name: size for _, size, d in parse_cache._entries()}
+        self.assertEqual(entries, {"linked": 0, "owned": 2004})
+        # ดิสก์ "เต็ม" ตลอด: ลบได้เฉพาะ entry ที่คืนที่จริง ไม่ล้างทั้ง cache
+        self.assertEqual(parse_cache.evict(max_bytes=0, min_free=1 << 62), 1)
+        self.assertTrue((parse_cache.cache_root() / "linked").exists())
+        self.assertFalse((parse_cache.cache_root() / "owned").exists())
+
+
+class ParseJobQueueTests(TestCase):
+    """คิว ParseJob: claim / คืนคิวเมื่อ heartbeat ขาด / worker เดิมเขียนทับ job ที่ worker อื่นรับไปแล้วไม่ได้"""
+
+    def setUp(self):
+        self.ev = _evidence()
+        self.job = jobs.enqueue_parse_job(self.ev)
+
+    def go_stale(self):
+        ParseJob.objects.filter(pk=self.job.pk).update(heartbeat_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        return jobs.requeue_stale_jobs()
+
+    def beat_once(self, job):
+        hb = jobs._Heartbeat(job)
+        with mock.patch.object(hb._halt, "wait", side_effect=[False, True]), \
+                mock.patch.object(jobs, "connection"):
+            hb.run()
+        return hb
+
+    def test_claim_in_order_once(self):
+        second = jobs.enqueue_parse_job(_evidence())
+        self.assertEqual(jobs.enqueue_parse_job(self.ev).pk, self.job.pk)       # ยังค้างอยู่ → ไม่ enqueue ซ้ำ
+        a, b = jobs.claim_next_job("w1"), jobs.claim_next_job("w2")
+        self.assertEqual((a.pk, a.worker, a.attempts, a.status), (self.job.pk, "w1", 1, ParseJob.Status.RUNNING))
+        self.assertEqual((b.pk, b.worker), (second.pk, "w2"))
+        self.assertIsNone(jobs.claim_next_job("w3"))
+
+    def test_requeue_then_fail_after_max_attempts(self):
+        for attempt in range(1, self.job.max_attempts + 1):
+            self.assertEqual(jobs.claim_next_job(f"w{attempt}").attempts, attempt)
+            self.assertEqual(self.go_stale(), 1)
+        job = ParseJob.objects.get(pk=self.job.pk)
+        self.assertEqual(job.status, ParseJob.Status.FAILED)
+        self.assertIn("heartbeat timeout", job.error)
+        self.assertEqual(Evidence.objects.get(pk=self.ev.pk).parse_status, Evidence.ParseStatus.FAILED)
+        self.assertEqual(self.go_stale(), 0)
+
+    def test_heartbeat_stops_once_job_is_taken_over(self):
+        mine = jobs.claim_next_job("w1")
+        self.assertFalse(self.beat_once(mine).lost.is_set())
+        self.go_stale()
+        theirs = jobs.claim_next_job("w2")
+        beat_before = ParseJob.objects.get(pk=theirs.pk).heartbeat_at
+        self.assertTrue(self.beat_once(mine).lost.is_set())
+        self.assertEqual(ParseJob.objects.get(pk=theirs.pk).heartbeat_at, beat_before)
+
+    def test_stale_worker_result_is_dropped(self):
+        mine = jobs.claim_next_job("w1")
+        self.go_stale()
+        jobs.claim_next_job("w2")
+        with mock.patch.object(jobs, "run_parse_pipeline", return_value={"ok": True}), \
+                self.assertLogs(jobs.log, "WARNING"):
+            got = jobs.run_job(mine)
+        job = ParseJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.status, job.worker, job.attempts, job.result), (ParseJob.Status.RUNNING, "w2", 2, {}))
+        self.assertEqual(got.worker, "w2")
+
+    def test_stale_worker_error_leaves_evidence_alone(self):
+        mine = jobs.claim_next_job("w1")
+        self.go_stale()
+        jobs.claim_next_job("w2")
+        Evidence.objects.filter(pk=self.ev.pk).update(parse_status=Evidence.ParseStatus.RUNNING)
+        version = Evidence.objects.get(pk=self.ev.pk).data_version
+        with mock.patch.object(jobs, "run_parse_pipeline", side_effect=RuntimeError("boom")), \
+                self.assertLogs(jobs.log, "WARNING"):
+            jobs.run_job(mine)
+        ev = Evidence.objects.get(pk=self.ev.pk)
+        self.assertEqual((ev.parse_status, ev.data_version), (Evidence.ParseStatus.RUNNING, version))
+        self.assertEqual(ParseJob.objects.get(pk=self.job.pk).worker, "w2")
+
+    def test_owner_records_result(self):
+        mine = jobs.claim_next_job("w1")
+        with mock.patch.object(jobs, "run_parse_pipeline", return_value={"ok": True, "n": 1}):
+            job = jobs.run_job(mine)
+        self.assertEqual((job.status, job.result), (ParseJob.Status.DONE, {"ok": True, "n": 1}))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_owner_requeues_after_unexpected_error(self):
+        mine = jobs.claim_next_job("w1")
+        version = Evidence.objects.get(pk=self.ev.pk).data_version
+        with mock.patch.object(jobs, "run_parse_pipeline", side_effect=RuntimeError("boom")):
+            job = jobs.run_job(mine)
+        self.assertEqual((job.status, job.worker), (ParseJob.Status.QUEUED, ""))
+        self.assertIn("boom", job.error)
+        ev = Evidence.objects.get(pk=self.ev.pk)
+        self.assertEqual((ev.parse_status, ev.data_version), (Evidence.ParseStatus.PENDING, version + 1))
+        self.assertEqual(jobs.claim_next_job("w2").attempts, 2)
+
+
+@skipUnless(SHA256_STATE, "libcrypto SHA256_* not available")
+class UploadHashTests(TestCase):
+    """sha256 ของ upload แบบแบ่งชิ้น: state อยู่ในแถว → chunk / complete ไปตก worker ไหนก็ไม่ต้องอ่านทั้งไฟล์ใหม่"""
+
+    CHUNK = 64 * 1024
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.data = os.urandom(self.CHUNK * 5 + 123)
+        self.session = uploads.init_upload("e.zip", len(self.data), {}, chunk_size=self.CHUNK)
+        self.reads = []
+        real = uploads._read_chunk
+        patcher = mock.patch.object(uploads, "_read_chunk",
+                                    side_effect=lambda s, i: self.reads.append(i) or real(s, i))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def put(self, index, worker_switch=True):
+        if worker_switch:
+            uploads._pending.clear()          # request ถัดไปไปตก process อื่น (ไม่มี buffer ของ process นี้)
+        s = UploadSession.objects.get(pk=self.session.pk)
+        chunk = self.data[index * self.CHUNK:(index + 1) * self.CHUNK]
+        return uploads.write_chunk(s, index, chunk)
+
+    def finish(self):
+        uploads._pending.clear()
+        return uploads.finish_upload(UploadSession.objects.get(pk=self.session.pk))
+
+    def test_in_order_across_workers_never_rereads(self):
+        for i in range(self.session.total_chunks):
+            self.assertEqual(self.put(i).hashed_upto, i + 1)
+        self.assertEqual(self.finish(), hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(self.reads, [])
+
+    def test_out_of_order_reads_only_chunks_buffered_elsewhere(self):
+        self.put(2)
+        self.put(1, worker_switch=False)
+        self.assertEqual(self.put(0).hashed_upto, 3)      # 1 / 2 อยู่ใน buffer ของ "worker ก่อนหน้า"
+        for i in (5, 4, 3):
+            self.put(i, worker_switch=False)
+        self.assertEqual(self.finish(), hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(sorted(self.reads), [1, 2])
+
+    def test_retry_and_lost_state(self):
+        self.put(0)
+        self.put(0)                                       # retry ซ้ำ: ไม่ hash ซ้ำ
+        UploadSession.objects.filter(pk=self.session.pk).update(hash_state=None)
+        for i in range(1, self.session.total_chunks):
+            self.put(i)
+        self.assertEqual(self.finish(), hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(self.reads, [0])                 # state หาย → เริ่มใหม่ อ่านคืนเฉพาะส่วนที่รับแล้ว
+
+    def test_state_round_trip(self):
+        h = Sha256()
+        h.update(b"x" * 1000)
+        g = Sha256(h.state())
+        g.update(b"y")
+        self.assertEqual(g.hexdigest(), hashlib.sha256(b"x" * 1000 + b"y").hexdigest())
+        with self.assertRaises(ValueError):
+            Sha256(b"garbage")
+
+
+class UploadChunkTests(TestCase):
+    """สถานะ / received ของ session ต้องตรวจจากแถวที่ lock แล้ว ไม่ใช่จาก instance ที่ view โหลดไว้ก่อนหน้า"""
+
+    CHUNK = 64 * 1024
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.session = uploads.init_upload("e.zip", self.CHUNK * 2, {}, chunk_size=self.CHUNK)
+        self.addCleanup(uploads._drop_pending, self.session.id)
+
+    def chunk(self, byte):
+        return byte * self.CHUNK
+
+    def head(self):
+        with open(self.session.part_abspath, "rb") as f:
+            return f.read(self.CHUNK)
+
+    def test_stale_instance_does_not_write_after_abort(self):
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        uploads.write_chunk(UploadSession.objects.get(pk=self.session.pk), 0, self.chunk(b"a"))
+        uploads.abort_upload(UploadSession.objects.get(pk=self.session.pk))
+        with self.assertRaises(uploads.UploadError) as cm:
+            uploads.write_chunk(stale, 1, self.chunk(b"b"))
+        self.assertEqual(cm.exception.status, 409)
+        self.assertFalse(self.session.part_abspath.exists())
+
+    def test_stale_instance_does_not_overwrite_received_chunk(self):
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        uploads.write_chunk(UploadSession.objects.get(pk=self.session.pk), 0, self.chunk(b"a"))
+        s = uploads.write_chunk(stale, 0, self.chunk(b"z"))       # retry ที่ยังไม่เห็นว่า chunk 0 รับไปแล้ว
+        self.assertEqual(s.received, [0])
+        self.assertEqual(self.head(), self.chunk(b"a"))
+
+    def test_complete_session_rejects_chunks(self):
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        UploadSession.objects.filter(pk=self.session.pk).update(status=UploadSession.Status.COMPLETE)
+        with self.assertRaises(uploads.UploadError) as cm:
+            uploads.write_chunk(stale, 0, self.chunk(b"a"))
+        self.assertEqual(cm.exception.status, 409)
+        self.assertEqual(self.head(), self.chunk(b"\0"))
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+class CopySinkTests(TestCase):
+    """COPY text format: escape ผิดไม่ error แต่แถวเพี้ยนเงียบ ๆ → เทียบกับ bulk_create ทีละค่า"""
+
+    HOSTILE = ["", "\\", "\\N", "\\\\N", "a\tb", "line1\nline2", "cr\r\nlf", "back\\slash\\t", "trailing\\",
+               "quote\"'", "日本語 ✓", "\\.", "tab\tat\tend\t", "\\u0000"]
+
+    def rows(self):
+        ts = datetime(2024, 2, 29, 23, 59, 59, 123456, tzinfo=timezone.utc)
+        for i, v in enumerate(self.HOSTILE):
+            yield {"event_id": i, "timestamp": ts, "message": v, "computer": v, "user_name": v,
+                   "event_data": {"v": v, "k\tey\n": [v, None, 1.5], "nul": None}}
+        yield {"event_id": 100, "timestamp": None, "message": "", "event_data": None}       # NULL
+        yield {"event_id": 101, "timestamp": None, "message": "\\N", "event_data": "\\N"}  # ข้อความ \N ≠ NULL
+        yield {"event_id": 102, "timestamp": None, "message": "", "event_data": ""}
+
+    def load(self, sink_cls):
+        ev = _evidence()
+        with sink_cls(SecurityEvent, ev, chunk=4) as sink:
+            for r in self.rows():
+                sink.add(r)
+        fields = ("event_id", "timestamp", "message", "computer", "user_name", "event_data")
+        return list(SecurityEvent.objects.filter(evidence=ev).order_by("event_id").values_list(*fields))
+
+    def test_round_trip_matches_bulk_create(self):
+        copied, created = self.load(CopySink), self.load(BulkCreateSink)
+        self.assertEqual(len(copied), len(self.HOSTILE) + 3)
+        self.assertEqual(copied, created)
+        by_id = {r[0]: r for r in copied}
+        self.assertIsNone(by_id[100][5])
+        self.assertEqual(by_id[101][2:6:3], ("\\N", "\\N"))
+        self.assertEqual(by_id[102][5], "")
+
+    def test_nul_is_dropped(self):
+        ev = _evidence()
+        with CopySink(SecurityEvent, ev) as sink:
+            sink.add({"event_id": 1, "message": "a\x00b", "event_data": {"v": "c\x00d"}})
+        row = SecurityEvent.objects.get(evidence=ev)
+        self.assertEqual((row.message, row.event_data), ("ab", {"v": "cd"}))
+
+
+def _hostile_csv(rows: int, seed: int = 7) -> bytes:
+    """CSV แบบ EvtxECmd: ฟิลด์หลายบรรทัด, "" ข้างใน quote, quote ติด \n / ท้ายฟิลด์"""
+    rnd = random.Random(seed)
+    out = io.StringIO(newline="")
+    w = csv.writer(out)
+    w.writerow(["RecordNumber", "TimeCreated", "EventId", "Level", "Provider", "Channel", "Computer",
+                "UserId", "Message", "Payload"])
+    for i in range(rows):
+        msg = rnd.choice(["", "plain", 'say "hi"\nbye', '"', '""', "a\n\n\"b\"\n", "x,y\r\nz", "end\""])
+        payload = json.dumps({"EventData": {"Data": [{"@Name": "CommandLine", "#text": f'cmd /c "echo {i}"\n\\x'},
+                                                     {"@Name": "Pad", "#text": "p" * rnd.randrange(0, 400)}]}},
+                             indent=rnd.choice([None, 1]))
+        w.writerow([i, f"2024-01-01 00:{i % 60:02d}:{i % 59:02d}.{i:07d}", 4624 + i % 3, "Info",
+                    "Microsoft-Windows-Security-Auditing", "Security", f"HOST{i % 5}", "S-1-5-18", msg, payload])
+    return out.getvalue().encode("utf-8-sig")
+
+
+class RecordBoundaryTests(SimpleTestCase):
+    """แบ่ง CSV เป็นช่วง byte: ขอบ block ต้องไม่ทำให้ parity ของ quote เพี้ยน"""
+
+    @staticmethod
+    def reference(data: bytes, target: int) -> int:
+        quotes = 0
+        for o in range(1, len(data) + 1):
+            quotes += data[o - 1] == ord('"')
+            if o >= target and data[o - 1] == ord("\n") and quotes % 2 == 0:
+                return o
+        return len(data)
+
+    def test_matches_reference_for_every_block_size(self):
+        data = _hostile_csv(12)
+        targets = list(range(1, len(data) + 2, 3))
+        expected = [self.reference(data, t) for t in targets]
+        for block in range(1, 1001):
+            with mock.patch.object(parallel_ingest, "_BLOCK", block):
+                got = parallel_ingest.record_boundaries(io.BytesIO(data), targets)
+            if got != expected:     # ไม่ให้ assertEqual diff list ยาวทั้งก้อน (ช้ามาก)
+                i = next(i for i, (g, e) in enumerate(zip(got, expected)) if g != e)
+                self.fail(f"block={block} target={targets[i]}: {got[i]} != {expected[i]}")
+
+    def test_ranges_reassemble_into_the_same_records(self):
+        data = _hostile_csv(7000)
+        with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+            f.write(data)
+            f.flush()
+            header_end, ranges = parallel_ingest.split_csv_ranges(Path(f.name), 3)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], header_end)
+        self.assertEqual(ranges[-1][1], len(data))
+        whole = list(csv.reader(io.StringIO(data[header_end:].decode("utf-8"), newline="")))
+        parts = [row for a, b in ranges for row in csv.reader(io.StringIO(data[a:b].decode("utf-8"), newline=""))]
+        self.assertEqual(parts, whole)
+
+
+class _InlinePool:
+    """แทน ProcessPoolExecutor ในเทสต์: process ที่ spawn ใหม่มองไม่เห็น test database → รันทีละช่วงใน process นี้"""
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+
+class ParallelIngestParityTests(TransactionTestCase):
+    """ingest แบ่งช่วง (INGEST_PARALLEL_MIN_BYTES=0) ต้องได้แถวเดียวกับทางอ่านทั้งไฟล์"""
+
+    FIELDS = ("record_id", "timestamp", "event_id", "level", "provider", "channel", "computer", "user_sid",
+              "message", "event_data")
+
+    def setUp(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        tmp.write(_hostile_csv(7000))
+        tmp.close()
+        self.path = Path(tmp.name)
+        self.addCleanup(self.path.unlink)
+
+    def rows(self, ev):
+        return list(SecurityEvent.objects.filter(evidence=ev).order_by("record_id").values_list(*self.FIELDS))
+
+    def test_parallel_equals_sequential(self):
+        seq, par = _evidence(), _evidence()
+        n_seq = parallel_ingest.replace_csv_rows("evtx", seq, self.path, workers=1)
+        with mock.patch.object(parallel_ingest, "ProcessPoolExecutor", _InlinePool), \
+                mock.patch.object(parallel_ingest, "ingest_csv_to_db",
+                                  side_effect=AssertionError("fell back to the sequential path")):
+            n_par = parallel_ingest.ingest_csv_parallel("evtx", par, self.path, workers=3)
+        self.assertEqual((n_seq, n_par), (7000, 7000))
+        self.assertEqual(self.rows(par), self.rows(seq))
+
+
+class ReplacingRowsTests(TransactionTestCase):
+    """ingest ใหม่ที่ล้มกลางทางต้องไม่ทำให้แถวเดิมของ evidence หาย (ทั้งทาง staging และทาง transaction เดียว)"""
+
+    def csv(self, n):
+        tmp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        tmp.write(_hostile_csv(n))
+        tmp.close()
+        self.addCleanup(os.unlink, tmp.name)
+        return Path(tmp.name)
+
+    def count(self, ev):
+        return SecurityEvent.objects.filter(evidence=ev).count()
+
+    def test_failed_reload_keeps_old_rows(self):
+        ev = _evidence()
+        parallel_ingest.replace_csv_rows("evtx", ev, self.csv(50), workers=1)
+        real_db, real_range = parallel_ingest.ingest_csv_to_db, parallel_ingest._ingest_range
+        ranges = []
+
+        def to_db(*args):
+            real_db(*args)
+            raise RuntimeError("disk full")
+
+        def one_range(*args):
+            ranges.append(args)
+            if len(ranges) > 1:
+                raise RuntimeError("disk full")
+            return real_range(*args)
+
+        with mock.patch.object(parallel_ingest, "INGEST_PARALLEL_MIN_BYTES", 0), \
+                mock.patch.object(parallel_ingest, "ProcessPoolExecutor", _InlinePool), \
+                mock.patch.object(parallel_ingest, "ingest_csv_to_db", side_effect=to_db), \
+                mock.patch.object(parallel_ingest, "_ingest_range", side_effect=one_range), \
+                self.assertRaisesMessage(RuntimeError, "disk full"):
+            parallel_ingest.replace_csv_rows("evtx", ev, self.csv(3000), workers=3)
+        self.assertEqual(self.count(ev), 50)
+
+    def tables(self, like):
+        with connection.cursor() as cur:
+            cur.execute("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p') AND relname LIKE %s "
+                        "ORDER BY relname", [like])
+            return [r[0] for r in cur.fetchall()]
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+    def test_staging_swaps_in_with_parent_indexes(self):
+        ev = _evidence()
+        parallel_ingest.replace_csv_rows("evtx", ev, self.csv(50), workers=1)
+        part = partitions.partition_name(SecurityEvent, ev.pk)
+        stg = partitions._create_staging(SecurityEvent, ev.pk)
+        ingest_csv_to_db("evtx", ev, self.csv(80), table=stg)
+        self.assertEqual(self.count(ev), 50)          # ยังไม่สลับ → query เห็นข้อมูลเดิม
+
+        partitions._finish_staging(SecurityEvent, stg)
+        with connection.cursor() as cur:
+            parent = len(partitions._parent_indexes(cur, SecurityEvent._meta.db_table))
+            self.assertEqual(len(partitions._parent_indexes(cur, stg)), parent)
+        partitions._swap_in(SecurityEvent, ev.pk, stg)
+
+        self.assertEqual(self.count(ev), 80)
+        self.assertEqual(self.tables(part + "%"), [part])
+        with connection.cursor() as cur:
+            cur.execute("SELECT inhparent::regclass::text FROM pg_inherits WHERE inhrelid = %s::regclass", [part])
+            self.assertEqual(cur.fetchone()[0], SecurityEvent._meta.db_table)
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+    def test_failed_staging_load_is_dropped(self):
+        ev = _evidence()
+        parallel_ingest.replace_csv_rows("evtx", ev, self.csv(50), workers=1)
+        part = partitions.partition_name(SecurityEvent, ev.pk)
+        with self.assertRaises(RuntimeError):
+            with partitions.replacing_rows(SecurityEvent, ev) as table:
+                self.assertTrue(table.startswith(part + "_"))
+                ingest_csv_to_db("evtx", ev, self.csv(80), table=table)
+                raise RuntimeError("boom")
+        self.assertEqual(self.count(ev), 50)
+        self.assertEqual(self.tables(part + "%"), [part])
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+    def test_convert_moves_rows_into_partitions(self):
+        a, b = _evidence(), _evidence()
+        probe = mock.Mock(_meta=mock.Mock(db_table="api_partition_probe", pk=mock.Mock(column="id")))
+        with connection.cursor() as cur:
+            cur.execute("CREATE TABLE api_partition_probe (id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, "
+                        "evidence_id bigint NOT NULL REFERENCES api_evidence (id), name text NOT NULL)")
+            cur.execute("CREATE INDEX api_partition_probe_name ON api_partition_probe (name)")
+            cur.execute("INSERT INTO api_partition_probe (evidence_id, name) VALUES (%s, 'x'), (%s, 'y'), (%s, 'z')",
+                        [a.pk, a.pk, b.pk])
+        self.addCleanup(partitions._partitioned.discard, "api_partition_probe")
+        self.addCleanup(connection.cursor().execute, "DROP TABLE IF EXISTS api_partition_probe CASCADE")
+
+        partitions._convert(probe)
+
+        self.assertTrue(partitions.is_partitioned(probe))
+        self.assertEqual(self.tables("api_partition_probe%"),
+                         sorted(["api_partition_probe", partitions.partition_name(probe, a.pk),
+                                 partitions.partition_name(probe, b.pk)]))
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {partitions.partition_name(probe, a.pk)}")
+            self.assertEqual(cur.fetchone()[0], 2)
+            # id ต่อจากค่าเดิม, index / FK ย้ายไปอยู่บน parent
+            cur.execute("INSERT INTO api_partition_probe (evidence_id, name) VALUES (%s, 'w') RETURNING id", [b.pk])
+            self.assertEqual(cur.fetchone()[0], 4)
+            self.assertEqual([r[0] for r in partitions._parent_indexes(cur, "api_partition_probe")],
+                             ["api_partition_probe_name", "api_partition_probe_pkey"])
+            self.assertEqual(len(partitions._foreign_keys(cur, "api_partition_probe")), 1)
+
+
+class PromoteEventFieldsTests(TestCase):
+
+    def test_backfill_rebuilds_derived_stores(self):
+        ev = _evidence()
+        ts = datetime(2024, 3, 1, 10, 15, tzinfo=timezone.utc)
+        SecurityEvent.objects.bulk_create([
+            SecurityEvent(evidence=ev, record_id=i, timestamp=ts, event_id=4624, channel="Security",
+                          event_data={"LogonType": "10", "TargetUserName": "alice", "IpAddress": "10.0.0.5"})
+            for i in range(3)
+        ])
+        aggregates.rebuild(ev.pk)           # สรุปที่นับไว้ก่อนเติมคอลัมน์: ยังไม่มี logon_type / user / src_ip
+        TimelineBucket.objects.create(evidence=ev, source="security", resolution=timeline.TOTAL,
+                                      bucket=timeline._EPOCH, count=99)
+        self.assertEqual(aggregates.histogram(ev.pk, "logon_type"), [])
+        version = Evidence.objects.get(pk=ev.pk).data_version
+
+        call_command("promote_event_fields", evidence=[ev.pk], stdout=io.StringIO())
+
+        self.assertEqual(aggregates.histogram(ev.pk, "logon_type"), [{"key": "10", "count": 3}])
+        self.assertEqual(aggregates.histogram(ev.pk, "user"), [{"key": "alice", "count": 3}])
+        self.assertEqual(aggregates.histogram(ev.pk, "src_ip"), [{"key": "10.0.0.5", "count": 3}])
+        totals = TimelineBucket.objects.filter(evidence=ev, slot="", source="security", resolution=timeline.TOTAL)
+        self.assertEqual(list(totals.values_list("count", flat=True)), [3])
+        self.assertGreater(Evidence.objects.get(pk=ev.pk).data_version, version)
+
+
+class ResponseCacheKeyTests(TestCase):
+    """key ของ response cache = query string ตามที่ view เห็น: ต่างกันเมื่อ request.GET.get() ได้ค่าต่างกัน"""
+
+    def setUp(self):
+        self.ev = _evidence(parse_status=Evidence.ParseStatus.DONE)
+        patcher = mock.patch.object(respcache, "BACKEND", respcache.LRUBackend(1 << 20))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        @respcache.cached_response("echo")
+        def view(request, ev_id):
+            return JsonResponse({"q": request.GET.get("q"), "sort": request.GET.get("sort")})
+        self.view = view
+
+    def get(self, qs):
+        resp = self.view(RequestFactory().get("/x?" + qs), self.ev.pk)
+        return resp["X-Cache"], json.loads(resp.content)
+
+    def test_distinct_raw_values_get_distinct_keys(self):
+        for a, b in (("q=a&q=b", "q=a,b"), ("sort=Size%20", "sort=Size"), ("q=", ""), ("q=b&q=a", "q=a&q=b")):
+            with self.subTest(a=a, b=b):
+                self.assertNotEqual(respcache.query_key(QueryDict(a)), respcache.query_key(QueryDict(b)))
+
+    def test_param_order_and_cache_buster_share_a_key(self):
+        self.assertEqual(respcache.query_key(QueryDict("sort=Size&q=x&_=123")),
+                         respcache.query_key(QueryDict("q=x&sort=Size")))
+
+    def test_each_request_gets_its_own_response(self):
+        self.assertEqual(self.get("q=a&q=b"), ("MISS", {"q": "b", "sort": None}))
+        self.assertEqual(self.get("q=a,b"), ("MISS", {"q": "a,b", "sort": None}))
+        self.assertEqual(self.get("sort=Size%20"), ("MISS", {"q": None, "sort": "Size "}))
+        self.assertEqual(self.get("sort=Size"), ("MISS", {"q": None, "sort": "Size"}))
+        self.assertEqual(self.get("_=99&q=b&q=a"), ("MISS", {"q": "a", "sort": None}))
+        self.assertEqual(self.get("q=a&q=b&_=1"), ("HIT", {"q": "b", "sort": None}))
+
+
+class KeysetPagingTests(TestCase):
+    """cursor ของ paginate บนคอลัมน์ที่ null ได้ (created_ts): เดินหน้า/ถอยหลังต้องเจอทุกแถวครั้งเดียว ตามลำดับ ordered()"""
+
+    FIELDS = ("id", "entry_number", "created_ts")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ev = _evidence()
+        rnd = random.Random(19)
+        stamps = [datetime(2024, 1, 1 + i % 5, tzinfo=timezone.utc) for i in range(17)] + [None] * 8
+        rnd.shuffle(stamps)       # ค่าซ้ำ + NULL ปนกัน, ลำดับ pk ไม่ตรงกับลำดับค่า
+        MFTEntry.objects.bulk_create([
+            MFTEntry(evidence=cls.ev, entry_number=n, file_name=f"f{n}", full_path=f"\\f{n}", created_ts=ts)
+            for n, ts in enumerate(stamps)
+        ])
+
+    def qs(self):
+        return MFTEntry.objects.filter(evidence=self.ev)
+
+    def expected(self, desc):
+        return list(paging.ordered(self.qs(), "created_ts", desc).values_list("pk", flat=True))
+
+    def page(self, desc, size, cursor=""):
+        return paging.paginate(self.qs(), self.FIELDS, "created_ts", desc, 1, size, cursor)
+
+    def walk(self, desc, size):
+        """หน้าแรก → next จนสุด แล้ว prev จนกลับหน้าแรก → (pk ของแต่ละหน้าขาไป, ขากลับ, segment ของ cursor)"""
+        pages, segs = [], []
+        rows, meta = self.page(desc, size)
+        pages.append([r["pk"] for r in rows])
+        while meta["next_cursor"]:
+            self.assertLess(len(pages), 30, "cursor ไม่ขยับ")
+            segs.append(signing.loads(meta["next_cursor"], salt=paging._CURSOR_SALT)[3])
+            rows, meta = self.page(desc, size, meta["next_cursor"])
+            pages.append([r["pk"] for r in rows])
+        back = [pages[-1]]
+        while meta["prev_cursor"]:
+            self.assertLess(len(back), 30, "cursor ไม่ขยับ")
+            segs.append(signing.loads(meta["prev_cursor"], salt=paging._CURSOR_SALT)[3])
+            rows, meta = self.page(desc, size, meta["prev_cursor"])
+            back.append([r["pk"] for r in rows])
+        return pages, back[::-1], segs
+
+    def test_next_then_prev_visits_every_row_once_in_order(self):
+        for desc in (False, True):
+            expected = self.expected(desc)
+            self.assertEqual(len(expected), 25)
+            for size in (1, 2, 3, 4, 7, 10, 24, 25, 30):
+                with self.subTest(desc=desc, size=size):
+                    pages, back, _ = self.walk(desc, size)
+                    self.assertEqual([pk for p in pages for pk in p], expected)
+                    self.assertEqual(back, pages)
+                    self.assertTrue(all(pages))
+
+    def test_nulls_sort_last_ascending_first_descending(self):
+        nulls = set(self.qs().filter(created_ts__isnull=True).values_list("pk", flat=True))
+        self.assertEqual(set(self.expected(False)[-8:]), nulls)
+        self.assertEqual(set(self.expected(True)[:8]), nulls)
+
+    def test_cursor_switches_segment(self):
+        # หน้าขนาด 3 ข้ามรอยต่อ "มีค่า" / NULL ทั้งสองทิศ → มี cursor ทั้งสองช่วง
+        for desc in (False, True):
+            with self.subTest(desc=desc):
+                pages, _, segs = self.walk(desc, 3)
+                self.assertEqual(set(segs), {paging._VALUE, paging._NULL})
+                mixed = [p for p in pages
+                         if len({ts is None for ts in MFTEntry.objects.filter(pk__in=p).values_list("created_ts", flat=True)}) == 2]
+                self.assertEqual(len(mixed), 1)
+
+    def test_tampered_cursor_is_rejected(self):
+        _, meta = self.page(False, 5)
+        token = meta["next_cursor"]
+        i = token.index(":") - 1
+        forged = token[:i] + ("A" if token[i] != "A" else "B") + token[i + 1:]
+        with self.assertRaises(paging.BadCursor):
+            self.page(False, 5, forged)
+        with self.assertRaises(paging.BadCursor):
+            self.page(False, 5, "garbage")
+
+    def test_cursor_bound_to_sort(self):
+        _, meta = self.page(False, 5)
+        with self.assertRaises(paging.BadCursor):
+            self.page(True, 5, meta["next_cursor"])
+        with self.assertRaises(paging.BadCursor):
+            paging.paginate(self.qs(), self.FIELDS, "modified_ts", False, 1, 5, meta["next_cursor"])
+        bad_seg = signing.dumps(["created_ts", False, True, "x", None, 1], salt=paging._CURSOR_SALT, compress=True)
+        with self.assertRaises(paging.BadCursor):
+            self.page(False, 5, bad_seg)
+
+
+class SuperTimelineTests(TestCase):
+    """k-way merge ของ super-timeline: ลำดับ (เวลา, stream, id) และ cursor ที่เดินต่อได้ทุกขนาดหน้า"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ev, other, cls.empty = _evidence(), _evidence(), _evidence()
+        rnd = random.Random(23)
+        at = [datetime(2024, 1, 1, 12, m, tzinfo=timezone.utc) for m in range(4)] + [None]
+
+        def ts():
+            return rnd.choice(at)     # ค่าซ้ำทั้งใน stream เดียวกันและข้าม stream + NULL
+
+        for ev in (cls.ev, other):
+            MFTEntry.objects.bulk_create([
+                MFTEntry(evidence=ev, entry_number=n, file_name=f"f{n}", full_path=f"\\f{n}", created_ts=ts(),
+                         modified_ts=ts(), accessed_ts=ts(), mft_changed_ts=ts())
+                for n in range(6)
+            ])
+            AmcacheEntry.objects.bulk_create([
+                AmcacheEntry(evidence=ev, app_name=f"app{n}", file_path=f"c:\\app{n}.exe", install_date=ts())
+                for n in range(5)
+            ])
+            SecurityEvent.objects.bulk_create([
+                SecurityEvent(evidence=ev, record_id=n, timestamp=ts(), event_id=4624, channel="Security",
+                              event_data={})
+                for n in range(12)
+            ])
+
+    def expected(self, ranks):
+        """ลำดับที่ควรได้ คำนวณตรง ๆ จากแต่ละตาราง: (เวลา, rank, id)"""
+        out = []
+        for rank in ranks:
+            _source, model, field, _kind, _cols = supertimeline.STREAMS[rank]
+            rows = model.objects.filter(evidence=self.ev).exclude(**{field: None}).values_list(field, "pk")
+            out.extend((t, rank, pk) for t, pk in rows)
+        return sorted(out)
+
+    def walk(self, ranks, limit, cursor=""):
+        pages = []
+        while True:
+            self.assertLess(len(pages), 200, "cursor ไม่ขยับ")
+            rows, cursor = supertimeline.page(self.ev.pk, ranks, limit, cursor=cursor)
+            pages.append(rows)
+            if cursor is None:
+                return pages
+
+    def test_merge_orders_ties_by_stream_then_id(self):
+        ranks = supertimeline.streams()
+        expected = self.expected(ranks)
+        got = [item[:3] for item in supertimeline.merged(self.ev.pk, ranks, chunk=2)]
+        self.assertEqual(got, expected)
+        # เวลาเท่ากันมีหลาย stream จริง (ไม่อย่างนั้นเทสต์นี้ไม่ได้ตรวจตัวตัดสิน)
+        self.assertGreater(len({rank for t, rank, _pk in expected if t == expected[0][0]}), 2)
+
+    def test_pages_continue_without_gaps_or_repeats(self):
+        ranks = supertimeline.streams()
+        full = [supertimeline.row(i) for i in supertimeline.merged(self.ev.pk, ranks)]
+        for limit in (1, 2, 3, 7, len(full) - 1, len(full), len(full) + 5):
+            with self.subTest(limit=limit):
+                pages = self.walk(ranks, limit)
+                self.assertEqual([r for p in pages for r in p], full)
+                self.assertTrue(all(len(p) == limit for p in pages[:-1]))
+                self.assertEqual(len(pages), max(1, -(-len(full) // limit)))
+
+    def test_cursor_is_signed_position_of_last_row(self):
+        ranks = supertimeline.streams()
+        expected = self.expected(ranks)
+        _rows, cursor = supertimeline.page(self.ev.pk, ranks, 5)
+        self.assertEqual(supertimeline.decode_cursor(cursor), expected[4])
+        t, rank, pk = signing.loads(cursor, salt=supertimeline._CURSOR_SALT)
+        self.assertEqual((t, rank, pk), (expected[4][0].isoformat(), expected[4][1], expected[4][2]))
+        with self.assertRaises(paging.BadCursor):
+            supertimeline.decode_cursor(cursor[:-2] + "xx")
+
+    def test_cursor_seeks_every_stream_after_filter_change(self):
+        # cursor จากหน้าที่รวมทุก stream ใช้ต่อกับ stream ชุดอื่นได้: แต่ละ stream เริ่มหลังตำแหน่งเดิมพอดี
+        ranks = supertimeline.streams()
+        expected = self.expected(ranks)
+        _rows, cursor = supertimeline.page(self.ev.pk, ranks, 9)
+        for sources, macb in ((("security",), "MACB"), (("mft", "amcache"), "MB"), (("mft",), "A")):
+            sub = supertimeline.streams(sources, macb)
+            with self.subTest(sources=sources, macb=macb):
+                after = [item[:3] for item in supertimeline.merged(self.ev.pk, sub, after=expected[8])]
+                self.assertEqual(after, [p for p in expected[9:] if p[1] in sub])
+                self.assertEqual([r for p in self.walk(sub, 4, cursor) for r in p],
+                                 [supertimeline.row(i) for i in supertimeline.merged(self.ev.pk, sub,
+                                                                                      after=expected[8])])
+
+    def test_empty_and_exhausted_sources(self):
+        ranks = supertimeline.streams()
+        self.assertEqual(supertimeline.page(self.empty.pk, ranks, 10), ([], None))
+        self.assertEqual(supertimeline.page(self.ev.pk, [], 10), ([], None))
+        last = self.expected(ranks)[-1]
+        self.assertEqual(supertimeline.page(self.ev.pk, ranks, 10, cursor=supertimeline.encode_cursor(last)),
+                         ([], None))
+        # stream ที่หมดก่อน (amcache มีแค่ไม่กี่แถว) ไม่ทำให้ stream อื่นหยุดตาม
+        AmcacheEntry.objects.filter(evidence=self.ev).delete()
+        rows = [r for p in self.walk(ranks, 3) for r in p]
+        self.assertEqual(len(rows), len(self.expected(ranks)))
+        self.assertNotIn("Amcache", {r["Source"] for r in rows})
+
+
+class _BinXml:
+    """
+    เขียน chunk EVTX ขั้นต่ำสำหรับเทสต์: record → template instance (นิยาม template inline ครั้งแรก แล้วอ้าง offset)
+    element / text / sub / entity คืนฟังก์ชันที่เขียนต่อท้าย buf → offset ใน buf = offset ภายใน chunk
+    """
+
+    def __init__(self):
+        self.buf = bytearray(evtx_native._CHUNK_HEADER_SIZE)
+        self.names = {}
+        self.templates = {}
+
+    def _put(self, fmt, *v):
+        self.buf += struct.pack("<" + fmt, *v)
+
+    def _name(self, name):
+        off = self.names.get(name)
+        if off is not None:
+            return self._put("I", off)
+        self.names[name] = len(self.buf) + 4
+        self._put("IIHH", len(self.buf) + 4, 0, 0, len(name))
+        self.buf += name.encode("utf-16-le") + b"\0\0"
+
+    def el(self, name, attrs=(), children=None):
+        def write():
+            self._put("BHI", 0x41 if attrs else 0x01, 0xFFFF, 0)
+            self._name(name)
+            if attrs:
+                size_at = len(self.buf)
+                self._put("I", 0)
+                for i, (aname, parts) in enumerate(attrs):
+                    self._put("B", 0x46 if i < len(attrs) - 1 else 0x06)
+                    self._name(aname)
+                    for part in parts:
+                        part()
+                struct.pack_into("<I", self.buf, size_at, len(self.buf) - size_at - 4)
+            if children is None:
+                return self._put("B", 0x03)
+            self._put("B", 0x02)
+            for child in children:
+                child()
+            self._put("B", 0x04)
+        return write
+
+    def text(self, s):
+        return lambda: self._put(f"BBH{2 * len(s)}s", 0x05, 0x01, len(s), s.encode("utf-16-le"))
+
+    def sub(self, index, vtype, optional=False):
+        return lambda: self._put("BHB", 0x0E if optional else 0x0D, index, vtype)
+
+    def entity(self, name):
+        return lambda: (self._put("B", 0x09), self._name(name))
+
+    def record(self, record_id, key, body, values):
+        """values: [(type, bytes), ...] ตามลำดับ index ของ sub; คืน offset ของ record"""
+        start = len(self.buf)
+        self._put("4sIQQ", evtx_native._RECORD_MAGIC, 0, record_id, 0)
+        self._put("IBBI", 0x0101010F, 0x0C, 0x01, 1)
+        if key in self.templates:
+            self._put("I", self.templates[key])
+        else:
+            self.templates[key] = len(self.buf) + 4
+            self._put("I", len(self.buf) + 4)
+            size_at = len(self.buf) + 20
+            self._put("I16sI", 0, bytes(16), 0)
+            self._put("I", 0x0101010F)
+            body()
+            self._put("B", 0x00)
+            struct.pack_into("<I", self.buf, size_at, len(self.buf) - size_at - 4)
+        self._put("I", len(values))
+        for vtype, data in values:
+            self._put("HBB", len(data), vtype, 0)
+        for _, data in values:
+            self.buf += data
+        self._put("I", len(self.buf) - start + 4)
+        struct.pack_into("<I", self.buf, start + 4, len(self.buf) - start)
+        return start
+
+    def chunk(self) -> bytes:
+        buf = bytearray(self.buf) + bytes(evtx_native._CHUNK_SIZE - len(self.buf))
+        buf[:8] = evtx_native._CHUNK_MAGIC
+        struct.pack_into("<I", buf, 48, len(self.buf))      # free space offset
+        return bytes(buf)
+
+
+def _utf16z(s):
+    return (s + "\0").encode("utf-16-le")
+
+
+def _sid(s):
+    rev, auth, *subs = (int(x) for x in s.split("-")[1:])
+    return bytes([rev, len(subs)]) + auth.to_bytes(6, "big") + struct.pack(f"<{len(subs)}I", *subs)
+
+
+class EvtxNativeTests(SimpleTestCase):
+    """reader ในตัว: BinXML ของ chunk สังเคราะห์ → dict แบบ Payload ของ EvtxECmd / event_data แบบทาง CSV"""
+
+    GUID = bytes(range(16))
+    SOURCE = "C:\\Windows\\System32\\winevt\\Logs\\Security.evtx"
+
+    def build(self) -> _BinXml:
+        b = _BinXml()
+        S, T = b.sub, b.text
+
+        def data(name, *parts):
+            return b.el("Data", [("Name", [T(name)])], list(parts))
+
+        body = b.el("Event", [("xmlns", [T("http://schemas.microsoft.com/win/2004/08/events/event")])], [
+            b.el("System", children=[
+                b.el("Provider", [("Name", [S(0, 0x01)]), ("Guid", [S(1, 0x0F)])]),
+                b.el("EventID", children=[S(2, 0x06)]),
+                b.el("Level", children=[S(3, 0x04)]),
+                b.el("TimeCreated", [("SystemTime", [S(4, 0x12)])]),
+                b.el("EventRecordID", children=[S(5, 0x0A)]),
+                b.el("Channel", children=[S(6, 0x01)]),
+                b.el("Computer", children=[S(7, 0x01)]),
+                b.el("Security", [("UserID", [S(8, 0x13, optional=True)])]),
+            ]),
+            b.el("EventData", children=[
+                data("TargetUserName", S(9, 0x01)),
+                data("LogonType", S(10, 0x08)),
+                data("IpAddress", S(11, 0x01, optional=True)),
+                data("Ports", S(12, 0x86)),
+                data("Workstations", S(13, 0x81)),
+                data("Note", T("a"), b.entity("amp"), T("b")),
+            ]),
+        ])
+        self.offsets = [
+            b.record(1, "4624", body, self.values(1, "alice", "S-1-5-21-1-2-3-1001", "10.0.0.5")),
+            b.record(2, "4624", body, self.values(2, "bob", None, None)),
+        ]
+        return b
+
+    def values(self, record_id, user, sid, ip):
+        systime = struct.pack("<8H", 2024, 2, 4, 29, 23, 59, 58, 123)
+        return [
+            (0x01, _utf16z("Microsoft-Windows-Security-Auditing")),
+            (0x0F, self.GUID),
+            (0x06, struct.pack("<H", 4624)),
+            (0x04, bytes([4])),
+            (0x12, systime),
+            (0x0A, struct.pack("<Q", record_id)),
+            (0x01, _utf16z("Security")),
+            (0x01, _utf16z("WS01.corp.local")),
+            (0x13, _sid(sid)) if sid else (0x00, b""),
+            (0x01, _utf16z(user)),
+            (0x08, struct.pack("<I", 3)),
+            (0x01, _utf16z(ip)) if ip else (0x00, b""),
+            (0x86, struct.pack("<3H", 22, 445, 3389)),
+            (0x81, _utf16z("WS01") + _utf16z("WS02")),
+        ]
+
+    def write_file(self, chunk: bytes) -> Path:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        header = bytearray(0x1000)
+        header[:8] = evtx_native._FILE_MAGIC
+        struct.pack_into("<H", header, 40, 0x1000)
+        path = Path(tmp.name) / "Security.evtx"
+        path.write_bytes(bytes(header) + chunk)
+        return path
+
+    def events(self, chunk: bytes):
+        c = evtx_native._Chunk(chunk, 0)
+        out = []
+        for off in self.offsets:
+            nodes, _ = c.fragment(off + evtx_native._RECORD_HEADER_SIZE)
+            out.append(evtx_native.render(*evtx_native._event_root(nodes, [])))
+        return c, out
+
+    def test_template_instance_rendering(self):
+        c, (first, second) = self.events(self.build().chunk())
+        self.assertEqual(len(c._templates), 1)               # record ที่สองอ้าง template ของ record แรก
+        self.assertEqual(first["@xmlns"], "http://schemas.microsoft.com/win/2004/08/events/event")
+        system = first["System"]
+        self.assertEqual(system["EventID"], "4624")
+        self.assertEqual(system["Level"], "4")
+        self.assertEqual(system["Channel"], "Security")
+        self.assertEqual(system["Provider"]["@Name"], "Microsoft-Windows-Security-Auditing")
+        data = first["EventData"]["Data"]
+        self.assertEqual([d["@Name"] for d in data],
+                         ["TargetUserName", "LogonType", "IpAddress", "Ports", "Workstations", "Note"])
+        self.assertEqual(data[0], {"@Name": "TargetUserName", "#text": "alice"})
+        self.assertEqual(data[5]["#text"], "a&b")
+        # ค่าของ record ที่สองมาจาก substitution ของตัวเอง; ช่อง optional ที่ว่างไม่เหลือ #text
+        self.assertEqual(second["System"]["EventRecordID"], "2")
+        self.assertEqual(second["EventData"]["Data"][0]["#text"], "bob")
+        self.assertEqual(second["EventData"]["Data"][2], {"@Name": "IpAddress"})
+        self.assertEqual(second["System"]["Security"], {"@UserID": ""})
+
+    def test_substitution_types(self):
+        _, (first, _) = self.events(self.build().chunk())
+        system, data = first["System"], {d["@Name"]: d.get("#text") for d in first["EventData"]["Data"]}
+        self.assertEqual(system["Security"]["@UserID"], "S-1-5-21-1-2-3-1001")
+        self.assertEqual(system["Provider"]["@Guid"], "{03020100-0504-0706-0809-0A0B0C0D0E0F}")
+        self.assertEqual(system["TimeCreated"]["@SystemTime"], "2024-02-29 23:59:58.1230000")
+        self.assertEqual(system["EventRecordID"], "1")
+        self.assertEqual(data["LogonType"], "3")
+        self.assertEqual(data["Ports"], "22, 445, 3389")
+        self.assertEqual(data["Workstations"], "WS01, WS02")
+
+    def test_corrupt_chunk(self):
+        buf = bytearray(self.build().chunk())
+        pos = self.offsets[1] + evtx_native._RECORD_HEADER_SIZE
+        buf[pos] = 0x07                     # token ที่ไม่ใช่ fragment / instance / element
+        with self.assertRaises(evtx_native.EvtxFormatError):
+            evtx_native._Chunk(bytes(buf), 0).fragment(pos)
+        reader = evtx_native.EvtxReader(self.write_file(bytes(buf)))
+        self.assertEqual([rid for _, rid, _, _ in reader.events()], [1])     # ข้าม record ที่เสีย อ่านตัวอื่นต่อ
+        self.assertEqual((reader.found, reader.errors), (2, 1))
+        self.assertIn("EvtxFormatError", reader.error_samples[0])
+
+    def test_event_data_matches_csv_path(self):
+        path = self.write_file(self.build().chunk())
+        native = list(evtx_native.EvtxReader(path).rows())
+
+        payload = {"EventData": {"Data": [
+            {"@Name": "TargetUserName", "#text": "alice"}, {"@Name": "LogonType", "#text": "3"},
+            {"@Name": "IpAddress", "#text": "10.0.0.5"}, {"@Name": "Ports", "#text": "22, 445, 3389"},
+            {"@Name": "Workstations", "#text": "WS01, WS02"}, {"@Name": "Note", "#text": "a&b"},
+        ]}}
+        row = dict.fromkeys(EVTXECMD_HEADER, "")
+        row.update(RecordNumber="1", EventRecordId="1", TimeCreated="2024-02-29 23:59:58.1230000", EventId="4624",
+                   Level="Info", Provider="Microsoft-Windows-Security-Auditing", Channel="Security",
+                   Computer="WS01.corp.local", ChunkNumber="0", UserId="S-1-5-21-1-2-3-1001", HiddenRecord="False",
+                   SourceFile=str(path), ExtraDataOffset="0", Payload=json.dumps(payload, ensure_ascii=False))
+        out = io.StringIO()
+        csv.writer(out).writerows([EVTXECMD_HEADER, row.values()])
+        out.seek(0)
+        ch, rows = read_compiled(out, EVTX_FIELDS)
+        cols = ch.columns(exclude=_EVTX_CORE_KEYS)
+        (p, csv_ed), = [(ch.pick(r), ch.raw(r, cols)) for r in rows]
+        native_p, native_ed = native[0]
+        # ต่างกันเฉพาะที่ docstring ของ evtx_native บอก: ไม่มีคอลัมน์ ExtraDataOffset ของ EvtxECmd
+        # และยกค่าใน EventData ขึ้นเป็น key ตรง ๆ
+        csv_ed.pop("ExtraDataOffset")
+        for k, v in flatten_payload(payload):
+            if v:
+                csv_ed.setdefault(k, v)
+        self.assertEqual(native_ed, csv_ed)
+        self.assertEqual({k: v for k, v in native_p.items() if v}, {k: v for k, v in p.items() if v})
+        # ค่าดิบชุดเดียวกัน → แถวที่ลง DB เหมือนกันทุกคอลัมน์ (เวลา / description / คอลัมน์ที่ promote)
+        self.assertEqual(self.values_of([native[0]]), self.values_of([(p, csv_ed)]))
+
+    @staticmethod
+    def values_of(pairs):
+        ts = TimestampDecoder(EVTX_TS_FIELDS)
+        ts.decode([p for p, _ in pairs])
+        return _evtx_values(*pairs[0])
+
+
+def _mft_attr(atype: int, content: bytes, name: str = "") -> bytes:
+    """resident attribute: header 0x18 byte (+ ชื่อ) แล้วเนื้อหา, ยาวปัดเป็นทวีคูณ 8"""
+    raw_name = name.encode("utf-16-le")
+    c_off = 0x18 + len(raw_name)
+    length = (c_off + len(content) + 7) // 8 * 8
+    head = struct.pack("<IIBBHHHIH2x", atype, length, 0, len(name), 0x18, 0, 0, len(content), c_off)
+    return (head + raw_name + content).ljust(length, b"\0")
+
+
+def _mft_record(seq=1, flags=0x01, names=(), base=(0, 0), si=True, data=None, ads=(), usn=0x0102) -> bytearray:
+    """
+    FILE record 1024 byte ที่ใส่ fixup แล้ว (ท้ายทุก sector = USN, ค่าเดิมอยู่ใน update sequence array)
+    names: [(namespace, ชื่อ, parent entry, parent seq), ...] ตามลำดับ attribute
+    """
+    attrs = b""
+    if si:
+        attrs += _mft_attr(0x10, struct.pack("<QQQQI12x", 1, 2, 3, 4, 0x20))
+    for ns, name, p_entry, p_seq in names:
+        fn = struct.pack("<QQQQQQQIIBB", p_entry | p_seq << 48, 5, 6, 7, 8, 0, 0, 0, 0, len(name), ns)
+        attrs += _mft_attr(0x30, fn + name.encode("utf-16-le"))
+    if data is not None:
+        attrs += _mft_attr(0x80, bytes(data))
+    for stream in ads:
+        attrs += _mft_attr(0x80, b"x", stream)
+    attrs += struct.pack("<II", 0xFFFFFFFF, 0)
+    rec = bytearray(1024)
+    struct.pack_into("<4sHH8xHHHHIIQ", rec, 0, b"FILE", 0x30, 3, seq, 1, 0x38, flags,
+                     0x38 + len(attrs), 1024, base[0] | base[1] << 48)
+    rec[0x38:0x38 + len(attrs)] = attrs
+    rec[0x30:0x32] = struct.pack("<H", usn)
+    for i in (1, 2):
+        end = i * 512
+        rec[0x30 + 2 * i:0x32 + 2 * i] = rec[end - 2:end]
+        rec[end - 2:end] = struct.pack("<H", usn)
+    return rec
+
+
+class MftNativeTests(SimpleTestCase):
+    """reader $MFT ในตัว: fixup / เลือกชื่อ / record ส่วนขยาย / ประกอบ path จาก FILE record สังเคราะห์"""
+
+    DIR, IN_USE = 0x02, 0x01
+
+    def decode(self, records: dict):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "$MFT"
+        records = {5: _mft_record(seq=5, flags=self.IN_USE | self.DIR, names=[(3, ".", 5, 5)]), **records}
+        path.write_bytes(b"".join(bytes(records.get(i, bytes(1024))) for i in range(max(records) + 1)))
+        decoded = mft_native.decode_mft(path, workers=1)
+        rows = mft_native._merge_extensions(decoded["rows"], decoded["ext"])
+        return decoded, {r[0]: r for r in rows}, mft_native.PathTable(rows)
+
+    def test_fixups_restore_sector_tails(self):
+        rec = _mft_record(names=[(1, "a" * 200, 5, 5)])      # ชื่อยาวข้ามท้าย sector แรก
+        self.assertEqual(rec[510:512], b"\x02\x01")
+        mft_native.apply_fixups(rec, 0x30, 3)
+        self.assertEqual(mft_native.decode_record(rec)[2][1], "a" * 200)
+
+    def test_fixup_mismatch_is_counted(self):
+        bad = _mft_record(names=[(1, "bad.txt", 5, 5)])
+        bad[1022] ^= 0xFF                                    # ท้าย sector ที่สองไม่เท่ากับ USN
+        with self.assertRaises(mft_native.MftFormatError):
+            mft_native.apply_fixups(bytearray(bad), 0x30, 3)
+        decoded, rows, _ = self.decode({40: bad, 41: _mft_record(names=[(1, "ok.txt", 5, 5)])})
+        self.assertEqual(decoded["errors"], 1)
+        self.assertIn("entry 40", decoded["error_samples"][0])
+        self.assertEqual(sorted(rows), [5, 41])
+
+    def test_win32_name_preferred_over_dos(self):
+        _, rows, _ = self.decode({
+            40: _mft_record(names=[(2, "PROGRA~1", 5, 5), (1, "Program Files", 5, 5)]),
+            41: _mft_record(names=[(3, "Readme.txt", 5, 5), (2, "README~1.TXT", 5, 5)]),
+            42: _mft_record(names=[(2, "ONLYDOS", 5, 5)]),
+        })
+        self.assertEqual(rows[40][4], "Program Files")
+        self.assertEqual(rows[41][4], "Readme.txt")
+        self.assertEqual(rows[42][4], "ONLYDOS")
+
+    def test_extension_records_merge_into_base(self):
+        _, rows, _ = self.decode({
+            40: _mft_record(seq=3),                          # base: มีแต่ $SI, ชื่อ / ขนาด / ADS อยู่ใน 41
+            41: _mft_record(base=(40, 3), si=False, names=[(1, "big.vhd", 5, 5)], data=b"z" * 300,
+                            ads=["Zone.Identifier"]),
+            42: _mft_record(),                               # base ที่ไม่มีชื่อเลย → ไม่มีแถว
+            43: _mft_record(base=(99, 1), si=False, names=[(1, "orphan", 5, 5)]),
+        })
+        self.assertEqual(sorted(rows), [5, 40])
+        entry, seq, in_use, is_dir, name, p_entry, p_seq, size, times, si_flags, links, ads = rows[40]
+        self.assertEqual((seq, name, p_entry, p_seq, size, ads), (3, "big.vhd", 5, 5, 300, ["Zone.Identifier"]))
+        self.assertEqual(times, (1, 2, 3, 4))                # เวลา / flags ของ $SI จาก base record
+        self.assertEqual(si_flags, 0x20)
+
+    def test_deleted_parent_with_sequence_plus_one(self):
+        _, rows, paths = self.decode({
+            40: _mft_record(seq=4, flags=self.DIR, names=[(1, "Old", 5, 5)]),                   # ลบแล้ว: seq 3 → 4
+            41: _mft_record(seq=4, flags=self.IN_USE | self.DIR, names=[(1, "Reused", 5, 5)]),  # ยังใช้อยู่
+            50: _mft_record(flags=0, names=[(1, "gone.txt", 40, 3)]),
+            51: _mft_record(names=[(1, "stale.txt", 41, 3)]),
+        })
+        self.assertEqual(paths.parent_path(*rows[50][5:7]), ".\\Old")
+        # directory ที่ยังใช้อยู่ sequence ต้องตรงเป๊ะ (ถูกลบแล้วนำ entry มาใช้ใหม่)
+        self.assertEqual(paths.parent_path(*rows[51][5:7]), ".\\PathUnknown\\Directory with ID 0x00000029-00000003")
+        self.assertEqual(paths.unresolved, 1)
+
+    def test_path_unknown_naming(self):
+        _, rows, paths = self.decode({
+            40: _mft_record(flags=self.IN_USE | self.DIR, names=[(1, "Sub", 99, 2)]),
+            41: _mft_record(names=[(1, "a.txt", 40, 1)]),
+            42: _mft_record(names=[(1, "b.txt", 5, 5)]),
+        })
+        self.assertEqual(paths.parent_path(*rows[41][5:7]),
+                         ".\\PathUnknown\\Directory with ID 0x00000063-00000002\\Sub")
+        self.assertEqual(paths.parent_path(*rows[42][5:7]), ".")
+        self.assertEqual(paths.unresolved, 1)
+
+    def test_cycle_guard(self):
+        _, rows, paths = self.decode({
+            40: _mft_record(flags=self.IN_USE | self.DIR, names=[(1, "A", 41, 1)]),
+            41: _mft_record(flags=self.IN_USE | self.DIR, names=[(1, "B", 40, 1)]),
+            42: _mft_record(names=[(1, "loop.txt", 40, 1)]),
+        })
+        self.assertEqual(paths.parent_path(*rows[42][5:7]), ".\\PathUnknown\\B\\A")
+        self.assertEqual(paths.unresolved, 1)
@@ -4,13 +4,25 @@ from . import views
 urlpatterns = [
     path("dashboard/overview", views.dashboard_overview_api, name="dashboard_overview_api"),
     path("upload-evidence/", views.upload_evidence_api, name="upload_evidence_api"),
+    path("uploads/", views.upload_init_api, name="upload_init_api"),
+    path("uploads/<uuid:upload_id>/", views.upload_status_api, name="upload_status_api"),
+    path("uploads/<uuid:upload_id>/chunks/<int:index>/", views.upload_chunk_api, name="upload_chunk_api"),
+    path("uploads/<uuid:upload_id>/complete/", views.upload_complete_api, name="upload_complete_api"),
     path("start-extract/", views.start_extract_api, name="start_extract_api"),
     path("start-parse/", views.start_parse_api, name="start_parse_api"),
+    path("jobs/<int:job_id>/", views.job_status_api, name="job_status_api"),
     path("evidence/<int:ev_id>/", views.evidence_detail_api, name="evidence_detail_api"),
     path("evidence/<int:ev_id>/mft/", views.mft_rows_api, name="mft_rows_api"),
+    path("evidence/<int:ev_id>/mft/export", views.mft_export_api, name="mft_export_api"),
     path("evidence/<int:ev_id>/amcache/", views.amcache_rows_api, name="amcache_rows_api"),
+    path("evidence/<int:ev_id>/amcache/export", views.amcache_export_api, name="amcache_export_api"),
     path("evidence/<int:ev_id>/security/", views.security_events_rows_api, name="security_rows_api"),
+    path("evidence/<int:ev_id>/security/export", views.security_events_export_api, name="security_export_api"),
     path("evidence/<int:ev_id>/security/rows", views.security_events_rows_api),
     path("evidence/<int:ev_id>/security/summary", views.security_events_summary_api, name="security_summary_api"),
+    path("evidence/<int:ev_id>/timeline/", views.timeline_api, name="timeline_api"),
+    path("evidence/<int:ev_id>/supertimeline/", views.supertimeline_api, name="supertimeline_api"),
+    path("evidence/<int:ev_id>/supertimeline/export", views.supertimeline_export_api, name="supertimeline_export_api"),
+    path("cache/stats", views.response_cache_stats_api, name="response_cache_stats_api"),
     path("preflight/", views.parser_preflight_api, name="parser_preflight"),
 ]
\ No newline at end of file
@@ -0,0 +1,202 @@
+# django/api/utils/aggregates.py
+"""
+สรุปของ SecurityEvent ต่อ evidence (SecurityEventStat) นับไปพร้อม ingest รอบเดียว ไม่ต้อง GROUP BY ตารางดิบ
+  - make_sink ของ SecurityEvent ห่อด้วย CountingSink: นับค่าของแต่ละ dim ใน Counter
+    ทุก batch (ขนาดเท่า chunk ของ sink) upsert เข้าตาราง count = count + ค่าใหม่ แล้วล้าง Counter
+    อยู่ใน connection / transaction เดียวกับแถว → process ลูกของ parallel ingest นับส่วนของตัวเองแล้วบวกรวมกันเอง
+  - วงจรชีวิตตามแถว (partitions.register_derived): slot = ตารางที่ sink เขียน
+      ลบแถว (clear_rows) → ลบสรุป, สลับ staging เข้า → สรุปของ staging แทนของเดิม, staging พัง → ทิ้ง
+      clone จาก parse cache → คัดลอกสรุปของ evidence ต้นทาง
+  - evidence ที่ ingest ก่อนมีตารางนี้: summary API สร้างให้ครั้งเดียวจากแถวจริง (rebuild)
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce, NullIf, TruncHour
+
+from ..models import SecurityEvent, SecurityEventStat
+
+
+# dim → คอลัมน์ของ SecurityEvent (user: actor ที่ normalize แล้ว ไม่มีค่อยใช้ user_name ของ EVTX)
+DIMENSIONS = ("event_id", "channel", "user", "computer", "logon_type", "src_ip")
+HOUR = "hour"
+TOTAL = "total"
+
+_KEY_MAX = SecurityEventStat._meta.get_field("key").max_length
+
+
+def hour_key(ts: datetime) -> str:
+    """key ของ bucket รายชั่วโมง (UTC) — เรียงแบบ string = เรียงตามเวลา"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return f"{ts:%Y-%m-%dT%H}"
+
+
+def _keys(values: dict) -> Iterable[Tuple[str, str]]:
+    yield TOTAL, ""
+    for dim in ("event_id", "channel", "computer", "logon_type", "src_ip"):
+        v = values.get(dim)
+        if v not in (None, ""):
+            yield dim, str(v)[:_KEY_MAX]
+    user = values.get("actor") or values.get("user_name")
+    if user:
+        yield "user", str(user)[:_KEY_MAX]
+    ts = values.get("timestamp")
+    if isinstance(ts, datetime):
+        yield HOUR, hour_key(ts)
+
+
+def _upsert(evidence_id: int, slot: str, counts: Dict[Tuple[str, str], int]) -> None:
+    """count += ค่าใหม่ (INSERT ... ON CONFLICT — PostgreSQL / SQLite); เรียงตาม key ให้ process ที่ชนกันล็อกแถวลำดับเดียวกัน"""
+    if not counts:
+        return
+    qn = connection.ops.quote_name
+    table = qn(SecurityEventStat._meta.db_table)
+    items = sorted(counts.items())
+    for i in range(0, len(items), 1000):
+        part = items[i:i + 1000]
+        params: List[object] = []
+        for (dim, key), n in part:
+            params.extend((evidence_id, slot, dim, key, n))
+        rows = ", ".join(["(%s, %s, %s, %s, %s)"] * len(part))
+        sql = (f"INSERT INTO {table} (evidence_id, slot, dim, {qn('key')}, {qn('count')}) VALUES {rows} "
+               f"ON CONFLICT (evidence_id, slot, dim, {qn('key')}) "
+               f"DO UPDATE SET {qn('count')} = {table}.{qn('count')} + excluded.{qn('count')}")
+        with connection.cursor() as cur:
+            cur.execute(sql, params)
+
+
+class CountingSink:
+    """
+    ห่อ sink: add() ส่งแถวต่อแล้วนับ key ของแถว (keys(values) → iterable ของ key), ครบ batch → upsert
+    keys / upsert เริ่มต้นเป็นของ SecurityEventStat; utils/timeline.py ใช้ตัวเดียวกันกับ bucket ของเวลา
+    """
+
+    def __init__(self, sink, ev, slot: str = "", batch: Optional[int] = None,
+                 keys: Optional[Callable[[dict], Iterable]] = None,
+                 upsert: Optional[Callable[[int, str, dict], None]] = None):
+        self.sink = sink
+        self.evidence_id = ev.pk
+        self.slot = slot
+        self.keys = keys or _keys
+        self.upsert = upsert or _upsert
+        self.batch = batch or getattr(sink, "chunk", 5000)
+        self.counts: Counter = Counter()
+        self._pending = 0
+
+    @property
+    def saved(self) -> int:
+        return self.sink.saved
+
+    @property
+    def chunk(self) -> int:           # ห่อซ้อนกันได้ (หลาย store ต่อ model) — batch เท่ากันทุกชั้น
+        return self.batch
+
+    def add(self, values: dict) -> None:
+        self.sink.add(values)
+        self.counts.update(self.keys(values))
+        self._pending += 1
+        if self._pending >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        # แถวก่อน สรุปทีหลัง: error ตอน COPY จะไม่เหลือสรุปของแถวที่ไม่ได้ลง
+        self.sink.flush()
+        self.upsert(self.evidence_id, self.slot, self.counts)
+        self.counts.clear()
+        self._pending = 0
+
+    def __enter__(self):
+        self.sink.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return self.sink.__exit__(exc_type, exc, tb)
+
+
+# ===== วงจรชีวิตตามแถว (partitions.register_derived) =====
+
+class StatStore:
+    """ตาราง SecurityEventStat ในฐานะข้อมูลที่คำนวณจากแถวของ SecurityEvent"""
+
+    def wrap(self, sink, ev, slot: str):
+        return CountingSink(sink, ev, slot)
+
+    def clear(self, evidence_id: int, slot: str = "") -> None:
+        SecurityEventStat.objects.filter(evidence_id=evidence_id, slot=slot).delete()
+
+    def promote(self, evidence_id: int, slot: str) -> None:
+        """สรุปของ staging แทนของเดิม (เรียกใน transaction เดียวกับการสลับ partition)"""
+        stats = SecurityEventStat.objects.filter(evidence_id=evidence_id)
+        stats.filter(slot="").delete()
+        stats.filter(slot=slot).update(slot="")
+
+    def copy(self, src_evidence_id: int, evidence_id: int, slot: str) -> None:
+        """clone ของ parse cache: สรุปของ evidence ต้นทาง → evidence ปลายทาง (ต้นทางมีแถวครบ = สรุปครบ)"""
+        if not has_stats(src_evidence_id):
+            rebuild(src_evidence_id)
+        qn = connection.ops.quote_name
+        table = qn(SecurityEventStat._meta.db_table)
+        cols = f"dim, {qn('key')}, {qn('count')}"
+        with connection.cursor() as cur:
+            cur.execute(f"INSERT INTO {table} (evidence_id, slot, {cols}) SELECT %s, %s, {cols} FROM {table} "
+                        f"WHERE evidence_id = %s AND slot = ''", [evidence_id, slot, src_evidence_id])
+
+
+STORE = StatStore()
+
+
+# ===== อ่าน / สร้างย้อนหลัง =====
+
+def has_stats(evidence_id: int) -> bool:
+    return SecurityEventStat.objects.filter(evidence_id=evidence_id, slot="", dim=TOTAL).exists()
+
+
+def rebuild(evidence_id: int) -> int:
+    """สร้างสรุปจากแถวจริง (GROUP BY ต่อ dim) — สำหรับ evidence ที่ ingest ก่อนมีตารางนี้; คืนจำนวนแถว"""
+    rows = SecurityEvent.objects.filter(evidence_id=evidence_id)
+    counts: Dict[Tuple[str, str], int] = {}
+    total = rows.count()
+    if total:
+        counts[(TOTAL, "")] = total
+    exprs = {
+        "event_id": F("event_id"), "channel": F("channel"), "computer": F("computer"),
+        "logon_type": F("logon_type"), "src_ip": F("src_ip"),
+        "user": Coalesce(NullIf(F("actor"), Value("")), F("user_name")),
+    }
+    for dim, expr in exprs.items():
+        for k, n in rows.annotate(k=expr).values("k").annotate(n=Count("id")).values_list("k", "n"):
+            if k not in (None, ""):
+                key = str(k)[:_KEY_MAX]
+                counts[(dim, key)] = counts.get((dim, key), 0) + n
+    hourly = (rows.exclude(timestamp=None).annotate(h=TruncHour("timestamp", tzinfo=timezone.utc))
+              .values("h").annotate(n=Count("id")).values_list("h", "n"))
+    for ts, n in hourly:
+        counts[(HOUR, hour_key(ts))] = n
+    with transaction.atomic():
+        STORE.clear(evidence_id)
+        _upsert(evidence_id, "", counts)
+    return total
+
+
+def histogram(evidence_id: int, dim: str, top: Optional[int] = None) -> List[dict]:
+    """[{key, count}] ของ dim เรียงมาก → น้อย (top = N ค่าแรก)"""
+    qs = (SecurityEventStat.objects.filter(evidence_id=evidence_id, slot="", dim=dim)
+          .order_by("-count", "key").values("key", "count"))
+    return list(qs[:top] if top else qs)
+
+
+def hours(evidence_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """[{hour, count}] เรียงตามเวลา ของชั่วโมงที่คาบเกี่ยวกับ [start, end)"""
+    qs = SecurityEventStat.objects.filter(evidence_id=evidence_id, slot="", dim=HOUR)
+    if start is not None:
+        qs = qs.filter(key__gte=hour_key(start))
+    if end is not None:
+        on_hour = (end.minute, end.second, end.microsecond) == (0, 0, 0)
+        qs = qs.filter(**{"key__lt" if on_hour else "key__lte": hour_key(end)})
+    return [{"hour": f"{k}:00:00Z", "count": n} for k, n in qs.order_by("key").values_list("key", "count")]
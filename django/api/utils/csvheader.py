@@ -0,0 +1,114 @@
+# django/api/utils/csvheader.py
+"""
+คอมไพล์ header ของ CSV ครั้งเดียวต่อไฟล์
+  - เดิม: ทุกแถว _canon_row() normalize ชื่อคอลัมน์ทุกคอลัมน์ใหม่ แล้ว _pick() normalize alias ซ้ำอีกรอบ
+  - ใหม่: อ่าน header → map logical field (EntryNumber, FileName, Created0x10, EventID ...)
+    เป็น index ของคอลัมน์ไว้ก่อน แล้วแต่ละแถวใช้ csv.reader + index ตรง ๆ
+ผลลัพธ์ต้องเหมือน _canon_row + _pick ทุกประการ:
+  - ชื่อคอลัมน์ที่ normalize แล้วซ้ำกัน → คอลัมน์หลังสุดชนะ
+  - ค่า "", "NULL" ถือว่าไม่มี → ลอง alias ถัดไป
+"""
+import csv
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+def _norm_key(s: str) -> str:
+    return "".join(ch for ch in (s or "").lower() if ch.isalnum())
+
+
+FieldSpec = Dict[str, Tuple[str, ...]]   # logical name → aliases (เรียงตามลำดับความสำคัญ)
+
+
+class CompiledHeader:
+    """
+    header = แถวแรกของ CSV, fields = {"entry_number": ("EntryNumber","Entry","RecordNumber"), ...}
+    pick(row) คืน dict {logical name: str}
+    """
+
+    def __init__(self, header: Sequence[str], fields: FieldSpec):
+        self.header = list(header)
+        self.width = len(self.header)
+        self._pad = [""] * self.width
+
+        index: Dict[str, int] = {}
+        for i, h in enumerate(self.header):
+            index[_norm_key(h)] = i          # ซ้ำ → ตัวหลังชนะ (เหมือน dict comprehension เดิม)
+        self.index = index
+
+        plan = []
+        for name, aliases in fields.items():
+            idxs: List[int] = []
+            for a in aliases:
+                i = index.get(_norm_key(a))
+                if i is not None and i not in idxs:
+                    idxs.append(i)
+            plan.append((name, tuple(idxs)))
+        self.plan = tuple(plan)
+
+    def columns(self, exclude: Iterable[str] = ()) -> Tuple[Tuple[str, int], ...]:
+        """
+        (ชื่อคอลัมน์ดิบ, index) สำหรับประกอบ dict ดิบ (extra / event_data) แบบ csv.DictReader
+        exclude = ชื่อที่ normalize แล้ว (เช่น _EVTX_CORE_KEYS)
+        """
+        exclude = set(exclude)
+        last: Dict[str, int] = {}
+        for i, h in enumerate(self.header):
+            last[h] = i                      # DictReader: ชื่อซ้ำ → ค่าของคอลัมน์หลังสุด
+        return tuple(
+            (h, i) for h, i in last.items()
+            if _norm_key(h) not in exclude
+        )
+
+    def fit(self, row: List[str]) -> List[str]:
+        """แถวที่สั้นกว่า header → เติม "" (DictReader เติม None ซึ่งถูกมองว่าไม่มีค่าเหมือนกัน)"""
+        n = len(row)
+        if n < self.width:
+            return row + self._pad[n:]
+        return row
+
+    def pick(self, row: List[str]) -> Dict[str, str]:
+        out = {}
+        for name, idxs in self.plan:
+            v = ""
+            for i in idxs:
+                x = row[i]
+                if x and x != "NULL":
+                    v = x
+                    break
+            out[name] = v
+        return out
+
+    def getter(self, name: str):
+        """ฟังก์ชัน row → ค่าของ logical field เดียว (กติกาเดียวกับ pick) ไว้กรองแถวก่อน pick ทั้งแถว"""
+        idxs = dict(self.plan).get(name, ())
+
+        def get(row: List[str]) -> str:
+            for i in idxs:
+                x = row[i]
+                if x and x != "NULL":
+                    return x
+            return ""
+
+        return get
+
+    @staticmethod
+    def raw(row: List[str], cols: Tuple[Tuple[str, int], ...]) -> Dict[str, str]:
+        return {h: row[i] for h, i in cols if row[i]}
+
+
+def read_compiled(f, fields: FieldSpec) -> Tuple[CompiledHeader, Iterator[List[str]]]:
+    """
+    เปิด csv.reader บนไฟล์ที่เปิดไว้แล้ว → (CompiledHeader, iterator ของแถวที่ fit แล้ว)
+    ข้ามบรรทัดว่างแบบเดียวกับ DictReader
+    """
+    reader = csv.reader(f)
+    header = next(reader, [])
+    ch = CompiledHeader(header, fields)
+
+    def rows():
+        fit = ch.fit
+        for row in reader:
+            if row:
+                yield fit(row)
+
+    return ch, rows()
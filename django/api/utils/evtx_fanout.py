@@ -0,0 +1,185 @@
+# django/api/utils/evtx_fanout.py
+"""
+parse winevt/Logs แบบกระจายหลาย parser พร้อมกัน (EvtxECmd ตัวเดียวทั้งโฟลเดอร์ = ทีละไฟล์)
+  - แบ่งไฟล์ .evtx เป็น bin ตามขนาด (ใหญ่สุดก่อน ใส่ bin ที่เบาสุด) → Security.evtx ก้อนใหญ่ได้ bin ของตัวเอง
+    ไฟล์เล็กหลายร้อยไฟล์กระจายไป bin อื่น
+  - แต่ละ bin: โฟลเดอร์ของตัวเองใต้ parsed/<id>/evtx_bins/ ที่มี hardlink (ไม่ได้ก็ relative symlink)
+    ของไฟล์ใน bin → รัน parse evtx-dir ผ่าน executor เดิมพร้อมกัน
+  - รวม CSV ของทุก bin เป็นไฟล์เดียว (ชื่อเดิม เช่น evtx_all.csv) แบบ stream: header จาก bin แรก
+    bin ถัดไปต่อเฉพาะส่วนข้อมูล (byte ต่อ byte ไม่ parse) → ingest / cache / ลิงก์ใช้ไฟล์เดิมได้หมด
+    (ingest ไฟล์ใหญ่แบ่งช่วงลงหลาย process อยู่แล้ว จึงไม่ต้องส่ง CSV ของแต่ละ bin ไป ingest แยก)
+  - evtxecmd.log ของทุก bin รวมเป็นไฟล์เดียว; parse_evtxecmd_log() ดึงจำนวนแถว / error ต่อไฟล์
+"""
+import csv
+import io
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+from .executors import ParserExecutor, ParserJob
+from .parallel_ingest import record_boundaries
+
+
+EVTX_FANOUT_BINS = int(getattr(settings, "EVTX_FANOUT_BINS", 4))
+
+_LOG_NAME = "evtxecmd.log"
+_COPY_BUF = 8 * 1024 * 1024
+
+
+def evtx_files(in_dir: Path) -> List[Path]:
+    return sorted(p for p in Path(in_dir).rglob("*") if p.is_file() and p.suffix.lower() == ".evtx")
+
+
+def size_balanced_bins(files: List[Path], bins: int) -> List[List[Path]]:
+    """ไฟล์ใหญ่สุดก่อน ใส่ bin ที่ผลรวมขนาดน้อยสุด (LPT); ตัด bin ว่างทิ้ง"""
+    bins = max(1, min(bins, len(files)))
+    loads = [0] * bins
+    out: List[List[Path]] = [[] for _ in range(bins)]
+    for p in sorted(files, key=lambda f: f.stat().st_size, reverse=True):
+        i = loads.index(min(loads))
+        out[i].append(p)
+        loads[i] += p.stat().st_size
+    return [b for b in out if b]
+
+
+def _link(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # relative symlink: ชี้ถูกทั้งบนเครื่องนี้และใน container ที่ mount media ไว้ path อื่น
+        os.symlink(os.path.relpath(src, dst.parent), dst)
+
+
+def _header_end(path: Path) -> int:
+    with open(path, "rb") as f:
+        return record_boundaries(f, [1])[0]
+
+
+def merge_csvs(parts: List[Path], dest: Path) -> None:
+    """
+    ต่อ CSV หลายไฟล์เป็นไฟล์เดียว; header เหมือนกัน → ต่อ byte ตรง ๆ
+    header ต่างกัน (EvtxECmd คนละเวอร์ชัน ฯลฯ) → เขียนใหม่ตาม header รวมด้วย csv
+    """
+    parts = [p for p in parts if p.exists() and p.stat().st_size > 0]
+    if not parts:
+        return
+    headers = []
+    for p in parts:
+        with open(p, "rb") as f:
+            headers.append(f.read(_header_end(p)))
+    tmp = dest.with_name(f".{dest.name}.merge")
+    if all(h.lstrip(b"\xef\xbb\xbf") == headers[0].lstrip(b"\xef\xbb\xbf") for h in headers):
+        with open(tmp, "wb") as out:
+            for i, p in enumerate(parts):
+                with open(p, "rb") as src:
+                    if i:
+                        src.seek(len(headers[i]))
+                    shutil.copyfileobj(src, out, _COPY_BUF)
+    else:
+        cols: List[str] = []
+        for h in headers:
+            for c in next(csv.reader(io.StringIO(h.decode("utf-8-sig", errors="ignore"))), []):
+                if c not in cols:
+                    cols.append(c)
+        with open(tmp, "w", newline="", encoding="utf-8-sig") as out:
+            w = csv.DictWriter(out, fieldnames=cols)
+            w.writeheader()
+            for p in parts:
+                with open(p, newline="", encoding="utf-8-sig", errors="ignore") as src:
+                    w.writerows(csv.DictReader(src))
+    os.replace(tmp, dest)
+
+
+def run_evtx_fanout(executor: ParserExecutor, in_dir: Path, out_dir: Path, csv_name: str,
+                    timeout=None, label: str = "", bins: int = None) -> Tuple[bool, str, List[str]]:
+    """
+    parse in_dir เป็น bin ขนานกัน แล้วรวมเป็น out_dir/csv_name + out_dir/evtxecmd.log
+    คืน (ok, output รวมของทุก bin, คำสั่งที่รัน)
+    """
+    bins = EVTX_FANOUT_BINS if bins is None else bins
+    groups = size_balanced_bins(evtx_files(in_dir), bins)
+    work = out_dir / "evtx_bins"
+    shutil.rmtree(work, ignore_errors=True)
+
+    jobs = []
+    for k, group in enumerate(groups):
+        bin_in, bin_out = work / f"in-{k}", work / f"out-{k}"
+        bin_in.mkdir(parents=True)
+        for p in group:
+            # ชื่อซ้ำได้ถ้ามีโฟลเดอร์ย่อย → เติม path ย่อยเข้าไปในชื่อ
+            _link(p, bin_in / p.relative_to(in_dir).as_posix().replace("/", "__"))
+        jobs.append(ParserJob("evtx-dir", bin_in, bin_out, csv_name, timeout=timeout,
+                              label=f"{label}-bin{k}" if label else ""))
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(jobs) or 1, thread_name_prefix="evtx-bin") as pool:
+            results = list(pool.map(executor.run, jobs))
+
+        outputs, commands = [], []
+        for k, (job, res) in enumerate(zip(jobs, results)):
+            outputs.append(f"=== bin {k}: {len(groups[k])} file(s), rc={res.rc}, {res.elapsed:.1f}s ===\n{res.output}")
+            commands.append(" ".join(res.command))
+        ok = bool(jobs) and all(r.ok for r in results)
+
+        # รวม log เสมอ (แม้ bin ไหนล้มก็ยังดูได้ว่าไฟล์ไหนพัง)
+        with open(out_dir / _LOG_NAME, "w", encoding="utf-8", errors="ignore") as log:
+            for k, job in enumerate(jobs):
+                part_log = job.out_dir / _LOG_NAME
+                log.write(f"=== bin {k} ===\n")
+                if part_log.exists():
+                    log.write(part_log.read_text(encoding="utf-8", errors="ignore"))
+        if ok:
+            merge_csvs([job.out_dir / csv_name for job in jobs], out_dir / csv_name)
+        return ok, "\n".join(outputs), commands
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+# ===== evtxecmd.log → จำนวนแถว / error ต่อไฟล์ =====
+
+_RE_PROCESSING = re.compile(r"^Processing\s+'?(?P<path>.+?\.evtx)'?(?:\.\.\.)?\s*$", re.IGNORECASE)
+_RE_INCLUDED = re.compile(r"Records included:\s*(?P<rows>[\d,]+)(?:\s*Errors:\s*(?P<errors>[\d,]+))?"
+                          r"(?:\s*Events dropped:\s*(?P<dropped>[\d,]+))?", re.IGNORECASE)
+_RE_FOUND = re.compile(r"Total event log records found:\s*(?P<n>[\d,]+)", re.IGNORECASE)
+_RE_ERRCOUNT = re.compile(r"error count:\s*(?P<n>[\d,]+)", re.IGNORECASE)
+
+
+def _num(s: str) -> int:
+    return int(s.replace(",", "")) if s else 0
+
+
+def parse_evtxecmd_log(text: str) -> Dict[str, dict]:
+    """
+    {ชื่อไฟล์: {"rows": .., "errors": .., "dropped": .., "found": ..}} จาก stdout ของ EvtxECmd
+    ชื่อไฟล์ตัด path ทิ้ง (รองรับทั้ง \\ และ /) และตัด prefix ของโฟลเดอร์ย่อยที่ fan-out เติมไว้
+    """
+    out: Dict[str, dict] = {}
+    cur = None
+    for line in text.splitlines():
+        line = line.strip()
+        m = _RE_PROCESSING.match(line)
+        if m:
+            name = re.split(r"[\\/]", m.group("path"))[-1].split("__")[-1]
+            cur = out.setdefault(name, {"rows": 0, "errors": 0, "dropped": 0, "found": 0})
+            continue
+        if cur is None:
+            continue
+        m = _RE_INCLUDED.search(line)
+        if m:
+            cur["rows"] += _num(m.group("rows"))
+            cur["errors"] += _num(m.group("errors"))
+            cur["dropped"] += _num(m.group("dropped"))
+            continue
+        m = _RE_FOUND.search(line)
+        if m:
+            cur["found"] += _num(m.group("n"))
+            continue
+        m = _RE_ERRCOUNT.search(line)
+        if m:
+            cur["errors"] += _num(m.group("n"))
+    return out
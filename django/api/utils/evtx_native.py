@@ -0,0 +1,611 @@
+# django/api/utils/evtx_native.py
+"""
+EVTX reader ในตัว: .evtx → SecurityEvent ตรง ๆ (ไม่ผ่าน EvtxECmd / docker / evtx_all.csv)
+  - mmap ไฟล์ → เดิน chunk 64 KB ("ElfChnk") → record ("**\\0\\0") → ถอด BinXML
+    template ของแต่ละ chunk คอมไพล์เป็น tree ครั้งเดียว (cache ตาม offset) แล้วเติม substitution ต่อ record
+  - record → dict แบบเดียวกับ JSON ใน Payload ของ EvtxECmd ("@attr", "#text", ชื่อซ้ำ → list)
+    แล้วแปลงเป็นค่าฟิลด์หลัก (ชื่อตาม EVTX_FIELDS) + event_data → TimestampDecoder / _evtx_values / sink ชุดเดิม
+      event_data: EventRecordId, ChunkNumber, SourceFile, HiddenRecord, Payload แบบคอลัมน์ของ EvtxECmd
+                  + ค่าใน EventData / UserData เป็น key ตรง ๆ (TargetUserName, LogonType, ...)
+      ไม่มีคอลัมน์ที่มาจาก Maps ของ EvtxECmd (MapDescription, UserName, RemoteHost, PayloadData1..6)
+  - ตัวกรองโปรไฟล์ (evtx_profiles) ตรวจจาก System ก่อนถอดส่วนอื่นของ record
+  - หนึ่งไฟล์ต่อหนึ่ง process (spawn, ไฟล์ใหญ่ก่อน) แต่ละ process ลง DB ใน transaction ของตัวเอง
+    ไฟล์ไหนล้ม → ลบแถวของ evidence ทั้งหมดแล้วโยน error ต่อ (เหมือน parallel_ingest)
+  - record ที่ถอดไม่ได้ข้ามไป (นับใน errors); chunk ที่ magic ไม่ตรง (ว่าง / เสีย) ข้ามทั้ง chunk
+เลือกใช้ด้วย EVTX_BACKEND=native (ค่าเริ่มต้น evtxecmd); เทียบผลกับ EvtxECmd: manage.py evtx_parity
+"""
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import Evidence, SecurityEvent
+from .evtx_profiles import EvtxFilter
+from .ingest import EVTX_TS_FIELDS, _batched, _evtx_values, flatten_payload
+from .partitions import can_stage, replacing_rows
+from .pgcopy import make_sink
+from .timestamps import TimestampDecoder, filetime_str
+
+
+EVTX_BACKEND = getattr(settings, "EVTX_BACKEND", "evtxecmd")     # evtxecmd | native
+EVTX_NATIVE_WORKERS = int(getattr(settings, "EVTX_NATIVE_WORKERS", min(4, os.cpu_count() or 1)))
+
+_FILE_MAGIC = b"ElfFile\x00"
+_CHUNK_MAGIC = b"ElfChnk\x00"
+_RECORD_MAGIC = b"\x2a\x2a\x00\x00"
+_CHUNK_SIZE = 0x10000
+_CHUNK_HEADER_SIZE = 0x200
+_RECORD_HEADER_SIZE = 24
+_MAX_SUBSTITUTIONS = 4096
+_MAX_ERROR_SAMPLES = 10
+
+_U16 = struct.Struct("<H").unpack_from
+_U32 = struct.Struct("<I").unpack_from
+_U64 = struct.Struct("<Q").unpack_from
+_RECORD_HDR = struct.Struct("<IQQ").unpack_from       # size, record id, เวลา written (FILETIME)
+_SUB_TOKEN = struct.Struct("<HB").unpack_from         # index, value type
+
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+_FIXED = {0x03: "b", 0x04: "B", 0x05: "h", 0x06: "H", 0x07: "i", 0x08: "I",
+          0x09: "q", 0x0A: "Q", 0x0B: "f", 0x0C: "d"}
+# System/Level → ชื่อแบบที่ EvtxECmd เขียนลงคอลัมน์ Level
+_LEVELS = {"0": "LogAlways", "1": "Critical", "2": "Error", "3": "Warning", "4": "Info", "5": "Verbose"}
+
+
+class EvtxFormatError(ValueError):
+    """โครงสร้างไฟล์ / BinXML ไม่ตรงกับที่คาด"""
+
+
+# ===== ค่าของ substitution =====
+
+def _systemtime(buf: bytes, off: int) -> str:
+    y, mo, _dow, d, h, mi, s, ms = struct.unpack_from("<8H", buf, off)
+    return f"{y:04d}-{mo:02d}-{d:02d} {h:02d}:{mi:02d}:{s:02d}.{ms:03d}0000"
+
+
+def _sid(buf: bytes, off: int) -> str:
+    rev, n = buf[off], buf[off + 1]
+    authority = int.from_bytes(buf[off + 2:off + 8], "big")
+    subs = struct.unpack_from(f"<{n}I", buf, off + 8)
+    return f"S-{rev}-{authority}" + "".join(f"-{x}" for x in subs)
+
+
+def _guid(buf: bytes, off: int) -> str:
+    d1, d2, d3 = struct.unpack_from("<IHH", buf, off)
+    rest = buf[off + 8:off + 16].hex().upper()
+    return f"{{{d1:08X}-{d2:04X}-{d3:04X}-{rest[:4]}-{rest[4:]}}}"
+
+
+def _utf16(buf: bytes, off: int, nbytes: int) -> str:
+    return buf[off:off + nbytes].decode("utf-16-le", "replace")
+
+
+# ===== BinXML → tree =====
+# part ของเนื้อหา: str (ข้อความคงที่) | _Sub (ช่องเติมค่า) | _Element | _Instance
+# ค่าที่เติม: str | None | list ของ node (ค่า type BinXml ที่ซ้อน fragment อยู่ข้างใน)
+
+class _Sub:
+    __slots__ = ("index", "optional")
+
+    def __init__(self, index: int, optional: bool):
+        self.index = index
+        self.optional = optional
+
+
+class _Element:
+    __slots__ = ("name", "attrs", "children", "fn")
+
+    def __init__(self, name: str, attrs: list, children: list):
+        self.name = name
+        self.attrs = attrs          # [(ชื่อ, [part, ...]), ...]
+        self.children = children    # [part, ...]
+        self.fn = None              # renderer ที่คอมไพล์แล้ว (ดู render)
+
+
+class _Instance:
+    __slots__ = ("nodes", "values")
+
+    def __init__(self, nodes: list, values: list):
+        self.nodes = nodes
+        self.values = values
+
+
+class _Chunk:
+    """chunk 64 KB หนึ่งก้อน: ชื่อ (string table) และ template อ้างด้วย offset ภายใน chunk → cache ไว้ที่นี่"""
+
+    def __init__(self, buf: bytes, number: int):
+        self.buf = buf
+        self.number = number
+        self._names: Dict[int, Tuple[str, int]] = {}
+        self._templates: Dict[int, list] = {}
+
+    def _name_ref(self, pos: int) -> Tuple[str, int]:
+        """name offset ที่ pos → (ชื่อ, pos ถัดไป); ชื่อที่ประกาศครั้งแรกอยู่ต่อท้ายตรงนั้น → ข้ามตัว string ไปด้วย"""
+        off = _U32(self.buf, pos)[0]
+        pos += 4
+        hit = self._names.get(off)
+        if hit is None:
+            n = _U16(self.buf, off + 6)[0]
+            hit = self._names[off] = (_utf16(self.buf, off + 8, 2 * n), n)
+        if off == pos:
+            pos += 10 + 2 * hit[1]        # next(4) hash(2) length(2) chars + NUL(2)
+        return hit[0], pos
+
+    def fragment(self, pos: int) -> Tuple[list, int]:
+        """BinXML fragment ที่ pos → (nodes, pos หลัง fragment รวม substitution array ถ้ามี)"""
+        buf = self.buf
+        nodes: list = []
+        while True:
+            tok = buf[pos]
+            t = tok & 0x0F
+            if t == 0x0F:                     # fragment header
+                pos += 4
+            elif t == 0x0C:                   # template instance (+ ค่า substitution) = จบ fragment
+                inst, pos = self._instance(pos)
+                nodes.append(inst)
+                return nodes, pos
+            elif t == 0x01:
+                el, pos = self._element(pos)
+                nodes.append(el)
+            elif t == 0x00:                   # end of stream
+                return nodes, pos + 1
+            else:
+                raise EvtxFormatError(f"unexpected token 0x{tok:02x} at chunk offset 0x{pos:x}")
+
+    def _template(self, def_off: int) -> list:
+        nodes = self._templates.get(def_off)
+        if nodes is None:
+            # next template(4) guid(16) data size(4) แล้วตามด้วย fragment ของ template
+            nodes = self._templates[def_off] = self.fragment(def_off + 24)[0]
+        return nodes
+
+    def _instance(self, pos: int) -> Tuple[_Instance, int]:
+        buf = self.buf
+        def_off = _U32(buf, pos + 6)[0]        # token(1) unknown(1) template id(4) definition offset(4)
+        pos += 10
+        nodes = self._template(def_off)
+        if def_off == pos:                     # นิยาม template อยู่ต่อท้าย (ใช้ครั้งแรกใน chunk)
+            pos = def_off + 24 + _U32(buf, def_off + 20)[0]
+        count = _U32(buf, pos)[0]
+        if count > _MAX_SUBSTITUTIONS:
+            raise EvtxFormatError(f"implausible substitution count {count}")
+        decl = struct.unpack_from(f"<{2 * count}H", buf, pos + 4)   # (size, type | pad << 8) ต่อช่อง
+        pos += 4 + 4 * count
+        values = []
+        for i in range(count):
+            size = decl[2 * i]
+            values.append(self._value(decl[2 * i + 1] & 0xFF, pos, size))
+            pos += size
+        return _Instance(nodes, values), pos
+
+    def _element(self, pos: int) -> Tuple[_Element, int]:
+        buf = self.buf
+        has_attrs = buf[pos] & 0x40
+        name, pos = self._name_ref(pos + 7)    # token(1) dependency id(2) data size(4)
+        attrs = []
+        if has_attrs:
+            end = pos + 4 + _U32(buf, pos)[0]
+            pos += 4
+            while pos < end:
+                aname, pos = self._name_ref(pos + 1)       # token 0x06 / 0x46
+                parts, pos = self._content(pos, end, in_attr=True)
+                attrs.append((aname, parts))
+        t = buf[pos] & 0x0F
+        pos += 1
+        children: list = []
+        if t == 0x02:                          # close start → เนื้อหา → end element
+            children, pos = self._content(pos)
+            pos += 1
+        elif t != 0x03:                        # ไม่ใช่ close empty
+            raise EvtxFormatError(f"unexpected token 0x{t:02x} closing <{name}>")
+        return _Element(name, attrs, children), pos
+
+    def _content(self, pos: int, end: Optional[int] = None, in_attr: bool = False) -> Tuple[list, int]:
+        """ค่าของ attribute (หยุดที่ attribute ถัดไป / ปิด tag) หรือเนื้อหาของ element (หยุดที่ end element)"""
+        buf = self.buf
+        parts: list = []
+        while end is None or pos < end:
+            t = buf[pos] & 0x0F
+            if t == 0x05:                      # value: type(1) + จำนวนตัวอักษร(2) + UTF-16
+                n = _U16(buf, pos + 2)[0]
+                parts.append(_utf16(buf, pos + 4, 2 * n))
+                pos += 4 + 2 * n
+            elif t == 0x0D or t == 0x0E:       # normal / optional substitution
+                index, _vtype = _SUB_TOKEN(buf, pos + 1)
+                parts.append(_Sub(index, t == 0x0E))
+                pos += 4
+            elif t == 0x08:                    # character reference
+                parts.append(chr(_U16(buf, pos + 1)[0]))
+                pos += 3
+            elif t == 0x09:                    # entity reference
+                ename, pos = self._name_ref(pos + 1)
+                parts.append(_ENTITIES.get(ename, f"&{ename};"))
+            elif t == 0x07:                    # CDATA
+                n = _U16(buf, pos + 1)[0]
+                parts.append(_utf16(buf, pos + 3, 2 * n))
+                pos += 3 + 2 * n
+            elif in_attr or t == 0x04:
+                break
+            elif t == 0x01:
+                el, pos = self._element(pos)
+                parts.append(el)
+            elif t == 0x0C:
+                inst, pos = self._instance(pos)
+                parts.append(inst)
+            elif t == 0x0A:                    # processing instruction: ข้าม
+                _, pos = self._name_ref(pos + 1)
+            elif t == 0x0B:
+                pos += 3 + 2 * _U16(buf, pos + 1)[0]
+            else:
+                raise EvtxFormatError(f"unexpected token 0x{buf[pos]:02x} at chunk offset 0x{pos:x}")
+        return parts, pos
+
+    def _value(self, vtype: int, off: int, size: int):
+        if vtype == 0x00 or size == 0:
+            return None
+        if vtype == 0x21:                      # BinXml ซ้อน (เช่น UserData / EventData ของ provider เก่า)
+            return self.fragment(off)[0]
+        decode = _DECODERS.get(vtype)
+        if decode is not None:
+            return decode(self.buf, off, size)
+        if vtype & 0x80 and (vtype & 0x7F) in _FIXED:
+            fmt = _FIXED[vtype & 0x7F]
+            n = size // struct.calcsize(fmt)
+            return ", ".join(str(v) for v in struct.unpack_from(f"<{n}{fmt}", self.buf, off))
+        return self.buf[off:off + size].hex().upper()
+
+
+def _fixed_decoder(fmt: str):
+    unpack = struct.Struct("<" + fmt).unpack_from
+    if fmt in "fd":
+        return lambda buf, off, size: repr(unpack(buf, off)[0])
+    return lambda buf, off, size: str(unpack(buf, off)[0])
+
+
+# value type → (buf, offset, size) → str
+_DECODERS = {
+    0x01: lambda buf, off, size: _utf16(buf, off, size).rstrip("\x00"),
+    0x02: lambda buf, off, size: buf[off:off + size].decode("cp1252", "replace").rstrip("\x00"),
+    **{t: _fixed_decoder(fmt) for t, fmt in _FIXED.items()},
+    0x0D: lambda buf, off, size: "true" if _U32(buf, off)[0] else "false",
+    0x0E: lambda buf, off, size: buf[off:off + size].hex().upper(),
+    0x0F: lambda buf, off, size: _guid(buf, off),
+    0x10: lambda buf, off, size: f"0x{_U64(buf, off)[0]:016x}" if size == 8 else f"0x{_U32(buf, off)[0]:08x}",
+    0x11: lambda buf, off, size: filetime_str(_U64(buf, off)[0]),
+    0x12: lambda buf, off, size: _systemtime(buf, off),
+    0x13: lambda buf, off, size: _sid(buf, off),
+    0x14: lambda buf, off, size: f"0x{_U32(buf, off)[0]:08x}",
+    0x15: lambda buf, off, size: f"0x{_U64(buf, off)[0]:016x}",
+    0x81: lambda buf, off, size: ", ".join(x for x in _utf16(buf, off, size).split("\x00") if x),
+}
+
+
+# ===== tree + ค่า → dict (แบบ XML → JSON ของ EvtxECmd) =====
+
+def _add(out: dict, name: str, value) -> None:
+    cur = out.get(name, _add)
+    if cur is _add:
+        out[name] = value
+    elif isinstance(cur, list):
+        cur.append(value)
+    else:
+        out[name] = [cur, value]
+
+
+def _render_nodes(nodes: Iterable, values: list, out: dict) -> None:
+    for node in nodes:
+        if node.__class__ is _Element:
+            _add(out, node.name, render(node, values))
+        elif node.__class__ is _Instance:
+            _render_nodes(node.nodes, node.values, out)
+
+
+def _sub_value(index: int):
+    return lambda values: values[index] if index < len(values) else None
+
+
+def _compile_text(parts: list) -> Callable[[list], str]:
+    """ค่าของ attribute → ฟังก์ชัน values → str (ค่าที่เป็น BinXml ซ้อนใน attribute ไม่นับ)"""
+    getters = [_sub_value(p.index) if p.__class__ is _Sub else (lambda values, s=p: s) for p in parts]
+    if len(getters) == 1:
+        get = getters[0]
+        return lambda values: v if (v := get(values)).__class__ is str else ""
+    return lambda values: "".join(v for g in getters if (v := g(values)).__class__ is str)
+
+
+def _compile_part(part) -> Callable[[list, dict, list], None]:
+    """ส่วนของเนื้อหา → ฟังก์ชัน (values, out, text) ที่เติมลูกลง out / ข้อความลง text"""
+    if part.__class__ is str:
+        return lambda values, out, text: text.append(part)
+    if part.__class__ is _Sub:
+        get = _sub_value(part.index)
+
+        def sub(values, out, text):
+            v = get(values)
+            if v.__class__ is str:
+                text.append(v)
+            elif v.__class__ is list:
+                _render_nodes(v, (), out)
+        return sub
+    if part.__class__ is _Element:
+        name = part.name
+        return lambda values, out, text: _add(out, name, render(part, values))
+    return lambda values, out, text: _render_nodes(part.nodes, part.values, out)
+
+
+def _compile_element(el: _Element) -> Callable[[list], object]:
+    attrs = [("@" + name, _compile_text(parts)) for name, parts in el.attrs]
+    fns = [_compile_part(p) for p in el.children]
+
+    def general(values):
+        out = {}
+        for key, text_of in attrs:
+            out[key] = text_of(values)
+        text: list = []
+        for fn in fns:
+            fn(values, out, text)
+        joined = "".join(text)
+        if not out:
+            return joined or None
+        if joined.strip():
+            out["#text"] = joined
+        return out
+
+    if not attrs and len(el.children) == 1 and el.children[0].__class__ is _Sub:
+        # <Level>%1</Level> แบบนี้เป็นส่วนใหญ่ของ <System> → คืนข้อความเลย
+        get = _sub_value(el.children[0].index)
+
+        def single(values):
+            v = get(values)
+            if v.__class__ is str:
+                return v or None
+            return None if v is None else general(values)
+        return single
+    return general
+
+
+def render(el: _Element, values: list):
+    """
+    element → ข้อความล้วน (str / None ถ้าว่าง) หรือ dict {"@attr": .., ลูก: .., "#text": ..}
+    template คอมไพล์เป็นฟังก์ชันครั้งแรกที่ใช้ (ต่อ chunk) แล้วเรียกซ้ำทุก record ที่ใช้ template เดียวกัน
+    """
+    fn = el.fn
+    if fn is None:
+        fn = el.fn = _compile_element(el)
+    return fn(values)
+
+
+def _event_root(nodes: list, values: list) -> Tuple[_Element, list]:
+    for node in nodes:
+        if isinstance(node, _Instance):
+            return _event_root(node.nodes, node.values)
+        if isinstance(node, _Element):
+            return node, values
+    raise EvtxFormatError("record has no root element")
+
+
+def _text(v) -> str:
+    if isinstance(v, list):
+        v = v[0] if v else None
+    if isinstance(v, dict):
+        return v.get("#text") or ""
+    return v or ""
+
+
+def _attr(system: dict, key: str, name: str) -> str:
+    v = system.get(key)
+    return (v.get("@" + name) or "") if isinstance(v, dict) else ""
+
+
+def event_row(event: dict, record_id: int, written: int, chunk_number: int, source: str) -> Tuple[dict, dict]:
+    """dict ของ <Event> → (ค่าฟิลด์หลักแบบ CompiledHeader.pick ของ EVTX_FIELDS, event_data)"""
+    system = event.get("System")
+    system = system if isinstance(system, dict) else {}
+    level = _text(system.get("Level"))
+    p = {
+        "event_id": _text(system.get("EventID")),
+        "timestamp": _attr(system, "TimeCreated", "SystemTime") or filetime_str(written),
+        "message": "",
+        "channel": _text(system.get("Channel")),
+        "provider": _attr(system, "Provider", "Name"),
+        "level": _LEVELS.get(level, level),
+        "task": _text(system.get("Task")),
+        "opcode": _text(system.get("Opcode")),
+        "keywords": _text(system.get("Keywords")),
+        "record_id": str(record_id),
+        "computer": _text(system.get("Computer")),
+        "user_sid": _attr(system, "Security", "UserID"),
+        "user_name": "",
+        "process_id": _attr(system, "Execution", "ProcessID"),
+        "thread_id": _attr(system, "Execution", "ThreadID"),
+    }
+    ed = {
+        "EventRecordId": _text(system.get("EventRecordID")),
+        "ChunkNumber": str(chunk_number),
+        "SourceFile": source,
+        "HiddenRecord": "False",
+    }
+    payload = {k: v for k, v in event.items() if k != "System" and not k.startswith("@")}
+    if payload:
+        ed["Payload"] = json.dumps(payload, ensure_ascii=False)
+        for k, v in flatten_payload(payload):
+            ed.setdefault(k, v)
+    return p, {k: v for k, v in ed.items() if v}
+
+
+class EvtxReader:
+    """
+    อ่าน .evtx หนึ่งไฟล์ตามลำดับ chunk / record
+      events() → (chunk, record id, written, dict ของ <Event>) ทุก record
+      rows()   → (ค่าฟิลด์หลัก, event_data) เฉพาะ record ที่ผ่าน row_filter
+    สถิติหลังอ่าน: found (record ที่เจอ), rows (ที่ส่งออก), errors (+ ตัวอย่างใน error_samples)
+    """
+
+    def __init__(self, path: Path, row_filter: Optional[EvtxFilter] = None):
+        self.path = Path(path)
+        self.row_filter = row_filter
+        self.found = 0
+        self.rows_out = 0
+        self.errors = 0
+        self.error_samples: List[str] = []
+
+    def _error(self, where: str, e: Exception) -> None:
+        self.errors += 1
+        if len(self.error_samples) < _MAX_ERROR_SAMPLES:
+            self.error_samples.append(f"{self.path.name} {where}: {e!r}")
+
+    def _chunks(self) -> Iterator[_Chunk]:
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _CHUNK_SIZE:
+                if size:
+                    self._error("file", EvtxFormatError("too small for one chunk"))
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:8] != _FILE_MAGIC:
+                    self._error("file", EvtxFormatError("not an EVTX file"))
+                    return
+                off, number = _U16(mm, 40)[0] or 0x1000, 0     # header block size (ปกติ 4 KB)
+                while off + _CHUNK_SIZE <= size:
+                    # header นับ chunk อาจไม่ตรงถ้าไฟล์ไม่ได้ปิดสะอาด → เดินตามขนาดไฟล์ ข้าม chunk ว่าง
+                    if mm[off:off + 8] == _CHUNK_MAGIC:
+                        yield _Chunk(mm[off:off + _CHUNK_SIZE], number)
+                    off += _CHUNK_SIZE
+                    number += 1
+
+    def _records(self) -> Iterator[Tuple[_Chunk, int, int, _Element, list]]:
+        for chunk in self._chunks():
+            buf = chunk.buf
+            end = min(max(_U32(buf, 48)[0], _CHUNK_HEADER_SIZE), _CHUNK_SIZE)   # free space offset
+            pos = _CHUNK_HEADER_SIZE
+            while pos + _RECORD_HEADER_SIZE + 4 <= end and buf[pos:pos + 4] == _RECORD_MAGIC:
+                size, record_id, written = _RECORD_HDR(buf, pos + 4)
+                if size < _RECORD_HEADER_SIZE + 4 or pos + size > _CHUNK_SIZE:
+                    self._error(f"chunk {chunk.number}", EvtxFormatError(f"bad record size {size} at 0x{pos:x}"))
+                    break
+                self.found += 1
+                try:
+                    nodes, _ = chunk.fragment(pos + _RECORD_HEADER_SIZE)
+                    el, values = _event_root(nodes, [])
+                except (EvtxFormatError, struct.error, IndexError, UnicodeError, RecursionError) as e:
+                    self._error(f"record {record_id}", e)
+                else:
+                    yield chunk, record_id, written, el, values
+                pos += size
+
+    def events(self) -> Iterator[Tuple[int, int, int, dict]]:
+        for chunk, record_id, written, el, values in self._records():
+            event = render(el, values)
+            yield chunk.number, record_id, written, event if isinstance(event, dict) else {}
+
+    def rows(self) -> Iterator[Tuple[dict, dict]]:
+        flt, source = self.row_filter, str(self.path)
+        for chunk, record_id, written, el, values in self._records():
+            if flt is not None and not flt.keeps_all:
+                # ตัดสินจาก <System> อย่างเดียวก่อน ไม่ต้องถอด EventData ของ record ที่ถูกกรองทิ้ง
+                sys_el = next((c for c in el.children if isinstance(c, _Element) and c.name == "System"), None)
+                system = render(sys_el, values) if sys_el is not None else None
+                if isinstance(system, dict) and not flt.keep(_text(system.get("Channel")),
+                                                             _text(system.get("EventID"))):
+                    continue
+            event = render(el, values)
+            self.rows_out += 1
+            yield event_row(event if isinstance(event, dict) else {}, record_id, written, chunk.number, source)
+
+    def stats(self) -> dict:
+        return {"rows": self.rows_out, "errors": self.errors, "found": self.found}
+
+
+# ===== ingest =====
+
+def ingest_evtx_file(ev: Evidence, path: Path, chunk: int = 2000,
+                     row_filter: Optional[EvtxFilter] = None, table: Optional[str] = None) -> dict:
+    """
+    ถอด path แล้วเพิ่มแถว SecurityEvent ของ ev (ใน transaction ของผู้เรียก)
+    table = ตาราง staging จาก partitions.replacing_rows (None = ตารางของ model)
+    คืน {"rows", "errors", "found", "db", "error_samples"}
+    """
+    reader = EvtxReader(path, row_filter)
+    ts = TimestampDecoder(EVTX_TS_FIELDS)
+    with make_sink(SecurityEvent, ev, chunk, table) as sink:
+        for batch in _batched(reader.rows()):
+            ts.decode([p for p, _ in batch])
+            for p, ed in batch:
+                values = _evtx_values(p, ed)
+                if values is not None:
+                    sink.add(values)
+    return {**reader.stats(), "db": sink.saved, "error_samples": reader.error_samples}
+
+
+def _ingest_file_proc(ev_id: int, path: str, chunk: int, filter_spec=None,
+                      table: Optional[str] = None) -> Tuple[dict, dict]:
+    """รันใน process ลูก: หนึ่งไฟล์ / หนึ่ง transaction; คืน (สถิติ, แถวที่ตัวกรองข้ามแยกตาม channel)"""
+    row_filter = EvtxFilter(*filter_spec) if filter_spec else None
+    try:
+        ev = Evidence.objects.get(pk=ev_id)
+        with transaction.atomic():
+            stats = ingest_evtx_file(ev, Path(path), chunk, row_filter, table)
+        return stats, dict(row_filter.skipped) if row_filter is not None else {}
+    finally:
+        connection.close()
+
+
+def _merge_stats(per_file: Dict[str, dict], name: str, stats: dict) -> None:
+    """ชื่อไฟล์ซ้ำ (คนละโฟลเดอร์ย่อย) → รวมตัวเลข"""
+    cur = per_file.setdefault(name, {"rows": 0, "errors": 0, "found": 0, "db": 0, "error_samples": []})
+    for k in ("rows", "errors", "found", "db"):
+        cur[k] += stats[k]
+    cur["error_samples"] = (cur["error_samples"] + stats["error_samples"])[:_MAX_ERROR_SAMPLES]
+
+
+def replace_evtx_rows(ev: Evidence, files: List[Path], chunk: int = 2000, workers: Optional[int] = None,
+                      row_filter: Optional[EvtxFilter] = None) -> Dict[str, dict]:
+    """
+    แทน SecurityEvent เดิมของ ev ด้วยแถวจากไฟล์ .evtx ทั้งหมด (partitions.replacing_rows); คืนสถิติต่อชื่อไฟล์
+      - workers<=1 / ไฟล์เดียว / ไม่มีตาราง staging: ทำใน process นี้ (transaction เดียว)
+      - หลายไฟล์: กระจายไฟล์ละ process (ไฟล์ใหญ่ก่อน)
+    หมายเหตุ: ทางหลาย process ห้ามเรียกจากใน transaction.atomic() ที่ยังไม่ commit
+    """
+    workers = EVTX_NATIVE_WORKERS if workers is None else workers
+    files = sorted(files, key=lambda p: p.stat().st_size, reverse=True)
+    per_file: Dict[str, dict] = {}
+    if workers <= 1 or len(files) <= 1 or not can_stage(SecurityEvent):
+        with replacing_rows(SecurityEvent, ev) as table:
+            for p in files:
+                _merge_stats(per_file, p.name, ingest_evtx_file(ev, p, chunk, row_filter, table))
+        return per_file
+
+    with replacing_rows(SecurityEvent, ev) as table:
+        _ingest_files_parallel(ev, files, chunk, workers, row_filter, table, per_file)
+    return per_file
+
+
+def _ingest_files_parallel(ev: Evidence, files: List[Path], chunk: int, workers: int,
+                           row_filter: Optional[EvtxFilter], table: Optional[str],
+                           per_file: Dict[str, dict]) -> None:
+    filter_spec = row_filter.spec() if row_filter is not None else None
+    # spawn + django.setup ก่อน unpickle งาน (เหตุผลเดียวกับ parallel_ingest)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(files)), mp_context=ctx,
+                             initializer=django.setup) as pool:
+        futures = [(p, pool.submit(_ingest_file_proc, ev.pk, str(p), chunk, filter_spec, table)) for p in files]
+        error = None
+        for p, fut in futures:
+            try:
+                stats, skipped = fut.result()
+            except Exception as e:       # เก็บ error แรกไว้ รอไฟล์อื่นจบก่อนค่อยเก็บกวาด
+                error = error or e
+                continue
+            _merge_stats(per_file, p.name, stats)
+            if row_filter is not None:
+                row_filter.merge(skipped)
+    if error is not None:
+        raise error      # replacing_rows ทิ้งตาราง staging แถวเดิมไม่ถูกแตะ
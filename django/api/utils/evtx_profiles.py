@@ -0,0 +1,151 @@
+# django/api/utils/evtx_profiles.py
+"""
+โปรไฟล์กรอง EVTX ตอน ingest (เลือกต่อ evidence: Evidence.evtx_profile / evtx_allowlist)
+  - "full": เก็บทุกแถว (แบบเดิม)
+  - "security-core": channel / EventID ที่ใช้สืบสวนบ่อย (logon, process, service, task, RDP, PowerShell ...)
+  - "custom": allowlist ของ evidence เอง เช่น {"Security": [4624, 4625], "System": "*", "*": [1102]}
+    "*" เป็น key = ทุก channel, เป็นค่า = ทุก EventID ของ channel นั้น
+  - ตรวจกับแถวดิบของ csv.reader (ดึงแค่ Channel + EventID) ก่อนสร้าง dict / event_data / describe_event
+    lookup ต่อ channel คอมไพล์ครั้งเดียวแล้ว memo ตามค่า Channel ที่เจอ (ในไฟล์หนึ่งมีไม่กี่ค่า)
+  - แถวที่ข้ามนับแยกตาม channel → Evidence.summary["evtx_skipped"] (ingest ใหม่ด้วยโปรไฟล์กว้างขึ้นได้)
+"""
+import hashlib
+import json
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .csvheader import CompiledHeader
+
+
+ALL = "*"
+
+# channel → EventID ที่เก็บ ("*" = ทุก EventID)
+BUILTIN_PROFILES: Dict[str, Optional[dict]] = {
+    "full": None,
+    "security-core": {
+        "Security": [
+            1102, 4616, 4624, 4625, 4634, 4647, 4648, 4657, 4662, 4663, 4672, 4688, 4689, 4697, 4698, 4699,
+            4700, 4701, 4702, 4719, 4720, 4722, 4723, 4724, 4725, 4726, 4728, 4732, 4735, 4738, 4740, 4756,
+            4767, 4768, 4769, 4771, 4776, 4778, 4779, 4798, 4799, 4946, 4947, 4948, 5140, 5145, 5156,
+        ],
+        "System": [104, 1074, 6005, 6006, 6008, 7034, 7036, 7040, 7045],
+        "Microsoft-Windows-PowerShell/Operational": [4103, 4104],
+        "Windows PowerShell": [400, 403, 600, 800],
+        "Microsoft-Windows-TaskScheduler/Operational": [106, 140, 141, 200, 201],
+        "Microsoft-Windows-TerminalServices-LocalSessionManager/Operational": [21, 22, 23, 24, 25],
+        "Microsoft-Windows-TerminalServices-RemoteConnectionManager/Operational": [1149],
+        "Microsoft-Windows-RemoteDesktopServices-RdpCoreTS/Operational": [131],
+        "Microsoft-Windows-Sysmon/Operational": ALL,
+        "Microsoft-Windows-Windows Defender/Operational": [1006, 1116, 1117, 5001, 5007],
+        "Microsoft-Windows-WMI-Activity/Operational": [5857, 5858, 5859, 5860, 5861],
+        "Microsoft-Windows-Bits-Client/Operational": [59, 60],
+    },
+}
+
+EVTX_INGEST_PROFILE = getattr(settings, "EVTX_INGEST_PROFILE", "full")
+
+
+def profiles() -> Dict[str, Optional[dict]]:
+    """โปรไฟล์ทั้งหมด: ในตัว + EVTX_INGEST_PROFILES จาก settings (ชื่อซ้ำ → settings ชนะ)"""
+    return {**BUILTIN_PROFILES, **getattr(settings, "EVTX_INGEST_PROFILES", {})}
+
+
+def _compile(allow: dict) -> Dict[str, Optional[FrozenSet[str]]]:
+    """{"Security": [4624], "System": "*"} → {"security": frozenset({"4624"}), "system": None}"""
+    if not isinstance(allow, dict) or not allow:
+        raise ValueError("allowlist must be a non-empty object of channel → event IDs or \"*\"")
+    out: Dict[str, Optional[FrozenSet[str]]] = {}
+    for channel, ids in allow.items():
+        if ids == ALL:
+            out[str(channel).lower()] = None
+            continue
+        if not isinstance(ids, (list, tuple, set)):
+            raise ValueError(f"event IDs for channel {channel!r} must be a list or \"*\"")
+        try:
+            out[str(channel).lower()] = frozenset(str(int(i)) for i in ids)
+        except (TypeError, ValueError):
+            raise ValueError(f"event IDs for channel {channel!r} must be integers")
+    return out
+
+
+class EvtxFilter:
+    """
+    ตัวกรองที่คอมไพล์แล้ว; select(ch, rows) คืนเฉพาะแถวที่ผ่าน และนับแถวที่ข้ามใน self.skipped
+    keep(channel, event_id) = ตรวจทีละ record (ใช้กับ record ที่ถอดจาก .evtx ตรง ๆ ใน evtx_native)
+    spec() → (ชื่อ, allowlist) ส่งข้าม process ได้ (parallel ingest สร้างตัวกรองใหม่ใน process ลูก)
+    """
+
+    def __init__(self, name: str, allow: Optional[dict]):
+        self.name = name
+        self.allow = allow
+        self.rules = None if allow is None else _compile(allow)
+        self.skipped: Counter = Counter()
+        self._memo: Dict[str, Tuple[bool, Optional[FrozenSet[str]]]] = {}
+
+    @property
+    def keeps_all(self) -> bool:
+        return self.rules is None
+
+    @property
+    def variant(self) -> str:
+        """ค่าแยกผล ingest ของโปรไฟล์ต่างกันใน parse cache ("" = full เหมือนของเดิม)"""
+        if self.keeps_all:
+            return ""
+        if self.name != "custom":
+            return self.name
+        blob = json.dumps(self.allow, sort_keys=True, default=list).encode()
+        return "custom:" + hashlib.sha1(blob).hexdigest()[:12]
+
+    def spec(self) -> Tuple[str, Optional[dict]]:
+        return self.name, self.allow
+
+    def _rule(self, channel: str) -> Tuple[bool, Optional[FrozenSet[str]]]:
+        """(มี rule ไหม, EventID ที่อนุญาต / None = ทุกตัว) ของ channel นี้"""
+        key = channel.lower()
+        if key in self.rules:
+            return True, self.rules[key]
+        if ALL in self.rules:
+            return True, self.rules[ALL]
+        return False, None
+
+    def keep(self, channel: str, event_id: str) -> bool:
+        """แถว / record นี้ผ่านไหม (ไม่ผ่าน → นับใน skipped); lookup ต่อ channel memo ไว้"""
+        if self.keeps_all:
+            return True
+        rule = self._memo.get(channel)
+        if rule is None:
+            rule = self._memo[channel] = self._rule(channel)
+        matched, ids = rule
+        if matched and (ids is None or event_id.strip() in ids):
+            return True
+        self.skipped[channel or "(none)"] += 1
+        return False
+
+    def select(self, ch: CompiledHeader, rows: Iterable[List[str]]) -> Iterator[List[str]]:
+        if self.keeps_all:
+            yield from rows
+            return
+        get_channel, get_eid, keep = ch.getter("channel"), ch.getter("event_id"), self.keep
+        for row in rows:
+            if keep(get_channel(row), get_eid(row)):
+                yield row
+
+    def merge(self, skipped: Dict[str, int]) -> None:
+        self.skipped.update(skipped)
+
+
+def build_filter(name: str = "", allowlist: Optional[dict] = None) -> EvtxFilter:
+    """ชื่อโปรไฟล์ ("" = EVTX_INGEST_PROFILE) → EvtxFilter; ไม่รู้จัก / allowlist ผิดรูป → ValueError"""
+    name = name or EVTX_INGEST_PROFILE
+    if name == "custom":
+        return EvtxFilter("custom", allowlist or {})
+    table = profiles()
+    if name not in table:
+        raise ValueError(f"unknown EVTX profile '{name}' (choices: {', '.join([*table, 'custom'])})")
+    return EvtxFilter(name, table[name])
+
+
+def filter_for_evidence(ev) -> EvtxFilter:
+    return build_filter(getattr(ev, "evtx_profile", ""), getattr(ev, "evtx_allowlist", None))
@@ -0,0 +1,260 @@
+# django/api/utils/executors.py
+"""
+ตัวรัน parser (parse.sh: mft / amcache / evtx-dir) แบบเลือก backend ได้ — interface เดียวกันทุกตัว
+  - docker-run : docker run --rm PARSER_IMAGE ... ต่อ artifact (แบบเดิม: สร้าง container ใหม่ทุกครั้ง)
+  - docker-exec: docker exec เข้า container ez-parsers ที่รันค้างไว้ (compose service "parsers")
+                 ไม่ต้องสร้าง/ลบ container ทุก artifact; timeout ใช้ `timeout` ใน container เอง
+                 (kill docker CLI อย่างเดียว process ใน container ยังวิ่งต่อ)
+  - local      : เรียก parse.sh ตรง ๆ บนเครื่องนี้ (ติดตั้ง dotnet + EZ tools ไว้แล้ว)
+  - auto       : docker-exec ถ้า container พร้อม (รันอยู่ + เห็น media volume) ไม่งั้น docker-run
+เลือกด้วย PARSER_EXECUTOR; path ที่ส่งให้ backend แบบ docker แปลงจาก MEDIA_ROOT → DOCKER_VOLUME_MOUNTPOINT
+"""
+import hashlib
+import os
+from abc import ABC, abstractmethod
+import shutil
+import subprocess
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+
+DOCKER_VOLUME_MEDIA = os.environ.get("DOCKER_VOLUME_MEDIA", "media")
+DOCKER_VOLUME_MOUNTPOINT = os.environ.get("DOCKER_VOLUME_MOUNTPOINT", "/mnt/media")
+PARSER_IMAGE = getattr(settings, "PARSER_IMAGE", os.environ.get("PARSER_IMAGE", "ez-parsers:latest"))
+PARSER_PLATFORM = os.environ.get("PARSER_PLATFORM")  # e.g. "linux/amd64" on Mac/ARM
+
+PARSER_EXECUTOR = getattr(settings, "PARSER_EXECUTOR", "docker-run")
+PARSER_CONTAINER = getattr(settings, "PARSER_CONTAINER", "ez-parsers")
+PARSER_LOCAL_SCRIPT = getattr(settings, "PARSER_LOCAL_SCRIPT", "") or shutil.which("parse") or "parse.sh"
+
+_KILL_GRACE = 10   # วินาที หลัง timeout ก่อน SIGKILL (timeout -k ใน container)
+
+
+def run_command(args: List[str], timeout: Optional[float] = None,
+                on_timeout: Optional[Callable[[], None]] = None) -> Tuple[int, str]:
+    """
+    รันคำสั่งแล้วคืน (returncode, stdout+stderr)
+    timeout: วินาที (None/0 = ไม่จำกัด) เกินแล้ว kill, เรียก on_timeout (เก็บกวาดฝั่ง container) และคืน rc=124
+    """
+    try:
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except OSError as e:
+        return 127, f"✘ cannot run {args[0]}: {e}"
+    try:
+        out, _ = proc.communicate(timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        out, _ = proc.communicate()
+        if on_timeout:
+            on_timeout()
+        return 124, (out or "") + f"\n✘ timeout after {timeout}s"
+    return proc.returncode, out or ""
+
+
+class ParserJob:
+    """
+    งาน parse หนึ่ง artifact
+    kind: 'mft' | 'amcache' | 'evtx-dir'; in_path / out_dir เป็น path บนเครื่องนี้ (ใต้ MEDIA_ROOT)
+    """
+
+    def __init__(self, kind: str, in_path: Path, out_dir: Path, csv_name: str,
+                 timeout: Optional[float] = None, label: str = ""):
+        if kind not in ("mft", "amcache", "evtx-dir"):
+            raise ValueError("unknown kind")
+        self.kind = kind
+        self.in_path = Path(in_path)
+        self.out_dir = Path(out_dir)
+        self.csv_name = csv_name
+        self.timeout = timeout
+        self.label = label or f"{kind}-{uuid.uuid4().hex[:8]}"
+
+
+class ParserResult:
+    def __init__(self, rc: int, output: str, command: List[str], elapsed: float):
+        self.rc = rc
+        self.output = output
+        self.command = command
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.rc == 0
+
+
+def container_path(p: Path) -> str:
+    """path ใต้ MEDIA_ROOT → path เดียวกันใน container ที่ mount media volume ไว้ที่ DOCKER_VOLUME_MOUNTPOINT"""
+    rel = Path(p).resolve().relative_to(Path(settings.MEDIA_ROOT).resolve()).as_posix()
+    return f"{DOCKER_VOLUME_MOUNTPOINT}/{rel}"
+
+
+class ParserExecutor(ABC):
+    """
+    base: available() → (ok, เหตุผล), identity() → ใช้ใน parse cache key, command(job), run(job), probe()
+    backend ที่ implement ไม่ครบสร้าง instance ไม่ได้ (TypeError ตอน get_executor ไม่ใช่กลางการ parse)
+    """
+    name = ""
+
+    @abstractmethod
+    def available(self) -> Tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    def identity(self) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def command(self, job: ParserJob) -> List[str]:
+        ...
+
+    @abstractmethod
+    def probe_command(self) -> List[str]:
+        """คำสั่งที่ไม่ทำอะไร ใน environment เดียวกับ parser (วัด overhead ตอนเริ่มงาน)"""
+
+    def _on_timeout(self, job: ParserJob) -> Optional[Callable[[], None]]:
+        return None
+
+    def run(self, job: ParserJob) -> ParserResult:
+        job.out_dir.mkdir(parents=True, exist_ok=True)
+        args = self.command(job)
+        t0 = time.monotonic()
+        rc, out = run_command(args, timeout=self._timeout(job), on_timeout=self._on_timeout(job))
+        return ParserResult(rc, out, args, time.monotonic() - t0)
+
+    def _timeout(self, job: ParserJob) -> Optional[float]:
+        return job.timeout or None
+
+    def probe(self) -> ParserResult:
+        args = self.probe_command()
+        t0 = time.monotonic()
+        rc, out = run_command(args, timeout=300)
+        return ParserResult(rc, out, args, time.monotonic() - t0)
+
+
+class DockerRunExecutor(ParserExecutor):
+    name = "docker-run"
+
+    def available(self) -> Tuple[bool, str]:
+        if shutil.which("docker") is None:
+            return False, "docker CLI not found in django container"
+        rc, out = run_command(["docker", "image", "inspect", PARSER_IMAGE])
+        if rc != 0:
+            return False, f"parser image '{PARSER_IMAGE}' not found\n{out[-2000:]}"
+        return True, ""
+
+    def identity(self) -> Optional[str]:
+        from .parse_cache import image_digest_from_inspect
+        rc, out = run_command(["docker", "image", "inspect", PARSER_IMAGE])
+        return image_digest_from_inspect(out) if rc == 0 else None
+
+    def _base(self, name: str) -> List[str]:
+        args = ["docker", "run", "--rm", "--name", name]
+        if PARSER_PLATFORM:
+            args += ["--platform", PARSER_PLATFORM]
+        return args + ["-v", f"{DOCKER_VOLUME_MEDIA}:{DOCKER_VOLUME_MOUNTPOINT}"]
+
+    def command(self, job: ParserJob) -> List[str]:
+        # ตั้งชื่อ container ไว้ เผื่อต้อง rm -f ตอน timeout
+        return self._base(self._container_name(job)) + [
+            PARSER_IMAGE, job.kind, container_path(job.in_path), container_path(job.out_dir), job.csv_name,
+        ]
+
+    def _container_name(self, job: ParserJob) -> str:
+        return f"dfir-parse-{job.label}"
+
+    def _on_timeout(self, job: ParserJob) -> Optional[Callable[[], None]]:
+        # kill แค่ docker CLI ตัว container ยังวิ่งต่อ → rm -f ด้วย
+        name = self._container_name(job)
+        return lambda: subprocess.run(["docker", "rm", "-f", name],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def probe_command(self) -> List[str]:
+        return self._base(f"dfir-probe-{uuid.uuid4().hex[:8]}") + ["--entrypoint", "true", PARSER_IMAGE]
+
+
+class DockerExecExecutor(ParserExecutor):
+    name = "docker-exec"
+
+    def available(self) -> Tuple[bool, str]:
+        if shutil.which("docker") is None:
+            return False, "docker CLI not found in django container"
+        rc, out = run_command(["docker", "inspect", "--format", "{{.State.Running}}", PARSER_CONTAINER])
+        if rc != 0 or out.strip() != "true":
+            return False, f"parser container '{PARSER_CONTAINER}' is not running\n{out[-2000:]}"
+        rc, out = run_command(["docker", "exec", PARSER_CONTAINER, "test", "-d", DOCKER_VOLUME_MOUNTPOINT])
+        if rc != 0:
+            return False, f"parser container '{PARSER_CONTAINER}' has no {DOCKER_VOLUME_MOUNTPOINT} mount"
+        return True, ""
+
+    def identity(self) -> Optional[str]:
+        # image ที่ container ถูกสร้างมา (rebuild แล้ว recreate container → digest เปลี่ยน)
+        rc, out = run_command(["docker", "inspect", "--format", "{{.Image}}", PARSER_CONTAINER])
+        return (out.strip() or None) if rc == 0 else None
+
+    def command(self, job: ParserJob) -> List[str]:
+        args = ["docker", "exec", PARSER_CONTAINER]
+        if job.timeout:
+            args += ["timeout", "-k", str(_KILL_GRACE), str(int(job.timeout))]
+        return args + ["parse", job.kind, container_path(job.in_path), container_path(job.out_dir), job.csv_name]
+
+    def _timeout(self, job: ParserJob) -> Optional[float]:
+        # `timeout` ใน container ตัดเอง; ฝั่งนี้เผื่อไว้กัน docker CLI ค้าง
+        return job.timeout + 3 * _KILL_GRACE if job.timeout else None
+
+    def probe_command(self) -> List[str]:
+        return ["docker", "exec", PARSER_CONTAINER, "true"]
+
+
+class LocalExecutor(ParserExecutor):
+    name = "local"
+
+    def available(self) -> Tuple[bool, str]:
+        script = shutil.which(PARSER_LOCAL_SCRIPT) or (PARSER_LOCAL_SCRIPT if os.path.isfile(PARSER_LOCAL_SCRIPT) else None)
+        if script is None:
+            return False, f"parse script '{PARSER_LOCAL_SCRIPT}' not found"
+        if shutil.which("dotnet") is None:
+            return False, "dotnet not found on PATH"
+        return True, ""
+
+    def identity(self) -> Optional[str]:
+        """sha256 ของ parse.sh + ขนาด/เวลาแก้ไขของ tool ทุกตัว (อัปเดต tools แล้ว cache เดิมใช้ไม่ได้)"""
+        script = shutil.which(PARSER_LOCAL_SCRIPT) or PARSER_LOCAL_SCRIPT
+        h = hashlib.sha256()
+        try:
+            h.update(Path(script).read_bytes())
+        except OSError:
+            return None
+        tools = Path(os.environ.get("EZ_TOOLS_DIR", "/opt/tools"))
+        if tools.is_dir():
+            for p in sorted(tools.rglob("*.dll")):
+                st = p.stat()
+                h.update(f"{p.relative_to(tools)}\0{st.st_size}\0{int(st.st_mtime)}\n".encode())
+        return "local:" + h.hexdigest()
+
+    def command(self, job: ParserJob) -> List[str]:
+        return [PARSER_LOCAL_SCRIPT, job.kind, str(job.in_path), str(job.out_dir), job.csv_name]
+
+    def probe_command(self) -> List[str]:
+        return ["true"]
+
+
+EXECUTORS: Dict[str, type] = {
+    DockerRunExecutor.name: DockerRunExecutor,
+    DockerExecExecutor.name: DockerExecExecutor,
+    LocalExecutor.name: LocalExecutor,
+}
+
+
+def get_executor(name: Optional[str] = None) -> ParserExecutor:
+    """executor ตามชื่อ (ค่าเริ่มต้น PARSER_EXECUTOR); 'auto' = docker-exec ถ้าพร้อม ไม่งั้น docker-run"""
+    name = name or PARSER_EXECUTOR
+    if name == "auto":
+        ex = DockerExecExecutor()
+        return ex if ex.available()[0] else DockerRunExecutor()
+    try:
+        return EXECUTORS[name]()
+    except KeyError:
+        raise ValueError(f"unknown parser executor '{name}' (choices: auto, {', '.join(EXECUTORS)})")
@@ -0,0 +1,55 @@
+# django/api/utils/fts.py
+"""
+full-text search ของ SecurityEvent: คอลัมน์ search_vector (tsvector, GeneratedField แบบ stored)
+  - PostgreSQL คำนวณให้เองทุกแถวที่ INSERT / COPY (ingest, clone ของ parse cache, staging ของ partitions)
+  - เอกสาร = message (น้ำหนัก A) + คีย์ใน event_data ที่ analyst ค้นบ่อย (B) + ค่า string ใน __norm (C)
+    คีย์ที่อยู่ใน Payload ของ EvtxECmd ถูกยกขึ้นมาไว้ใน event_data ตอน ingest (ingest._lift_payload_keys)
+  - config "simple": ไม่ตัดคำ stem / stopword → ชื่อไฟล์, command line, account ตรงตามที่พิมพ์
+  - GIN index สร้างตอน post_migrate (search.ensure_search_indexes)
+DB อื่นได้คอลัมน์ว่าง (NULL) และช่องค้นหากลับไปใช้ substring แบบเดิม
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db.models import F, Func
+
+
+FTS_CONFIG = "simple"
+
+# คีย์ใน event_data ที่เข้า search_vector (ลำดับไม่มีผลกับผลค้น)
+FTS_KEYS = (
+    "CommandLine", "ProcessCommandLine", "NewProcessName", "ParentProcessName", "ServiceName", "ImagePath",
+    "ObjectName", "TaskName", "ScriptBlockText", "ShareName", "RelativeTargetName", "ExecutableInfo",
+)
+
+# ค่า mode ของพารามิเตอร์ q → search_type ของ SearchQuery
+#   phrase: คำเรียงติดกันตามที่พิมพ์ ("explicit credentials")
+#   web:    แบบช่องค้นหาเว็บ — "วลี", OR, -คำที่ไม่เอา
+FTS_MODES = {"phrase": "phrase", "web": "websearch"}
+
+
+class EventDocument(Func):
+    """expression ของ SecurityEvent.search_vector (ต้อง immutable: ใช้ regconfig คงที่ + || แทน concat_ws)"""
+    output_field = SearchVectorField()
+
+    def __init__(self, message: str = "message", event_data: str = "event_data", **extra):
+        super().__init__(F(message), F(event_data), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return "NULL", []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        msg, msg_params = compiler.compile(self.source_expressions[0])
+        ed, ed_params = compiler.compile(self.source_expressions[1])
+        cfg = f"'{FTS_CONFIG}'::regconfig"
+        keys = " || ' ' || ".join(f"COALESCE({ed} ->> '{k}', '')" for k in FTS_KEYS)
+        sql = (f"setweight(to_tsvector({cfg}, COALESCE({msg}, '')), 'A') || "
+               f"setweight(to_tsvector({cfg}, {keys}), 'B') || "
+               f"setweight(jsonb_to_tsvector({cfg}, COALESCE({ed} -> '__norm', '{{}}'::jsonb), "
+               f"'[\"string\"]'::jsonb), 'C')")
+        return sql, (*msg_params, *ed_params)
+
+
+def ranked_search(qs, q: str, mode: str):
+    """กรอง qs ด้วย search_vector @@ query (ใช้ GIN) + annotate rank (ts_rank_cd: คำอยู่ใกล้กัน / น้ำหนักสูง = มาก่อน)"""
+    query = SearchQuery(q, search_type=FTS_MODES[mode], config=FTS_CONFIG)
+    return (qs.filter(search_vector=query)
+              .annotate(rank=SearchRank(F("search_vector"), query, cover_density=True)))
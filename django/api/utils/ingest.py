@@ -0,0 +1,361 @@
+# django/api/utils/ingest.py
+"""
+CSV (ผลจาก EZ Tools) → DB
+แยกออกมาจาก views เพื่อให้ทั้ง view และ worker (manage.py run_workers) เรียกใช้ร่วมกันได้
+"""
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Evidence, MFTEntry, AmcacheEntry, SecurityEvent
+from .security_describer import describe_event, promoted_columns
+from .pgcopy import make_sink
+from .csvheader import CompiledHeader, FieldSpec, _norm_key, read_compiled
+from .fts import FTS_KEYS
+from .timestamps import TimestampDecoder
+
+
+def _parse_ts_guess(s: str):
+    """
+    แปลง string → datetime ให้เป็น timezone-aware เสมอเมื่อ USE_TZ=True
+    รองรับฟอร์แมตพื้นฐาน; ถ้าแปลงไม่ได้คืน None
+    (ทางเดิมต่อค่า — ingest ใช้ TimestampDecoder แล้ว เก็บไว้เทียบใน bench_ingest)
+    """
+    s = (s or "").strip()
+    if not s:
+        return None
+
+    # ISO/มาตรฐานของ Django ก่อน (เร็วสุด)
+    dt = parse_datetime(s)
+    if dt:
+        if settings.USE_TZ and dt.tzinfo is None:
+            dt = timezone.make_aware(dt, timezone.get_current_timezone())
+        return dt
+
+    # ฟอร์แมตที่พบได้บ่อย + เผื่อ microseconds
+    for fmt in (
+        "%Y-%m-%d %H:%M:%S",
+        "%m/%d/%Y %H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%d %H:%M:%S.%f",
+        "%Y-%m-%dT%H:%M:%S.%f",
+    ):
+        try:
+            dt = datetime.strptime(s, fmt)
+            if settings.USE_TZ:
+                dt = timezone.make_aware(dt, timezone.get_current_timezone())
+            return dt
+        except Exception:
+            pass
+    return None
+
+# === helpers: normalizer + safe-int ที่ใช้ซ้ำ ===
+# _canon_row/_pick = ทางเดิม (ต่อแถว); ingest จริงใช้ CompiledHeader (ต่อไฟล์) — เก็บไว้เทียบใน bench_ingest
+def _canon_row(row: dict) -> dict:
+    return {_norm_key(k): v for k, v in row.items()}
+
+def _pick(nrow: dict, *aliases: str) -> str:
+    for a in aliases:
+        v = nrow.get(_norm_key(a), "")
+        if v not in (None, "", "NULL"):
+            return v
+    return ""
+
+def _pick_fields(nrow: dict, fields: FieldSpec) -> dict:
+    """ทางเดิมแบบ dict ต่อแถว ให้ผลเหมือน CompiledHeader.pick"""
+    return {name: _pick(nrow, *aliases) for name, aliases in fields.items()}
+
+def _to_int(s: str, default=0) -> int:
+    try:
+        return int(str(s or "0").replace(",", "").strip())
+    except Exception:
+        return default
+
+def _to_bool(s: str) -> bool:
+    return str(s or "").strip().lower() in ("1","true","yes")
+
+def _join_path(parent: str, name: str) -> str:
+    parent = (parent or "").strip()
+    name = (name or "").strip()
+    if not parent and not name:
+        return "."
+    if parent in (".", ""):
+        return name or "."
+    # ใช้สไตล์ Windows ให้สวยตา (กันซ้ำเครื่องหมายคั่น)
+    sep = "\\" if "\\" in parent or "\\" in name else "\\"
+    return parent.rstrip("\\/") + sep + name
+
+
+# === Field specs: logical field → alias ของหัวคอลัมน์ (เรียงตามความสำคัญ) ===
+MFT_FIELDS: FieldSpec = {
+    "entry_number": ("EntryNumber","Entry","RecordNumber"),
+    "file_name": ("FileName","Name"),
+    "full_path": ("FullPath","FilePath"),
+    "parent_path": ("ParentPath","Path"),
+    "is_directory": ("IsDirectory","IsDir","Directory","Dir"),
+    "file_size": ("FileSize","LogicalSize","Size"),
+    "created": ("Created0x10","Created","CreationTime","CreationTimeUTC"),
+    "modified": ("LastModified0x10","Modified0x10","Modified","ModifiedTime","LastWriteTime"),
+    "accessed": ("LastAccess0x10","Accessed0x10","Accessed","AccessTime"),
+    "mft_changed": ("LastRecordChange0x10","MFTChanged0x10","MFTChanged","EntryModifiedTime"),
+}
+
+AMCACHE_FIELDS: FieldSpec = {
+    "app_name": ("ProgramName","AppName","ProductName"),
+    "version": ("Version","FileVersion","ProductVersion"),
+    "publisher": ("Publisher","Company","CompanyName"),
+    "install_date": ("InstallDate","InstallDateTime","InstallDateUTC","FirstInserted","FirstTime"),
+    "file_path": ("Path","FilePath","FullPath","KeyPath"),
+    "sha1": ("SHA1","FileSHA1","SHA1Hash"),
+    "pe_hash": ("PEHash","PEHash32","PEHash64"),
+    "product_name": ("ProductName",),
+}
+
+EVTX_FIELDS: FieldSpec = {
+    "event_id": ("EventID",),
+    "timestamp": ("Timestamp","TimeCreated","Created"),
+    "message": ("Message",),
+    "channel": ("Channel","Log"),
+    "provider": ("Provider","Source"),
+    "level": ("Level",),
+    "task": ("Task",),
+    "opcode": ("Opcode",),
+    "keywords": ("Keywords",),
+    "record_id": ("RecordNumber","RecordId"),
+    "computer": ("Computer",),
+    "user_sid": ("UserID","Sid"),
+    "user_name": ("User",),
+    "process_id": ("ProcessID","PID"),
+    "thread_id": ("ThreadID","TID"),
+}
+
+# คอลัมน์ที่เป็นเวลา → ถอดเป็น batch ด้วย TimestampDecoder ก่อนเข้า normalizer
+MFT_TS_FIELDS = ("created", "modified", "accessed", "mft_changed")
+AMCACHE_TS_FIELDS = ("install_date",)
+EVTX_TS_FIELDS = ("timestamp",)
+
+TS_BATCH = 1000   # จำนวนแถวต่อรอบถอดเวลา
+
+_EVTX_CORE_KEYS = {
+    "timestamp","timecreated","created",
+    "eventid","provider","channel","computer","user","userid","recordnumber","recordid",
+    "level","task","opcode","keywords","processid","threadid","message","sid","pid","tid","log","source"
+}
+
+
+def _batched(items: Iterable, size: int = TS_BATCH) -> Iterator[list]:
+    buf = []
+    for it in items:
+        buf.append(it)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+# === Normalizers: ค่าที่ pick + ถอดเวลาแล้ว → dict ค่าฟิลด์ของ model (ใช้ร่วมกันทั้ง COPY และ bulk_create) ===
+def _mft_values(p: dict) -> dict:
+    """
+    - ใช้ FileSize เป็นหลักตามโครง CSV ที่ให้มา
+    - ถ้าไม่มี FullPath ให้ประกอบ Path จาก ParentPath + FileName
+    - โฟลเดอร์ size เป็น 0 เสมอ
+    """
+    file_name = p["file_name"]
+    # ถ้า CSV ไม่มี FullPath (ตามตัวอย่าง) ให้สร้างจาก ParentPath + FileName
+    full_path = p["full_path"] or _join_path(p["parent_path"], file_name)
+
+    # โฟลเดอร์?
+    is_dir = _to_bool(p["is_directory"])
+
+    return {
+        "entry_number": _to_int(p["entry_number"]),
+        "is_directory": is_dir,
+        "file_name": file_name,
+        "full_path": full_path or ".",
+        # ขนาดไฟล์: ใช้ FileSize เป็นหลัก
+        "size_bytes": 0 if is_dir else _to_int(p["file_size"]),
+        # เวลา
+        "created_ts": p["created"],
+        "modified_ts": p["modified"],
+        "accessed_ts": p["accessed"],
+        "mft_changed_ts": p["mft_changed"],
+    }
+
+
+def _amcache_values(p: dict, extra: dict) -> dict | None:
+    if not p["app_name"]:
+        return None
+    return {
+        "app_name": p["app_name"],
+        "version": p["version"],
+        "publisher": p["publisher"],
+        "install_date": p["install_date"],
+        "file_path": p["file_path"],
+        "sha1": p["sha1"],
+        "pe_hash": p["pe_hash"],
+        "product_name": p["product_name"],
+        "extra": extra,
+    }
+
+
+def flatten_payload(payload: dict) -> Iterator[Tuple[str, str]]:
+    """EventData: <Data Name="X">v</Data> → (X, v); UserData: ลูกชั้นเดียวของ element ข้างใน → (ชื่อ, ค่า)"""
+    ed = payload.get("EventData")
+    if isinstance(ed, dict):
+        data = ed.get("Data")
+        for d in data if isinstance(data, list) else [data]:
+            if isinstance(d, dict) and d.get("@Name"):
+                yield d["@Name"], d.get("#text") or ""
+    ud = payload.get("UserData")
+    if isinstance(ud, dict):
+        for inner in ud.values():
+            if isinstance(inner, dict):
+                for k, v in inner.items():
+                    if not k.startswith("@") and isinstance(v, str):
+                        yield k, v
+
+
+# คีย์ใน Payload (JSON ของ EvtxECmd) ที่ยกขึ้นมาไว้ใน event_data ให้ search_vector / แถวขยายของหน้า result เห็น
+_LIFT_KEYS = frozenset(k for k in FTS_KEYS if k != "ExecutableInfo")
+_LIFT_HINTS = tuple(f'"{k}"' for k in _LIFT_KEYS)
+
+
+def _lift_payload_keys(ed: dict) -> None:
+    """Payload มีคีย์ใน _LIFT_KEYS → ใส่ ed[คีย์] (ไม่ทับของเดิม) — เช็ค substring ก่อน parse JSON จริง"""
+    payload = ed.get("Payload")
+    if not isinstance(payload, str) or not any(h in payload for h in _LIFT_HINTS):
+        return
+    try:
+        doc = json.loads(payload)
+    except ValueError:
+        return
+    if isinstance(doc, dict):
+        for k, v in flatten_payload(doc):
+            if k in _LIFT_KEYS and v:
+                ed.setdefault(k, v)
+
+
+def _evtx_values(p: dict, ed: dict) -> dict | None:
+    """
+    ed = คอลัมน์ดิบที่ไม่ใช่ core (ไม่ว่าง) → เก็บลง event_data
+    """
+    eid = _to_int(p["event_id"])
+    if eid == 0:
+        return None
+
+    # message ดิบจาก CSV (ถ้ามี)
+    msg_raw = p["message"]
+
+    # --- สร้าง description ตาม EventID (เก็บเพิ่ม ไม่ทับของดิบ) ---
+    desc, norm = describe_event(
+        eid,
+        {"event_id": eid, "message": msg_raw},
+        ed
+    )
+    if msg_raw and desc != msg_raw:
+        ed["MessageRaw"] = msg_raw  # เก็บของดิบไว้ด้วย
+    ed["__desc"] = desc           # เก็บคำอธิบายประกอบ
+    ed["__norm"] = norm           # เก็บ normalized fields เผื่อใช้ค้น/สรุปต่อ
+    _lift_payload_keys(ed)        # CommandLine / ServiceName / ObjectName ... สำหรับ search_vector
+
+    return {
+        "timestamp": p["timestamp"],
+        "channel": p["channel"],
+        "provider": p["provider"],
+        "event_id": eid,
+        "level": p["level"],
+        "task": p["task"],
+        "opcode": p["opcode"],
+        "keywords": p["keywords"],
+        "record_id": _to_int(p["record_id"]),
+        "computer": p["computer"],
+        "user_sid": p["user_sid"],
+        "user_name": p["user_name"],
+        "process_id": _to_int(p["process_id"]),
+        "thread_id": _to_int(p["thread_id"]),
+        # เก็บ message ให้ “อ่านรู้เรื่อง” ก่อน (ถ้าไม่มีจะว่างก็ได้ แต่เรามี desc แล้ว)
+        "message": desc or msg_raw or "",
+        "event_data": ed,
+        **promoted_columns(ed, norm),
+    }
+
+
+# === Loaders: (CompiledHeader, แถว) → sink — ใช้ร่วมกันทั้งอ่านทั้งไฟล์ และอ่านเป็นช่วง byte (parallel_ingest) ===
+def load_mft_rows(sink, ch: CompiledHeader, rows: Iterable[list]) -> None:
+    ts, add = TimestampDecoder(MFT_TS_FIELDS), sink.add
+    for batch in _batched(map(ch.pick, rows)):
+        for p in ts.decode(batch):
+            add(_mft_values(p))
+
+
+def load_amcache_rows(sink, ch: CompiledHeader, rows: Iterable[list]) -> None:
+    cols, ts = ch.columns(), TimestampDecoder(AMCACHE_TS_FIELDS)
+    for batch in _batched((ch.pick(row), ch.raw(row, cols)) for row in rows):
+        ts.decode([p for p, _ in batch])
+        for p, extra in batch:
+            values = _amcache_values(p, extra)
+            if values is not None:
+                sink.add(values)
+
+
+def load_evtx_rows(sink, ch: CompiledHeader, rows: Iterable[list]) -> None:
+    cols, ts = ch.columns(exclude=_EVTX_CORE_KEYS), TimestampDecoder(EVTX_TS_FIELDS)
+    for batch in _batched((ch.pick(row), ch.raw(row, cols)) for row in rows):
+        ts.decode([p for p, _ in batch])
+        for p, ed in batch:
+            values = _evtx_values(p, ed)
+            if values is not None:
+                sink.add(values)
+
+
+# kind → (model, field spec, encoding ตอนเปิดไฟล์, loader)
+CSV_KINDS = {
+    "mft": (MFTEntry, MFT_FIELDS, None, load_mft_rows),
+    "amcache": (AmcacheEntry, AMCACHE_FIELDS, None, load_amcache_rows),
+    "evtx": (SecurityEvent, EVTX_FIELDS, "utf-8-sig", load_evtx_rows),
+}
+
+
+# === Ingesters: header คอมไพล์ครั้งเดียว → csv.reader → sink (PostgreSQL → COPY, อื่น ๆ → bulk_create) ===
+def ingest_csv_to_db(kind: str, ev: Evidence, csv_path: Path, chunk=1000, row_filter=None,
+                     table: Optional[str] = None) -> int:
+    """
+    อ่าน CSV ทั้งไฟล์ใน process เดียว / transaction เดียว
+    chunk = ขนาด batch ของ bulk_create (COPY ใช้ INGEST_COPY_CHUNK)
+    row_filter = ตัวกรองแถวดิบก่อนเข้า loader (เช่น evtx_profiles.EvtxFilter) — นับแถวที่ข้ามไว้ในตัวมันเอง
+    table = ตาราง staging จาก partitions.replacing_rows (None = ตารางของ model)
+    """
+    model, fields, encoding, loader = CSV_KINDS[kind]
+    with transaction.atomic():
+        with open(csv_path, "r", newline="", errors="ignore", encoding=encoding) as r, \
+                make_sink(model, ev, chunk, table) as sink:
+            ch, rows = read_compiled(r, fields)
+            if row_filter is not None:
+                rows = row_filter.select(ch, rows)
+            loader(sink, ch, rows)
+    return sink.saved
+
+
+def ingest_mft_csv_to_db(ev: Evidence, csv_path: Path, chunk=1000) -> int:
+    """
+    อ่าน parsed/mft.csv → MFTEntry
+    """
+    return ingest_csv_to_db("mft", ev, csv_path, chunk)
+
+
+def ingest_amcache_csv_to_db(ev: Evidence, csv_path: Path, chunk=1000) -> int:
+    """
+    อ่าน amcache_UnassociatedFileEntries.csv → AmcacheEntry
+    """
+    return ingest_csv_to_db("amcache", ev, csv_path, chunk)
+
+
+def ingest_evtx_csv_to_db(ev: Evidence, csv_path: Path, chunk=2000, row_filter=None) -> int:
+    return ingest_csv_to_db("evtx", ev, csv_path, chunk, row_filter)
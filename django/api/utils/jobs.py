@@ -0,0 +1,268 @@
+# django/api/utils/jobs.py
+"""
+คิวงาน parse แบบทนทาน (เก็บใน DB ตาราง ParseJob)
+  - start_parse_api แค่ enqueue แล้วตอบ job id กลับทันที
+  - worker (manage.py run_workers) ดึงงานด้วย SELECT ... FOR UPDATE SKIP LOCKED
+    → หลาย process / หลายเครื่องที่แชร์ media volume เดียวกันช่วยกันระบายคิวได้โดยไม่ชนกัน
+  - worker ส่ง heartbeat ระหว่างทำงาน; งานที่ heartbeat ขาดเกิน PARSE_JOB_STALE_SECONDS
+    จะถูกคืนเข้าคิว (หรือ FAILED ถ้าครบ max_attempts)
+  - ทุกการเขียนของ worker ที่ถือ job (heartbeat / สถานะสุดท้าย) กรองด้วย pk + worker + attempts + RUNNING
+    → job ที่ถูกคืนคิวแล้ว (worker อื่นรับไป) worker เดิมเขียนไม่ติด: หยุด heartbeat แล้วทิ้งผลของตัวเอง
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Evidence, ParseJob
+from .pipeline import run_parse_pipeline, set_progress, ParseError
+
+
+HEARTBEAT_SECONDS = int(getattr(settings, "PARSE_JOB_HEARTBEAT_SECONDS", 15))
+STALE_SECONDS = int(getattr(settings, "PARSE_JOB_STALE_SECONDS", 300))
+
+ACTIVE_STATUSES = (ParseJob.Status.QUEUED, ParseJob.Status.RUNNING)
+
+log = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_parse_job(ev: Evidence, options: Optional[dict] = None) -> ParseJob:
+    """
+    สร้าง job ใหม่ให้ evidence (ถ้ามี job ที่ยังค้างอยู่แล้ว คืนตัวเดิม ไม่ enqueue ซ้ำ)
+    """
+    with transaction.atomic():
+        # lock แถว evidence กันสอง request enqueue พร้อมกัน
+        Evidence.objects.select_for_update().filter(pk=ev.pk).first()
+        existing = (
+            ParseJob.objects
+            .filter(evidence=ev, status__in=ACTIVE_STATUSES)
+            .order_by("id")
+            .first()
+        )
+        if existing:
+            return existing
+
+        job = ParseJob.objects.create(
+            evidence=ev,
+            kind=ParseJob.Kind.PARSE,
+            options=options or {},
+            max_attempts=int(getattr(settings, "PARSE_JOB_MAX_ATTEMPTS", 3)),
+        )
+        Evidence.objects.filter(pk=ev.pk).update(
+            parse_status=getattr(Evidence.ParseStatus, "PENDING", "PENDING"),
+            parse_progress=0,
+            parse_message="queued",
+        )
+    return job
+
+
+def claim_next_job(worker_id: str) -> Optional[ParseJob]:
+    """
+    จอง job ถัดไปแบบ atomic; แถวที่ worker อื่นล็อกอยู่จะถูกข้าม (SKIP LOCKED)
+    """
+    with transaction.atomic():
+        job = (
+            ParseJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ParseJob.Status.QUEUED)
+            .order_by("id")
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status = ParseJob.Status.RUNNING
+        job.worker = worker_id
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.error = ""
+        job.save(update_fields=["status", "worker", "attempts", "started_at", "heartbeat_at", "error", "updated_at"])
+    return job
+
+
+def requeue_stale_jobs(stale_after: int = STALE_SECONDS) -> int:
+    """
+    job ที่ RUNNING แต่ heartbeat หายไปนาน = worker ตาย → คืนเข้าคิวหรือปิดเป็น FAILED
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    n = 0
+    with transaction.atomic():
+        stale = list(
+            ParseJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ParseJob.Status.RUNNING, heartbeat_at__lt=cutoff)
+        )
+        for job in stale:
+            if job.attempts >= job.max_attempts:
+                job.status = ParseJob.Status.FAILED
+                job.finished_at = timezone.now()
+                job.error = (job.error or "") + f"\nworker {job.worker} lost (heartbeat timeout)"
+                Evidence.objects.filter(pk=job.evidence_id).update(
+                    parse_status=getattr(Evidence.ParseStatus, "FAILED", "FAILED"),
+                    parse_message="worker lost",
+                )
+            else:
+                job.status = ParseJob.Status.QUEUED
+                job.worker = ""
+                Evidence.objects.filter(pk=job.evidence_id).update(
+                    parse_status=getattr(Evidence.ParseStatus, "PENDING", "PENDING"),
+                    parse_message="requeued",
+                )
+            job.save()
+            n += 1
+    return n
+
+
+def _owned(job: ParseJob):
+    """แถวของ job ถ้ายังเป็นของรอบที่ worker นี้ claim มา (ยังไม่ถูก requeue / ไม่ถูก worker อื่นรับไป)"""
+    return ParseJob.objects.filter(pk=job.pk, worker=job.worker, attempts=job.attempts,
+                                   status=ParseJob.Status.RUNNING)
+
+
+class _Heartbeat(threading.Thread):
+    """ตีบัตร heartbeat_at ของ job เป็นระยะ ระหว่างที่ pipeline ทำงานยาว ๆ; job ไม่ใช่ของเราแล้ว → lost + หยุด"""
+
+    def __init__(self, job: ParseJob, interval: int = HEARTBEAT_SECONDS):
+        super().__init__(daemon=True)
+        self.owned = _owned(job)
+        self.interval = interval
+        self._halt = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        try:
+            while not self._halt.wait(self.interval):
+                if not self.owned.update(heartbeat_at=timezone.now()):
+                    self.lost.set()
+                    break
+        finally:
+            # thread นี้มี connection ของตัวเอง ต้องปิดเอง
+            connection.close()
+
+    def stop(self):
+        self._halt.set()
+
+
+def _requeue_evidence(ev: Evidence, message: str) -> None:
+    Evidence.objects.filter(pk=ev.pk).update(
+        parse_status=getattr(Evidence.ParseStatus, "PENDING", "PENDING"),
+        parse_message=message,
+        data_version=F("data_version") + 1,
+    )
+
+
+def run_job(job: ParseJob) -> ParseJob:
+    """
+    ทำ job ที่ claim มาแล้วจนจบ แล้วบันทึกผลลง job + evidence
+    job ถูกคืนคิวระหว่างทาง (heartbeat ขาดจน requeue_stale_jobs ให้ worker อื่น) → ไม่เขียนอะไรทับ คืนสถานะปัจจุบันใน DB
+    """
+    ev = Evidence.objects.get(pk=job.evidence_id)
+    owned = _owned(job)
+    hb = _Heartbeat(job)
+    hb.start()
+
+    def _progress(pct: int, msg: str):
+        if not hb.lost.is_set():          # job เป็นของ worker อื่นแล้ว → ไม่ทับ progress ของเขา
+            set_progress(ev, pct, msg)
+
+    mark = None                           # เปลี่ยนสถานะ evidence หลังยืนยันว่ายังถือ job อยู่
+    try:
+        result = run_parse_pipeline(ev, progress=_progress)
+        job.status = ParseJob.Status.DONE if result.get("ok") else ParseJob.Status.FAILED
+        job.result = result
+        if not result.get("ok"):
+            job.error = ev.parse_message or "parse failed"
+    except ParseError as e:
+        job.status = ParseJob.Status.FAILED
+        job.error = str(e)
+        job.result = {"ok": False, "error": str(e), "log_tail": e.log_tail}
+        mark = partial(_mark_failed, ev, str(e))
+    except Exception as e:
+        # error ไม่คาดคิด: ถ้ายังเหลือโควต้าให้ลองใหม่
+        job.error = f"{e!r}\n{traceback.format_exc()[-4000:]}"
+        if job.attempts < job.max_attempts:
+            job.status = ParseJob.Status.QUEUED
+            mark = partial(_requeue_evidence, ev, f"requeued after error: {e}")
+        else:
+            job.status = ParseJob.Status.FAILED
+            mark = partial(_mark_failed, ev, f"parse error: {e}")
+    finally:
+        hb.stop()
+
+    if job.status != ParseJob.Status.QUEUED:
+        job.finished_at = timezone.now()
+    with transaction.atomic():
+        kept = owned.update(
+            status=job.status, worker="" if job.status == ParseJob.Status.QUEUED else job.worker,
+            result=job.result, error=job.error, finished_at=job.finished_at, updated_at=timezone.now(),
+        )
+        if kept and mark is not None:
+            mark()
+    if not kept:
+        log.warning("ParseJob#%s: no longer owned by %s (attempt %s) — result dropped", job.pk, job.worker, job.attempts)
+        return ParseJob.objects.get(pk=job.pk)
+    job.refresh_from_db()
+    return job
+
+
+def _mark_failed(ev: Evidence, message: str) -> None:
+    ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
+    ev.parse_message = message
+    if hasattr(ev, "parse_log"):
+        ev.parse_log = (ev.parse_log or "") + "\n" + message
+    # สถานะ evidence เปลี่ยน → cache ของ response เดิมใช้ไม่ได้
+    ev.data_version = F("data_version") + 1
+    ev.save(update_fields=["parse_status", "parse_message", "parse_log", "data_version"])
+    ev.refresh_from_db(fields=["data_version"])
+
+
+def worker_loop(worker_id: Optional[str] = None, poll_interval: float = 2.0,
+                once: bool = False, stop: Optional[threading.Event] = None) -> int:
+    """
+    วนดึงงานจนกว่าจะถูกสั่งหยุด (once=True: ทำจนคิวว่างแล้วออก)
+    คืนจำนวน job ที่ทำไป
+    """
+    worker_id = worker_id or default_worker_id()
+    stop = stop or threading.Event()
+    done = 0
+    last_sweep = 0.0
+
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_sweep > STALE_SECONDS / 2:
+                requeue_stale_jobs()
+                last_sweep = time.monotonic()
+
+            job = claim_next_job(worker_id)
+        except Exception:
+            # DB ยังไม่พร้อม (เช่นตอน migrate) → รอแล้วลองใหม่
+            connection.close()
+            if once:
+                raise
+            stop.wait(poll_interval)
+            continue
+
+        if job is None:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        run_job(job)
+        done += 1
+    return done
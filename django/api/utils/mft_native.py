@@ -0,0 +1,343 @@
+# django/api/utils/mft_native.py
+"""
+$MFT reader ในตัว: $MFT → MFTEntry ตรง ๆ (ไม่ผ่าน MFTECmd / docker / mft.csv)
+  - mmap ไฟล์ → FILE record ขนาดคงที่ (อ่านจาก record 0, ปกติ 1024 byte) → ใส่ fixup ต่อ sector
+    → ถอด $STANDARD_INFORMATION (เวลา 4 ค่า, flags), $FILE_NAME (ชื่อ, parent reference), ขนาดจาก $DATA
+  - แบ่งช่วงเลข record ละ _RANGE_RECORDS ให้ process pool ถอดพร้อมกัน (spawn) — record ไม่ขึ้นต่อกัน
+    แต่ละช่วงคืนแถวแบบ tuple + record ส่วนขยาย (base reference ≠ 0) ที่มี $FILE_NAME / $DATA ของ base
+  - full path: ตาราง directory (entry → sequence, ชื่อ, parent) ได้มาจากรอบถอดเดียวกัน
+    process หลักประกอบ path แบบ memo แล้วส่งเข้า _mft_values / sink ชุดเดิม (ParentPath แบบ MFTECmd: ".\\Windows")
+    parent ที่หาไม่เจอ / sequence ไม่ตรง → ".\\PathUnknown\\Directory with ID 0x<entry>-<seq>"
+  - เวลาใช้ $SI เป็นหลัก (ไม่มี → $FN) ส่งเป็น FILETIME ดิบ แล้วแปลงเป็น datetime ตรง ๆ ใน process หลัก
+    (ผลเท่ากับทาง CSV: ตัดเหลือ microsecond + tz ตาม default_tz() — ไม่ต้องผ่าน string)
+  - record ที่เสีย (magic "BAAD", fixup ไม่ตรง, attribute เกินขอบ) ข้ามไป นับใน errors
+ต่างจาก MFTECmd: หนึ่งแถวต่อ record (ชื่อ Win32 ตัวแรก ไม่แตกแถวต่อ hard link / ADS — ชื่อ ADS อยู่ใน extra)
+เลือกใช้ด้วย MFT_BACKEND=native (ค่าเริ่มต้น mftecmd)
+"""
+import mmap
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import django
+from django.conf import settings
+
+from ..models import Evidence, MFTEntry
+from .ingest import _mft_values
+from .partitions import replacing_rows
+from .pgcopy import make_sink
+from .timestamps import default_tz, filetime_datetime
+
+
+MFT_BACKEND = getattr(settings, "MFT_BACKEND", "mftecmd")     # mftecmd | native
+MFT_NATIVE_WORKERS = int(getattr(settings, "MFT_NATIVE_WORKERS", min(4, os.cpu_count() or 1)))
+
+_FILE_MAGIC = b"FILE"
+_SECTOR = 512
+_DEFAULT_RECORD_SIZE = 1024
+_RANGE_RECORDS = 65536          # record ต่องานหนึ่งชิ้นของ pool (64 MB ที่ record 1 KB)
+_ROOT_ENTRY = 5
+_MAX_DEPTH = 512
+_MAX_ERROR_SAMPLES = 10
+
+_ATTR_SI = 0x10
+_ATTR_FN = 0x30
+_ATTR_DATA = 0x80
+_ATTR_END = 0xFFFFFFFF
+
+_FLAG_IN_USE = 0x01
+_FLAG_DIRECTORY = 0x02
+_NS_DOS = 2
+
+_U16 = struct.Struct("<H").unpack_from
+_U32 = struct.Struct("<I").unpack_from
+_U64 = struct.Struct("<Q").unpack_from
+_RECORD_HDR = struct.Struct("<4sHH8xHHHHII").unpack_from     # magic, usa off, usa count, seq, links, attr off, flags, used, alloc
+_ATTR_HDR = struct.Struct("<IIBBH").unpack_from               # type, length, non-resident, name length, name offset
+_SI_TIMES = struct.Struct("<QQQQI").unpack_from               # created, modified, mft changed, accessed, flags
+_FN_HDR = struct.Struct("<QQQQQQQIIBB").unpack_from           # parent ref, 4 เวลา, alloc, real size, flags, reparse, name len, namespace
+
+
+class MftFormatError(ValueError):
+    pass
+
+
+def _ref(v: int) -> Tuple[int, int]:
+    """file reference 64 bit → (entry 48 bit, sequence 16 bit)"""
+    return v & 0xFFFFFFFFFFFF, v >> 48
+
+
+def apply_fixups(rec: bytearray, usa_off: int, usa_count: int) -> None:
+    """แทน 2 byte ท้ายของทุก sector ด้วยค่าใน update sequence array (ค่าท้าย sector ต้องเท่ากับ USN)"""
+    if usa_count < 2 or usa_off + 2 * usa_count > len(rec):
+        raise MftFormatError("bad update sequence array")
+    usn = rec[usa_off:usa_off + 2]
+    for i in range(1, usa_count):
+        end = i * _SECTOR
+        if end > len(rec):
+            break
+        if rec[end - 2:end] != usn:
+            raise MftFormatError(f"fixup mismatch in sector {i - 1}")
+        rec[end - 2:end] = rec[usa_off + 2 * i:usa_off + 2 * i + 2]
+
+
+def _file_name(rec: bytearray, off: int, size: int):
+    """$FILE_NAME → (namespace, ชื่อ, parent entry, parent seq, (created, modified, changed, accessed))"""
+    if size < 66:
+        raise MftFormatError("short $FILE_NAME")
+    parent, cr, mo, ch, ac, _alloc, _real, _flags, _reparse, n, ns = _FN_HDR(rec, off)
+    name = bytes(rec[off + 66:off + 66 + 2 * n]).decode("utf-16-le", errors="replace")
+    return ns, name, *_ref(parent), (cr, mo, ch, ac)
+
+
+def decode_record(rec: bytearray):
+    """
+    FILE record หนึ่งตัว (ใส่ fixup แล้ว) → (ส่วนหัว, $SI, $FN ที่เลือก, ขนาด $DATA หลัก, ชื่อ ADS)
+    ส่วนหัว = (sequence, flags, จำนวนลิงก์, base entry)
+    """
+    magic, _usa_off, _usa_count, seq, links, attr_off, flags, used, _alloc = _RECORD_HDR(rec, 0)
+    base = _ref(_U64(rec, 0x20)[0])[0]
+    used = min(used, len(rec))
+    si = fn = size = None
+    ads: List[str] = []
+    pos = attr_off
+    while pos + 16 <= used:
+        atype, length, nonresident, name_len, name_off = _ATTR_HDR(rec, pos)
+        if atype == _ATTR_END:
+            break
+        if length < 16 or pos + length > used:
+            raise MftFormatError(f"attribute 0x{atype:X} at {pos} overruns record")
+        if not nonresident:
+            c_size, c_off = _U32(rec, pos + 0x10)[0], pos + _U16(rec, pos + 0x14)[0]
+            if c_off + c_size > pos + length:
+                raise MftFormatError(f"attribute 0x{atype:X} content overruns attribute")
+        if atype == _ATTR_SI and not nonresident and c_size >= 36:
+            si = _SI_TIMES(rec, c_off)
+        elif atype == _ATTR_FN and not nonresident:
+            cand = _file_name(rec, c_off, c_size)
+            # ชื่อ Win32 / POSIX ก่อนชื่อ DOS 8.3
+            if fn is None or (fn[0] == _NS_DOS and cand[0] != _NS_DOS):
+                fn = cand
+        elif atype == _ATTR_DATA:
+            if name_len:
+                ads.append(bytes(rec[pos + name_off:pos + name_off + 2 * name_len]).decode("utf-16-le", errors="replace"))
+            elif not nonresident:
+                size = c_size
+            elif _U64(rec, pos + 0x10)[0] == 0:          # extent แรก (VCN 0) เท่านั้นที่มีขนาดจริง
+                size = _U64(rec, pos + 0x30)[0]
+        pos += length
+    return (seq, flags, links, base), si, fn, size, ads
+
+
+# ===== ถอดเป็นช่วง (รันใน process ลูกได้) =====
+
+def record_size(path: Path) -> int:
+    """ขนาด FILE record จาก record 0 ($MFT เอง); อ่านไม่ได้ → 1024"""
+    with open(path, "rb") as f:
+        head = f.read(0x20)
+    if len(head) == 0x20 and head[:4] == _FILE_MAGIC:
+        size = _U32(head, 0x1C)[0]
+        if size in (1024, 2048, 4096):
+            return size
+    return _DEFAULT_RECORD_SIZE
+
+
+def decode_range(path: str, start: int, stop: int, rsize: int) -> dict:
+    """
+    record [start, stop) → {"rows": [...], "ext": [...], "errors": n, "error_samples": [...]}
+      rows: (entry, seq, in_use, is_dir, ชื่อ, parent entry, parent seq, ขนาด, 4 เวลา (FILETIME), si flags, links, ads)
+      ext:  (base entry, $FN ที่เลือก หรือ None, ขนาด หรือ None, ads) ของ record ส่วนขยาย
+    """
+    rows, ext, errors, samples = [], [], 0, []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        stop = min(stop, size // rsize)
+        if stop <= start:
+            return {"rows": rows, "ext": ext, "errors": 0, "error_samples": samples}
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for entry in range(start, stop):
+                off = entry * rsize
+                magic = mm[off:off + 4]
+                if magic != _FILE_MAGIC:
+                    # record ที่ไม่เคยใช้เป็น 0 ทั้งก้อน; อย่างอื่น (BAAD / ขยะ) นับเป็น error
+                    if magic != b"\x00\x00\x00\x00":
+                        errors += 1
+                        if len(samples) < _MAX_ERROR_SAMPLES:
+                            samples.append(f"entry {entry}: bad magic {bytes(magic)!r}")
+                    continue
+                rec = bytearray(mm[off:off + rsize])
+                try:
+                    apply_fixups(rec, _U16(rec, 4)[0], _U16(rec, 6)[0])
+                    (seq, flags, links, base), si, fn, data_size, ads = decode_record(rec)
+                except (MftFormatError, struct.error, UnicodeDecodeError) as e:
+                    errors += 1
+                    if len(samples) < _MAX_ERROR_SAMPLES:
+                        samples.append(f"entry {entry}: {e!r}")
+                    continue
+                if base:
+                    if fn is not None or data_size is not None or ads:
+                        ext.append((base, fn, data_size, ads))
+                    continue
+                if fn is None and not flags & _FLAG_IN_USE:
+                    continue                             # ไม่มีชื่อ (record ว่างที่เคย format ไว้) → ไม่มีแถว
+                # ไม่มี $FN ใน base record → ชื่ออยู่ใน record ส่วนขยาย (เติมทีหลังใน _merge_extensions)
+                name, p_entry, p_seq = fn[1:4] if fn is not None else (None, 0, 0)
+                times = si[:4] if si is not None else fn[4] if fn is not None else (0, 0, 0, 0)
+                rows.append((entry, seq, bool(flags & _FLAG_IN_USE), bool(flags & _FLAG_DIRECTORY),
+                             name, p_entry, p_seq, data_size or 0, tuple(times),
+                             si[4] if si is not None else None, links, ads))
+        finally:
+            mm.close()
+    return {"rows": rows, "ext": ext, "errors": errors, "error_samples": samples}
+
+
+def _decode_range_proc(path: str, start: int, stop: int, rsize: int) -> dict:
+    return decode_range(path, start, stop, rsize)
+
+
+def decode_mft(path: Path, workers: Optional[int] = None) -> dict:
+    """ถอดทั้งไฟล์: ช่วงเดียว → process นี้, หลายช่วง → process pool (ผลเรียงตามเลข entry)"""
+    workers = MFT_NATIVE_WORKERS if workers is None else workers
+    rsize = record_size(path)
+    total = Path(path).stat().st_size // rsize
+    ranges = [(s, min(s + _RANGE_RECORDS, total)) for s in range(0, total, _RANGE_RECORDS)]
+    if workers <= 1 or len(ranges) <= 1:
+        parts = [decode_range(str(path), s, e, rsize) for s, e in ranges]
+    else:
+        # spawn + django.setup ก่อน unpickle งาน (เหตุผลเดียวกับ parallel_ingest)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=ctx,
+                                 initializer=django.setup) as pool:
+            parts = list(pool.map(_decode_range_proc, *zip(*[(str(path), s, e, rsize) for s, e in ranges])))
+    out = {"records": total, "rows": [], "ext": [], "errors": 0, "error_samples": []}
+    for part in parts:
+        out["rows"].extend(part["rows"])
+        out["ext"].extend(part["ext"])
+        out["errors"] += part["errors"]
+        out["error_samples"] = (out["error_samples"] + part["error_samples"])[:_MAX_ERROR_SAMPLES]
+    return out
+
+
+# ===== parent reference → path =====
+
+class PathTable:
+    """
+    ตาราง directory จากรอบถอด: entry → (sequence, in use, ชื่อ, parent entry, parent seq)
+    parent_path(entry, seq) คืน path ของ directory แบบ ParentPath ของ MFTECmd (root = ".") พร้อม memo
+    """
+
+    def __init__(self, rows: List[tuple]):
+        self.dirs: Dict[int, tuple] = {r[0]: (r[1], r[2], r[4], r[5], r[6]) for r in rows if r[3]}
+        self._memo: Dict[Tuple[int, int], str] = {(_ROOT_ENTRY, self.dirs.get(_ROOT_ENTRY, (0,))[0]): "."}
+        self.unresolved = 0
+
+    def _known(self, entry: int, seq: int) -> Optional[tuple]:
+        d = self.dirs.get(entry)
+        # directory ที่ถูกลบ: NTFS เพิ่ม sequence ตอนลบ → ลูกยังอ้าง sequence เดิม (น้อยกว่า 1)
+        if d is None or not (d[0] == seq or (not d[1] and d[0] == seq + 1)):
+            return None
+        return d
+
+    def parent_path(self, entry: int, seq: int) -> str:
+        key = (entry, seq)
+        hit = self._memo.get(key)
+        if hit is not None:
+            return hit
+        # ไต่ขึ้นไปจนเจอ path ที่รู้แล้ว / root / หาไม่เจอ แล้วต่อชื่อกลับลงมา
+        chain, cur, prefix = [], key, None
+        while len(chain) < _MAX_DEPTH:
+            hit = self._memo.get(cur)
+            if hit is not None:
+                prefix = hit
+                break
+            if cur[0] == _ROOT_ENTRY:
+                prefix = "."
+                break
+            d = self._known(*cur)
+            if d is None:
+                self.unresolved += 1
+                prefix = f".\\PathUnknown\\Directory with ID 0x{cur[0]:08X}-{cur[1]:08X}"
+                break
+            chain.append((cur, d[2]))
+            cur = (d[3], d[4])
+            if any(c == cur for c, _ in chain):     # วนกลับมาที่เดิม (record เสีย)
+                self.unresolved += 1
+                prefix = ".\\PathUnknown"
+                break
+        if prefix is None:
+            prefix = ".\\PathUnknown"
+        path = prefix
+        for k, name in reversed(chain):
+            path = path + "\\" + name
+            self._memo[k] = path
+        return self._memo.setdefault(key, path)
+
+
+def _merge_extensions(rows: List[tuple], ext: List[tuple]) -> List[tuple]:
+    """
+    ชื่อ / ขนาด / ADS ที่อยู่ใน record ส่วนขยาย (attribute list) → แถวของ base record
+    base ที่ยังไม่มีชื่อหลังรวมแล้วตัดทิ้ง
+    """
+    if ext:
+        by_entry = {r[0]: i for i, r in enumerate(rows)}
+        for base, fn, size, ads in ext:
+            i = by_entry.get(base)
+            if i is None:
+                continue
+            r = list(rows[i])
+            if fn is not None and r[4] is None:
+                r[4], r[5], r[6] = fn[1:4]
+            if size is not None and not r[7]:
+                r[7] = size
+            if ads:
+                r[11] = r[11] + ads
+            rows[i] = tuple(r)
+    return [r for r in rows if r[4] is not None]
+
+
+# ===== ingest =====
+
+def _picked(row: tuple, parent_path: str, tz) -> dict:
+    """แถวที่ถอดแล้ว → dict หน้าตาเดียวกับ CompiledHeader.pick + ถอดเวลาแล้ว ของ MFT_FIELDS (ให้ _mft_values ใช้ต่อ)"""
+    entry, _seq, _in_use, is_dir, name, _pe, _ps, size, times = row[:9]
+    return {
+        "entry_number": str(entry),
+        "file_name": name,
+        "full_path": "",
+        "parent_path": parent_path,
+        "is_directory": "True" if is_dir else "False",
+        "file_size": str(size),
+        "created": filetime_datetime(times[0], tz),
+        "modified": filetime_datetime(times[1], tz),
+        "mft_changed": filetime_datetime(times[2], tz),
+        "accessed": filetime_datetime(times[3], tz),
+    }
+
+
+def ingest_mft_file(ev: Evidence, path: Path, chunk: int = 1000, workers: Optional[int] = None) -> dict:
+    """
+    แทน MFTEntry เดิมของ ev ด้วย $MFT ที่ถอดใหม่ (partitions.replacing_rows; ถอดขนานกันได้ แต่เขียน DB ทางเดียว)
+    คืน {"records", "rows", "in_use", "deleted", "errors", "unresolved", "db", "error_samples"}
+    """
+    decoded = decode_mft(path, workers)
+    rows = _merge_extensions(decoded["rows"], decoded["ext"])
+    paths = PathTable(rows)
+    tz = default_tz()
+    with replacing_rows(MFTEntry, ev) as table:
+        with make_sink(MFTEntry, ev, chunk, table) as sink:
+            for r in rows:
+                values = _mft_values(_picked(r, paths.parent_path(r[5], r[6]), tz))
+                values["sequence"] = r[1]
+                values["extra"] = {k: v for k, v in (
+                    ("InUse", r[2]), ("ParentEntryNumber", r[5]), ("ParentSequenceNumber", r[6]),
+                    ("ReferenceCount", r[10]), ("SiFlags", r[9]), ("Ads", r[11]),
+                ) if v is not None and v != []}
+                sink.add(values)
+    in_use = sum(1 for r in rows if r[2])
+    return {"records": decoded["records"], "rows": len(rows), "in_use": in_use, "deleted": len(rows) - in_use,
+            "errors": decoded["errors"], "unresolved": paths.unresolved, "db": sink.saved,
+            "error_samples": decoded["error_samples"]}
@@ -0,0 +1,235 @@
+# django/api/utils/paging.py
+"""
+แบ่งหน้าของ row API (MFT / Amcache / Security events)
+  - keyset: หน้าถัดไป/ก่อนหน้าใช้ cursor (ค่าของคอลัมน์ที่ sort + id ของแถวขอบหน้า)
+    → WHERE (col, id) > (v, id) ORDER BY col, id LIMIT n ซึ่ง index (evidence, col, id) seek ได้ตรง ๆ
+    ไม่ต้องข้าม OFFSET แถวเหมือน [start:start + page_size] (หน้าลึก ๆ ช้าตามจำนวนแถวที่ข้าม)
+  - cursor เป็น token ที่ sign ด้วย SECRET_KEY (client แก้ไม่ได้) และผูกกับ sort/order ที่ออก token มา
+  - กระโดดไปเลขหน้าตรง ๆ (page=N ไม่มี cursor) ยังใช้ OFFSET แต่ตอบ cursor ของหน้านั้นกลับไปด้วย
+  - คอลัมน์ที่ null ได้: ค่า NULL อยู่ท้าย (asc) / ต้น (desc) เหมือน PostgreSQL
+    แยกเป็นช่วง "มีค่า" กับ "NULL" แล้ว seek ทีละช่วง (row comparison กับ NULL ไม่ได้ผล)
+  - total: นับจริงแล้ว cache ไว้ (ต่อ evidence + เงื่อนไข) / ประมาณจาก planner / ไม่นับ
+"""
+import hashlib
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, F, Func, Value
+
+
+ROW_TOTAL_CACHE_SECONDS = getattr(settings, "ROW_TOTAL_CACHE_SECONDS", 300)
+ROW_TOTAL_EXACT_BELOW = getattr(settings, "ROW_TOTAL_EXACT_BELOW", 10000)
+
+TOTAL_MODES = ("exact", "estimate", "none")
+
+_CURSOR_SALT = "api.rows.cursor"
+_VALUE, _NULL = "v", "n"                 # ช่วงของคอลัมน์ที่ null ได้
+
+
+class BadCursor(ValueError):
+    pass
+
+
+class RowCompare(Func):
+    """(a, b) > (x, y) — row comparison ที่ B-tree index บน (a, b) ใช้เป็นจุดเริ่ม scan ได้"""
+    output_field = BooleanField()
+
+    def __init__(self, lhs: Sequence, op: str, rhs: Sequence):
+        self.op = op
+        self.width = len(lhs)
+        super().__init__(*lhs, *rhs)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expr in self.get_source_expressions():
+            sql, p = compiler.compile(expr)
+            parts.append(sql)
+            params.extend(p)
+        n = self.width
+        return f"({', '.join(parts[:n])}) {self.op} ({', '.join(parts[n:])})", params
+
+
+# ===== cursor =====
+
+def _encode(field: str, desc: bool, forward: bool, seg: str, value, pk) -> str:
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return signing.dumps([field, desc, forward, seg, value, pk], salt=_CURSOR_SALT, compress=True)
+
+
+def _decode(token: str, model, field: str, desc: bool):
+    try:
+        c_field, c_desc, forward, seg, value, pk = signing.loads(token, salt=_CURSOR_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        raise BadCursor("invalid cursor")
+    if c_field != field or c_desc != desc or seg not in (_VALUE, _NULL):
+        raise BadCursor("cursor does not match sort/order")
+    if seg == _VALUE:
+        value = model._meta.get_field(field).to_python(value)
+    return forward, seg, value, pk
+
+
+# ===== keyset =====
+
+def _segments(model, field: str, desc: bool) -> Tuple[str, ...]:
+    if not model._meta.get_field(field).null:
+        return (_VALUE,)
+    return (_NULL, _VALUE) if desc else (_VALUE, _NULL)
+
+
+def _segment_qs(qs, field: str, seg: str, nullable: bool, ascending: bool, bound=None):
+    """แถวในช่วง seg เรียงตามทิศ ascending; bound = (value, pk) → เฉพาะแถวที่อยู่หลังจุดนั้น"""
+    model = qs.model
+    op = ">" if ascending else "<"
+    if seg == _NULL:
+        qs = qs.filter(**{f"{field}__isnull": True})
+        if bound is not None:
+            qs = qs.filter(**{f"pk__{'gt' if ascending else 'lt'}": bound[1]})
+        return qs.order_by("pk" if ascending else "-pk")
+    if nullable:
+        qs = qs.filter(**{f"{field}__isnull": False})
+    if bound is not None:
+        out = model._meta.get_field(field)
+        qs = qs.filter(RowCompare((F(field), F("pk")), op,
+                                  (Value(bound[0], output_field=out), Value(bound[1], output_field=model._meta.pk))))
+    return qs.order_by(F(field).asc() if ascending else F(field).desc(), "pk" if ascending else "-pk")
+
+
+def _seek(qs, fields: Sequence[str], field: str, desc: bool, limit: int, forward: bool, start=None) -> List[dict]:
+    """
+    อ่าน limit แถวถัดจาก start = (seg, value, pk) ตามลำดับของหน้า (forward) หรือย้อนกลับ (not forward)
+    start = None → จากต้น (forward) ; คืนตามลำดับการอ่าน
+    """
+    segs = _segments(qs.model, field, desc)
+    nullable = len(segs) > 1
+    ascending = (not desc) == forward
+    order = segs if forward else segs[::-1]
+    i = order.index(start[0]) if start else 0
+    rows: List[dict] = []
+    for j, seg in enumerate(order[i:]):
+        bound = (start[1], start[2]) if start and j == 0 else None
+        part = _segment_qs(qs, field, seg, nullable, ascending, bound)
+        rows.extend(part.values(*fields)[:limit - len(rows)])
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def _position(row: dict, field: str) -> Tuple[str, object, object]:
+    value = row[field]
+    return (_NULL if value is None else _VALUE), value, row["pk"]
+
+
+def paginate(qs, fields: Sequence[str], field: str, desc: bool, page: int, page_size: int,
+             cursor: str = "", keyset: bool = True) -> Tuple[List[dict], dict]:
+    """
+    หน้าหนึ่งของ qs → (rows, meta)
+      field/desc: คอลัมน์ที่ sort (ชื่อฟิลด์ของ model) — ผูก id เป็นตัวตัดสินเสมอ ลำดับจึงนิ่ง
+      cursor: next_cursor / prev_cursor จากหน้าก่อน (ว่าง = ใช้ page แบบ OFFSET)
+      keyset=False: qs เรียงมาเองแล้ว (เช่น rank ของ full-text) → OFFSET อย่างเดียว ไม่มี cursor
+    meta: page, page_size, start_index, end_index, next_cursor, prev_cursor
+    """
+    fields = tuple(fields)
+    page = max(1, page)
+    if not keyset:
+        start = (page - 1) * page_size
+        rows = list(qs.values(*fields)[start:start + page_size + 1])
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        return rows, _meta(page, page_size, len(rows), None, None, more)
+
+    cols = fields + tuple(f for f in (field, "pk") if f not in fields)
+    if cursor:
+        forward, seg, value, pk = _decode(cursor, qs.model, field, desc)
+        rows = _seek(qs, cols, field, desc, page_size + 1, forward, (seg, value, pk))
+        more = len(rows) > page_size          # ยังมีแถวต่อในทิศที่อ่าน
+        rows = rows[:page_size]
+        if not forward:
+            rows.reverse()
+        has_next = more if forward else True
+        has_prev = True if forward else more
+    else:
+        start = (page - 1) * page_size
+        rows = list(ordered(qs, field, desc).values(*cols)[start:start + page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = page > 1
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = _encode(field, desc, True, *_position(rows[-1], field))
+    if rows and has_prev:
+        prev_cursor = _encode(field, desc, False, *_position(rows[0], field))
+    return rows, _meta(page, page_size, len(rows), next_cursor, prev_cursor, has_next)
+
+
+def ordered(qs, field: str, desc: bool):
+    """qs เรียงตามลำดับเดียวกับหน้าของ paginate (export ทั้งชุดใช้ลำดับนี้)"""
+    return qs.order_by(*_order(qs.model, field, desc))
+
+
+def _order(model, field: str, desc: bool):
+    """ลำดับเดียวกับที่ _seek เดิน: NULL ท้าย (asc) / ต้น (desc) แล้วตาม pk"""
+    if desc:
+        return F(field).desc(nulls_first=True), "-pk"
+    return F(field).asc(nulls_last=True), "pk"
+
+
+def _meta(page: int, page_size: int, n: int, next_cursor, prev_cursor, has_next: bool) -> dict:
+    start = (page - 1) * page_size
+    return {
+        "page": page,
+        "page_size": page_size,
+        "start_index": start + 1 if n else 0,
+        "end_index": start + n,
+        "has_next": has_next,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+
+# ===== total =====
+
+def _estimate(qs) -> Optional[int]:
+    """จำนวนแถวที่ planner ประมาณ (PostgreSQL เท่านั้น)"""
+    if connection.vendor != "postgresql":
+        return None
+    plan = json.loads(qs.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _cache_key(ev, qs) -> Optional[str]:
+    # ระหว่าง parse แถวยังเปลี่ยนอยู่ → ไม่ cache; หลังจากนั้นผูกกับ data_version (เพิ่มทุกครั้งที่ ingest จบ) + summary ของรอบ parse
+    if ev.parse_status == ev.ParseStatus.RUNNING:
+        return None
+    sql, params = qs.order_by().query.sql_with_params()
+    raw = json.dumps([sql, [str(p) for p in params], ev.data_version, ev.summary], sort_keys=True, default=str)
+    return f"rows-total:{ev.pk}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def count_rows(ev, qs, how: str = "exact") -> Tuple[Optional[int], bool]:
+    """
+    total ของ qs → (จำนวน, เป็นค่าจริงไหม)
+      exact:    COUNT(*) แล้ว cache ไว้ ROW_TOTAL_CACHE_SECONDS (เปลี่ยนหน้า / sort ไม่ต้องนับใหม่)
+      estimate: planner ประมาณ; ต่ำกว่า ROW_TOTAL_EXACT_BELOW นับจริง (ถูก) — DB อื่นนับจริง
+      none:     ไม่นับ (client ใช้ total จากหน้าแรก)
+    """
+    if how == "none":
+        return None, False
+    key = _cache_key(ev, qs)
+    if key:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit, True
+    if how == "estimate":
+        est = _estimate(qs)
+        if est is not None and est >= ROW_TOTAL_EXACT_BELOW:
+            return est, False
+    total = qs.count()
+    if key:
+        cache.set(key, total, ROW_TOTAL_CACHE_SECONDS)
+    return total, True
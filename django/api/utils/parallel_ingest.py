@@ -0,0 +1,227 @@
+# django/api/utils/parallel_ingest.py
+"""
+ingest CSV ไฟล์ใหญ่ (เช่น evtx_all.csv หลาย GB) ด้วยหลาย process
+  - แบ่งไฟล์เป็นช่วง byte ที่ตรงกับขอบ record จริง:
+    newline จะเป็นขอบ record ก็ต่อเมื่อจำนวน " ก่อนหน้าเป็นเลขคู่ (ไม่ได้อยู่ในฟิลด์ที่ quote ไว้)
+    → ฟิลด์หลายบรรทัด / "" ข้างในไม่ถูกตัดกลาง  (นับด้วย bytes.count ทีละ block ไม่ต้อง parse)
+  - แต่ละช่วง: process ของตัวเอง + DB connection ของตัวเอง + transaction ของตัวเอง
+    ใช้ loader ชุดเดียวกับทางอ่านทั้งไฟล์ (ingest.CSV_KINDS) → แถวที่ได้เหมือนกันทุกประการ
+  - ช่วงไหนล้ม: ลบแถวของ evidence ที่ลงไปแล้วทั้งหมดแล้วโยน error ต่อ (ไม่ทิ้งข้อมูลครึ่ง ๆ กลาง ๆ)
+    (ตาราง partitioned: ทุกช่วงเขียนลงตาราง staging ตัวเดียวกัน ล้ม = DROP staging ข้อมูลเดิมไม่ถูกแตะ)
+"""
+import csv
+import io
+import locale
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import Evidence
+from .csvheader import CompiledHeader
+from .evtx_profiles import EvtxFilter
+from .ingest import CSV_KINDS, ingest_csv_to_db
+from .partitions import can_stage, replacing_rows
+from .pgcopy import make_sink
+
+
+INGEST_PARALLEL_WORKERS = int(getattr(settings, "INGEST_PARALLEL_WORKERS", min(4, os.cpu_count() or 1)))
+INGEST_PARALLEL_MIN_BYTES = int(getattr(settings, "INGEST_PARALLEL_MIN_BYTES", 256 * 1024 * 1024))
+
+_BLOCK = 8 * 1024 * 1024
+
+
+def record_boundaries(f, targets: List[int]) -> List[int]:
+    """
+    สำหรับแต่ละ target (เรียงจากน้อยไปมาก) หา offset แรกที่ >= target ซึ่งเป็นจุดเริ่ม record
+    (byte ก่อนหน้าเป็น \\n และจำนวน " ตั้งแต่ต้นไฟล์เป็นเลขคู่) ไม่เจอ = ขนาดไฟล์
+    สแกนไฟล์รอบเดียว ตั้งแต่ต้นไฟล์ (ต้องรู้ parity ของ quote ตั้งแต่ byte แรก)
+    """
+    out: List[int] = []
+    f.seek(0)
+    offset = 0          # offset ของ block ปัจจุบันในไฟล์
+    parity = 0          # จำนวน " ถึง offset+pos เป็นคี่ไหม
+    ti = 0
+    while ti < len(targets):
+        blk = f.read(_BLOCK)
+        if not blk:
+            break
+        pos = 0
+        n = len(blk)
+        while ti < len(targets):
+            t = targets[ti]
+            if out and t <= out[-1]:
+                out.append(out[-1])
+                ti += 1
+                continue
+            want = t - 1 - offset            # record เริ่มที่ o ⇔ byte o-1 เป็น \n
+            if want >= n:
+                break                        # target อยู่ block ถัดไป
+            if want > pos:
+                parity ^= blk.count(b'"', pos, want) & 1
+                pos = want
+            found = None
+            while True:
+                nl = blk.find(b"\n", pos)
+                if nl < 0:
+                    break
+                parity ^= blk.count(b'"', pos, nl) & 1
+                pos = nl + 1
+                if not parity:
+                    found = offset + pos
+                    break
+            if found is None:
+                break                        # หา \n ต่อใน block ถัดไป
+            out.append(found)
+            ti += 1
+        parity ^= blk.count(b'"', pos) & 1
+        offset += n
+
+    while len(out) < len(targets):      # สแกนจนจบไฟล์แล้ว target ที่เหลือ → ท้ายไฟล์
+        out.append(offset)
+    return out
+
+
+def split_csv_ranges(path: Path, parts: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    คืน (ความยาว header เป็น byte, [(start, end), ...]) ของส่วนข้อมูลหลัง header
+    ช่วงว่างถูกตัดทิ้ง; parts=1 → ช่วงเดียวทั้งไฟล์
+    """
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        header_end = record_boundaries(f, [1])[0]
+        body = size - header_end
+        parts = max(1, min(parts, body // (1024 * 1024) or 1))
+        targets = [header_end + body * k // parts for k in range(1, parts)]
+        cuts = [header_end, *record_boundaries(f, targets), size]
+    ranges = [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+    return header_end, ranges
+
+
+class _BoundedRaw(io.RawIOBase):
+    """อ่านไฟล์ได้แค่ช่วง [start, end) — ให้ TextIOWrapper / csv.reader มองเป็นไฟล์ย่อย"""
+
+    def __init__(self, path: Path, start: int, end: int):
+        self._f = open(path, "rb", buffering=0)
+        self._f.seek(start)
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        if self._left <= 0:
+            return 0
+        view = memoryview(b)[: min(len(b), self._left)]
+        n = self._f.readinto(view)
+        self._left -= n or 0
+        return n or 0
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def _read_header(path: Path, header_end: int, encoding: Optional[str]) -> List[str]:
+    with open(path, "rb") as f:
+        raw = f.read(header_end)
+    text = raw.decode(encoding or locale.getpreferredencoding(False), errors="ignore")
+    return next(csv.reader(io.StringIO(text, newline="")), [])
+
+
+def _range_encoding(encoding: Optional[str]) -> Optional[str]:
+    # BOM อยู่แค่ต้นไฟล์ (ใน header) ช่วงข้อมูลอ่านเป็น utf-8 ธรรมดา
+    return "utf-8" if encoding == "utf-8-sig" else encoding
+
+
+def _ingest_range(kind: str, ev_id: int, path: str, header: List[str],
+                  start: int, end: int, chunk: int, filter_spec=None,
+                  table: Optional[str] = None) -> Tuple[int, dict]:
+    """
+    รันใน process ลูก: ingest ช่วง [start, end) ใน transaction ของตัวเอง
+    คืน (จำนวนแถวที่ลง, แถวที่ตัวกรองข้ามแยกตาม channel)
+    """
+    model, fields, encoding, loader = CSV_KINDS[kind]
+    row_filter = EvtxFilter(*filter_spec) if filter_spec else None
+    try:
+        ev = Evidence.objects.get(pk=ev_id)
+        ch = CompiledHeader(header, fields)
+        raw = _BoundedRaw(Path(path), start, end)
+        with transaction.atomic():
+            with io.TextIOWrapper(io.BufferedReader(raw, _BLOCK), encoding=_range_encoding(encoding),
+                                  errors="ignore", newline="") as r, \
+                    make_sink(model, ev, chunk, table) as sink:
+                fit = ch.fit
+                rows = (fit(row) for row in csv.reader(r) if row)
+                if row_filter is not None:
+                    rows = row_filter.select(ch, rows)
+                loader(sink, ch, rows)
+        return sink.saved, dict(row_filter.skipped) if row_filter is not None else {}
+    finally:
+        connection.close()
+
+
+def ingest_csv_parallel(kind: str, ev: Evidence, csv_path: Path, chunk: int = 1000,
+                        workers: Optional[int] = None, row_filter=None, table: Optional[str] = None) -> int:
+    """
+    แบ่ง csv_path เป็นช่วงตาม workers แล้ว ingest พร้อมกัน; คืนผลรวมของจำนวนแถวทุกช่วง
+    row_filter: ส่งเป็น spec ไปสร้างใหม่ในแต่ละ process แล้วรวมจำนวนแถวที่ข้ามกลับเข้าตัวเดิม
+    table: ตาราง staging (ผู้สร้างเก็บกวาดเองเมื่อ error)
+    หมายเหตุ: แต่ละช่วง commit แยกกัน ห้ามเรียกจากใน transaction.atomic() ที่ยังไม่ commit
+    """
+    workers = INGEST_PARALLEL_WORKERS if workers is None else workers
+    csv_path = Path(csv_path)
+    if workers <= 1:
+        return ingest_csv_to_db(kind, ev, csv_path, chunk, row_filter, table)
+
+    model, _fields, encoding, _loader = CSV_KINDS[kind]
+    header_end, ranges = split_csv_ranges(csv_path, workers)
+    if len(ranges) <= 1:
+        return ingest_csv_to_db(kind, ev, csv_path, chunk, row_filter, table)
+    header = _read_header(csv_path, header_end, encoding)
+    filter_spec = row_filter.spec() if row_filter is not None else None
+
+    # spawn: process ลูกไม่รับ thread / socket ของ worker แม่มา (แม่อาจอยู่ใน thread pool ของ pipeline)
+    # initializer = django.setup ต้องรันก่อน unpickle _ingest_range (module นี้ import models)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(ranges), mp_context=ctx, initializer=django.setup) as pool:
+        futures = [
+            pool.submit(_ingest_range, kind, ev.pk, str(csv_path), header, a, b, chunk, filter_spec, table)
+            for a, b in ranges
+        ]
+        counts, error = [], None
+        for fut in futures:
+            try:
+                saved, skipped = fut.result()
+                counts.append(saved)
+                if row_filter is not None:
+                    row_filter.merge(skipped)
+            except Exception as e:       # เก็บ error แรกไว้ รอช่วงอื่นจบก่อนค่อยเก็บกวาด
+                error = error or e
+    if error is not None:
+        if table is None:
+            model.objects.filter(evidence=ev).delete()
+        raise error
+    return sum(counts)
+
+
+def replace_csv_rows(kind: str, ev: Evidence, csv_path: Path, chunk: int = 1000,
+                     workers: Optional[int] = None, row_filter=None) -> int:
+    """
+    แทนแถวเดิมของ evidence ด้วย CSV ใหม่ (ใช้ใน pipeline) ผ่าน partitions.replacing_rows
+      - ไฟล์เล็ก (< INGEST_PARALLEL_MIN_BYTES) / workers<=1 / ไม่มีตาราง staging: ingest_csv_to_db
+        (ไม่มี staging = ลบ + โหลดใน transaction เดียว ล้มแล้วแถวเดิมยังอยู่ — process ลูกเข้า transaction นี้ไม่ได้)
+      - ไฟล์ใหญ่: ingest_csv_parallel ลงตาราง staging
+    """
+    model = CSV_KINDS[kind][0]
+    workers = INGEST_PARALLEL_WORKERS if workers is None else workers
+    if workers <= 1 or Path(csv_path).stat().st_size < INGEST_PARALLEL_MIN_BYTES or not can_stage(model):
+        with replacing_rows(model, ev) as table:
+            return ingest_csv_to_db(kind, ev, csv_path, chunk, row_filter, table)
+    with replacing_rows(model, ev) as table:
+        return ingest_csv_parallel(kind, ev, csv_path, chunk, workers, row_filter, table)
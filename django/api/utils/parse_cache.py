@@ -0,0 +1,313 @@
+# django/api/utils/parse_cache.py
+"""
+cache ผล parse แบบ content-addressed (MEDIA_ROOT/parse_cache/<key>/)
+  key = sha256(kind + sha256 ของ artifact + digest ของ parser image)
+    - $MFT / Amcache.hve: sha256 ของไฟล์
+    - winevt/Logs: sha256 ของ (path, size, sha256) ทุกไฟล์ในโฟลเดอร์ เรียงตามชื่อ
+  - hit: hardlink (ไม่ได้ก็ copy) CSV จาก cache เข้า parsed/<evidence_id>/ ไม่ต้อง docker run
+         ไฟล์ใน cache กับ parsed/ ของหลาย evidence เป็น inode เดียวกัน → ก่อนรัน parser ทุกครั้ง
+         clear_outputs ลบผลเดิมทิ้งก่อน (parser เขียนทับ in place = แก้ไฟล์ใน cache / evidence อื่นไปด้วย)
+         ถ้า evidence ที่เคย ingest จาก entry นี้ยังเป็นผลของ parse รอบนั้น (DONE, data_version เดิม, แถวครบ)
+         → clone แถวใน DB (INSERT ... SELECT) แทนการอ่าน CSV ใหม่
+  - miss: parse ตามปกติ แล้วเก็บ CSV เข้า cache (เขียนลง tmp แล้ว rename → atomic)
+  - LRU: ใช้ mtime ของ manifest.json เป็นเวลาใช้งานล่าสุด; เกิน PARSE_CACHE_MAX_BYTES
+    หรือดิสก์ว่างเหลือน้อยกว่า PARSE_CACHE_MIN_FREE_BYTES → ลบ entry ที่เก่าสุดก่อน
+    นับเฉพาะไฟล์ที่ cache ถือไว้คนเดียว (st_nlink == 1) — ไฟล์ที่ยัง link อยู่ใน parsed/ ลบไปก็ไม่ได้ที่คืน
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from ..models import Evidence
+from .partitions import derived, ensure_partition, replacing_rows
+
+
+PARSE_CACHE_ENABLED = bool(getattr(settings, "PARSE_CACHE_ENABLED", True))
+PARSE_CACHE_MAX_BYTES = int(getattr(settings, "PARSE_CACHE_MAX_BYTES", 20 * 1024 ** 3))
+PARSE_CACHE_MIN_FREE_BYTES = int(getattr(settings, "PARSE_CACHE_MIN_FREE_BYTES", 2 * 1024 ** 3))
+
+# ไฟล์ผลลัพธ์ของ parse.sh แต่ละ kind (glob ใต้ parsed/<id>/)
+OUTPUT_PATTERNS = {
+    "mft": ("mft.csv", "mft_FileListing.csv"),
+    "amcache": ("amcache*.csv",),
+    "evtx-dir": ("evtx_all.csv", "evtxecmd.log"),
+}
+
+_MANIFEST = "manifest.json"
+
+
+def cache_root() -> Path:
+    return Path(settings.MEDIA_ROOT) / "parse_cache"
+
+
+# ===== hashing =====
+
+def _sha256_file(path: Path, h=None) -> str:
+    h = h or hashlib.sha256()
+    with open(path, "rb") as f:
+        for blk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(blk)
+    return h.hexdigest()
+
+
+def artifact_digest(path: Path) -> str:
+    """sha256 ของไฟล์ หรือของทั้งโฟลเดอร์ (ชื่อ + ขนาด + เนื้อหา ทุกไฟล์ เรียงตาม path)"""
+    path = Path(path)
+    if path.is_file():
+        return _sha256_file(path)
+    outer = hashlib.sha256()
+    files = sorted(p for p in path.rglob("*") if p.is_file())
+    for p in files:
+        rel = p.relative_to(path).as_posix()
+        outer.update(f"{rel}\0{p.stat().st_size}\0{_sha256_file(p)}\n".encode())
+    return outer.hexdigest()
+
+
+def image_digest_from_inspect(out: str) -> Optional[str]:
+    """ดึง Id จากผล `docker image inspect` (JSON list) — ไม่ได้ = ไม่ใช้ cache"""
+    try:
+        data = json.loads(out)
+        return (data[0].get("Id") or None) if data else None
+    except (ValueError, AttributeError, IndexError, TypeError):
+        return None
+
+
+def cache_key(kind: str, artifact_sha256: str, image_digest: str) -> str:
+    return hashlib.sha256(f"{kind}\0{artifact_sha256}\0{image_digest}".encode()).hexdigest()
+
+
+# ===== entries =====
+
+def _entry_dir(key: str) -> Path:
+    return cache_root() / key
+
+
+def _write_manifest(d: Path, manifest: dict) -> None:
+    tmp = d / f".{_MANIFEST}.{uuid.uuid4().hex[:8]}"
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.replace(tmp, d / _MANIFEST)
+
+
+def lookup(key: str) -> Optional[dict]:
+    """คืน manifest ถ้ามีใน cache (และ touch เวลาใช้งานล่าสุดสำหรับ LRU)"""
+    if not PARSE_CACHE_ENABLED:
+        return None
+    mf = _entry_dir(key) / _MANIFEST
+    try:
+        manifest = json.loads(mf.read_text())
+        os.utime(mf)
+    except (OSError, ValueError):
+        return None
+    manifest["key"] = key
+    return manifest
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)                 # ไฟล์เดียวกันบนดิสก์ ไม่กินที่เพิ่ม
+    except OSError:
+        shutil.copy2(src, dst)            # ข้าม filesystem / ไม่รองรับ hardlink
+
+
+def materialize(manifest: dict, dest_dir: Path) -> List[Path]:
+    """
+    วางไฟล์จาก cache ลง dest_dir; คืน list path ที่วาง
+    โยน OSError ถ้า entry ถูก evict ไประหว่างทาง (ให้ผู้เรียกถือเป็น miss)
+    """
+    src_dir = _entry_dir(manifest["key"])
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    placed = []
+    for name in manifest.get("files", []):
+        dst = dest_dir / name
+        _link_or_copy(src_dir / name, dst)
+        placed.append(dst)
+    return placed
+
+
+def clear_outputs(kind: str, parsed_dir: Path, *names: str) -> None:
+    """
+    ลบผล parse เดิมของ kind (+ names) ใน parsed_dir ก่อนรัน parser
+    ไฟล์อาจเป็น hardlink ของ cache entry → unlink แล้ว parser สร้าง inode ใหม่ ไม่เขียนทับของที่แชร์กันอยู่
+    """
+    for pat in OUTPUT_PATTERNS.get(kind, ()) + names:
+        for p in parsed_dir.glob(pat):
+            if p.is_file() or p.is_symlink():
+                p.unlink()
+
+
+def collect_outputs(kind: str, parsed_dir: Path) -> List[Path]:
+    out = []
+    for pat in OUTPUT_PATTERNS.get(kind, ()):
+        out += [p for p in sorted(parsed_dir.glob(pat)) if p.is_file() and p.stat().st_size > 0]
+    return out
+
+
+def store(key: str, kind: str, artifact_sha256: str, image_digest: str, files: Iterable[Path]) -> Optional[dict]:
+    """เก็บผล parse เข้า cache; มีอยู่แล้ว (worker อื่นเก็บไปก่อน) → คืนตัวเดิม"""
+    if not PARSE_CACHE_ENABLED:
+        return None
+    files = list(files)
+    if not files:
+        return None
+    root = cache_root()
+    root.mkdir(parents=True, exist_ok=True)
+    final = _entry_dir(key)
+    if final.exists():
+        return lookup(key)
+
+    tmp = root / f".tmp-{key[:16]}-{uuid.uuid4().hex[:8]}"
+    tmp.mkdir()
+    try:
+        for p in files:
+            _link_or_copy(p, tmp / p.name)
+        manifest = {
+            "kind": kind,
+            "artifact_sha256": artifact_sha256,
+            "image_digest": image_digest,
+            "files": [p.name for p in files],
+            "bytes": sum(p.stat().st_size for p in files),
+            "created": time.time(),
+            "ingested": {},               # model label → {"evidence_id": .., "rows": ..}
+        }
+        _write_manifest(tmp, manifest)
+        os.rename(tmp, final)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return lookup(key)
+    evict()
+    return lookup(key)
+
+
+def _ingested_key(model, variant: str = "") -> str:
+    """key ใน manifest["ingested"]: label ของ model (+ ":variant" ถ้า ingest แบบกรองแถว เช่นโปรไฟล์ EVTX)"""
+    return f"{model._meta.label}:{variant}" if variant else model._meta.label
+
+
+def record_ingest(manifest: dict, model, evidence_id: int, rows: int, data_version: int,
+                  variant: str = "", extra: Optional[dict] = None) -> None:
+    """
+    จำว่า evidence ไหน ingest จาก entry นี้ได้กี่แถว (ใช้ clone ครั้งถัดไป); extra = ข้อมูลเสริมเก็บไว้ด้วย
+    data_version = Evidence.data_version หลัง parse รอบนั้นจบเป็น DONE (เรียกหลังจบรอบเท่านั้น)
+    """
+    d = _entry_dir(manifest["key"])
+    try:
+        current = json.loads((d / _MANIFEST).read_text())
+    except (OSError, ValueError):
+        return
+    current.setdefault("ingested", {})[_ingested_key(model, variant)] = {
+        **(extra or {}), "evidence_id": evidence_id, "rows": rows, "data_version": data_version,
+    }
+    try:
+        _write_manifest(d, current)
+    except OSError:
+        pass
+    manifest["ingested"] = current["ingested"]
+
+
+# ===== DB clone =====
+
+def ingest_record(manifest: Optional[dict], model, variant: str = "") -> Optional[dict]:
+    """record ที่ record_ingest เขียนไว้ ({"evidence_id", "rows", ...extra}) หรือ None"""
+    if not manifest:
+        return None
+    return (manifest.get("ingested") or {}).get(_ingested_key(model, variant))
+
+
+def clone_source(manifest: Optional[dict], model, evidence_id: int, variant: str = "") -> Optional[int]:
+    """
+    evidence id ที่ clone แถวได้ หรือ None — แถวของต้นทางต้องยังเป็นผลของ parse รอบที่ record ไว้:
+      - data_version ยังเท่ากับตอน record (ingest / ล้มเหลว / requeue / แก้แถวภายหลัง → version เพิ่ม)
+      - สถานะ DONE — ยกเว้นต้นทางคือ evidence_id เอง (กำลัง parse ซ้ำ = RUNNING แต่ version ยังไม่ขยับ)
+      - จำนวนแถวตรงกับตอน ingest
+    record แบบเก่าที่ไม่มี data_version → ไม่ clone (ingest จาก CSV แล้ว record ใหม่)
+    """
+    src = ingest_record(manifest, model, variant)
+    if not src or "data_version" not in src:
+        return None
+    state = Evidence.objects.filter(pk=src["evidence_id"]).values_list("parse_status", "data_version").first()
+    if state is None or state[1] != src["data_version"]:
+        return None
+    if src["evidence_id"] != evidence_id and state[0] != Evidence.ParseStatus.DONE:
+        return None
+    n = model.objects.filter(evidence_id=src["evidence_id"]).count()
+    return src["evidence_id"] if n == src["rows"] and n > 0 else None
+
+
+def clone_evidence_rows(model, src_evidence_id: int, ev) -> int:
+    """แทนแถวของ ev ด้วยสำเนาแถวของ src_evidence_id ทั้งชุด ใน DB (INSERT ... SELECT)"""
+    qn = connection.ops.quote_name
+    fields = [f for f in model._meta.concrete_fields
+              if not f.primary_key and not getattr(f, "generated", False)]
+    cols = ", ".join(qn(f.column) for f in fields)
+    select = ", ".join("%s" if f.attname == "evidence_id" else qn(f.column) for f in fields)
+    src = qn(model._meta.db_table)
+    with replacing_rows(model, ev) as table:
+        dst = qn(table) if table else src
+        if table is None:
+            ensure_partition(model, ev.pk)
+        sql = f"INSERT INTO {dst} ({cols}) SELECT {select} FROM {src} WHERE {qn('evidence_id')} = %s"
+        with connection.cursor() as cur:
+            cur.execute(sql, [ev.pk, src_evidence_id])
+            n = cur.rowcount
+        for store in derived(model):
+            store.copy(src_evidence_id, ev.pk, table or "")
+        return n
+
+
+# ===== LRU eviction =====
+
+def _entries() -> List[tuple]:
+    """[(last_used, bytes ที่ได้คืนถ้าลบ, dir)] ของทุก entry — นับเฉพาะไฟล์ที่ไม่มี hardlink อื่น"""
+    out = []
+    root = cache_root()
+    if not root.exists():
+        return out
+    for d in root.iterdir():
+        if not d.is_dir() or d.name.startswith("."):
+            continue
+        try:
+            last_used = (d / _MANIFEST).stat().st_mtime
+            files = (p.stat() for p in d.iterdir() if p.is_file() and p.name != _MANIFEST)
+            size = sum(st.st_size for st in files if st.st_nlink == 1)
+        except OSError:
+            continue
+        out.append((last_used, size, d))
+    return out
+
+
+def evict(max_bytes: int = None, min_free: int = None) -> int:
+    """
+    ลบ entry ที่ใช้ล่าสุดนานที่สุดจนขนาดรวม ≤ max_bytes และดิสก์ว่าง ≥ min_free; คืนจำนวนที่ลบ
+    entry ที่ทุกไฟล์ยัง link อยู่ใน parsed/ ไม่ลบ (ไม่ได้ที่คืน แถมเสีย hit ของ evidence นั้นไปเปล่า ๆ)
+    """
+    max_bytes = PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    min_free = PARSE_CACHE_MIN_FREE_BYTES if min_free is None else min_free
+    entries = sorted(_entries(), key=lambda e: e[0])
+    total = sum(e[1] for e in entries)
+    removed = 0
+
+    def _free() -> int:
+        try:
+            return shutil.disk_usage(settings.MEDIA_ROOT).free
+        except OSError:
+            return min_free
+
+    for _last_used, size, d in entries:
+        if total <= max_bytes and _free() >= min_free:
+            break
+        if not size:
+            continue
+        shutil.rmtree(d, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,307 @@
+# django/api/utils/partitions.py
+"""
+ตาราง artifact (MFTEntry / AmcacheEntry / SecurityEvent) บน PostgreSQL แบ่ง partition แบบ LIST ตาม evidence_id
+  - migration ของ Django สร้างตารางธรรมดา → post_migrate แปลงเป็น partitioned table ครั้งเดียว (ensure_partitioned)
+      PK เป็น (id, evidence_id) (PostgreSQL บังคับ unique ต้องรวม partition key), index / FK เดิมย้ายไปอยู่บน parent
+      แถวที่มีอยู่แล้วย้ายลง partition ของ evidence นั้น ๆ
+  - evidence หนึ่งตัว = partition หนึ่งตาราง: <table>_ev<evidence_id> (สร้างเมื่อมีแถวแรก — ensure_partition)
+  - ingest ใหม่ (replacing_rows): โหลดลงตาราง staging เปล่าที่มี index / FK / CHECK ครบแล้ว
+    → transaction สั้น ๆ: DETACH + DROP partition เดิม แล้ว ATTACH staging แทน (ไม่ต้อง scan / สร้าง index ตอนสลับ)
+    ไม่มี DELETE ทีละแถว ไม่มี dead tuple และระหว่างโหลด query ข้อมูลเดิมได้ตามปกติ
+  - ลบ evidence → DROP partition ก่อน cascade ของ Django (DELETE ที่ตามมาเจอ 0 แถว)
+  - view ที่กรอง evidence=ev อยู่แล้ว (WHERE evidence_id = X) ได้ partition pruning เอง
+  - ข้อมูลที่คำนวณจากแถว (register_derived เช่น aggregates ของ SecurityEvent) ลบ / สลับ / ทิ้งไปพร้อมแถวเสมอ
+DB อื่น (sqlite ตอน dev) / ARTIFACT_PARTITIONING=False / ตารางยังไม่ถูกแปลง → DELETE + INSERT ในตารางเดียวแบบเดิม
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import AmcacheEntry, MFTEntry, SecurityEvent
+
+
+log = logging.getLogger(__name__)
+
+ARTIFACT_PARTITIONING = bool(getattr(settings, "ARTIFACT_PARTITIONING", True))
+
+PARTITIONED_MODELS = (MFTEntry, AmcacheEntry, SecurityEvent)
+
+_partitioned: Set[str] = set()      # ตารางที่รู้แล้วว่าเป็น partitioned (ต่อ process)
+_known_parts: Set[str] = set()      # partition ที่รู้แล้วว่ามีอยู่ (ต่อ process)
+
+# model → store ของข้อมูลที่คำนวณจากแถว; store มี wrap(sink, ev, slot) / clear(ev_id, slot) /
+# promote(ev_id, slot) / copy(src_ev_id, ev_id, slot) — slot = ตารางที่ sink เขียน ("" = ตารางของ model)
+_derived: Dict[type, list] = {}
+
+
+def register_derived(model, store) -> None:
+    if store not in _derived.setdefault(model, []):
+        _derived[model].append(store)
+
+
+def derived(model) -> list:
+    return _derived.get(model, [])
+
+
+def _qn(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def enabled() -> bool:
+    return ARTIFACT_PARTITIONING and connection.vendor == "postgresql"
+
+
+def is_partitioned(model) -> bool:
+    table = model._meta.db_table
+    if table in _partitioned:
+        return True
+    if not enabled():
+        return False
+    with connection.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                    "WHERE c.relname = %s AND pg_table_is_visible(c.oid)", [table])
+        found = cur.fetchone() is not None
+    if found:
+        _partitioned.add(table)
+    return found
+
+
+def partition_name(model, evidence_id: int) -> str:
+    return f"{model._meta.db_table}_ev{int(evidence_id)}"
+
+
+def _exists(cur, name: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cur.fetchone()[0]
+
+
+def ensure_partition(model, evidence_id: int) -> None:
+    """สร้าง partition ของ evidence ถ้ายังไม่มี (ตาราง partitioned ไม่รับแถวที่ไม่มี partition รองรับ)"""
+    if not is_partitioned(model):
+        return
+    name = partition_name(model, evidence_id)
+    if name in _known_parts:
+        return
+    with transaction.atomic(), connection.cursor() as cur:
+        # หลาย thread / process ของ pipeline อาจสร้างพร้อมกัน
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [name])
+        if not _exists(cur, name):
+            cur.execute(f"CREATE TABLE {_qn(name)} PARTITION OF {_qn(model._meta.db_table)} "
+                        f"FOR VALUES IN ({int(evidence_id)})")
+    _known_parts.add(name)
+
+
+def clear_rows(model, ev) -> None:
+    """ลบแถวทั้งหมดของ ev: partitioned → TRUNCATE partition, อื่น ๆ → DELETE"""
+    for store in derived(model):
+        store.clear(ev.pk, "")
+    if is_partitioned(model):
+        ensure_partition(model, ev.pk)
+        with connection.cursor() as cur:
+            cur.execute(f"TRUNCATE {_qn(partition_name(model, ev.pk))}")
+    else:
+        model.objects.filter(evidence=ev).delete()
+
+
+def drop_partitions(evidence_id: int) -> None:
+    """DROP partition ของ evidence ในทุกตาราง artifact (ก่อนลบ evidence)"""
+    for model in PARTITIONED_MODELS:
+        if not is_partitioned(model):
+            continue
+        name = partition_name(model, evidence_id)
+        with connection.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {_qn(name)}")
+        _known_parts.discard(name)
+
+
+# ===== staging → สลับเข้าแทน partition เดิม =====
+
+def _parent_indexes(cur, table: str) -> List[tuple]:
+    """[(ชื่อ, definition, เป็น PK ไหม)] ของ index บนตาราง"""
+    cur.execute("SELECT ic.relname, pg_get_indexdef(i.indexrelid), i.indisprimary "
+                "FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid "
+                "WHERE i.indrelid = %s::regclass ORDER BY ic.relname", [table])
+    return cur.fetchall()
+
+
+def _foreign_keys(cur, table: str) -> List[tuple]:
+    cur.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f' ORDER BY conname", [table])
+    return cur.fetchall()
+
+
+def _create_staging(model, evidence_id: int) -> str:
+    """ตารางเปล่าหน้าตาเดียวกับ partition: คอลัมน์ / default (id ใช้ sequence ของ parent) / CHECK / index / FK"""
+    table = model._meta.db_table
+    tag = uuid.uuid4().hex[:8]
+    stg = f"{partition_name(model, evidence_id)}_{tag}"
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"CREATE TABLE {_qn(stg)} (LIKE {_qn(table)} INCLUDING DEFAULTS INCLUDING GENERATED "
+                    f"INCLUDING STORAGE)")
+        pk = model._meta.pk.column
+        cur.execute("SELECT pg_get_serial_sequence(%s, %s)", [table, pk])
+        seq = cur.fetchone()[0]
+        if seq:
+            cur.execute(f"ALTER TABLE {_qn(stg)} ALTER COLUMN {_qn(pk)} SET DEFAULT nextval(%s::regclass)", [seq])
+        # CHECK ตรงกับขอบเขตของ partition → ATTACH ไม่ต้อง scan ตรวจแถว
+        cur.execute(f"ALTER TABLE {_qn(stg)} ADD CONSTRAINT {_qn(stg + '_ev')} "
+                    f"CHECK (evidence_id IS NOT NULL AND evidence_id = {int(evidence_id)})")
+    return stg
+
+
+def _finish_staging(model, stg: str) -> None:
+    """
+    หลังโหลดเสร็จ: สร้าง index ให้ตรงกับของ parent + FK (ตอน ATTACH จะผูกของที่มีอยู่ ไม่สร้างใหม่) + ANALYZE
+    สร้างหลังโหลด = build ครั้งเดียว เร็วกว่าอัปเดต index ทีละแถวระหว่าง COPY
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cur:
+        for i, (name, definition, primary) in enumerate(_parent_indexes(cur, table)):
+            if primary:
+                cols = definition[definition.index("(") + 1:definition.rindex(")")]
+                cur.execute(f"ALTER TABLE {_qn(stg)} ADD CONSTRAINT {_qn(stg + '_pkey')} PRIMARY KEY ({cols})")
+                continue
+            # "CREATE [UNIQUE] INDEX x ON ONLY public.t USING btree (...)" → ย้ายไปที่ staging
+            using = definition.index(" USING ")
+            unique = "UNIQUE " if definition.startswith("CREATE UNIQUE") else ""
+            cur.execute(f"CREATE {unique}INDEX {_qn(f'{stg}_i{i}')} ON {_qn(stg)}{definition[using:]}")
+        for name, definition in _foreign_keys(cur, table):
+            cur.execute(f"ALTER TABLE {_qn(stg)} ADD CONSTRAINT {_qn(stg + '_fk_' + name[-8:])} {definition}")
+        cur.execute(f"ANALYZE {_qn(stg)}")
+
+
+def _swap_in(model, evidence_id: int, stg: str) -> None:
+    table, part = model._meta.db_table, partition_name(model, evidence_id)
+    with transaction.atomic(), connection.cursor() as cur:
+        if _exists(cur, part):
+            cur.execute(f"ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(part)}")
+            cur.execute(f"DROP TABLE {_qn(part)}")
+        cur.execute(f"ALTER TABLE {_qn(stg)} RENAME TO {_qn(part)}")
+        cur.execute(f"ALTER TABLE {_qn(table)} ATTACH PARTITION {_qn(part)} FOR VALUES IN ({int(evidence_id)})")
+        for store in derived(model):
+            store.promote(evidence_id, stg)
+    _known_parts.add(part)
+
+
+def _drop_staging(model, evidence_id: int, stg: str) -> None:
+    try:
+        with connection.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {_qn(stg)}")
+        for store in derived(model):
+            store.clear(evidence_id, stg)
+    except Exception:                 # connection เสียไปแล้ว ฯลฯ — ตารางค้างลบทีหลังได้ ไม่บัง error เดิม
+        log.exception("cannot drop staging table %s", stg)
+
+
+def can_stage(model) -> bool:
+    """replacing_rows ให้ตาราง staging ได้ไหม (partitioned + COPY) — ทางโหลดหลาย process ต้องมีตารางนี้"""
+    from .pgcopy import copy_supported      # pgcopy import โมดูลนี้ (ensure_partition)
+
+    return is_partitioned(model) and copy_supported()
+
+
+@contextmanager
+def replacing_rows(model, ev) -> Iterator[Optional[str]]:
+    """
+    แทนแถวทั้งหมดของ ev ด้วยแถวที่โหลดใน block; yield ชื่อตารางให้ sink เขียน (None = ตารางของ model)
+      can_stage: ตาราง staging ใหม่ → จบ block ปกติสลับเข้าแทน partition เดิม, error → DROP staging
+      อื่น ๆ:    ลบ + โหลดใน transaction เดียว (error → rollback แถวเดิมยังอยู่ครบ)
+                 process ลูกเขียนลง transaction นี้ไม่ได้ → ทางหลาย process ต้องเช็ค can_stage ก่อน
+    ทาง staging ห้ามเรียกจากใน transaction.atomic() ที่ยังไม่ commit (process ลูกมองไม่เห็นตาราง)
+    """
+    if can_stage(model):
+        stg = _create_staging(model, ev.pk)
+        try:
+            yield stg
+            _finish_staging(model, stg)
+            _swap_in(model, ev.pk, stg)
+        except BaseException:
+            _drop_staging(model, ev.pk, stg)
+            raise
+        return
+
+    with transaction.atomic():
+        clear_rows(model, ev)
+        yield None
+
+
+# ===== แปลงตารางเดิมเป็น partitioned (post_migrate) =====
+
+def _convert(model) -> None:
+    table = model._meta.db_table
+    old = f"{table}__unpartitioned"
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"LOCK TABLE {_qn(table)} IN ACCESS EXCLUSIVE MODE")
+        indexes = _parent_indexes(cur, table)
+        fks = _foreign_keys(cur, table)
+        pk = model._meta.pk.column
+        cur.execute(f"SELECT COALESCE(MAX({_qn(pk)}), 0) FROM {_qn(table)}")
+        next_id = cur.fetchone()[0] + 1
+
+        # ชื่อ index / constraint ต้องว่างก่อนสร้างบนตารางใหม่ → ลบออกจากตารางเดิม (ตารางเดิมทิ้งตอนจบอยู่แล้ว)
+        cur.execute(f"ALTER TABLE {_qn(table)} RENAME TO {_qn(old)}")
+        for name, _def in fks:
+            cur.execute(f"ALTER TABLE {_qn(old)} DROP CONSTRAINT {_qn(name)}")
+        for name, _def, primary in indexes:
+            if primary:
+                cur.execute(f"ALTER TABLE {_qn(old)} DROP CONSTRAINT {_qn(name)}")
+            else:
+                cur.execute(f"DROP INDEX {_qn(name)}")
+
+        cur.execute(f"CREATE TABLE {_qn(table)} (LIKE {_qn(old)} INCLUDING DEFAULTS INCLUDING GENERATED "
+                    f"INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY LIST (evidence_id)")
+        cur.execute(f"ALTER TABLE {_qn(table)} ALTER COLUMN {_qn(pk)} "
+                    f"ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {int(next_id)})")
+        for name, definition, primary in indexes:
+            if primary:
+                cur.execute(f"ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} PRIMARY KEY ({_qn(pk)}, evidence_id)")
+            else:
+                cur.execute(definition)          # definition อ้างชื่อตารางเดิม = ตาราง partitioned ตัวใหม่
+        for name, definition in fks:
+            cur.execute(f"ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} {definition}")
+
+        cur.execute(f"SELECT DISTINCT evidence_id FROM {_qn(old)}")
+        for (evidence_id,) in cur.fetchall():
+            cur.execute(f"CREATE TABLE {_qn(partition_name(model, evidence_id))} PARTITION OF {_qn(table)} "
+                        f"FOR VALUES IN ({int(evidence_id)})")
+        # คอลัมน์ generated (search_vector) คำนวณใหม่เอง ใส่ค่าตรง ๆ ไม่ได้
+        cur.execute("SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 "
+                    "AND NOT attisdropped AND attgenerated = '' ORDER BY attnum", [old])
+        cols = ", ".join(_qn(r[0]) for r in cur.fetchall())
+        cur.execute(f"INSERT INTO {_qn(table)} ({cols}) SELECT {cols} FROM {_qn(old)}")
+        cur.execute(f"DROP TABLE {_qn(old)}")
+    _partitioned.add(table)
+
+
+def ensure_partitioned() -> List[str]:
+    """แปลงตาราง artifact ที่ยังเป็นตารางธรรมดาเป็น partitioned table; คืนชื่อตารางที่แปลง"""
+    if not enabled():
+        return []
+    done = []
+    for model in PARTITIONED_MODELS:
+        if is_partitioned(model):
+            continue
+        try:
+            _convert(model)
+            done.append(model._meta.db_table)
+        except Exception:
+            # แปลงไม่ได้ (เช่น unique index ที่ไม่รวม evidence_id) → rollback ทั้งตาราง ใช้ตารางเดิมต่อไป
+            log.exception("cannot partition %s; keeping the plain table", model._meta.db_table)
+    return done
+
+
+def on_post_migrate(sender, using="default", verbosity=1, **kwargs) -> None:
+    if using != "default":
+        return
+    for table in ensure_partitioned():
+        if verbosity:
+            print(f"  Partitioned {table} by evidence_id")
+
+
+def on_evidence_delete(sender, instance, using="default", **kwargs) -> None:
+    if enabled():
+        drop_partitions(instance.pk)
@@ -0,0 +1,198 @@
+# django/api/utils/pgcopy.py
+"""
+ปลายทางของ ingest (sink): รับ dict ค่าฟิลด์ที่ normalize แล้ว ทีละแถว
+  - CopySink: PostgreSQL → COPY <table> (...) FROM STDIN (text format)
+    ประกอบ buffer แบบ tab-separated ในหน่วยความจำ ไม่สร้าง ORM object เลย
+  - BulkCreateSink: DB อื่น / ปิด COPY → Model(...) + bulk_create แบบเดิม
+ทั้งสองแบบรับ input หน้าตาเดียวกัน (dict ที่ได้จาก _mft_values / _evtx_values ฯลฯ)
+"""
+import io
+import json
+from datetime import datetime
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection, models
+
+
+INGEST_BACKEND = getattr(settings, "INGEST_BACKEND", "auto")   # auto | copy | orm
+
+# escape ตาม COPY text format: \ tab newline CR (NUL ใส่ใน text ของ PG ไม่ได้ ตัดทิ้ง)
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\x00": ""})
+_NULL = "\\N"
+
+
+def _enc_text(v) -> str:
+    if v is None:
+        return _NULL
+    return str(v).translate(_COPY_ESCAPES)
+
+
+def _enc_int(v) -> str:
+    return _NULL if v is None else str(int(v))
+
+
+def _enc_bool(v) -> str:
+    return _NULL if v is None else ("t" if v else "f")
+
+
+def _enc_datetime(v) -> str:
+    if v is None:
+        return _NULL
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return _enc_text(v)
+
+
+def _strip_nul(v):
+    if isinstance(v, str):
+        return v.replace("\x00", "")
+    if isinstance(v, dict):
+        return {_strip_nul(k): _strip_nul(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_strip_nul(x) for x in v]
+    return v
+
+
+def _enc_json(v) -> str:
+    if v is None:
+        return _NULL
+    s = json.dumps(v, ensure_ascii=False)
+    if "\\u0000" in s:
+        # jsonb ไม่รับ \u0000 (ทั้ง chunk fail) → ตัด NUL ออกจากค่าเหมือน text (มีน้อยมาก ไม่เดินทุกแถว)
+        s = json.dumps(_strip_nul(v), ensure_ascii=False)
+    return s.translate(_COPY_ESCAPES)
+
+
+def _encoder_for(field: models.Field) -> Callable[[object], str]:
+    t = field.get_internal_type()
+    if t in ("IntegerField", "BigIntegerField", "SmallIntegerField",
+             "PositiveIntegerField", "PositiveSmallIntegerField", "PositiveBigIntegerField"):
+        return _enc_int
+    if t == "BooleanField":
+        return _enc_bool
+    if t == "DateTimeField":
+        return _enc_datetime
+    if t == "JSONField":
+        return _enc_json
+    return _enc_text
+
+
+def copy_supported() -> bool:
+    if INGEST_BACKEND == "orm":
+        return False
+    return connection.vendor == "postgresql"
+
+
+class BulkCreateSink:
+    """fallback: สร้าง model instance แล้ว bulk_create ทีละ chunk (พฤติกรรมเดิม)"""
+
+    def __init__(self, model, ev, chunk: int = 1000):
+        self.model = model
+        self.ev = ev
+        self.chunk = chunk
+        self.batch = []
+        self.saved = 0
+
+    def add(self, values: dict) -> None:
+        self.batch.append(self.model(evidence=self.ev, **values))
+        if len(self.batch) >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.batch:
+            self.model.objects.bulk_create(self.batch, ignore_conflicts=True, batch_size=self.chunk)
+            self.saved += len(self.batch)
+            self.batch.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+class CopySink:
+    """
+    COPY FROM STDIN ผ่าน psycopg (รองรับทั้ง psycopg2.copy_expert และ psycopg3 cursor.copy)
+    คอลัมน์ = concrete fields ทั้งหมดยกเว้น pk / generated; ฟิลด์ที่ไม่ได้ส่งมาใช้ default ของ model
+    """
+
+    def __init__(self, model, ev, chunk: int = 5000, table: Optional[str] = None):
+        self.model = model
+        self.ev = ev
+        self.chunk = chunk
+        self.table = table or model._meta.db_table
+        self.saved = 0
+        self._pending = 0
+        self._buf = io.StringIO()
+
+        self.fields = [
+            f for f in model._meta.concrete_fields
+            if not f.primary_key and not getattr(f, "generated", False)
+        ]
+        self.columns = [f.column for f in self.fields]
+        self.encoders = [_encoder_for(f) for f in self.fields]
+        self.names = [f.attname for f in self.fields]
+        # ค่า default ของฟิลด์ที่ ingest ไม่ได้ส่งมา (เช่น attributes={}, extra={})
+        self.defaults = {f.attname: f.get_default() for f in self.fields}
+        self.defaults["evidence_id"] = ev.pk
+
+        cols = ", ".join(connection.ops.quote_name(c) for c in self.columns)
+        self.sql = f"COPY {connection.ops.quote_name(self.table)} ({cols}) FROM STDIN"
+
+    def add(self, values: dict) -> None:
+        d = self.defaults
+        line = "\t".join(
+            enc(values[name] if name in values else d[name])
+            for name, enc in zip(self.names, self.encoders)
+        )
+        self._buf.write(line)
+        self._buf.write("\n")
+        self._pending += 1
+        if self._pending >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self._buf.seek(0)
+        with connection.cursor() as cur:
+            raw = cur.cursor
+            if hasattr(raw, "copy_expert"):          # psycopg2
+                raw.copy_expert(self.sql, self._buf, size=1024 * 1024)
+            else:                                     # psycopg3
+                with raw.copy(self.sql) as cp:
+                    cp.write(self._buf.getvalue())
+        self.saved += self._pending
+        self._pending = 0
+        self._buf = io.StringIO()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def make_sink(model, ev, chunk: int = 1000, table: Optional[str] = None):
+    """
+    เลือก sink ตาม DB ที่ใช้อยู่ (PostgreSQL → COPY, อื่น ๆ → bulk_create)
+    table: ตาราง staging จาก partitions.replacing_rows (None = ตารางของ model)
+    """
+    from .partitions import derived, ensure_partition
+    if table is None:
+        ensure_partition(model, ev.pk)     # ตาราง partitioned ต้องมี partition ของ evidence ก่อน INSERT
+    if copy_supported():
+        # COPY ได้ประโยชน์จาก batch ใหญ่กว่า bulk_create มาก
+        sink = CopySink(model, ev, chunk=max(chunk, int(getattr(settings, "INGEST_COPY_CHUNK", 20000))), table=table)
+    else:
+        sink = BulkCreateSink(model, ev, chunk=chunk)
+    # ข้อมูลที่คำนวณจากแถว (เช่น aggregates ของ SecurityEvent) นับไปพร้อมกัน — slot ตามตารางที่เขียน
+    for store in derived(model):
+        sink = store.wrap(sink, ev, table or "")
+    return sink
@@ -0,0 +1,586 @@
+# django/api/utils/pipeline.py
+"""
+ขั้นตอน parse หลักฐานหลังแตก ZIP (เดิมอยู่ใน start_parse_api)
+  - หา $MFT / Amcache.hve / winevt/Logs
+  - รัน parser ผ่าน executor (docker run / docker exec / local) → MEDIA_ROOT/parsed/<id>/*.csv
+    (MFT_BACKEND / EVTX_BACKEND=native: $MFT / winevt/Logs ถอดด้วย reader ในตัว ลง DB ตรง ๆ ไม่มี CSV)
+  - ingest CSV → DB (MFTEntry / AmcacheEntry / SecurityEvent)
+ถูกเรียกจาก worker (api.utils.jobs) แทนการรันใน HTTP request
+"""
+import os
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Tuple, Optional, Set
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from ..models import Evidence
+from .ingest import CSV_KINDS
+from .parallel_ingest import replace_csv_rows
+from .evtx_profiles import build_filter, filter_for_evidence
+from .evtx_fanout import EVTX_FANOUT_BINS, evtx_files, parse_evtxecmd_log, run_evtx_fanout
+from .evtx_native import EVTX_BACKEND, replace_evtx_rows
+from .mft_native import MFT_BACKEND, ingest_mft_file
+from .executors import PARSER_IMAGE, ParserJob, get_executor, run_command
+from .zipindex import has_index, locate_members
+from .parse_cache import (
+    PARSE_CACHE_ENABLED, artifact_digest, cache_key, clear_outputs, clone_evidence_rows, clone_source,
+    collect_outputs, ingest_record, lookup, materialize, record_ingest, store,
+)
+
+
+# ===== Config from ENV / settings =====
+# (docker volume / image / platform อยู่ใน executors; PARSER_IMAGE re-export ให้ views ใช้ตามเดิม)
+
+# จำนวน parser container ที่รันพร้อมกันได้ + timeout ต่อ artifact (วินาที, 0 = ไม่จำกัด)
+PARSER_MAX_PARALLEL = int(getattr(settings, "PARSER_MAX_PARALLEL", 3))
+PARSER_TIMEOUTS = getattr(settings, "PARSER_TIMEOUTS", {"mft": 3600, "amcache": 900, "evtx-dir": 7200})
+# artifact ที่ parse ("mft" / "amcache" / "evtx") — start_extract_api ใช้เลือกไฟล์ที่จะแตกด้วย
+PARSERS_ENABLED = tuple(getattr(settings, "PARSERS_ENABLED", ("mft", "amcache", "evtx")))
+
+
+class ParseError(Exception):
+    """parse ล้มเหลวแบบไปต่อไม่ได้ (ไม่มี docker / ไม่มี image ฯลฯ)"""
+
+    def __init__(self, message: str, log_tail: str = ""):
+        super().__init__(message)
+        self.log_tail = log_tail
+
+
+# ===== Helpers =====
+
+def _find_first_name(root: Path, target_lower: str, skip_dirs: Optional[Set[str]] = None) -> Optional[Path]:
+    """
+    เดินหาไฟล์ชื่อ = target_lower (case-insensitive) ใต้ root (recursive)
+    skip_dirs: โฟลเดอร์ที่ไม่ต้องเดินลงไป (เช่น {'Parsed'})
+    """
+    skip_dirs = skip_dirs or set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        # prune โฟลเดอร์ที่ไม่อยากเดิน
+        dirnames[:] = [d for d in dirnames if d not in skip_dirs]
+        for fn in filenames:
+            if fn.lower() == target_lower:
+                return Path(dirpath) / fn
+    return None
+
+
+def _find_kape_artifacts(extracted_root: Path) -> Tuple[Optional[Path], Optional[Path]]:
+    """
+    หาไฟล์ตามผัง KAPE:
+      - พยายาม KAPE/Triage → Triage → ทั้งโฟลเดอร์
+      - ข้ามโฟลเดอร์ 'Parsed'
+    """
+    mft_path = None
+    amc_path = None
+
+    candidates = [
+        extracted_root / "KAPE" / "Triage",
+        extracted_root / "Triage",
+        extracted_root,  # fallback
+    ]
+    for base in candidates:
+        if base.exists():
+            if not mft_path:
+                mft_path = _find_first_name(base, "$mft", skip_dirs={"Parsed"})
+            if not amc_path:
+                amc_path = _find_first_name(base, "amcache.hve", skip_dirs={"Parsed"})
+    return mft_path, amc_path
+
+
+def _find_winevt_logs_dir(extracted_root: Path) -> Optional[Path]:
+    """
+    พยายามหาโฟลเดอร์ winevt/Logs จากเค้าโครง KAPE/Windows ปกติ
+    ถ้าไม่เจอในตำแหน่งมาตรฐาน จะเดินหา dir ที่ลงท้าย 'winevt/Logs'
+    """
+    candidates = [
+        extracted_root / "KAPE" / "Triage" / "Windows" / "System32" / "winevt" / "Logs",
+        extracted_root / "Triage" / "Windows" / "System32" / "winevt" / "Logs",
+        extracted_root / "Windows" / "System32" / "winevt" / "Logs",
+        extracted_root / "Windows" / "winevt" / "Logs",
+        extracted_root / "System32" / "winevt" / "Logs",
+        extracted_root / "winevt" / "Logs",
+    ]
+    for p in candidates:
+        if p.exists() and p.is_dir():
+            return p
+
+    # fallback เดินหา
+    for dirpath, dirnames, _filenames in os.walk(extracted_root):
+        # speed: prune 'Parsed'
+        if "Parsed" in dirnames:
+            dirnames.remove("Parsed")
+        path = Path(dirpath)
+        parts = [pp.lower() for pp in path.parts[-2:]]  # last 2 parts
+        if len(parts) >= 2 and parts[-2] == "winevt" and parts[-1] == "logs":
+            return path
+    return None
+
+
+def _locate_artifacts(ev: Evidence, extracted_root: Path) -> Tuple[Optional[Path], Optional[Path], Optional[Path]]:
+    """
+    ($MFT, Amcache.hve, winevt/Logs) ใต้ extracted_root
+    มี index ของ ZIP (ZipMember) → ใช้ index ไม่ต้องเดินทั้งต้นไม้; ตัวที่ index บอกแต่ไม่อยู่บนดิสก์
+    หรือ evidence ที่ไม่มี index → เดินหาแบบเดิม
+    """
+    if not has_index(ev):
+        mft_path, amc_path = _find_kape_artifacts(extracted_root)
+        return mft_path, amc_path, _find_winevt_logs_dir(extracted_root)
+
+    located = locate_members(ev)
+
+    def _on_disk(rel: Optional[str]) -> Optional[Path]:
+        p = extracted_root / rel if rel else None
+        return p if p is not None and p.exists() else None
+
+    mft_path, amc_path, evtx_dir = (_on_disk(located[k]) for k in ("mft", "amcache", "evtx"))
+    if (located["mft"] and not mft_path) or (located["amcache"] and not amc_path):
+        walk_mft, walk_amc = _find_kape_artifacts(extracted_root)
+        mft_path, amc_path = mft_path or walk_mft, amc_path or walk_amc
+    if located["evtx"] and not evtx_dir:
+        evtx_dir = _find_winevt_logs_dir(extracted_root)
+    return mft_path, amc_path, evtx_dir
+
+
+def _docker_run(args: list[str], timeout: Optional[float] = None,
+                container_name: Optional[str] = None) -> tuple[int, str]:
+    """
+    รัน docker command และคืน (returncode, combined_output)
+    timeout: วินาที (None/0 = ไม่จำกัด) เกินแล้ว kill และคืน rc=124
+    container_name: ถ้าเป็น 'docker run --name ...' ต้อง rm -f container ด้วย
+                    (kill แค่ docker CLI ตัว container ยังวิ่งต่อ)
+    """
+    def _rm():
+        subprocess.run(["docker", "rm", "-f", container_name],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return run_command(args, timeout=timeout, on_timeout=_rm if container_name else None)
+
+
+def _exists_nonempty(path: Path) -> bool:
+    try:
+        return path.exists() and path.stat().st_size > 0
+    except Exception:
+        return False
+
+
+def set_progress(ev: Evidence, pct: int, message: str) -> None:
+    """
+    อัปเดต parse_progress / parse_message ลง DB ทันที (ให้ UI poll เห็นระหว่างทาง)
+    ใช้ .update() เพื่อไม่ไปทับฟิลด์อื่นที่ยังไม่ได้ save
+    """
+    pct = max(0, min(100, int(pct)))
+    Evidence.objects.filter(pk=ev.pk).update(parse_progress=pct, parse_message=message)
+    ev.parse_progress = pct
+    ev.parse_message = message
+
+
+def evidence_extracted_dir(ev: Evidence) -> Path:
+    return Path(ev.extracted_dir) if getattr(ev, "extracted_dir", None) \
+        else Path(settings.MEDIA_ROOT) / "extracted" / str(ev.id)
+
+
+def _count_rows_if_small(path: Path) -> Optional[int]:
+    try:
+        if path.exists() and path.stat().st_size <= 200 * 1024 * 1024:
+            with open(path, "r", errors="ignore") as r:
+                return max(0, sum(1 for _ in r) - 1)
+    except Exception:
+        pass
+    return None
+
+
+class _StepTracker:
+    """
+    นับ step ที่เสร็จ (parse + ingest ของแต่ละ artifact) แล้วแปลงเป็น % ให้ UI
+    ถูกเรียกจากหลาย thread พร้อมกัน
+    """
+
+    def __init__(self, total_steps: int, progress: Callable[[int, str], None], start: int = 5, end: int = 98):
+        self.total = max(1, total_steps)
+        self.done = 0
+        self.progress = progress
+        self.start = start
+        self.end = end
+        self._lock = threading.Lock()
+
+    def step(self, message: str) -> None:
+        with self._lock:
+            self.done += 1
+            pct = self.start + (self.end - self.start) * self.done // self.total
+            self.progress(pct, message)
+
+
+def _in_own_connection(fn: Callable[[], dict]) -> Callable[[], dict]:
+    """ห่อ task ที่รันใน thread pool: Django เปิด connection แยกต่อ thread ต้องปิดเองเมื่อจบ"""
+    def _wrapped() -> dict:
+        try:
+            return fn()
+        finally:
+            connection.close()
+    return _wrapped
+
+
+# ===== Pipeline =====
+
+def run_parse_pipeline(ev: Evidence, progress: Optional[Callable[[int, str], None]] = None) -> dict:
+    """
+    parse + ingest evidence หนึ่งตัว (blocking, เรียกจาก worker)
+      - MFT / Amcache / EVTX รัน parser container พร้อมกัน (สูงสุด PARSER_MAX_PARALLEL)
+        แต่ละตัวมี timeout ของตัวเอง (PARSER_TIMEOUTS)
+      - artifact ไหน CSV เสร็จก่อน ingest ต่อทันทีใน thread เดียวกัน ไม่ต้องรอตัวที่ช้าสุด
+    คืน dict รูปแบบเดียวกับที่ start_parse_api เคยตอบกลับ
+    โยน ParseError เมื่อเตรียมสภาพแวดล้อมไม่ผ่าน (docker/image/extracted path)
+    """
+    def _progress(pct: int, msg: str):
+        if progress:
+            progress(pct, msg)
+        else:
+            set_progress(ev, pct, msg)
+
+    extracted = evidence_extracted_dir(ev)
+    if not extracted.exists():
+        raise ParseError("extracted path not found")
+
+    parsed_dir = Path(settings.MEDIA_ROOT) / "parsed" / str(ev.id)
+    parsed_dir.mkdir(parents=True, exist_ok=True)
+
+    ev.parse_status = getattr(Evidence.ParseStatus, "RUNNING", "RUNNING")
+    ev.save(update_fields=["parse_status"])
+    _progress(2, "locating artifacts")
+
+    mft_path, amc_path, evtx_dir = _locate_artifacts(ev, extracted)
+    if not (evtx_dir and evtx_dir.exists()):
+        evtx_dir = None
+
+    log_lines: list[str] = []
+    log_lines.append("[django] run_parse_pipeline: begin")
+
+    # executor ของ parser (docker-run / docker-exec / local ตาม PARSER_EXECUTOR) ต้องพร้อม
+    # (ไม่ต้องใช้ถ้าทุก artifact ที่เปิดไว้ถอดด้วย reader ในตัว)
+    native = {k for k, backend in (("mft", MFT_BACKEND), ("evtx", EVTX_BACKEND)) if backend == "native"}
+    executor, image_digest = None, None
+    if not set(PARSERS_ENABLED) <= native:
+        try:
+            executor = get_executor()
+        except ValueError as e:
+            raise ParseError(str(e))
+        ready, why = executor.available()
+        if not ready:
+            raise ParseError(why.splitlines()[0], log_tail=why[-2000:])
+        log_lines.append(f"[django] parser executor: {executor.name}")
+        # digest ของ image (หรือของ tools บนเครื่อง) เป็นส่วนหนึ่งของ cache key (อัปเดต tools แล้ว cache เดิมใช้ไม่ได้)
+        image_digest = executor.identity()
+    log_lines.append(f"[django] MFT backend: {MFT_BACKEND}, EVTX backend: {EVTX_BACKEND}")
+
+    def run_parser(kind: str, in_abs: Path | None, out_csv_name: str) -> tuple[bool, str]:
+        """
+        kind: 'mft' | 'amcache' | 'evtx-dir'
+        in_abs: สำหรับ evtx-dir เป็น 'directory', ที่เหลือเป็นไฟล์
+        """
+        if in_abs is None:
+            return False, "no input"
+
+        timeout = PARSER_TIMEOUTS.get(kind) or None
+        label = f"{ev.id}-{kind}-{uuid.uuid4().hex[:8]}"
+        # ผลเดิมอาจเป็น hardlink ของ parse cache (materialize) → ลบก่อน ไม่ให้ parser truncate inode ที่แชร์กันอยู่
+        clear_outputs(kind, parsed_dir, out_csv_name)
+        # winevt/Logs หลายไฟล์: แบ่ง bin ตามขนาดแล้ว parse ขนานกัน → รวมเป็น CSV / log ชื่อเดิม
+        if kind == "evtx-dir" and EVTX_FANOUT_BINS > 1 and len(evtx_files(in_abs)) > 1:
+            ok, out, commands = run_evtx_fanout(executor, in_abs, parsed_dir, out_csv_name,
+                                                timeout=timeout, label=label)
+            log_lines.append("$ " + "\n$ ".join(commands) + f"\n{out}\n(ok={ok})\n")
+            return ok, out
+
+        job = ParserJob(kind, in_abs, parsed_dir, out_csv_name, timeout=timeout, label=label)
+        res = executor.run(job)
+        log_lines.append(f"$ {' '.join(res.command)}\n{res.output}\n(rc={res.rc}, {res.elapsed:.1f}s)\n")
+        return res.ok, res.output
+
+    def run_parser_cached(kind: str, in_abs: Path | None, out_csv_name: str) -> tuple[bool, Optional[dict]]:
+        """
+        เหมือน run_parser แต่ดู parse cache ก่อน (key = sha256 ของ artifact + digest ของ image)
+        คืน (ok, manifest ของ cache entry หรือ None)
+        """
+        if in_abs is None or not (PARSE_CACHE_ENABLED and image_digest):
+            ok, _ = run_parser(kind, in_abs, out_csv_name)
+            return ok, None
+        try:
+            art_sha = artifact_digest(in_abs)
+            key = cache_key(kind, art_sha, image_digest)
+        except OSError as e:
+            log_lines.append(f"! parse cache: cannot hash {in_abs.name}: {e!r}\n")
+            ok, _ = run_parser(kind, in_abs, out_csv_name)
+            return ok, None
+
+        manifest = lookup(key)
+        if manifest:
+            try:
+                materialize(manifest, parsed_dir)
+                log_lines.append(f"[cache] {kind}: hit {key[:12]} ({', '.join(manifest['files'])})\n")
+                return True, manifest
+            except OSError as e:          # entry ถูก evict ระหว่างทาง → parse ใหม่
+                log_lines.append(f"[cache] {kind}: stale entry {key[:12]}: {e!r}\n")
+
+        ok, _ = run_parser(kind, in_abs, out_csv_name)
+        if not ok:
+            return False, None
+        try:
+            # miss: ส่ง manifest ใหม่กลับไปด้วย เพื่อ record_ingest ไว้ให้ครั้งหน้า clone ได้
+            manifest = store(key, kind, art_sha, image_digest, collect_outputs(kind, parsed_dir))
+        except OSError as e:
+            log_lines.append(f"! parse cache: store failed: {e!r}\n")
+            manifest = None
+        return ok, manifest
+
+    # record_ingest ของ entry ที่ ingest รอบนี้ — เขียนหลังจบรอบเมื่อเป็น DONE แล้วเท่านั้น (พร้อม data_version ใหม่)
+    pending_records: list = []
+
+    def _ingest(kind: str, rel: str, chunk: int, cached: Optional[dict] = None,
+                row_filter=None) -> Optional[int]:
+        model = CSV_KINDS[kind][0]
+        variant = row_filter.variant if row_filter is not None else ""
+        try:
+            # cache hit + evidence ต้นทางยังมีแถวครบ (ingest ด้วยตัวกรองเดียวกัน) → clone ใน DB ไม่ต้องอ่าน CSV
+            src = clone_source(cached, model, ev.pk, variant)
+            if src is not None:
+                if src == ev.pk:
+                    # parse ซ้ำแล้วได้ผลเดิม: แถวของ evidence นี้คือผลของ entry นี้อยู่แล้ว
+                    # (clone จากตัวเองจะลบแถวต้นทางทิ้งก่อน INSERT ... SELECT)
+                    n = model.objects.filter(evidence_id=ev.pk).count()
+                    log_lines.append(f"[cache] {model.__name__}: kept {n} rows (same parse output)\n")
+                    pending_records.append((cached, model, n, variant, ingest_record(cached, model, variant)))
+                else:
+                    n = clone_evidence_rows(model, src, ev)
+                    log_lines.append(f"[cache] {model.__name__}: cloned {n} rows from evidence {src}\n")
+                if row_filter is not None:
+                    row_filter.merge(ingest_record(cached, model, variant).get("skipped") or {})
+                return n
+            # CSV ใหญ่ (≥ INGEST_PARALLEL_MIN_BYTES) แบ่งช่วง byte ลงหลาย process
+            n = replace_csv_rows(kind, ev, Path(settings.MEDIA_ROOT) / rel, chunk=chunk, row_filter=row_filter)
+            if cached:
+                extra = {"skipped": dict(row_filter.skipped)} if row_filter is not None else None
+                pending_records.append((cached, model, n, variant, extra))
+            return n
+        except Exception as _ing_e:
+            log_lines.append(f"ingest error ({model.__name__}): {repr(_ing_e)}")
+            return None
+
+    # ==== task ต่อ artifact: parse → (ถ้าได้ CSV) ingest ทันที ====
+    # แต่ละ task คืน {"rel": ..., "fields": {...ฟิลด์ Evidence}, "summary": {...}, "amcache_all": [...]}
+
+    def mft_task() -> dict:
+        res = {"rel": None, "fields": {}, "summary": {}}
+        ok, cached = run_parser_cached("mft", mft_path, "mft.csv")
+        tracker.step("$MFT parsed")
+        mft_csv_abs = parsed_dir / "mft.csv"
+        mft_listing_abs = parsed_dir / "mft_FileListing.csv"
+        if ok and _exists_nonempty(mft_csv_abs):
+            res["rel"] = f"parsed/{ev.id}/mft.csv"
+            res["fields"]["mft_csv_path"] = res["rel"]
+        if _exists_nonempty(mft_listing_abs):
+            res["summary"]["mft_filelisting"] = f"parsed/{ev.id}/mft_FileListing.csv"
+        if res["rel"]:
+            cnt = _count_rows_if_small(mft_csv_abs)
+            if cnt is not None:
+                res["summary"]["mft_rows"] = cnt
+            inserted = _ingest("mft", res["rel"], 1000, cached)
+            if inserted is not None:
+                res["summary"]["mft_rows_db"] = inserted
+        tracker.step("MFT ingested")
+        return res
+
+    def mft_native_task() -> dict:
+        # MFT_BACKEND=native: ถอด $MFT ตรง ๆ ลง DB (ไม่มี mft.csv / parse cache)
+        res = {"rel": None, "fields": {}, "summary": {"mft_backend": "native"}}
+        tracker.step("$MFT located")
+        try:
+            stats = ingest_mft_file(ev, mft_path)
+        except Exception as _ing_e:
+            log_lines.append(f"ingest error (MFTEntry): {repr(_ing_e)}")
+        else:
+            log_lines.append(f"[native] $MFT: {stats['records']} records, {stats['rows']} rows, "
+                             f"{stats['errors']} error(s), {stats['unresolved']} unresolved parent(s)\n")
+            log_lines.extend(f"! $MFT {s}\n" for s in stats.pop("error_samples"))
+            res["summary"]["mft_rows"] = stats["rows"]
+            res["summary"]["mft_rows_db"] = stats["db"]
+            res["summary"]["mft_native"] = {k: stats[k] for k in ("records", "in_use", "deleted", "errors", "unresolved")}
+            res["ingested"] = True
+        tracker.step("MFT ingested")
+        return res
+
+    def amcache_task() -> dict:
+        res = {"rel": None, "fields": {}, "summary": {}, "amcache_all": []}
+        ok, cached = run_parser_cached("amcache", amc_path, "amcache.csv")
+        tracker.step("Amcache.hve parsed")
+        focus_abs = parsed_dir / "amcache_UnassociatedFileEntries.csv"
+        if _exists_nonempty(focus_abs):
+            res["rel"] = f"parsed/{ev.id}/amcache_UnassociatedFileEntries.csv"
+        else:
+            for p in sorted(parsed_dir.glob("amcache*.csv")):
+                if _exists_nonempty(p):
+                    res["amcache_all"].append(f"parsed/{ev.id}/{p.name}")
+            if res["amcache_all"]:
+                res["rel"] = res["amcache_all"][0]
+                res["summary"]["amcache_csvs"] = res["amcache_all"]
+            else:
+                log_lines.append("! Amcache parsed but no amcache*.csv found\n")
+        if res["rel"]:
+            res["fields"]["amcache_csv_path"] = res["rel"]
+            cnt = _count_rows_if_small(Path(settings.MEDIA_ROOT) / res["rel"])
+            if cnt is not None:
+                res["summary"]["amcache_rows"] = cnt
+            inserted = _ingest("amcache", res["rel"], 1000, cached)
+            if inserted is not None:
+                res["summary"]["amcache_rows_db"] = inserted
+        tracker.step("Amcache ingested")
+        return res
+
+    def evtx_task() -> dict:
+        res = {"rel": None, "fields": {}, "summary": {}}
+        ok, cached = run_parser_cached("evtx-dir", evtx_dir, "evtx_all.csv")
+        tracker.step("EVTX parsed")
+        evtx_csv_abs = parsed_dir / "evtx_all.csv"
+        # จำนวนแถว / error ต่อไฟล์ .evtx จาก evtxecmd.log (ทั้งแบบรันครั้งเดียวและแบบ fan-out)
+        log_abs = parsed_dir / "evtxecmd.log"
+        if log_abs.exists():
+            per_file = parse_evtxecmd_log(log_abs.read_text(encoding="utf-8", errors="ignore"))
+            if per_file:
+                res["summary"]["evtx_files"] = per_file
+                res["summary"]["evtx_parse_errors"] = sum(f["errors"] for f in per_file.values())
+        if ok and _exists_nonempty(evtx_csv_abs):
+            res["rel"] = f"parsed/{ev.id}/evtx_all.csv"
+            res["summary"]["evtx_csv"] = res["rel"]
+            cnt = _count_rows_if_small(evtx_csv_abs)
+            if cnt is not None:
+                res["summary"]["evtx_rows"] = cnt
+            flt = _evtx_filter()
+            inserted = _ingest("evtx", res["rel"], 2000, cached, flt)
+            if inserted is not None:
+                _evtx_ingested(res, flt, inserted)
+        tracker.step("security events ingested")
+        return res
+
+    def evtx_native_task() -> dict:
+        # EVTX_BACKEND=native: ถอด .evtx ตรง ๆ ลง DB ไฟล์ละ process (ไม่มี evtx_all.csv / parse cache)
+        res = {"rel": None, "fields": {}, "summary": {"evtx_backend": "native"}}
+        files = evtx_files(evtx_dir)
+        tracker.step(f"EVTX: {len(files)} file(s)")
+        flt = _evtx_filter()
+        try:
+            per_file = replace_evtx_rows(ev, files, row_filter=flt)
+        except Exception as _ing_e:
+            log_lines.append(f"ingest error (SecurityEvent): {repr(_ing_e)}")
+        else:
+            for name, stats in per_file.items():
+                log_lines.append(f"[native] {name}: {stats['found']} records, {stats['errors']} error(s)\n")
+                log_lines.extend(f"! {s}\n" for s in stats.pop("error_samples"))
+            res["summary"]["evtx_files"] = per_file
+            res["summary"]["evtx_parse_errors"] = sum(f["errors"] for f in per_file.values())
+            res["summary"]["evtx_rows"] = sum(f["rows"] for f in per_file.values())
+            _evtx_ingested(res, flt, sum(f["db"] for f in per_file.values()))
+            res["ingested"] = True
+        tracker.step("security events ingested")
+        return res
+
+    def _evtx_filter():
+        try:
+            return filter_for_evidence(ev)
+        except ValueError as e:
+            # โปรไฟล์ที่บันทึกไว้ถูกลบออกจาก settings ภายหลัง → เก็บทุกแถวแทน
+            log_lines.append(f"! EVTX profile: {e}; ingesting all rows\n")
+            return build_filter("full")
+
+    def _evtx_ingested(res: dict, flt, inserted: int) -> None:
+        res["summary"]["security_events_rows_db"] = inserted
+        res["summary"]["evtx_profile"] = flt.name
+        if not flt.keeps_all:
+            res["summary"]["evtx_skipped"] = dict(flt.skipped)
+            log_lines.append(f"[django] EVTX profile '{flt.name}': kept {inserted}, "
+                             f"skipped {sum(flt.skipped.values())} rows\n")
+
+    tasks: dict[str, Callable[[], dict]] = {}
+    for kind in ("mft", "amcache", "evtx"):
+        if kind not in PARSERS_ENABLED:
+            log_lines.append(f"[django] {kind}: disabled (PARSERS_ENABLED)\n")
+    mft_path = mft_path if "mft" in PARSERS_ENABLED else None
+    amc_path = amc_path if "amcache" in PARSERS_ENABLED else None
+    evtx_dir = evtx_dir if "evtx" in PARSERS_ENABLED else None
+    if mft_path:
+        tasks["mft"] = mft_native_task if MFT_BACKEND == "native" else mft_task
+    else:
+        log_lines.append("! $MFT not found under extracted path\n")
+    if amc_path:
+        tasks["amcache"] = amcache_task
+    else:
+        log_lines.append("! Amcache.hve not found under extracted path\n")
+    if evtx_dir:
+        tasks["evtx"] = evtx_native_task if EVTX_BACKEND == "native" else evtx_task
+    else:
+        log_lines.append("! winevt/Logs directory not found under extracted path\n")
+
+    tracker = _StepTracker(total_steps=2 * len(tasks), progress=_progress)
+    _progress(5, "parsing " + ", ".join(tasks) if tasks else "no artifact found")
+
+    results: dict[str, dict] = {}
+    if tasks:
+        with ThreadPoolExecutor(max_workers=max(1, PARSER_MAX_PARALLEL),
+                                thread_name_prefix=f"parse-ev{ev.id}") as pool:
+            futures = {pool.submit(_in_own_connection(fn)): kind for kind, fn in tasks.items()}
+            for fut in as_completed(futures):
+                kind = futures[fut]
+                res = fut.result()
+                results[kind] = res
+                # รวมผลของ artifact ที่เสร็จแล้วลง evidence ทันที (UI เห็น summary ทีละส่วน)
+                summary = dict(getattr(ev, "summary", {}) or {})
+                summary.update(res["summary"])
+                ev.summary = summary
+                for f, v in res["fields"].items():
+                    setattr(ev, f, v)
+                ev.save(update_fields=["summary", *res["fields"].keys()])
+
+    mft_rel = results.get("mft", {}).get("rel")
+    amcache_focus_rel = results.get("amcache", {}).get("rel")
+    amcache_all_rels = results.get("amcache", {}).get("amcache_all", [])
+    evtx_rel = results.get("evtx", {}).get("rel")
+
+    # ==== อัปเดตสถานะ ====
+    # reader ในตัวไม่มี CSV → นับจากผล ingest แทน
+    produced_any = bool(mft_rel or amcache_focus_rel or evtx_rel
+                        or any(r.get("ingested") for r in results.values()))
+    if produced_any:
+        ev.parse_status = getattr(Evidence.ParseStatus, "DONE", "DONE")
+        ev.parse_message = "parsed"
+        ev.parse_progress = 100
+    else:
+        ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
+        ev.parse_message = "no artifact parsed"
+
+    # เก็บ log
+    if hasattr(ev, "parse_log"):
+        ev.parse_log = (ev.parse_log or "") + "\n".join(log_lines)
+    # แถวเปลี่ยนแล้ว → response ที่ cache ไว้ใช้ไม่ได้ (เพิ่มใน UPDATE เดียวกับสถานะ ไม่มีช่วงที่ DONE แต่ยังเป็น version เก่า)
+    ev.data_version = F("data_version") + 1
+    ev.save()
+    ev.refresh_from_db(fields=["data_version"])
+    if ev.parse_status == getattr(Evidence.ParseStatus, "DONE", "DONE"):
+        for cached, model, n, variant, extra in pending_records:
+            record_ingest(cached, model, ev.pk, n, ev.data_version, variant, extra)
+
+    return {
+        "ok": ev.parse_status == getattr(Evidence.ParseStatus, "DONE", "DONE"),
+        "status": ev.parse_status,
+        "mft_csv": (settings.MEDIA_URL + mft_rel) if mft_rel else None,
+        "amcache_csv": (settings.MEDIA_URL + amcache_focus_rel) if amcache_focus_rel else None,
+        "amcache_all": [settings.MEDIA_URL + x for x in amcache_all_rels] if amcache_all_rels else [],
+        "evtx_csv": (settings.MEDIA_URL + evtx_rel) if evtx_rel else None,
+        "mft_filelisting": (
+            settings.MEDIA_URL + ev.summary.get("mft_filelisting")
+            if getattr(ev, "summary", None) and ev.summary.get("mft_filelisting") else None
+        ),
+        "log_tail": "\n".join(log_lines[-10:]),
+        "summary": ev.summary,
+    }
@@ -0,0 +1,302 @@
+# django/api/utils/respcache.py
+"""
+cache ของ response (JSON) ของ read API ใต้ /api/evidence/<id>/... — สลับ tab / เปลี่ยนหน้ากลับไปมาไม่ต้อง query ใหม่
+  - key = evidence + Evidence.data_version + ชื่อ view + query string ตามที่รับมา
+    (เรียงตามชื่อเท่านั้น ทิ้งแค่พารามิเตอร์กันแคชของ browser "_" — ค่าไม่ strip / ไม่รวมค่าซ้ำ
+     เพราะ view อ่าน request.GET.get() ดิบ: "sort=Size " กับ "sort=Size" หรือ "q=a&q=b" กับ "q=a,b" ได้ผลต่างกัน)
+  - data_version เพิ่มทุกครั้งที่ ingest จบ (สำเร็จ / ล้มเหลว — พร้อมกับสถานะใน UPDATE เดียว, ดู pipeline / jobs)
+    → key เก่าไม่มีใครอ้างถึงอีก ของเก่าจึงไม่มีทางถูกส่งออก แล้วค่อยถูก evict ไปเอง
+    ระหว่าง parse (RUNNING) แถวยังเปลี่ยนอยู่ → ไม่อ่าน / ไม่เขียน cache
+  - backend (RESPONSE_CACHE_BACKEND):
+      lru:    OrderedDict ใน process จำกัดขนาดรวม RESPONSE_CACHE_MAX_BYTES (ใช้น้อยสุดถูกไล่ก่อน)
+      file:   ไฟล์ใต้ RESPONSE_CACHE_DIR ใช้ร่วมกันทุก process บนเครื่อง; mtime = เวลาใช้ล่าสุด,
+              เกิน RESPONSE_CACHE_MAX_BYTES ลบตัวเก่าสุด (เช็กทุก _PRUNE_EVERY ครั้งที่เขียน)
+      django: django.core.cache ตาม alias RESPONSE_CACHE_ALIAS (ตั้ง CACHES เป็น Redis / memcached ได้โดยไม่แก้โค้ด)
+      off:    ไม่ cache
+  - ตัวนับ hit / miss / bypass ต่อ view (ต่อ process) — ดู stats()
+"""
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.http import HttpResponse
+
+from ..models import Evidence
+
+
+RESPONSE_CACHE_BACKEND = str(getattr(settings, "RESPONSE_CACHE_BACKEND", "lru")).lower()
+RESPONSE_CACHE_MAX_BYTES = int(getattr(settings, "RESPONSE_CACHE_MAX_BYTES", 64 * 1024 ** 2))
+RESPONSE_CACHE_SECONDS = int(getattr(settings, "RESPONSE_CACHE_SECONDS", 3600))
+RESPONSE_CACHE_ALIAS = getattr(settings, "RESPONSE_CACHE_ALIAS", "default")
+
+_IGNORED_PARAMS = {"_"}
+_PRUNE_EVERY = 64
+
+Entry = Tuple[str, bytes]              # (content_type, body)
+
+
+# ===== backends =====
+
+class LRUBackend:
+    """cache ใน process จำกัดขนาดรวมของ body (bytes)"""
+    name = "lru"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Entry) -> None:
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._data[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _k, (_ct, body) = self._data.popitem(last=False)
+                self._bytes -= len(body)
+                self.evictions += 1
+
+    def usage(self) -> dict:
+        return {"entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "evictions": self.evictions}
+
+
+class FileBackend:
+    """ไฟล์ละ entry: <dir>/<hash[:2]>/<hash> = content_type + "\\n" + body (เขียน tmp แล้ว rename → atomic)"""
+    name = "file"
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        h = hashlib.sha256(key.encode()).hexdigest()
+        return self.root / h[:2] / h
+
+    def get(self, key: str) -> Optional[Entry]:
+        path = self._path(key)
+        try:
+            raw = path.read_bytes()
+            os.utime(path)                       # ใช้ล่าสุด → อยู่ท้ายคิวของการ evict
+        except OSError:
+            return None
+        content_type, _, body = raw.partition(b"\n")
+        return content_type.decode(), body
+
+    def set(self, key: str, entry: Entry) -> None:
+        path = self._path(key)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(entry[0].encode() + b"\n" + entry[1])
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+        self._writes += 1
+        if self._writes % _PRUNE_EVERY == 0:
+            self.prune()
+
+    def _files(self) -> list:
+        out = []
+        if not self.root.exists():
+            return out
+        for d in self.root.iterdir():
+            if not d.is_dir():
+                continue
+            for p in d.iterdir():
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def prune(self) -> int:
+        """ลบไฟล์ที่ใช้ล่าสุดนานที่สุดจนขนาดรวม ≤ 90% ของ max_bytes; คืนจำนวนที่ลบ"""
+        files = sorted(self._files(), key=lambda f: f[0])
+        total = sum(f[1] for f in files)
+        removed = 0
+        for _mtime, size, p in files:
+            if total <= self.max_bytes * 0.9:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def usage(self) -> dict:
+        files = self._files()
+        return {"entries": len(files), "bytes": sum(f[1] for f in files), "max_bytes": self.max_bytes,
+                "evictions": self.evictions}
+
+
+class DjangoCacheBackend:
+    """django.core.cache (เช่น Redis) — TTL = RESPONSE_CACHE_SECONDS, ขนาดให้ server ของ cache จัดการ"""
+    name = "django"
+
+    def __init__(self, alias: str, timeout: int):
+        self.alias = alias
+        self.timeout = timeout
+
+    def get(self, key: str) -> Optional[Entry]:
+        entry = caches[self.alias].get(_digest(key))
+        return tuple(entry) if entry else None
+
+    def set(self, key: str, entry: Entry) -> None:
+        caches[self.alias].set(_digest(key), entry, self.timeout)
+
+    def usage(self) -> dict:
+        return {"alias": self.alias}
+
+
+def _digest(key: str) -> str:
+    # memcached จำกัดความยาว / ตัวอักษรของ key
+    return "resp:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _make_backend():
+    if RESPONSE_CACHE_BACKEND == "file":
+        root = getattr(settings, "RESPONSE_CACHE_DIR", "") or Path(settings.MEDIA_ROOT) / "response_cache"
+        return FileBackend(root, RESPONSE_CACHE_MAX_BYTES)
+    if RESPONSE_CACHE_BACKEND == "django":
+        return DjangoCacheBackend(RESPONSE_CACHE_ALIAS, RESPONSE_CACHE_SECONDS)
+    if RESPONSE_CACHE_BACKEND == "lru":
+        return LRUBackend(RESPONSE_CACHE_MAX_BYTES)
+    return None
+
+
+BACKEND = _make_backend()
+
+
+# ===== ตัวนับ =====
+
+_counts: Dict[str, Dict[str, int]] = {}
+_counts_lock = threading.Lock()
+
+
+def _count(view: str, what: str) -> None:
+    with _counts_lock:
+        c = _counts.setdefault(view, {"hit": 0, "miss": 0, "bypass": 0})
+        c[what] += 1
+
+
+def _rate(c: dict) -> Optional[float]:
+    looked = c["hit"] + c["miss"]
+    return round(c["hit"] / looked, 4) if looked else None
+
+
+def stats() -> dict:
+    """ตัวนับของ process นี้: รวม + ต่อ view (hit_rate = hit / (hit + miss))"""
+    with _counts_lock:
+        views = {v: {**c, "hit_rate": _rate(c)} for v, c in sorted(_counts.items())}
+    total = {k: sum(c[k] for c in views.values()) for k in ("hit", "miss", "bypass")}
+    return {
+        "backend": BACKEND.name if BACKEND else "off",
+        **total,
+        "hit_rate": _rate(total),
+        "views": views,
+        "usage": BACKEND.usage() if BACKEND else {},
+    }
+
+
+def reset_stats() -> None:
+    with _counts_lock:
+        _counts.clear()
+
+
+# ===== key / version =====
+
+def query_key(query) -> str:
+    """QueryDict → urlencode ของ (ชื่อ, [ค่า...]) เรียงตามชื่อ ค่าตามที่รับมาทุกตัว (ลำดับค่าซ้ำคงไว้ — .get() เอาตัวท้าย)"""
+    return urlencode(sorted((k, v) for k, v in query.lists() if k not in _IGNORED_PARAMS), doseq=True)
+
+
+def cache_key(ev, view: str, params: str = "") -> str:
+    return f"{ev.pk}:{ev.data_version}:{view}:{params}"
+
+
+def bump(evidence_ids: Iterable[int]) -> None:
+    """แถวของ evidence เปลี่ยน (นอก pipeline เช่น management command) → entry เดิมทั้งหมดใช้ไม่ได้อีก"""
+    Evidence.objects.filter(pk__in=list(evidence_ids)).update(data_version=F("data_version") + 1)
+
+
+def _cacheable(ev) -> bool:
+    return BACKEND is not None and ev.parse_status != Evidence.ParseStatus.RUNNING
+
+
+# ===== ใช้งาน =====
+
+def cached_response(view: str) -> Callable:
+    """
+    decorator ของ view (request, ev_id): GET ที่ตอบ 200 เก็บ body ไว้ตาม key ข้างบน
+    response มี header X-Cache: HIT / MISS / BYPASS
+    """
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(request, ev_id, *args, **kwargs):
+            ev = Evidence.objects.filter(pk=ev_id).only("id", "parse_status", "data_version").first()
+            if ev is None or request.method != "GET" or not _cacheable(ev):
+                _count(view, "bypass")
+                resp = fn(request, ev_id, *args, **kwargs)
+                resp["X-Cache"] = "BYPASS"
+                return resp
+
+            key = cache_key(ev, view, query_key(request.GET))
+            hit = BACKEND.get(key)
+            if hit is not None:
+                _count(view, "hit")
+                resp = HttpResponse(hit[1], content_type=hit[0])
+                resp["X-Cache"] = "HIT"
+                return resp
+
+            _count(view, "miss")
+            resp = fn(request, ev_id, *args, **kwargs)
+            if resp.status_code == 200 and not resp.streaming:
+                BACKEND.set(key, (resp["Content-Type"], resp.content))
+            resp["X-Cache"] = "MISS"
+            return resp
+        return wrapper
+    return deco
+
+
+def memo(ev, name: str, compute: Callable[[], bytes]) -> bytes:
+    """ค่าย่อยที่ใช้ร่วมกันหลาย response ของ evidence เดียว (เช่นรายชื่อ publisher) — เก็บเป็น bytes"""
+    if not _cacheable(ev):
+        _count(name, "bypass")
+        return compute()
+    key = cache_key(ev, name)
+    hit = BACKEND.get(key)
+    if hit is not None:
+        _count(name, "hit")
+        return hit[1]
+    _count(name, "miss")
+    value = compute()
+    BACKEND.set(key, ("application/octet-stream", value))
+    return value
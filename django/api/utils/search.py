@@ -0,0 +1,154 @@
+# django/api/utils/search.py
+"""
+ค้นหาแบบ substring (q) ของหน้า result: MFT / Amcache / Security events
+  - icontains ของ Django บน PostgreSQL = UPPER(col) LIKE UPPER('%q%') → index ไหนก็ใช้ไม่ได้ ต้อง scan ทุกแถวของ evidence
+  - ที่นี่ใช้ col ILIKE '%q%' แทน (ผลเหมือนกัน) ซึ่ง GIN index แบบ gin_trgm_ops (pg_trgm) ตอบได้
+    คอลัมน์ที่ OR กันหลายตัว → BitmapOr ของ index แต่ละตัว
+  - index สร้างตอน post_migrate (ensure_search_indexes) บนตาราง parent → มีในทุก partition และ staging ของ partitions.py
+    JSON ใช้ expression index บนค่าที่ดึงออกมา (event_data ->> 'MessageRaw')
+  - DB อื่น / ไม่มี pg_trgm: ใช้ icontains เดิม (ILIKE แบบ scan ช้ากว่า UPPER LIKE)
+q สั้นกว่า 3 ตัวอักษรไม่มี trigram ให้ใช้ → planner กลับไป scan ตามปกติ
+"""
+import logging
+from typing import List, Optional, Sequence, Tuple, Union
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.lookups import IContains
+
+from ..models import AmcacheEntry, MFTEntry, SecurityEvent
+
+
+log = logging.getLogger(__name__)
+
+Term = Union[str, Tuple[str, str]]      # "คอลัมน์" หรือ ("คอลัมน์ JSON", "คีย์")
+
+# คอลัมน์ที่ช่อง q ของแต่ละหน้าค้น (ลำดับ = ลำดับใน OR)
+MFT_SEARCH: Sequence[Term] = ("file_name", "full_path")
+AMCACHE_SEARCH: Sequence[Term] = ("app_name", "version", "publisher", "file_path")
+# __desc ไม่ต้องค้นแยก: ตอน ingest message = __desc อยู่แล้ว (ว่างเฉพาะเมื่อไม่มีคำอธิบาย → message = ของดิบ)
+SECURITY_SEARCH: Sequence[Term] = ("message", ("event_data", "MessageRaw"), "user_name", "computer", "provider")
+
+SEARCH_MODELS = ((MFTEntry, MFT_SEARCH), (AmcacheEntry, AMCACHE_SEARCH), (SecurityEvent, SECURITY_SEARCH))
+
+_trgm: Optional[bool] = None      # มี pg_trgm ไหม (ต่อ process)
+
+
+def trigram_available() -> bool:
+    global _trgm
+    if _trgm is None:
+        _trgm = False
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cur:
+                cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _trgm = cur.fetchone() is not None
+    return _trgm
+
+
+class ILikeContains(IContains):
+    """icontains ที่ PostgreSQL ได้เป็น lhs ILIKE '%q%' (ไม่ครอบ UPPER) → ใช้ trigram index ได้"""
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = compiler.compile(self.lhs)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", (*lhs_params, *rhs_params)
+
+
+def _expr(term: Term):
+    if isinstance(term, tuple):
+        return KeyTextTransform(term[1], term[0])
+    return F(term)
+
+
+def contains_filter(terms: Sequence[Term], q: str, legacy: Optional[bool] = None) -> Q:
+    """
+    เงื่อนไข "q อยู่ในคอลัมน์ใดคอลัมน์หนึ่ง" (ไม่สนตัวพิมพ์)
+    legacy: None = เลือกเอง (ILIKE เมื่อมี pg_trgm), True = icontains แบบเดิม, False = ILIKE (bench_search ใช้เทียบ)
+    """
+    if legacy is None:
+        legacy = not trigram_available()
+    cond = Q()
+    for term in terms:
+        if legacy:
+            lookup = f"{term[0]}__{term[1]}__icontains" if isinstance(term, tuple) else f"{term}__icontains"
+            cond |= Q(**{lookup: q})
+        else:
+            cond |= Q(ILikeContains(_expr(term), q))
+    return cond
+
+
+# ===== trigram index =====
+
+def _index_name(table: str, term: Term) -> str:
+    col = term[1] if isinstance(term, tuple) else term
+    return f"{table}_{col.lower()}_trgm"[:63]
+
+
+def _index_expr(term: Term) -> str:
+    qn = connection.ops.quote_name
+    if isinstance(term, tuple):
+        key = term[1].replace("'", "''")
+        return f"(({qn(term[0])} ->> '{key}'))"
+    return qn(term)
+
+
+def index_statements() -> List[Tuple[str, str]]:
+    """[(ชื่อ index, CREATE INDEX ...)] ของทุกคอลัมน์ใน SEARCH_MODELS"""
+    qn = connection.ops.quote_name
+    out = []
+    for model, terms in SEARCH_MODELS:
+        table = model._meta.db_table
+        for term in terms:
+            name = _index_name(table, term)
+            out.append((name, f"CREATE INDEX IF NOT EXISTS {qn(name)} ON {qn(table)} "
+                              f"USING gin ({_index_expr(term)} gin_trgm_ops)"))
+    return out
+
+
+def _fts_index() -> Tuple[str, str]:
+    """GIN บน SecurityEvent.search_vector (full-text ของ utils/fts.py) — ไม่ต้องใช้ extension"""
+    qn = connection.ops.quote_name
+    table = SecurityEvent._meta.db_table
+    name = f"{table}_search_vector_gin"
+    return name, f"CREATE INDEX IF NOT EXISTS {qn(name)} ON {qn(table)} USING gin ({qn('search_vector')})"
+
+
+def _missing(cur, names: List[str]) -> set:
+    cur.execute("SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)", [names])
+    return set(names) - {r[0] for r in cur.fetchall()}
+
+
+def ensure_search_indexes() -> List[str]:
+    """GIN ของ full-text + CREATE EXTENSION pg_trgm + trigram index ที่ยังไม่มี; คืนชื่อ index ที่สร้างใหม่"""
+    global _trgm
+    if connection.vendor != "postgresql":
+        return []
+    created = []
+    with connection.cursor() as cur:
+        name, sql = _fts_index()
+        if _missing(cur, [name]):
+            cur.execute(sql)
+            created.append(name)
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception:
+            # ไม่มีสิทธิ์สร้าง extension → ค้นได้เหมือนเดิมแค่ไม่มี index
+            log.exception("cannot create extension pg_trgm; substring search stays unindexed")
+            return created
+        _trgm = True
+        statements = index_statements()
+        missing = _missing(cur, [name for name, _ in statements])
+        for name, sql in statements:
+            if name in missing:
+                cur.execute(sql)
+                created.append(name)
+    return created
+
+
+def on_post_migrate(sender, using="default", verbosity=1, **kwargs) -> None:
+    if using != "default":
+        return
+    for name in ensure_search_indexes():
+        if verbosity:
+            print(f"  Created search index {name}")
@@ -1,6 +1,7 @@
 # django/api/utils/security_describer.py
 from __future__ import annotations
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
+import ipaddress
 import json
 
 def _pick(d: Dict[str, Any], *ks, default: str = "") -> str:
@@ -110,3 +111,30 @@ def describe_event(event_id: int, core: Dict[str, Any], ed: Dict[str, Any]) -> T
     if event_id == 4625:
         return describe_4625(ed)
     return describe_generic(core, ed)
+
+def _inet(v: str) -> Optional[str]:
+    """ค่าที่ใส่คอลัมน์ inet ได้ ("-", "LOCAL" ฯลฯ → None; zone ID "fe80::1%11" → "fe80::1" เพราะ inet ไม่รับ)"""
+    v = (v or "").strip().split("%", 1)[0]
+    if v.startswith("::ffff:") and "." in v:
+        v = v[7:]
+    try:
+        return str(ipaddress.ip_address(v))
+    except ValueError:
+        return None
+
+def promoted_columns(ed: Dict[str, Any], norm: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    คอลัมน์จริงของ SecurityEvent ที่หน้า result ใช้ sort / filter / แสดง (แทนการไล่ ed.get() ตอนอ่าน)
+    ใช้ norm ของ describe_event ก่อน แล้ว fallback คีย์ดิบใน event_data ชุดเดียวกับที่ view เคยไล่
+    """
+    # ตัดตาม max_length ของคอลัมน์ (COPY ไม่ตัดให้ ค่ายาวเกินทั้ง chunk จะ fail)
+    return {
+        "src_ip": _inet(norm.get("src_ip") or _ip(ed)),
+        "logon_type": (norm.get("logon_type") or _pick(ed, "LogonType", "Logon_Type"))[:32],
+        "domain": (norm.get("domain") or _pick(ed, "TargetDomainName", "SubjectDomainName", "DomainName"))[:256],
+        "actor": (norm.get("actor") or _pick(ed, "TargetUserName", "SubjectUserName", "AccountName"))[:256],
+        "process": norm.get("process") or _pick(ed, "ProcessName", "NewProcessName", "Image"),
+        "auth_package": (norm.get("auth_package") or _pick(ed, "AuthenticationPackageName", "PackageName"))[:64],
+        "failure_reason": (norm.get("failure_reason") or _pick(ed, "FailureReason", "Status", "SubStatus"))[:256],
+        "command_line": _pick(ed, "CommandLine", "ProcessCommandLine", "CmdLine"),
+    }
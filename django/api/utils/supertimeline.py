@@ -0,0 +1,137 @@
+# django/api/utils/supertimeline.py
+"""
+super-timeline ของ evidence: MFT (MACB สี่เวลา) + Amcache install_date + Security events เรียงตามเวลาเป็นสายเดียว
+  - แต่ละ stream (MFT M / A / C / B, amcache, security) = query เดียวเรียงตาม (เวลา, id) ที่ index
+    (evidence, เวลา, id) ตอบได้ตรง ๆ อ่านผ่าน .iterator() (PostgreSQL = server-side cursor) ทีละ chunk
+    → heapq.merge รวม k stream; หน่วยความจำ = chunk × จำนวน stream ไม่ขึ้นกับขนาด evidence
+  - ลำดับรวม = (เวลา, ลำดับของ stream ใน STREAMS, id) — เวลาเท่ากันตัดสินด้วย stream แล้ว id ลำดับจึงนิ่ง
+  - cursor = ตำแหน่งของแถวสุดท้าย (sign ด้วย SECRET_KEY) → แต่ละ stream seek ต่อจากจุดนั้นเองด้วย row comparison
+    ไม่ผูกกับ source / ช่วงเวลา เปลี่ยน filter แล้วเดินต่อจากเวลาเดิมได้
+แถวที่เวลาเป็น NULL ไม่อยู่ใน timeline
+"""
+import heapq
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import F, Value
+
+from ..models import AmcacheEntry, MFTEntry, SecurityEvent
+from .paging import BadCursor, RowCompare
+
+
+SUPERTIMELINE_CHUNK = int(getattr(settings, "SUPERTIMELINE_CHUNK", 2000))
+
+_CURSOR_SALT = "api.supertimeline.cursor"
+
+COLUMNS = ("Timestamp", "Source", "Type", "Description", "Path", "User", "Computer")
+SOURCES = ("mft", "amcache", "security")
+MACB = "MACB"
+
+# (source, model, ฟิลด์เวลา, Type, คอลัมน์ที่อ่าน) — ลำดับ = ตัวตัดสินเมื่อเวลาเท่ากัน
+STREAMS = (
+    ("mft", MFTEntry, "modified_ts", "M...", ("full_path", "entry_number", "is_directory", "size_bytes")),
+    ("mft", MFTEntry, "accessed_ts", ".A..", ("full_path", "entry_number", "is_directory", "size_bytes")),
+    ("mft", MFTEntry, "mft_changed_ts", "..C.", ("full_path", "entry_number", "is_directory", "size_bytes")),
+    ("mft", MFTEntry, "created_ts", "...B", ("full_path", "entry_number", "is_directory", "size_bytes")),
+    ("amcache", AmcacheEntry, "install_date", "Install", ("app_name", "version", "publisher", "file_path")),
+    ("security", SecurityEvent, "timestamp", "",
+     ("event_id", "channel", "message", "actor", "user_name", "domain", "computer")),
+)
+
+Position = Tuple[datetime, int, int]        # (เวลา, ลำดับ stream, id)
+
+
+# ===== cursor =====
+
+def encode_cursor(pos: Position) -> str:
+    ts, rank, pk = pos
+    return signing.dumps([ts.isoformat(), rank, pk], salt=_CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token: str) -> Position:
+    try:
+        ts, rank, pk = signing.loads(token, salt=_CURSOR_SALT)
+        return datetime.fromisoformat(ts), int(rank), int(pk)
+    except (signing.BadSignature, ValueError, TypeError):
+        raise BadCursor("invalid cursor")
+
+
+# ===== stream =====
+
+def streams(sources: Sequence[str] = SOURCES, macb: str = MACB) -> List[int]:
+    """ลำดับ (rank) ของ stream ที่เลือก; macb = ตัวอักษรของเวลา MFT ที่ต้องการ (เช่น "MB")"""
+    macb = macb.upper()
+    return [rank for rank, (source, _m, _f, kind, _c) in enumerate(STREAMS)
+            if source in sources and (source != "mft" or kind.strip(".") in macb)]
+
+
+def _rows(evidence_id: int, rank: int, start: Optional[datetime], end: Optional[datetime],
+          after: Optional[Position], chunk: int) -> Iterator[tuple]:
+    """แถวของ stream หนึ่งเรียงตาม (เวลา, id) → (เวลา, rank, id, values)"""
+    source, model, field, kind, cols = STREAMS[rank]
+    qs = model.objects.filter(evidence_id=evidence_id, **{f"{field}__isnull": False})
+    if start is not None:
+        qs = qs.filter(**{f"{field}__gte": start})
+    if end is not None:
+        qs = qs.filter(**{f"{field}__lt": end})
+    if after is not None:
+        ts, a_rank, a_pk = after
+        # stream ก่อนหน้า: เวลาต้องมากกว่า, stream หลัง: เวลาเท่ากันได้, stream เดียวกัน: (เวลา, id) มากกว่า
+        if rank < a_rank:
+            qs = qs.filter(**{f"{field}__gt": ts})
+        elif rank > a_rank:
+            qs = qs.filter(**{f"{field}__gte": ts})
+        else:
+            qs = qs.filter(RowCompare((F(field), F("pk")), ">",
+                                      (Value(ts, output_field=model._meta.get_field(field)),
+                                       Value(a_pk, output_field=model._meta.pk))))
+    for values in qs.order_by(field, "pk").values("pk", field, *cols).iterator(chunk_size=chunk):
+        yield values[field], rank, values["pk"], values
+
+
+def merged(evidence_id: int, ranks: Sequence[int], start: Optional[datetime] = None,
+           end: Optional[datetime] = None, after: Optional[Position] = None,
+           chunk: int = SUPERTIMELINE_CHUNK) -> Iterator[tuple]:
+    """k-way merge ของ stream ที่เลือก → (เวลา, rank, id, values) เรียงตามลำดับรวม"""
+    its = [_rows(evidence_id, rank, start, end, after, chunk) for rank in ranks]
+    return heapq.merge(*its, key=lambda item: item[:3])
+
+
+def row(item: tuple) -> dict:
+    """(เวลา, rank, id, values) → แถวของ super-timeline (คอลัมน์ตาม COLUMNS)"""
+    ts, rank, _pk, v = item
+    source, _model, _field, kind, _cols = STREAMS[rank]
+    out = dict.fromkeys(COLUMNS, "")
+    out["Timestamp"] = ts.isoformat()
+    if source == "mft":
+        out.update(Source="MFT", Type=kind, Path=v["full_path"],
+                   Description=f"{'Directory' if v['is_directory'] else 'File'} #{v['entry_number']} "
+                               f"({v['size_bytes']:,} bytes)")
+    elif source == "amcache":
+        out.update(Source="Amcache", Type=kind, Path=v["file_path"] or "",
+                   Description=" ".join(x for x in (v["app_name"], v["version"], v["publisher"] and f"({v['publisher']})")
+                                        if x))
+    else:
+        user = v["actor"] or v["user_name"] or ""
+        out.update(Source=f"EVTX:{v['channel']}" if v["channel"] else "EVTX", Type=str(v["event_id"]),
+                   Description=v["message"] or "", Computer=v["computer"] or "",
+                   User=f"{v['domain']}\\{user}" if v["domain"] and user else user)
+    return out
+
+
+def page(evidence_id: int, ranks: Sequence[int], limit: int, start: Optional[datetime] = None,
+         end: Optional[datetime] = None, cursor: str = "") -> Tuple[List[dict], Optional[str]]:
+    """limit แถวถัดจาก cursor → (rows, next_cursor) — next_cursor = None เมื่อหมดแล้ว"""
+    after = decode_cursor(cursor) if cursor else None
+    items: List[tuple] = []
+    # อ่านเกินหนึ่งแถวไว้ดูว่ายังมีต่อไหม; chunk ไม่เกินที่ต้องใช้ (แต่ละ stream อ่านอย่างมาก limit + 1 แถว)
+    for item in merged(evidence_id, ranks, start, end, after, chunk=min(limit + 1, SUPERTIMELINE_CHUNK)):
+        items.append(item)
+        if len(items) > limit:
+            break
+    more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1][:3]) if more and items else None
+    return [row(i) for i in items], next_cursor
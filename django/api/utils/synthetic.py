@@ -0,0 +1,133 @@
+# django/api/utils/synthetic.py
+"""
+สร้าง CSV สังเคราะห์หน้าตาเหมือนผลของ MFTECmd / EvtxECmd (หัวคอลัมน์ + รูปแบบค่า)
+และแถวสังเคราะห์สำหรับลงตาราง artifact ตรง ๆ (artifact_values)
+ใช้กับ management command ที่วัดความเร็ว (bench_*) — ไม่มีข้อมูลจริงของเคสใด ๆ
+"""
+import csv
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+MFTECMD_HEADER = (
+    "EntryNumber,SequenceNumber,InUse,ParentEntryNumber,ParentSequenceNumber,ParentPath,FileName,"
+    "Extension,FileSize,ReferenceCount,ReparseTarget,IsDirectory,HasAds,IsAds,SI<FN,uSecZeros,Copied,"
+    "SiFlags,NameType,Created0x10,Created0x30,LastModified0x10,LastModified0x30,LastRecordChange0x10,"
+    "LastRecordChange0x30,LastAccess0x10,LastAccess0x30,UpdateSequenceNumber,LogfileSequenceNumber,"
+    "SecurityId,ObjectIdFileDroid,LoggedUtilStream,ZoneIdContents,SourceFile"
+).split(",")
+
+EVTXECMD_HEADER = (
+    "RecordNumber,EventRecordId,TimeCreated,EventId,Level,Provider,Channel,ProcessId,ThreadId,Computer,"
+    "ChunkNumber,UserId,MapDescription,UserName,RemoteHost,PayloadData1,PayloadData2,PayloadData3,"
+    "PayloadData4,PayloadData5,PayloadData6,ExecutableInfo,HiddenRecord,SourceFile,Keywords,"
+    "ExtraDataOffset,Payload"
+).split(",")
+
+_EVENTS = (
+    ("Security", "Microsoft-Windows-Security-Auditing", 4624),
+    ("Security", "Microsoft-Windows-Security-Auditing", 4625),
+    ("Security", "Microsoft-Windows-Security-Auditing", 4688),
+    ("Security", "Microsoft-Windows-Security-Auditing", 4672),
+    ("System", "Service Control Manager", 7045),
+    ("Application", "Application Error", 1000),
+)
+
+
+def _ts(rnd: random.Random) -> str:
+    # รูปแบบเวลาของ EZ Tools: yyyy-MM-dd HH:mm:ss.fffffff
+    return (f"20{rnd.randint(15, 24):02d}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} "
+            f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}."
+            f"{rnd.randint(0, 9999999):07d}")
+
+
+def write_mftecmd_csv(path: Path, rows: int, seed: int = 1) -> Path:
+    rnd = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(MFTECMD_HEADER)
+        for i in range(rows):
+            is_dir = i % 7 == 0
+            name = f"dir{i}" if is_dir else f"file{i}.{rnd.choice(('txt', 'exe', 'dll', 'lnk'))}"
+            parent = rnd.choice((".\\Windows\\System32", ".\\Users\\bob\\AppData\\Local\\Temp",
+                                 ".\\Program Files\\App, \"Beta\"", "."))
+            w.writerow([
+                i, 1, "True", rnd.randint(5, 50000), 1, parent, name,
+                "" if is_dir else name.rsplit(".", 1)[-1], 0 if is_dir else rnd.randint(0, 10 ** 8),
+                1, "", str(is_dir), "False", "False", "False", "False", "False", "Archive", "DosWindows",
+                _ts(rnd), _ts(rnd), _ts(rnd), "", _ts(rnd), "", _ts(rnd) if i % 5 else "", "",
+                rnd.randint(0, 10 ** 9), rnd.randint(0, 10 ** 9), 256, "", "", "", "C:\\$MFT",
+            ])
+    return path
+
+
+def write_evtxecmd_csv(path: Path, rows: int, seed: int = 1) -> Path:
+    rnd = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(EVTXECMD_HEADER)
+        for i in range(rows):
+            channel, provider, eid = rnd.choice(_EVENTS)
+            user = f"user{rnd.randint(0, 20)}"
+            ip = f"10.0.{rnd.randint(0, 3)}.{rnd.randint(1, 254)}" if eid in (4624, 4625) else ""
+            payload = {"EventData": {"Data": [
+                {"@Name": "TargetUserName", "#text": user},
+                {"@Name": "LogonType", "#text": str(rnd.choice((2, 3, 10)))},
+                {"@Name": "IpAddress", "#text": ip or "-"},
+            ]}}
+            w.writerow([
+                i + 1, i + 1, _ts(rnd), eid, "Info", provider, channel, 4, rnd.randint(1, 9000),
+                "WS01.corp.local", i // 100, "S-1-5-18",
+                "Successful logon\nsee payload" if i % 13 == 0 else "Event",
+                f"CORP\\{user}", ip, f"Target: CORP\\{user}", f"LogonType {rnd.choice((2, 3, 10))}",
+                "", "", "", "", "C:\\Windows\\System32\\svchost.exe", "False",
+                "C:\\Windows\\System32\\winevt\\Logs\\Security.evtx", "0x8020000000000000", 0,
+                json.dumps(payload),
+            ])
+    return path
+
+
+# ===== แถวสังเคราะห์สำหรับลงตารางตรง (ผ่าน sink) — ใช้กับ bench_search =====
+
+_WORDS = ("system", "update", "setup", "helper", "agent", "config", "report", "backup", "driver", "service",
+          "client", "viewer", "loader", "policy", "sync", "cache", "launcher", "monitor", "profile", "shell")
+_DIRS = ("Windows\\System32", "Windows\\SysWOW64", "Program Files\\Common Files", "ProgramData\\Microsoft",
+         "Users\\bob\\AppData\\Local\\Temp", "Users\\alice\\Downloads", "Windows\\Temp", "Windows\\WinSxS")
+_PUBLISHERS = ("Microsoft Corporation", "Google LLC", "Adobe Inc.", "Oracle Corporation", "Mozilla", "")
+# ชื่อหายาก (~1 ใน 20,000 แถว) เอาไว้วัดกรณีค้นเจอน้อย
+NEEDLES = ("mimikatz", "psexesvc", "rclone")
+
+
+def _name(rnd: random.Random, i: int) -> str:
+    if i % 20011 == 7:
+        return f"{NEEDLES[i % len(NEEDLES)]}.exe"
+    return f"{rnd.choice(_WORDS)}{rnd.choice(_WORDS)}{rnd.randint(0, 999)}.{rnd.choice(('exe', 'dll', 'sys', 'txt'))}"
+
+
+def artifact_values(kind: str, rows: int, seed: int = 1) -> Iterator[dict]:
+    """dict ค่าฟิลด์ของ MFTEntry ("mft") / AmcacheEntry ("amcache") / SecurityEvent ("evtx") ทีละแถว"""
+    rnd = random.Random(seed)
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for i in range(rows):
+        ts = base + timedelta(seconds=rnd.randint(0, 5 * 365 * 86400))
+        name = _name(rnd, i)
+        path = f".\\{rnd.choice(_DIRS)}\\{rnd.choice(_WORDS)}{rnd.randint(0, 99)}"
+        if kind == "mft":
+            yield {"entry_number": i, "sequence": 1, "is_directory": i % 7 == 0, "file_name": name,
+                   "full_path": f"{path}\\{name}", "size_bytes": rnd.randint(0, 10 ** 8),
+                   "created_ts": ts, "modified_ts": ts, "accessed_ts": ts, "mft_changed_ts": ts}
+        elif kind == "amcache":
+            yield {"app_name": name.rsplit(".", 1)[0], "version": f"{rnd.randint(1, 20)}.{rnd.randint(0, 9)}",
+                   "publisher": rnd.choice(_PUBLISHERS), "install_date": ts,
+                   "file_path": f"C:{path[1:]}\\{name}", "sha1": f"{rnd.getrandbits(160):040x}"}
+        else:
+            channel, provider, eid = rnd.choice(_EVENTS)
+            user = f"user{rnd.randint(0, 200)}"
+            desc = f"Process created: C:{path[1:]}\\{name}" if eid == 4688 else f"Event {eid} for CORP\\{user}"
+            yield {"timestamp": ts, "channel": channel, "provider": provider, "event_id": eid,
+                   "record_id": i + 1, "computer": f"WS{rnd.randint(1, 50):02d}.corp.local",
+                   "user_name": user, "actor": user, "domain": "CORP", "message": desc,
+                   "event_data": {"MessageRaw": f"{desc} ({rnd.getrandbits(32):08x})", "__desc": desc,
+                                  "__norm": {"actor": user}, "TargetUserName": user}}
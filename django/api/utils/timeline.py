@@ -0,0 +1,226 @@
+# django/api/utils/timeline.py
+"""
+timeline ของ evidence: จำนวนเหตุการณ์ต่อช่วงเวลา (UTC) ของ SecurityEvent.timestamp และ MFT created / modified
+  - นับตอน ingest (CountingSink ตัวเดียวกับ aggregates) เป็น bucket รายนาที ต่อ event_id / channel
+    ตอน flush รวมขึ้นเป็นรายชั่วโมง / รายวันแล้ว upsert ทั้งสามระดับ → ซูมจากเดือนลงถึงนาที query แค่ bucket ที่ต้องการ
+    ไม่ต้อง GROUP BY ตารางดิบหลายล้านแถว
+  - วงจรชีวิตตามแถว (partitions.register_derived) แยก store ต่อ model: ลบ / สลับ / clone MFT ไม่แตะของ security
+  - resolution=auto: เลือกระดับที่ละเอียดที่สุดที่จำนวน bucket ในช่วงไม่เกิน TIMELINE_MAX_BUCKETS
+    ระดับวันยังเกินก็รวมหลายวันเป็น bucket เดียว (step)
+  - evidence ที่ ingest ก่อนมีตารางนี้: API สร้างให้ครั้งเดียวจากแถวจริง (rebuild)
+"""
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMinute
+
+from ..models import MFTEntry, SecurityEvent, TimelineBucket
+from .aggregates import CountingSink
+
+
+TIMELINE_MAX_BUCKETS = int(getattr(settings, "TIMELINE_MAX_BUCKETS", 1500))
+
+# source → (model, ฟิลด์เวลา)
+SOURCES = {
+    "security": (SecurityEvent, "timestamp"),
+    "mft_created": (MFTEntry, "created_ts"),
+    "mft_modified": (MFTEntry, "modified_ts"),
+}
+MINUTE, HOUR, DAY = "minute", "hour", "day"
+RESOLUTIONS = {MINUTE: 60, HOUR: 3600, DAY: 86400}      # ละเอียด → หยาบ
+TOTAL = "total"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_CHANNEL_MAX = TimelineBucket._meta.get_field("channel").max_length
+
+Key = Tuple[str, str, datetime, int, str]             # (source, resolution, bucket, event_id, channel)
+
+
+def floor(ts: datetime, resolution: str) -> datetime:
+    """ต้น bucket (UTC) ของ ts; ไม่มี timezone = UTC"""
+    ts = ts.astimezone(timezone.utc) if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+    ts = ts.replace(second=0, microsecond=0)
+    if resolution in (HOUR, DAY):
+        ts = ts.replace(minute=0)
+    if resolution == DAY:
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def iso(ts: datetime) -> str:
+    return f"{ts.astimezone(timezone.utc):%Y-%m-%dT%H:%M:%S}Z"
+
+
+# ===== นับตอน ingest =====
+
+def _security_keys(values: dict) -> Iterable[Key]:
+    yield "security", TOTAL, _EPOCH, 0, ""
+    ts = values.get("timestamp")
+    if isinstance(ts, datetime):
+        yield ("security", MINUTE, floor(ts, MINUTE), int(values.get("event_id") or 0),
+               str(values.get("channel") or "")[:_CHANNEL_MAX])
+
+
+def _mft_keys(values: dict) -> Iterable[Key]:
+    for source in ("mft_created", "mft_modified"):
+        yield source, TOTAL, _EPOCH, 0, ""
+        ts = values.get(SOURCES[source][1])
+        if isinstance(ts, datetime):
+            yield source, MINUTE, floor(ts, MINUTE), 0, ""
+
+
+def _rollup(counts: Dict[Key, int]) -> Counter:
+    """bucket รายนาที → เพิ่มรายชั่วโมง / รายวันของช่วงเดียวกัน"""
+    out: Counter = Counter()
+    for (source, res, bucket, event_id, channel), n in counts.items():
+        out[(source, res, bucket, event_id, channel)] += n
+        if res == MINUTE:
+            out[(source, HOUR, floor(bucket, HOUR), event_id, channel)] += n
+            out[(source, DAY, floor(bucket, DAY), event_id, channel)] += n
+    return out
+
+
+def _upsert(evidence_id: int, slot: str, counts: Dict[Key, int]) -> None:
+    """count += ค่าใหม่ (INSERT ... ON CONFLICT) ของ bucket ทุกระดับ; เรียง key ให้ process ที่ชนกันล็อกลำดับเดียวกัน"""
+    if not counts:
+        return
+    qn = connection.ops.quote_name
+    table = qn(TimelineBucket._meta.db_table)
+    adapt = connection.ops.adapt_datetimefield_value
+    items = sorted(_rollup(counts).items())
+    for i in range(0, len(items), 1000):
+        part = items[i:i + 1000]
+        params: List[object] = []
+        for (source, res, bucket, event_id, channel), n in part:
+            params.extend((evidence_id, slot, source, res, adapt(bucket), event_id, channel, n))
+        rows = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(part))
+        sql = (f"INSERT INTO {table} (evidence_id, slot, source, resolution, bucket, event_id, channel, "
+               f"{qn('count')}) VALUES {rows} "
+               f"ON CONFLICT (evidence_id, slot, source, resolution, bucket, event_id, channel) "
+               f"DO UPDATE SET {qn('count')} = {table}.{qn('count')} + excluded.{qn('count')}")
+        with connection.cursor() as cur:
+            cur.execute(sql, params)
+
+
+# ===== วงจรชีวิตตามแถว (partitions.register_derived) =====
+
+class TimelineStore:
+    """bucket ของ source ที่มาจาก model เดียว (SecurityEvent → security, MFTEntry → mft_created / mft_modified)"""
+
+    def __init__(self, model, keys):
+        self.sources = tuple(s for s, (m, _f) in SOURCES.items() if m is model)
+        self.keys = keys
+
+    def _buckets(self, evidence_id: int):
+        return TimelineBucket.objects.filter(evidence_id=evidence_id, source__in=self.sources)
+
+    def wrap(self, sink, ev, slot: str):
+        return CountingSink(sink, ev, slot, keys=self.keys, upsert=_upsert)
+
+    def clear(self, evidence_id: int, slot: str = "") -> None:
+        self._buckets(evidence_id).filter(slot=slot).delete()
+
+    def promote(self, evidence_id: int, slot: str) -> None:
+        """bucket ของ staging แทนของเดิม (เรียกใน transaction เดียวกับการสลับ partition)"""
+        buckets = self._buckets(evidence_id)
+        buckets.filter(slot="").delete()
+        buckets.filter(slot=slot).update(slot="")
+
+    def copy(self, src_evidence_id: int, evidence_id: int, slot: str) -> None:
+        """clone ของ parse cache: bucket ของ evidence ต้นทาง → evidence ปลายทาง"""
+        for source in self.sources:
+            if not has_timeline(src_evidence_id, source):
+                rebuild(src_evidence_id, source)
+        qn = connection.ops.quote_name
+        table = qn(TimelineBucket._meta.db_table)
+        cols = f"source, resolution, bucket, event_id, channel, {qn('count')}"
+        marks = ", ".join(["%s"] * len(self.sources))
+        with connection.cursor() as cur:
+            cur.execute(f"INSERT INTO {table} (evidence_id, slot, {cols}) SELECT %s, %s, {cols} FROM {table} "
+                        f"WHERE evidence_id = %s AND slot = '' AND source IN ({marks})",
+                        [evidence_id, slot, src_evidence_id, *self.sources])
+
+
+SECURITY_STORE = TimelineStore(SecurityEvent, _security_keys)
+MFT_STORE = TimelineStore(MFTEntry, _mft_keys)
+
+
+# ===== สร้างย้อนหลัง =====
+
+def has_timeline(evidence_id: int, source: str) -> bool:
+    return TimelineBucket.objects.filter(evidence_id=evidence_id, slot="", source=source, resolution=TOTAL).exists()
+
+
+def rebuild(evidence_id: int, source: str, batch: int = 50000) -> int:
+    """สร้าง bucket ของ source จากแถวจริง (GROUP BY นาที) — สำหรับ evidence ที่ ingest ก่อนมีตารางนี้; คืนจำนวนแถว"""
+    model, field = SOURCES[source]
+    rows = model.objects.filter(evidence_id=evidence_id)
+    group = ("event_id", "channel") if source == "security" else ()
+    minutes = (rows.exclude(**{field: None}).annotate(m=TruncMinute(field, tzinfo=timezone.utc))
+               .values("m", *group).annotate(n=Count("id")).order_by().values_list("m", *group, "n"))
+    total = rows.count()
+    with transaction.atomic():
+        TimelineBucket.objects.filter(evidence_id=evidence_id, slot="", source=source).delete()
+        counts: Dict[Key, int] = {(source, TOTAL, _EPOCH, 0, ""): total} if total else {}
+        for m, *rest in minutes.iterator(chunk_size=batch):
+            n = rest.pop()
+            event_id, channel = (int(rest[0] or 0), (rest[1] or "")[:_CHANNEL_MAX]) if rest else (0, "")
+            key = (source, MINUTE, floor(m, MINUTE), event_id, channel)
+            counts[key] = counts.get(key, 0) + n
+            if len(counts) >= batch:
+                _upsert(evidence_id, "", counts)       # ON CONFLICT บวกเพิ่ม → แบ่ง batch ได้
+                counts = {}
+        _upsert(evidence_id, "", counts)
+    return total
+
+
+# ===== อ่าน =====
+
+def extent(evidence_id: int, sources: Sequence[str]) -> Optional[Tuple[datetime, datetime]]:
+    """ช่วงเวลาที่มีข้อมูล [นาทีแรก, นาทีสุดท้าย + 1 นาที) ของ sources; ไม่มี → None"""
+    agg = (TimelineBucket.objects.filter(evidence_id=evidence_id, slot="", source__in=sources, resolution=MINUTE)
+           .aggregate(lo=Min("bucket"), hi=Max("bucket")))
+    if agg["lo"] is None:
+        return None
+    return agg["lo"], agg["hi"] + timedelta(minutes=1)
+
+
+def choose(start: datetime, end: datetime, resolution: Optional[str] = None,
+           max_buckets: int = TIMELINE_MAX_BUCKETS) -> Tuple[str, int]:
+    """
+    (resolution, step เป็นวินาที) ของช่วง [start, end)
+      resolution=None (auto): ระดับที่ละเอียดที่สุดที่จำนวน bucket ≤ max_buckets
+      ระดับที่เลือก / ระดับวันยังเกิน → รวมหลาย bucket เป็นหนึ่ง (step = ขนาด bucket × k)
+    """
+    span = max((end - start).total_seconds(), 1)
+    if resolution is None:
+        resolution = next((r for r, secs in RESOLUTIONS.items() if math.ceil(span / secs) <= max_buckets), DAY)
+    secs = RESOLUTIONS[resolution]
+    return resolution, secs * max(1, math.ceil(span / secs / max_buckets))
+
+
+def series(evidence_id: int, source: str, resolution: str, step: int, start: datetime, end: datetime,
+           event_ids: Sequence[int] = (), channels: Sequence[str] = ()) -> List[dict]:
+    """
+    [{t, count}] ครบทุกช่วง step ใน [start, end) (ช่วงที่ไม่มีเหตุการณ์ = 0)
+    start ต้องเป็นต้น bucket ของ resolution; event_ids / channels กรองเฉพาะ source=security
+    """
+    qs = TimelineBucket.objects.filter(evidence_id=evidence_id, slot="", source=source, resolution=resolution,
+                                       bucket__gte=start, bucket__lt=end)
+    if source == "security":
+        if event_ids:
+            qs = qs.filter(event_id__in=event_ids)
+        if channels:
+            qs = qs.filter(channel__in=channels)
+    n = max(1, math.ceil((end - start).total_seconds() / step))
+    counts = [0] * n
+    for bucket, c in qs.values("bucket").annotate(c=Sum("count")).order_by().values_list("bucket", "c"):
+        i = int((bucket - start).total_seconds() // step)
+        if 0 <= i < n:
+            counts[i] += c
+    return [{"t": iso(start + timedelta(seconds=i * step)), "count": c} for i, c in enumerate(counts)]
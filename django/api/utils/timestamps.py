@@ -0,0 +1,187 @@
+# django/api/utils/timestamps.py
+"""
+ถอด timestamp จาก CSV ของ EZ Tools แบบเร็ว
+  - เดา format จากค่าแรก ๆ ของแต่ละคอลัมน์ แล้วจำ parser ที่ใช้ได้ไว้ (ต่อคอลัมน์)
+    ค่าไหน parser ที่จำไว้อ่านไม่ออก → ไล่เดาใหม่ทั้งชุด (ผลเหมือน _parse_ts_guess เดิม)
+  - fast path สำหรับ yyyy-MM-dd HH:mm:ss.fffffff (เศษวินาที 7 หลัก → ตัดเหลือ microsecond)
+    ด้วยการหั่น string ตรง ๆ ไม่ผ่าน regex / strptime
+  - timezone คำนวณครั้งเดียวต่อ decoder; ถ้าเป็น UTC ใช้ datetime.timezone.utc (fixed offset)
+  - ทำทีละ batch: ไล่ทีละคอลัมน์ใน chunk ของแถว + memo ค่าซ้ำ (MFT มัก 0x10/0x30 เวลาเดียวกัน)
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone, tzinfo
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+Parser = Callable[[str], Optional[datetime]]
+
+_FILETIME_EPOCH = datetime(1601, 1, 1)
+
+# strptime เดิมของ _parse_ts_guess (ใช้เมื่อ ISO อ่านไม่ออก)
+_STRPTIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f",
+)
+
+
+def default_tz() -> Optional[tzinfo]:
+    """tz ที่จะติดให้ค่าที่ไม่มี offset (None = USE_TZ ปิด → naive)"""
+    if not settings.USE_TZ:
+        return None
+    tz = timezone.get_current_timezone()
+    if getattr(tz, "key", None) in ("UTC", "Etc/UTC"):
+        return dt_timezone.utc
+    return tz
+
+
+def _ez_parser(tz: Optional[tzinfo]) -> Parser:
+    """yyyy-MM-dd HH:mm:ss[.f…] (ตัวคั่น ' ' หรือ 'T') เท่านั้น; อย่างอื่นคืน None"""
+
+    def parse(s: str) -> Optional[datetime]:
+        n = len(s)
+        if n < 19 or s[4] != "-" or s[7] != "-" or s[10] not in " T" or s[13] != ":" or s[16] != ":":
+            return None
+        us = 0
+        if n > 19:
+            frac = s[20:]
+            if s[19] != "." or not frac.isdigit():
+                return None
+            us = int(frac[:6].ljust(6, "0"))
+        try:
+            return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                            int(s[11:13]), int(s[14:16]), int(s[17:19]), us, tzinfo=tz)
+        except ValueError:
+            return None
+
+    return parse
+
+
+def _iso_parser(tz: Optional[tzinfo]) -> Parser:
+    def parse(s: str) -> Optional[datetime]:
+        try:
+            dt = parse_datetime(s)
+        except ValueError:        # รูปแบบถูกแต่ค่าผิด เช่น เดือน 13
+            return None
+        if dt is not None and tz is not None and dt.tzinfo is None:
+            dt = dt.replace(tzinfo=tz)
+        return dt
+
+    return parse
+
+
+def _strptime_parser(fmt: str, tz: Optional[tzinfo]) -> Parser:
+    strptime = datetime.strptime
+
+    def parse(s: str) -> Optional[datetime]:
+        try:
+            dt = strptime(s, fmt)
+        except ValueError:
+            return None
+        return dt.replace(tzinfo=tz) if tz is not None else dt
+
+    return parse
+
+
+def candidate_parsers(tz: Optional[tzinfo]) -> Tuple[Tuple[str, Parser], ...]:
+    return (
+        ("ez", _ez_parser(tz)),
+        ("iso", _iso_parser(tz)),
+        *((fmt, _strptime_parser(fmt, tz)) for fmt in _STRPTIME_FORMATS),
+    )
+
+
+class TimestampColumn:
+    """ตัวถอดของคอลัมน์เดียว: จำ parser ที่ชนะล่าสุดไว้ใน self.parser / self.format"""
+
+    def __init__(self, candidates: Sequence[Tuple[str, Parser]]):
+        self.candidates = candidates
+        self.format: Optional[str] = None
+        self.parser: Optional[Parser] = None
+
+    def sniff(self, s: str) -> Optional[datetime]:
+        for name, parse in self.candidates:
+            dt = parse(s)
+            if dt is not None:
+                self.format, self.parser = name, parse
+                return dt
+        return None
+
+    def __call__(self, s: str) -> Optional[datetime]:
+        s = (s or "").strip()
+        if not s:
+            return None
+        if self.parser is not None:
+            dt = self.parser(s)
+            if dt is not None:
+                return dt
+        return self.sniff(s)
+
+
+_MISS = object()
+
+
+class TimestampDecoder:
+    """
+    decoder ต่อไฟล์: fields = ชื่อคีย์ใน dict ที่เป็น timestamp (เช่น "created", "modified")
+    decode(batch) แทนค่า string ใน batch (list ของ dict) ด้วย datetime/None แบบ in-place
+    """
+
+    def __init__(self, fields: Iterable[str], tz: Optional[tzinfo] = _MISS):
+        tz = default_tz() if tz is _MISS else tz
+        candidates = candidate_parsers(tz)
+        self.columns: Dict[str, TimestampColumn] = {f: TimestampColumn(candidates) for f in fields}
+
+    def decode(self, batch: List[dict]) -> List[dict]:
+        memo: Dict[str, Optional[datetime]] = {}
+        for name, col in self.columns.items():
+            for p in batch:
+                s = p[name]
+                if not s:
+                    p[name] = None
+                    continue
+                dt = memo.get(s, _MISS)
+                if dt is _MISS:
+                    dt = memo[s] = col(s)
+                p[name] = dt
+        return batch
+
+    def formats(self) -> Dict[str, Optional[str]]:
+        return {name: col.format for name, col in self.columns.items()}
+
+
+def parse_timestamp(s: str) -> Optional[datetime]:
+    """ถอดค่าเดี่ยว (ไม่มี cache ข้ามค่า) — สำหรับจุดที่ไม่ได้ ingest เป็น batch"""
+    return TimestampColumn(candidate_parsers(default_tz()))(s)
+
+
+def filetime_str(v: int) -> str:
+    """
+    FILETIME (100ns ตั้งแต่ 1601 UTC) → 'yyyy-MM-dd HH:mm:ss.fffffff' แบบเดียวกับ CSV ของ EZ Tools
+    (reader ในตัวส่งเวลาเป็น string รูปเดียวกับ CSV → ถอดด้วย TimestampDecoder ชุดเดียวกัน ได้ tz ตรงกัน)
+    """
+    if not v:
+        return ""
+    try:
+        dt = _FILETIME_EPOCH + timedelta(microseconds=v // 10)
+    except OverflowError:
+        return ""
+    return f"{dt:%Y-%m-%d %H:%M:%S}.{v % 10_000_000:07d}"
+
+
+def filetime_datetime(v: int, tz: Optional[tzinfo]) -> Optional[datetime]:
+    """
+    FILETIME → datetime ตรง ๆ (ผลเท่ากับ filetime_str แล้วถอดด้วย TimestampDecoder: ตัดเหลือ microsecond, ติด tz)
+    tz = default_tz() ที่ผู้เรียกคำนวณไว้ครั้งเดียว
+    """
+    if not v:
+        return None
+    try:
+        dt = _FILETIME_EPOCH + timedelta(microseconds=v // 10)
+    except OverflowError:
+        return None
+    return dt.replace(tzinfo=tz) if tz is not None else dt
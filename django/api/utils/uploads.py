@@ -0,0 +1,256 @@
+# django/api/utils/uploads.py
+"""
+อัปโหลดหลักฐานแบบแบ่งชิ้น + resume ได้
+  - init: จองไฟล์ MEDIA_ROOT/uploads/<id>.part ขนาดเต็ม (sparse) แล้วคืน chunk_size / total_chunks
+  - PUT chunk N: ตรวจ sha256 ของชิ้น (ถ้า client ส่งมา) → os.pwrite ลงตำแหน่ง N*chunk_size ตรง ๆ
+    chunk มาไม่เรียงได้ (client ส่งขนานกันหลายชิ้น)
+  - sha256 ของทั้งไฟล์คำนวณแบบเรียงลำดับไปพร้อมกับการรับ:
+      ชิ้นที่ต่อจากส่วนที่ hash แล้วพอดี → hash จาก bytes ใน request เลย
+      ชิ้นที่มาก่อนลำดับ → พักไว้ในหน่วยความจำ (ไม่เกิน UPLOAD_HASH_BUFFER_BYTES) ไม่งั้นค่อยอ่านคืนจากดิสก์
+    → complete แล้วได้ sha256 ทันที ไม่ต้องอ่านไฟล์ใหม่ทั้งก้อน
+  - สถานะของ sha256 (midstate, utils/sha256state) เก็บในแถว UploadSession.hash_state คู่กับ hashed_upto
+    ต่อภายใต้ row lock → chunk / complete ไปตก worker ไหน (หลาย process / server restart) ก็ hash ต่อจากเดิมได้
+    buffer ของชิ้นที่มาก่อนลำดับอยู่ใน process ที่รับชิ้นนั้น; worker อื่นที่ต้องใช้ชิ้นนั้นอ่านคืนจากดิสก์เฉพาะชิ้นนั้น
+    ไม่มี libcrypto ให้ใช้ (sha256state.AVAILABLE = False) → hash ทั้งไฟล์จากดิสก์ตอน complete ครั้งเดียว
+  - complete: ย้ายไฟล์ (rename) ไป evidence_zips/<evidence_id>.zip ไม่ copy
+"""
+import hashlib
+import os
+import threading
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import UploadSession
+from .sha256state import AVAILABLE as HASH_STATE_SHARED, Sha256
+
+
+UPLOAD_CHUNK_SIZE = int(getattr(settings, "UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+UPLOAD_HASH_BUFFER_BYTES = int(getattr(settings, "UPLOAD_HASH_BUFFER_BYTES", 64 * 1024 * 1024))
+UPLOAD_SESSION_TTL_HOURS = int(getattr(settings, "UPLOAD_SESSION_TTL_HOURS", 72))
+
+
+class UploadError(Exception):
+    """request ของ chunk/complete ใช้ไม่ได้ (ตอบ 400/409 ให้ client)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# ===== running hash ต่อ session (state อยู่ในแถว, buffer อยู่ใน process ที่รับ chunk) =====
+
+class _Pending:
+    """chunk ที่ process นี้รับมาก่อนลำดับ (ใช้ hash ทีหลังแทนการอ่านคืนจากดิสก์)"""
+
+    def __init__(self):
+        self.chunks: Dict[int, bytes] = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def put(self, index: int, data: bytes) -> None:
+        with self.lock:
+            if index not in self.chunks and self.bytes + len(data) <= UPLOAD_HASH_BUFFER_BYTES:
+                self.chunks[index] = data
+                self.bytes += len(data)
+
+    def take(self, index: int) -> Optional[bytes]:
+        with self.lock:
+            buf = self.chunks.pop(index, None)
+            if buf is not None:
+                self.bytes -= len(buf)
+            return buf
+
+    def drop_below(self, upto: int) -> None:
+        # worker อื่น hash ชิ้นเหล่านี้ไปแล้ว
+        with self.lock:
+            for i in [i for i in self.chunks if i < upto]:
+                self.bytes -= len(self.chunks.pop(i))
+
+
+_pending: Dict[str, _Pending] = {}
+_pending_lock = threading.Lock()
+
+
+def _pending_for(session_id) -> _Pending:
+    with _pending_lock:
+        p = _pending.get(str(session_id))
+        if p is None:
+            p = _pending[str(session_id)] = _Pending()
+        return p
+
+
+def _drop_pending(session_id) -> None:
+    with _pending_lock:
+        _pending.pop(str(session_id), None)
+
+
+def _read_chunk(s: UploadSession, index: int) -> bytes:
+    fd = os.open(s.part_abspath, os.O_RDONLY)
+    try:
+        return os.pread(fd, s.chunk_length(index), index * s.chunk_size)
+    finally:
+        os.close(fd)
+
+
+def _resume(s: UploadSession) -> Tuple[Sha256, int]:
+    """(hash, hashed_upto) จากแถว; state หาย / ใช้ไม่ได้ → เริ่มใหม่จาก chunk 0"""
+    if s.hashed_upto and s.hash_state:
+        try:
+            return Sha256(s.hash_state), s.hashed_upto
+        except ValueError:
+            pass
+    return Sha256(), 0
+
+
+def _advance(s: UploadSession, index: Optional[int] = None, data: Optional[bytes] = None) -> Sha256:
+    """
+    รวม chunk ที่ต่อกันได้เข้า sha256 ให้มากที่สุด แล้วเก็บ state + hashed_upto ลงแถว
+    s ต้องเป็นแถวที่ lock ไว้แล้ว (select_for_update ใน transaction ของผู้เรียก) — คืน hash ณ hashed_upto ใหม่
+    data = bytes ของ chunk index ที่เพิ่งเขียน (ใช้แทนการอ่านคืนจากดิสก์)
+    """
+    pending = _pending_for(s.id)
+    h, upto = _resume(s)
+    if data is not None and index is not None and index > upto:
+        pending.put(index, data)
+    received = set(s.received)
+    start = upto
+    while upto in received:
+        buf = data if upto == index and data is not None else pending.take(upto)
+        if buf is None:
+            buf = _read_chunk(s, upto)          # ชิ้นที่ worker อื่นรับ / ล้น buffer → อ่านคืนจากดิสก์
+        h.update(buf)
+        upto += 1
+    pending.drop_below(upto)
+    if upto != start or upto != s.hashed_upto:
+        s.hashed_upto, s.hash_state = upto, h.state()
+        s.save(update_fields=["hashed_upto", "hash_state", "updated_at"])
+    return h
+
+
+# ===== API helpers =====
+
+def cleanup_stale_uploads() -> int:
+    """ลบ session ที่ค้าง UPLOADING นานเกิน TTL (และไฟล์ .part)"""
+    cutoff = timezone.now() - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+    n = 0
+    for s in UploadSession.objects.filter(status=UploadSession.Status.UPLOADING, updated_at__lt=cutoff):
+        abort_upload(s)
+        n += 1
+    return n
+
+
+def init_upload(filename: str, total_size: int, meta: dict, uploaded_by=None,
+                chunk_size: Optional[int] = None) -> UploadSession:
+    if total_size <= 0:
+        raise UploadError("size must be > 0")
+    chunk_size = int(chunk_size or UPLOAD_CHUNK_SIZE)
+    if not (64 * 1024 <= chunk_size <= 64 * 1024 * 1024):
+        raise UploadError("chunk_size out of range")
+    s = UploadSession.objects.create(
+        filename=filename or "evidence.zip",
+        total_size=total_size,
+        chunk_size=chunk_size,
+        total_chunks=(total_size + chunk_size - 1) // chunk_size,
+        meta=meta,
+        uploaded_by=uploaded_by,
+    )
+    part = s.part_abspath
+    part.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o640)
+    try:
+        os.ftruncate(fd, total_size)          # sparse: จองขนาดไว้ เขียนทีหลังตาม offset
+    finally:
+        os.close(fd)
+    return s
+
+
+def status_payload(s: UploadSession) -> dict:
+    return {
+        "upload_id": str(s.id),
+        "filename": s.filename,
+        "size": s.total_size,
+        "chunk_size": s.chunk_size,
+        "total_chunks": s.total_chunks,
+        "received": sorted(s.received),
+        "received_count": len(s.received),
+        "hashed_upto": s.hashed_upto,
+        "status": s.status,
+        "evidence_id": s.evidence_id,
+    }
+
+
+def write_chunk(s: UploadSession, index: int, data: bytes, sha256: str = "") -> UploadSession:
+    """
+    เขียน chunk index ลงตำแหน่งของมัน; chunk ที่เคยรับแล้วไม่เขียนทับ (retry ซ้ำได้ปลอดภัย)
+    สถานะ / received ตรวจหลัง lock แถว session แล้วค่อยเขียนไฟล์: complete / abort / PUT ซ้ำที่มาพร้อมกัน
+    ต้องรอ chunk นี้จบก่อน → ไม่มีการเขียนลงไฟล์ที่ถูกย้ายไปแล้ว และไม่เขียนทับ chunk ที่ hash ไปแล้ว
+    """
+    if not (0 <= index < s.total_chunks):
+        raise UploadError("chunk index out of range")
+    if len(data) != s.chunk_length(index):
+        raise UploadError(f"chunk {index} must be {s.chunk_length(index)} bytes, got {len(data)}")
+    if sha256 and hashlib.sha256(data).hexdigest() != sha256.lower():
+        raise UploadError(f"chunk {index} sha256 mismatch")
+
+    with transaction.atomic():
+        s = UploadSession.objects.select_for_update().get(pk=s.pk)
+        if s.status != UploadSession.Status.UPLOADING:
+            raise UploadError(f"upload is {s.status}", status=409)
+        wrote = index not in s.received
+        if wrote:
+            fd = os.open(s.part_abspath, os.O_WRONLY)
+            try:
+                view, offset = memoryview(data), index * s.chunk_size
+                while view:
+                    n = os.pwrite(fd, view, offset)
+                    view, offset = view[n:], offset + n
+            finally:
+                os.close(fd)
+            s.received.append(index)
+            s.save(update_fields=["received", "updated_at"])
+        if HASH_STATE_SHARED:
+            # ส่ง bytes ให้ hash เฉพาะตอนที่ request นี้เป็นคนเขียนจริง (retry ซ้ำ → ใช้ของบนดิสก์)
+            _advance(s, index, data) if wrote else _advance(s)
+    return s
+
+
+def finish_upload(s: UploadSession) -> str:
+    """ตรวจว่าครบทุก chunk แล้วคืน sha256 ของทั้งไฟล์"""
+    if s.status != UploadSession.Status.UPLOADING:
+        raise UploadError(f"upload is {s.status}", status=409)
+    missing = s.total_chunks - len(set(s.received))
+    if missing:
+        raise UploadError(f"{missing} chunk(s) missing", status=409)
+    if not HASH_STATE_SHARED:
+        h = hashlib.sha256()
+        for i in range(s.total_chunks):
+            h.update(_read_chunk(s, i))
+        return h.hexdigest()
+    with transaction.atomic():
+        s = UploadSession.objects.select_for_update().get(pk=s.pk)
+        h = _advance(s)
+    if s.hashed_upto != s.total_chunks:
+        raise UploadError("hash did not reach the end of file", status=500)
+    _drop_pending(s.id)
+    return h.hexdigest()
+
+
+def move_into_place(s: UploadSession, target_abs: Path) -> None:
+    target_abs.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(s.part_abspath, target_abs)     # MEDIA_ROOT เดียวกัน → rename ไม่ copy
+
+
+def abort_upload(s: UploadSession) -> None:
+    # เปลี่ยนสถานะก่อนลบไฟล์: UPDATE รอ chunk ที่ถือ lock อยู่จบ และ chunk ที่มาทีหลังได้ 409 แทนเปิดไฟล์ไม่เจอ
+    UploadSession.objects.filter(pk=s.pk).update(status=UploadSession.Status.ABORTED)
+    s.status = UploadSession.Status.ABORTED
+    _drop_pending(s.id)
+    try:
+        s.part_abspath.unlink()
+    except FileNotFoundError:
+        pass
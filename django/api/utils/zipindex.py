@@ -0,0 +1,120 @@
+# django/api/utils/zipindex.py
+"""
+index central directory ของ ZIP หลักฐานลงตาราง ZipMember ตอนอัปโหลด
+  - อ่านแค่ central directory ท้ายไฟล์ (zipfile.ZipFile ไม่แตกเนื้อไฟล์) → เร็วแม้ ZIP หลายสิบ GB
+  - หา $MFT / Amcache.hve / winevt/Logs จาก index ด้วยลำดับเดียวกับ pipeline._find_kape_artifacts /
+    _find_winevt_logs_dir (KAPE/Triage → Triage → ทั้ง ZIP, ข้ามโฟลเดอร์ Parsed) แต่ไม่ต้อง os.walk
+  - selective_members(): รายชื่อไฟล์ที่ parser ที่เปิดใช้ต้องใช้ → แตกเฉพาะไฟล์เหล่านี้
+"""
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from ..models import Evidence, ZipMember
+from .extract import is_safe_member
+
+
+_BASES = ("kape/triage/", "triage/", "")       # ลำดับเดียวกับ _find_kape_artifacts
+_SKIP_DIR = "Parsed"
+_WINEVT_CANDIDATES = (                          # ลำดับเดียวกับ _find_winevt_logs_dir
+    "kape/triage/windows/system32/winevt/logs",
+    "triage/windows/system32/winevt/logs",
+    "windows/system32/winevt/logs",
+    "windows/winevt/logs",
+    "system32/winevt/logs",
+    "winevt/logs",
+)
+
+
+def index_zip(ev: Evidence, zip_path: Optional[Path] = None, batch: int = 2000) -> int:
+    """อ่าน central directory แล้วแทนที่ ZipMember ของ evidence; คืนจำนวนไฟล์ (ข้าม dir / path อันตราย)"""
+    zip_path = Path(zip_path) if zip_path else ev.zip_abspath
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        infos = [m for m in zf.infolist() if not m.is_dir() and is_safe_member(m.filename)]
+    objs = [
+        ZipMember(
+            evidence=ev,
+            path=m.filename,
+            name_lower=PurePosixPath(m.filename).name.lower()[:255],
+            size=m.file_size,
+            compressed_size=m.compress_size,
+            crc=m.CRC,
+        )
+        for m in infos
+    ]
+    with transaction.atomic():
+        ZipMember.objects.filter(evidence=ev).delete()
+        ZipMember.objects.bulk_create(objs, batch_size=batch)
+    return len(objs)
+
+
+def has_index(ev: Evidence) -> bool:
+    return ZipMember.objects.filter(evidence=ev).exists()
+
+
+def _skipped(path: str) -> bool:
+    return _SKIP_DIR in PurePosixPath(path).parts[:-1]
+
+
+def _pick_by_base(paths: Iterable[str]) -> Optional[str]:
+    """เลือก path ตามลำดับ _BASES; ในกลุ่มเดียวกันเอาตัวที่ตื้นสุด (แบบ os.walk top-down)"""
+    paths = [p for p in paths if not _skipped(p)]
+    for base in _BASES:
+        group = [p for p in paths if p.lower().startswith(base)]
+        if group:
+            return min(group, key=lambda p: (p.count("/"), p))
+    return None
+
+
+def _find_file(ev: Evidence, name_lower: str) -> Optional[str]:
+    paths = ZipMember.objects.filter(evidence=ev, name_lower=name_lower).values_list("path", flat=True)
+    return _pick_by_base(paths)
+
+
+def _find_winevt_dir(ev: Evidence) -> Optional[str]:
+    dirs = set()
+    qs = ZipMember.objects.filter(evidence=ev, path__icontains="winevt/logs/").values_list("path", flat=True)
+    for p in qs:
+        parent = PurePosixPath(p).parent
+        if [x.lower() for x in parent.parts[-2:]] == ["winevt", "logs"] and not _skipped(p):
+            dirs.add(parent.as_posix())
+    if not dirs:
+        return None
+    by_lower = {d.lower(): d for d in sorted(dirs)}
+    for cand in _WINEVT_CANDIDATES:
+        if cand in by_lower:
+            return by_lower[cand]
+    return min(dirs, key=lambda d: (d.count("/"), d))
+
+
+def locate_members(ev: Evidence) -> Dict[str, Optional[str]]:
+    """path ใน zip ของ artifact แต่ละตัว: {"mft": ..., "amcache": ..., "evtx": <dir>} (None = ไม่มี)"""
+    return {
+        "mft": _find_file(ev, "$mft"),
+        "amcache": _find_file(ev, "amcache.hve"),
+        "evtx": _find_winevt_dir(ev),
+    }
+
+
+def selective_members(ev: Evidence, kinds: Iterable[str],
+                      located: Optional[Dict[str, Optional[str]]] = None) -> List[str]:
+    """
+    รายชื่อไฟล์ใน zip ที่ parser ของ kinds ต้องใช้
+      mft: $MFT | amcache: Amcache.hve + transaction log (.LOG1/.LOG2) ข้างกัน | evtx: ทุกไฟล์ใต้ winevt/Logs
+    """
+    located = located if located is not None else locate_members(ev)
+    kinds = set(kinds)
+    out: List[str] = []
+    members = ZipMember.objects.filter(evidence=ev)
+    if "mft" in kinds and located.get("mft"):
+        out.append(located["mft"])
+    if "amcache" in kinds and located.get("amcache"):
+        hve = PurePosixPath(located["amcache"])
+        siblings = members.filter(name_lower__startswith="amcache.hve").values_list("path", flat=True)
+        out += [p for p in siblings if PurePosixPath(p).parent == hve.parent]
+    if "evtx" in kinds and located.get("evtx"):
+        prefix = located["evtx"] + "/"
+        out += list(members.filter(path__startswith=prefix).values_list("path", flat=True))
+    return sorted(set(out))
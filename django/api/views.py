@@ -1,127 +1,94 @@
-import os
+import json
 import hashlib
 import zipfile
-import subprocess
-import shutil
-import csv
 from pathlib import Path
-from typing import Tuple, Optional, Set
-from datetime import datetime
+from datetime import datetime, timezone
 
 from django.views.decorators.http import require_GET
 import shutil as _shutil
 from django.conf import settings
-from django.db import transaction
-from django.http import JsonResponse, HttpResponseBadRequest, Http404
+from django.db import connection, transaction
+from django.http import JsonResponse, HttpResponseBadRequest, Http404, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_POST, require_http_methods
 from django.db.models import Q, F, Count
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
 
-from .models import Case, Evidence, MFTEntry, AmcacheEntry, SecurityEvent
-from .utils.security_describer import describe_event
-
-
-# ===== Config from ENV / settings =====
-DOCKER_VOLUME_MEDIA = os.environ.get("DOCKER_VOLUME_MEDIA", "media")
-DOCKER_VOLUME_MOUNTPOINT = os.environ.get("DOCKER_VOLUME_MOUNTPOINT", "/mnt/media")
-PARSER_IMAGE = getattr(settings, "PARSER_IMAGE", os.environ.get("PARSER_IMAGE", "ez-parsers:latest"))
-PARSER_PLATFORM = os.environ.get("PARSER_PLATFORM")  # e.g. "linux/amd64" on Mac/ARM
+from .models import Case, Evidence, MFTEntry, AmcacheEntry, SecurityEvent, ParseJob, UploadSession
+from .utils.pipeline import PARSER_IMAGE, PARSERS_ENABLED, _docker_run, evidence_extracted_dir, set_progress
+from .utils.executors import get_executor
+from .utils.evtx_profiles import build_filter
+from .utils.extract import InsufficientSpace, extract_zip
+from .utils.zipindex import has_index, index_zip, locate_members, selective_members
+from .utils import aggregates, respcache, supertimeline, timeline
+from .utils import export
+from .utils.jobs import enqueue_parse_job
+from .utils.paging import TOTAL_MODES, BadCursor, count_rows, ordered, paginate
+from .utils.fts import FTS_MODES, ranked_search
+from .utils.search import AMCACHE_SEARCH, MFT_SEARCH, SECURITY_SEARCH, contains_filter
+from .utils.uploads import (
+    UploadError, abort_upload, cleanup_stale_uploads, finish_upload, init_upload,
+    move_into_place, status_payload, write_chunk,
+)
 
 
 # ===== Helpers =====
 
-def _sha256_of_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+def _upload_form_fields(post) -> dict:
+    """ฟิลด์ฟอร์มของการอัปโหลด (ใช้ร่วมกันทั้งแบบ multipart ก้อนเดียว และแบบ chunked)"""
+    notes = post.get("notes", "")
+    uploaded_by_name = post.get("uploaded_by", "").strip()
+    if uploaded_by_name:
+        notes = (notes + f"\n[UploadedBy:{uploaded_by_name}]").strip()
+    return {
+        "case_id": post.get("case_id") or "",
+        "source_system": post.get("source_system", ""),
+        "acquisition_tool": post.get("acquisition_tool", "KAPE"),
+        "notes": notes,
+    }
 
 
-def _find_first_name(root: Path, target_lower: str, skip_dirs: Optional[Set[str]] = None) -> Optional[Path]:
-    """
-    เดินหาไฟล์ชื่อ = target_lower (case-insensitive) ใต้ root (recursive)
-    skip_dirs: โฟลเดอร์ที่ไม่ต้องเดินลงไป (เช่น {'Parsed'})
-    """
-    skip_dirs = skip_dirs or set()
-    for dirpath, dirnames, filenames in os.walk(root):
-        # prune โฟลเดอร์ที่ไม่อยากเดิน
-        dirnames[:] = [d for d in dirnames if d not in skip_dirs]
-        for fn in filenames:
-            if fn.lower() == target_lower:
-                return Path(dirpath) / fn
-    return None
+def _get_or_create_case(case_id: str) -> Case:
+    """case_id ว่าง → auto-create เคสให้; ไม่เจอ → Case.DoesNotExist"""
+    if case_id:
+        return Case.objects.get(id=case_id)
+    return Case.objects.create(
+        case_number=f"CASE-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+        title="Auto-created Case",
+        description="Created by upload_evidence_api",
+    )
 
 
-def _find_kape_artifacts(extracted_root: Path) -> Tuple[Optional[Path], Optional[Path]]:
-    """
-    หาไฟล์ตามผัง KAPE:
-      - พยายาม KAPE/Triage → Triage → ทั้งโฟลเดอร์
-      - ข้ามโฟลเดอร์ 'Parsed'
-    """
-    mft_path = None
-    amc_path = None
-
-    candidates = [
-        extracted_root / "KAPE" / "Triage",
-        extracted_root / "Triage",
-        extracted_root,  # fallback
-    ]
-    for base in candidates:
-        if base.exists():
-            if not mft_path:
-                mft_path = _find_first_name(base, "$mft", skip_dirs={"Parsed"})
-            if not amc_path:
-                amc_path = _find_first_name(base, "amcache.hve", skip_dirs={"Parsed"})
-    return mft_path, amc_path
-
-
-def _find_winevt_logs_dir(extracted_root: Path) -> Optional[Path]:
-    """
-    พยายามหาโฟลเดอร์ winevt/Logs จากเค้าโครง KAPE/Windows ปกติ
-    ถ้าไม่เจอในตำแหน่งมาตรฐาน จะเดินหา dir ที่ลงท้าย 'winevt/Logs'
-    """
-    candidates = [
-        extracted_root / "KAPE" / "Triage" / "Windows" / "System32" / "winevt" / "Logs",
-        extracted_root / "Triage" / "Windows" / "System32" / "winevt" / "Logs",
-        extracted_root / "Windows" / "System32" / "winevt" / "Logs",
-        extracted_root / "Windows" / "winevt" / "Logs",
-        extracted_root / "System32" / "winevt" / "Logs",
-        extracted_root / "winevt" / "Logs",
-    ]
-    for p in candidates:
-        if p.exists() and p.is_dir():
-            return p
-
-    # fallback เดินหา
-    for dirpath, dirnames, _filenames in os.walk(extracted_root):
-        # speed: prune 'Parsed'
-        if "Parsed" in dirnames:
-            dirnames.remove("Parsed")
-        path = Path(dirpath)
-        parts = [pp.lower() for pp in path.parts[-2:]]  # last 2 parts
-        if len(parts) >= 2 and parts[-2] == "winevt" and parts[-1] == "logs":
-            return path
-    return None
-
-
-def _docker_run(args: list[str]) -> tuple[int, str]:
-    """รัน docker command และคืน (returncode, combined_output)"""
-    proc = subprocess.Popen(
-        args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+def _create_evidence(case: Case, fields: dict, filename: str, size: int, uploaded_by) -> Evidence:
+    return Evidence.objects.create(
+        case=case,
+        original_filename=filename,
+        stored_path="",  # set ทีหลังเมื่อเขียนไฟล์เสร็จ
+        size_bytes=size or 0,
+        source_system=fields["source_system"],
+        acquisition_tool=fields["acquisition_tool"],
+        uploaded_by=uploaded_by,
+        notes=fields["notes"],
+        parse_status=getattr(Evidence.ParseStatus, "PENDING", "PENDING"),
+        parse_message="uploaded",
     )
-    out, _ = proc.communicate()
-    return proc.returncode, out or ""
 
 
-def _exists_nonempty(path: Path) -> bool:
-    try:
-        return path.exists() and path.stat().st_size > 0
-    except Exception:
-        return False
+def _request_user(request):
+    return request.user if getattr(request, "user", None) and request.user.is_authenticated else None
+
+
+def _evidence_upload_payload(ev: Evidence) -> dict:
+    return {
+        "id": str(ev.id),
+        "case_id": str(ev.case_id),
+        "case_number": ev.case.case_number,
+        "original_name": ev.original_filename,
+        "size_bytes": ev.size_bytes,
+        "sha256": ev.sha256,
+        "status": ev.parse_status,  # ให้ frontend ใช้ key เดิมได้
+    }
 
 
 # ===== Views =====
@@ -136,80 +103,173 @@ def upload_evidence_api(request):
       - case_id (optional) ถ้าไม่ส่งมาจะ auto-create เคสให้
       - uploaded_by (text) *ถ้ายังไม่ใช้ auth จะเก็บแนบลงใน notes
       - source_system, acquisition_tool, notes
+    (ไฟล์ใหญ่ให้ใช้ /api/uploads/ แบบ chunked แทน: resume ได้ และไม่ผ่าน temp file)
     """
     f = request.FILES.get("evidence_file")
     if not f:
         return HttpResponseBadRequest("missing file")
 
-    # --- Select/Create Case ---
-    case_id = request.POST.get("case_id")
-    if case_id:
-        try:
-            case = Case.objects.get(id=case_id)
-        except Case.DoesNotExist:
-            return HttpResponseBadRequest("case not found")
-    else:
-        from datetime import datetime
-        case = Case.objects.create(
-            case_number=f"CASE-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
-            title="Auto-created Case",
-            description="Created by upload_evidence_api",
-        )
-
-    source_system = request.POST.get("source_system", "")
-    acquisition_tool = request.POST.get("acquisition_tool", "KAPE")
-    notes = request.POST.get("notes", "")
-    uploaded_by_name = request.POST.get("uploaded_by", "").strip()
-    if uploaded_by_name:
-        notes = (notes + f"\n[UploadedBy:{uploaded_by_name}]").strip()
-
-    uploaded_by_user = (
-        request.user if getattr(request, "user", None) and request.user.is_authenticated else None
-    )
+    fields = _upload_form_fields(request.POST)
+    try:
+        case = _get_or_create_case(fields["case_id"])
+    except Case.DoesNotExist:
+        return HttpResponseBadRequest("case not found")
 
     with transaction.atomic():
-        ev = Evidence.objects.create(
-            case=case,
-            original_filename=getattr(f, "name", "evidence.zip"),
-            stored_path="",  # set ทีหลังเมื่อเขียนไฟล์เสร็จ
-            size_bytes=getattr(f, "size", 0) or 0,
-            source_system=source_system,
-            acquisition_tool=acquisition_tool,
-            uploaded_by=uploaded_by_user,
-            notes=notes,
-            parse_status=getattr(Evidence.ParseStatus, "PENDING", "PENDING"),
-            parse_message="uploaded",
-        )
+        ev = _create_evidence(case, fields, getattr(f, "name", "evidence.zip"),
+                              getattr(f, "size", 0), _request_user(request))
 
-        # เก็บไฟล์ลง MEDIA_ROOT/evidence_zips/<evidence_id>.zip
+        # เก็บไฟล์ลง MEDIA_ROOT/evidence_zips/<evidence_id>.zip (hash ไปพร้อมกับเขียน ไม่ต้องอ่านซ้ำ)
         target_rel = f"evidence_zips/{ev.id}.zip"
         target_abs = Path(settings.MEDIA_ROOT) / target_rel
         target_abs.parent.mkdir(parents=True, exist_ok=True)
 
+        h = hashlib.sha256()
         with open(target_abs, "wb") as dst:
             for chunk in f.chunks(1024 * 1024):
+                h.update(chunk)
                 dst.write(chunk)
 
-        ev.sha256 = _sha256_of_file(target_abs)
+        ev.sha256 = h.hexdigest()
         ev.stored_path = target_rel
         ev.save()
 
+    _index_uploaded_zip(ev)
+    return JsonResponse(_evidence_upload_payload(ev))
+
+
+# ===== Chunked upload: init → PUT chunk N → complete =====
+
+def _index_uploaded_zip(ev: Evidence) -> None:
+    """index central directory ของ ZIP ที่เพิ่งอัปโหลด (ไม่ใช่ ZIP / อ่านไม่ได้ → จดลง parse_log แล้วไปต่อ)"""
+    try:
+        index_zip(ev)
+    except (zipfile.BadZipFile, OSError) as e:
+        ev.parse_log = (ev.parse_log or "") + f"\nzip index error: {e}"
+        ev.save(update_fields=["parse_log"])
+
+
+def _upload_error(e: UploadError) -> JsonResponse:
+    return JsonResponse({"ok": False, "error": str(e)}, status=e.status)
+
+
+@csrf_exempt
+@require_POST
+def upload_init_api(request):
+    """
+    เริ่ม session อัปโหลดแบบแบ่งชิ้น
+    form fields: filename, size (bytes), chunk_size (optional) + ฟิลด์เดียวกับ upload_evidence_api
+    ตอบ: upload_id, chunk_size, total_chunks, received (ว่าง)
+    """
+    try:
+        size = int(request.POST.get("size", "0"))
+        chunk_size = int(request.POST.get("chunk_size") or 0) or None
+    except ValueError:
+        return HttpResponseBadRequest("invalid size")
+
+    fields = _upload_form_fields(request.POST)
+    if fields["case_id"] and not Case.objects.filter(id=fields["case_id"]).exists():
+        return HttpResponseBadRequest("case not found")
+
+    cleanup_stale_uploads()
+    try:
+        s = init_upload(request.POST.get("filename", ""), size, fields,
+                        uploaded_by=_request_user(request), chunk_size=chunk_size)
+    except UploadError as e:
+        return _upload_error(e)
+    return JsonResponse({"ok": True, **status_payload(s)}, status=201)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "DELETE"])
+def upload_status_api(request, upload_id):
+    """
+    GET: สถานะ (chunk ที่รับแล้ว) สำหรับ resume — client ส่งเฉพาะ chunk ที่ยังไม่อยู่ใน received
+    DELETE: ยกเลิก + ลบไฟล์ .part
+    """
+    s = get_object_or_404(UploadSession, pk=upload_id)
+    if request.method == "DELETE":
+        if s.status == UploadSession.Status.UPLOADING:
+            abort_upload(s)
+        return JsonResponse({"ok": True, **status_payload(s)})
+    return JsonResponse({"ok": True, **status_payload(s)})
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def upload_chunk_api(request, upload_id, index: int):
+    """
+    body = bytes ดิบของ chunk; header X-Chunk-SHA256 (แนะนำ) ใช้ตรวจความถูกต้องของชิ้นนี้
+    """
+    s = get_object_or_404(UploadSession, pk=upload_id)
+    try:
+        s = write_chunk(s, index, request.body, request.headers.get("X-Chunk-SHA256", ""))
+    except UploadError as e:
+        return _upload_error(e)
     return JsonResponse({
-        "id": str(ev.id),
-        "case_id": str(case.id),
-        "case_number": case.case_number,
-        "original_name": ev.original_filename,
-        "size_bytes": ev.size_bytes,
-        "sha256": ev.sha256,
-        "status": ev.parse_status,  # ให้ frontend ใช้ key เดิมได้
+        "ok": True,
+        "index": index,
+        "received_count": len(s.received),
+        "total_chunks": s.total_chunks,
+        "hashed_upto": s.hashed_upto,
     })
 
 
+@csrf_exempt
+@require_POST
+def upload_complete_api(request, upload_id):
+    """
+    ครบทุก chunk แล้ว: สร้าง Evidence (+ เคสถ้าไม่ได้ระบุ) ย้ายไฟล์ไป evidence_zips/<id>.zip
+    ตอบ JSON แบบเดียวกับ upload_evidence_api; เรียกซ้ำหลัง complete แล้วได้ผลเดิม
+    """
+    s = get_object_or_404(UploadSession, pk=upload_id)
+    if s.status == UploadSession.Status.COMPLETE and s.evidence_id:
+        return JsonResponse(_evidence_upload_payload(s.evidence))
+    try:
+        digest = finish_upload(s)
+    except UploadError as e:
+        return _upload_error(e)
+
+    fields = s.meta or {}
+    fields.setdefault("source_system", "")
+    fields.setdefault("acquisition_tool", "KAPE")
+    fields.setdefault("notes", "")
+    try:
+        case = _get_or_create_case(fields.get("case_id") or "")
+    except Case.DoesNotExist:
+        return HttpResponseBadRequest("case not found")
+
+    with transaction.atomic():
+        ev = _create_evidence(case, fields, s.filename, s.total_size, s.uploaded_by)
+        target_rel = f"evidence_zips/{ev.id}.zip"
+        ev.sha256 = digest
+        ev.stored_path = target_rel
+        ev.save()
+
+        s.status = UploadSession.Status.COMPLETE
+        s.sha256 = digest
+        s.hashed_upto = s.total_chunks
+        s.hash_state = None
+        s.evidence = ev
+        s.save(update_fields=["status", "sha256", "hashed_upto", "hash_state", "evidence", "updated_at"])
+        # ย้ายไฟล์เป็นขั้นสุดท้าย: ถ้าพังตรงนี้ transaction rollback และ .part ยังอยู่ให้ complete ใหม่ได้
+        move_into_place(s, Path(settings.MEDIA_ROOT) / target_rel)
+
+    _index_uploaded_zip(ev)
+    return JsonResponse(_evidence_upload_payload(ev))
+
+
 @csrf_exempt
 @require_POST
 def start_extract_api(request):
     """
     แตก ZIP → MEDIA_ROOT/extracted/<evidence_id>/
+      - ค่าเริ่มต้น (EXTRACT_MODE=selective): แตกเฉพาะไฟล์ที่ parser ใน PARSERS_ENABLED ต้องใช้
+        หาจาก index central directory (ZipMember) ที่ทำไว้ตอนอัปโหลด
+      - full=1 หรือ EXTRACT_MODE=full: แตกทั้งหมดแบบเดิม
+        (selective แต่หา artifact ใน index ไม่เจอเลย → แตกทั้งหมดเช่นกัน)
+    แตกหลาย thread (EXTRACT_THREADS); ความคืบหน้า (byte ที่แตกแล้ว) อยู่ใน Evidence.parse_progress
+    เนื้อที่ดิสก์ไม่พอ → 507 ก่อนเริ่มแตก
     """
     ev_id = request.POST.get("id")
     if not ev_id:
@@ -229,19 +289,26 @@ def start_extract_api(request):
 
     out_dir = Path(settings.MEDIA_ROOT) / "extracted" / str(ev.id)
     out_dir.mkdir(parents=True, exist_ok=True)
+    full = _as_bool(request.POST.get("full", "")) or getattr(settings, "EXTRACT_MODE", "selective") == "full"
 
     try:
         ev.parse_status = getattr(Evidence.ParseStatus, "RUNNING", "RUNNING")
         ev.parse_message = "extracting"
+        ev.parse_progress = 0
         ev.save()
 
-        # ป้องกัน path traversal
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            for m in zf.infolist():
-                p = Path(m.filename)
-                if p.is_absolute() or ".." in p.parts:
-                    continue
-                zf.extract(m, out_dir)
+        members = None
+        if not full:
+            if not has_index(ev):               # evidence ที่อัปโหลดก่อนมี index
+                index_zip(ev, zip_path)
+            members = selective_members(ev, PARSERS_ENABLED, locate_members(ev)) or None
+
+        def _progress(done: int, total: int) -> None:
+            pct = done * 100 // total if total else 100
+            if pct != ev.parse_progress:
+                set_progress(ev, pct, f"extracting {done // (1024 * 1024)}/{total // (1024 * 1024)} MB")
+
+        count, nbytes = extract_zip(zip_path, out_dir, members, progress=_progress)
 
         # บันทึก path ที่แตกไฟล์แล้ว
         if hasattr(ev, "extracted_dir"):
@@ -249,10 +316,21 @@ def start_extract_api(request):
         else:
             pass
 
+        mode = "full" if members is None else "selective"
+        summary = dict(ev.summary or {})
+        summary["extract"] = {"mode": mode, "files": count, "bytes": nbytes}
+        ev.summary = summary
         ev.parse_message = "ready"
         ev.save()
 
-        return JsonResponse({"ok": True, "status": ev.parse_status, "extract_path": str(out_dir)})
+        return JsonResponse({"ok": True, "status": ev.parse_status, "extract_path": str(out_dir),
+                             "mode": mode, "files": count, "bytes": nbytes})
+    except InsufficientSpace as e:
+        ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
+        ev.parse_message = f"extract error: {e}"
+        ev.save()
+        return JsonResponse({"ok": False, "error": str(e), "needed_bytes": e.needed, "free_bytes": e.free},
+                            status=507)
     except Exception as e:
         ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
         ev.parse_message = f"extract error: {e}"
@@ -266,12 +344,9 @@ def start_extract_api(request):
 @require_POST
 def start_parse_api(request):
     """
-    หลังแตก ZIP:
-      - หา $MFT และ Amcache.hve
-      - หา winevt/Logs (Windows Event Logs)
-      - docker run PARSER_IMAGE เพื่อแปลง CSV → MEDIA_ROOT/parsed/<id>/
-      - จากนั้น ingest CSV → DB (MFTEntry / AmcacheEntry / SecurityEvent)
-      - ทำแบบล้างชนิดต่อชนิดเพื่อลด peak memory
+    หลังแตก ZIP: ส่งงาน parse เข้าคิว (ParseJob) แล้วตอบ job id กลับทันที
+    งานจริง (docker run + ingest CSV → DB) ทำโดย worker: python manage.py run_workers
+    ความคืบหน้าดูได้จาก /api/jobs/<job_id>/ หรือ Evidence.parse_progress
     """
     ev_id = request.POST.get("id")
     if not ev_id:
@@ -283,229 +358,50 @@ def start_parse_api(request):
         raise Http404("evidence not found")
 
     # หา extracted dir
-    extracted = Path(ev.extracted_dir) if getattr(ev, "extracted_dir", None) \
-        else Path(settings.MEDIA_ROOT) / "extracted" / str(ev.id)
-    if not extracted.exists():
+    if not evidence_extracted_dir(ev).exists():
         return HttpResponseBadRequest("extracted path not found")
 
-    parsed_dir = Path(settings.MEDIA_ROOT) / "parsed" / str(ev.id)
-    parsed_dir.mkdir(parents=True, exist_ok=True)
-
-    mft_path, amc_path = _find_kape_artifacts(extracted)
-    evtx_dir = _find_winevt_logs_dir(extracted)
-
-    ev.parse_status = getattr(Evidence.ParseStatus, "RUNNING", "RUNNING")
-    ev.parse_message = "parsing"
-    ev.save(update_fields=["parse_status", "parse_message"])
-
-    log_lines: list[str] = []
-    log_lines.append("[django] start_parse_api: begin")
-
-    # ต้องมี docker CLI
-    if shutil.which("docker") is None:
-        msg = "docker CLI not found in django container"
-        ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
-        ev.parse_message = msg
-        if hasattr(ev, "parse_log"):
-            ev.parse_log = (ev.parse_log or "") + "\n" + msg
-        ev.save(update_fields=["parse_status", "parse_message", "parse_log"])
-        return JsonResponse({"ok": False, "error": msg}, status=500)
-
-    # ตรวจ image
-    rc_img, out_img = _docker_run(["docker", "image", "inspect", PARSER_IMAGE])
-    if rc_img != 0:
-        log_lines.append(out_img)
-        ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
-        ev.parse_message = f"parser image '{PARSER_IMAGE}' not found"
-        if hasattr(ev, "parse_log"):
-            ev.parse_log = (ev.parse_log or "") + "\n".join(log_lines)
-        ev.save(update_fields=["parse_status", "parse_message", "parse_log"])
-        return JsonResponse({
-            "ok": False,
-            "error": ev.parse_message,
-            "log_tail": out_img[-2000:],
-        }, status=500)
-
-    def run_parser(kind: str, in_abs: Path | None, out_csv_name: str) -> tuple[bool, str]:
-        """
-        kind: 'mft' | 'amcache' | 'evtx-dir'
-        in_abs: สำหรับ evtx-dir เป็น 'directory', ที่เหลือเป็นไฟล์
-        """
-        if in_abs is None:
-            return False, "no input"
-
-        # สำหรับ 'evtx-dir' เราจะส่งเป็นโฟลเดอร์ relative to extracted
-        rel_in = in_abs.relative_to(extracted).as_posix()
-        in_path = f"{DOCKER_VOLUME_MOUNTPOINT}/extracted/{ev.id}/{rel_in}"
-        out_dir = f"{DOCKER_VOLUME_MOUNTPOINT}/parsed/{ev.id}"
-
-        args = ["docker", "run", "--rm"]
-        if PARSER_PLATFORM:
-            args += ["--platform", PARSER_PLATFORM]
-        args += ["-v", f"{DOCKER_VOLUME_MEDIA}:{DOCKER_VOLUME_MOUNTPOINT}", PARSER_IMAGE]
-
-        if kind == "mft":
-            args += ["mft", in_path, out_dir, out_csv_name]
-        elif kind == "amcache":
-            args += ["amcache", in_path, out_dir, out_csv_name]
-        elif kind == "evtx-dir":
-            args += ["evtx-dir", in_path, out_dir, out_csv_name]
-        else:
-            raise ValueError("unknown kind")
-
-        rc, out = _docker_run(args)
-        log_lines.append(f"$ {' '.join(args)}\n{out}\n(rc={rc})\n")
-        return rc == 0, out
-
-    # ==== รันตามที่พบไฟล์/โฟลเดอร์ ====
-    mft_rel: Optional[str] = None
-    amcache_focus_rel: Optional[str] = None
-    amcache_all_rels: list[str] = []
-    evtx_rel: Optional[str] = None
-
-    # MFT
-    if mft_path:
-        ok, _ = run_parser("mft", mft_path, "mft.csv")
-        mft_csv_abs = parsed_dir / "mft.csv"
-        mft_listing_abs = parsed_dir / "mft_FileListing.csv"
-        if ok and _exists_nonempty(mft_csv_abs):
-            mft_rel = f"parsed/{ev.id}/mft.csv"
-            if hasattr(ev, "mft_csv_path"):
-                ev.mft_csv_path = mft_rel
-        if _exists_nonempty(mft_listing_abs):
-            summ = dict(getattr(ev, "summary", {}) or {})
-            summ["mft_filelisting"] = f"parsed/{ev.id}/mft_FileListing.csv"
-            ev.summary = summ
-    else:
-        log_lines.append("! $MFT not found under extracted path\n")
-
-    # Amcache
-    if amc_path:
-        ok, _out = run_parser("amcache", amc_path, "amcache.csv")
-        focus_abs = parsed_dir / "amcache_UnassociatedFileEntries.csv"
-        if _exists_nonempty(focus_abs):
-            amcache_focus_rel = f"parsed/{ev.id}/amcache_UnassociatedFileEntries.csv"
-            if hasattr(ev, "amcache_csv_path"):
-                ev.amcache_csv_path = amcache_focus_rel
-        else:
-            for p in sorted(parsed_dir.glob("amcache*.csv")):
-                if _exists_nonempty(p):
-                    rel = f"parsed/{ev.id}/{p.name}"
-                    amcache_all_rels.append(rel)
-            if amcache_all_rels and not amcache_focus_rel:
-                amcache_focus_rel = amcache_all_rels[0]
-                if hasattr(ev, "amcache_csv_path"):
-                    ev.amcache_csv_path = amcache_focus_rel
-            if not amcache_all_rels and not amcache_focus_rel:
-                log_lines.append("! Amcache parsed but no amcache*.csv found\n")
-        if amcache_all_rels:
-            summ = dict(getattr(ev, "summary", {}) or {})
-            summ["amcache_csvs"] = amcache_all_rels
-            ev.summary = summ
-    else:
-        log_lines.append("! Amcache.hve not found under extracted path\n")
-
-    # EVTX (Security/System/Application)
-    if evtx_dir and evtx_dir.exists():
-        ok, _out = run_parser("evtx-dir", evtx_dir, "evtx_all.csv")
-        evtx_csv_abs = parsed_dir / "evtx_all.csv"
-        if ok and _exists_nonempty(evtx_csv_abs):
-            evtx_rel = f"parsed/{ev.id}/evtx_all.csv"
-            summ = dict(getattr(ev, "summary", {}) or {})
-            summ["evtx_csv"] = evtx_rel
-            ev.summary = summ
-    else:
-        log_lines.append("! winevt/Logs directory not found under extracted path\n")
-
-    # ==== อัปเดตสถานะ + สรุปเร็ว ๆ ====
-    produced_any = bool(mft_rel or amcache_focus_rel or evtx_rel)
-    if produced_any:
-        ev.parse_status = getattr(Evidence.ParseStatus, "DONE", "DONE")
-        ev.parse_message = "parsed"
-        summary = dict(getattr(ev, "summary", {}) or {})
+    # โปรไฟล์กรอง EVTX (ไม่ส่ง = ใช้ค่าที่ evidence มีอยู่): evtx_profile=security-core
+    # หรือ evtx_profile=custom&evtx_allowlist={"Security":[4624,4625],"System":"*"}
+    if "evtx_profile" in request.POST or "evtx_allowlist" in request.POST:
+        profile = request.POST.get("evtx_profile", ev.evtx_profile).strip()
         try:
-            def _count_rows_if_small(path: Path) -> Optional[int]:
-                try:
-                    if path.exists() and path.stat().st_size <= 200 * 1024 * 1024:
-                        with open(path, "r", errors="ignore") as r:
-                            return max(0, sum(1 for _ in r) - 1)
-                except Exception:
-                    pass
-                return None
-
-            if mft_rel:
-                cnt = _count_rows_if_small(Path(settings.MEDIA_ROOT) / mft_rel)
-                if cnt is not None:
-                    summary["mft_rows"] = cnt
-            if amcache_focus_rel:
-                cnt = _count_rows_if_small(Path(settings.MEDIA_ROOT) / amcache_focus_rel)
-                if cnt is not None:
-                    summary["amcache_rows"] = cnt
-            if evtx_rel:
-                cnt = _count_rows_if_small(Path(settings.MEDIA_ROOT) / evtx_rel)
-                if cnt is not None:
-                    summary["evtx_rows"] = cnt
-        except Exception:
-            pass
-        ev.summary = summary
-    else:
-        ev.parse_status = getattr(Evidence.ParseStatus, "FAILED", "FAILED")
-        ev.parse_message = "no artifact parsed"
+            allow = json.loads(request.POST.get("evtx_allowlist") or "{}")
+            build_filter(profile, allow)
+        except ValueError as e:
+            return HttpResponseBadRequest(f"invalid EVTX profile: {e}")
+        ev.evtx_profile = profile
+        ev.evtx_allowlist = allow if profile == "custom" else {}
+        ev.save(update_fields=["evtx_profile", "evtx_allowlist"])
 
-    # ===== Ingest → DB (ทีละชนิด ลด peak memory) =====
-    try:
-        if mft_rel:
-            with transaction.atomic():
-                MFTEntry.objects.filter(evidence=ev).delete()
-                mft_csv_abs = Path(settings.MEDIA_ROOT) / mft_rel
-                inserted = ingest_mft_csv_to_db(ev, mft_csv_abs, chunk=1000)
-                summary = dict(getattr(ev, "summary", {}) or {})
-                summary["mft_rows_db"] = inserted
-                ev.summary = summary
-                ev.save(update_fields=["summary"])
-
-        if amcache_focus_rel:
-            with transaction.atomic():
-                AmcacheEntry.objects.filter(evidence=ev).delete()
-                amc_csv_abs = Path(settings.MEDIA_ROOT) / amcache_focus_rel
-                inserted = ingest_amcache_csv_to_db(ev, amc_csv_abs, chunk=1000)
-                summary = dict(getattr(ev, "summary", {}) or {})
-                summary["amcache_rows_db"] = inserted
-                ev.summary = summary
-                ev.save(update_fields=["summary"])
-
-        if evtx_rel:
-            with transaction.atomic():
-                SecurityEvent.objects.filter(evidence=ev).delete()
-                evtx_csv_abs = Path(settings.MEDIA_ROOT) / evtx_rel
-                inserted = ingest_evtx_csv_to_db(ev, evtx_csv_abs, chunk=2000)
-                summary = dict(getattr(ev, "summary", {}) or {})
-                summary["security_events_rows_db"] = inserted
-                ev.summary = summary
-                ev.save(update_fields=["summary"])
-    except Exception as _ing_e:
-        if hasattr(ev, "parse_log"):
-            ev.parse_log = (ev.parse_log or "") + f"\ningest error: {repr(_ing_e)}"
-            ev.save(update_fields=["parse_log"])
+    job = enqueue_parse_job(ev)
 
-    # เก็บ log และตอบกลับ
-    if hasattr(ev, "parse_log"):
-        ev.parse_log = (ev.parse_log or "") + "\n".join(log_lines)
-    ev.save()
+    return JsonResponse({
+        "ok": True,
+        "job_id": job.id,
+        "status": job.status,
+        "evidence_id": str(ev.id),
+    }, status=202)
 
+
+@require_GET
+def job_status_api(request, job_id: int):
+    """
+    สถานะ job + ความคืบหน้าของ evidence (ให้ UI poll)
+    """
+    job = get_object_or_404(ParseJob.objects.select_related("evidence"), id=job_id)
+    ev = job.evidence
     return JsonResponse({
-        "ok": ev.parse_status == getattr(Evidence.ParseStatus, "DONE", "DONE"),
-        "status": ev.parse_status,
-        "mft_csv": (settings.MEDIA_URL + mft_rel) if mft_rel else None,
-        "amcache_csv": (settings.MEDIA_URL + amcache_focus_rel) if amcache_focus_rel else None,
-        "amcache_all": [settings.MEDIA_URL + x for x in amcache_all_rels] if amcache_all_rels else [],
-        "evtx_csv": (settings.MEDIA_URL + evtx_rel) if evtx_rel else None,
-        "mft_filelisting": (
-            settings.MEDIA_URL + ev.summary.get("mft_filelisting")
-            if getattr(ev, "summary", None) and ev.summary.get("mft_filelisting") else None
-        ),
-        "log_tail": "\n".join(log_lines[-10:]),
-        "summary": ev.summary,
+        "id": job.id,
+        "evidence_id": str(ev.id),
+        "status": job.status,
+        "attempts": job.attempts,
+        "worker": job.worker,
+        "error": job.error[-2000:] if job.error else "",
+        "parse_status": ev.parse_status,
+        "parse_progress": ev.parse_progress,
+        "parse_message": ev.parse_message,
+        "result": job.result if job.status in (ParseJob.Status.DONE, ParseJob.Status.FAILED) else None,
     })
 
 
@@ -543,6 +439,8 @@ def evidence_detail_api(request, ev_id):
         "id": str(ev.id),
         "case_id": str(ev.case_id),
         "status": ev.parse_status,
+        "parse_progress": ev.parse_progress,
+        "parse_message": ev.parse_message,
         "original_name": ev.original_filename,
         "size_bytes": ev.size_bytes,
         "sha256": ev.sha256,
@@ -576,51 +474,46 @@ def _str_to_int_default(s: str, default=0):
     except Exception:
         return default
 
-def _parse_ts_guess(s: str):
-    """
-    แปลง string → datetime ให้เป็น timezone-aware เสมอเมื่อ USE_TZ=True
-    รองรับฟอร์แมตพื้นฐาน; ถ้าแปลงไม่ได้คืน None
-    """
-    s = (s or "").strip()
-    if not s:
-        return None
+def _as_bool(s: str) -> bool:
+    return str(s or "").strip().lower() in ("1", "true", "yes")
 
-    # ISO/มาตรฐานของ Django ก่อน (เร็วสุด)
-    dt = parse_datetime(s)
-    if dt:
-        if settings.USE_TZ and dt.tzinfo is None:
-            dt = timezone.make_aware(dt, timezone.get_current_timezone())
-        return dt
-
-    # ฟอร์แมตที่พบได้บ่อย + เผื่อ microseconds
-    for fmt in (
-        "%Y-%m-%d %H:%M:%S",
-        "%m/%d/%Y %H:%M:%S",
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y-%m-%d %H:%M:%S.%f",
-        "%Y-%m-%dT%H:%M:%S.%f",
-    ):
-        try:
-            dt = datetime.strptime(s, fmt)
-            if settings.USE_TZ:
-                dt = timezone.make_aware(dt, timezone.get_current_timezone())
-            return dt
-        except Exception:
-            pass
-    return None
+def _paging_params(request):
+    """cursor (จาก next_cursor / prev_cursor) + total=exact|estimate|none ของ row API"""
+    cursor = (request.GET.get("cursor") or "").strip()
+    how = (request.GET.get("total") or "exact").strip().lower()
+    return cursor, (how if how in TOTAL_MODES else "exact")
 
+def _bad_cursor(e: BadCursor) -> JsonResponse:
+    return JsonResponse({"ok": False, "error": str(e)}, status=400)
 
-def _as_bool(s: str) -> bool:
-    return str(s or "").strip().lower() in ("1", "true", "yes")
+def _export_format(request) -> str:
+    """format=csv|ndjson ของ export (ไม่รู้จัก = "")"""
+    fmt = (request.GET.get("format") or "csv").strip().lower()
+    return fmt if fmt in export.FORMATS else ""
+
+def _export_response(request, name: str, columns, rows):
+    """
+    StreamingHttpResponse ของ rows (iterator ของ dict) — ไม่มีทั้งชุดในหน่วยความจำ
+      format=csv (คอลัมน์ตาม columns) | ndjson (แถวเต็ม) ; gzip=1 → บีบอัดไปพร้อมกัน ได้ไฟล์ .gz
+    """
+    fmt = _export_format(request)
+    if not fmt:
+        return JsonResponse({"ok": False, "error": f"format must be one of {', '.join(export.FORMATS)}"}, status=400)
+    content_type, ext = export.FORMATS[fmt]
+    body = export.blocks(export.lines(fmt, columns, rows))
+    filename = f"{name}.{ext}"
+    if _as_bool(request.GET.get("gzip")):
+        body, content_type, filename = export.gzipped(body), "application/gzip", filename + ".gz"
+    resp = StreamingHttpResponse(body, content_type=content_type)
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
 
 # ---------- MFT (ORM) ----------
-def mft_rows_api(request, ev_id):
-    ev = Evidence.objects.filter(id=ev_id).first()
-    if not ev:
-        raise Http404("evidence not found")
+MFT_FIELDS = ("entry_number", "file_name", "full_path", "size_bytes", "created_ts", "modified_ts", "is_directory")
+MFT_EXPORT_COLUMNS = ("EntryNumber", "FileName", "FullPath", "Size", "Created", "Modified", "IsDirectory")
 
-    page = int(request.GET.get("page", 1))
-    page_size = min(int(request.GET.get("page_size", 50)), 1000)
+def _mft_query(request, ev):
+    """queryset + (คอลัมน์ sort, desc) ตาม filter / sort ของ mft_rows_api — export ใช้ชุดเดียวกัน"""
     q = (request.GET.get("q", "") or "").strip()
     type_filter = (request.GET.get("type", "") or "").lower()   # "", "file", "dir"
     size_bucket = (request.GET.get("size_bucket", "") or "").lower()
@@ -630,7 +523,7 @@ def mft_rows_api(request, ev_id):
     qs = MFTEntry.objects.filter(evidence=ev)
 
     if q:
-        qs = qs.filter(Q(file_name__icontains=q) | Q(full_path__icontains=q))
+        qs = qs.filter(contains_filter(MFT_SEARCH, q))
     if type_filter == "file":
         qs = qs.filter(is_directory=False)
     elif type_filter == "dir":
@@ -651,46 +544,61 @@ def mft_rows_api(request, ev_id):
         "Created": "created_ts",
         "Modified": "modified_ts",
     }
-    sfield = sort_map.get(sort_key, "entry_number")
-    if order == "desc":
-        sfield = "-" + sfield
-    qs = qs.order_by(sfield)
-
-    total = qs.count()
-    start = (page - 1) * page_size
-    rows = list(qs.values(
-        "entry_number","file_name","full_path","size_bytes","created_ts","modified_ts","is_directory"
-    )[start:start + page_size])
-
-    payload = []
-    for r in rows:
-        payload.append({
-            "EntryNumber": r["entry_number"],
-            "FileName": r["file_name"],
-            "FullPath": r["full_path"],
-            "Size": f'{r["size_bytes"]:,}',
-            "Created": r["created_ts"].isoformat() if r["created_ts"] else "",
-            "Modified": r["modified_ts"].isoformat() if r["modified_ts"] else "",
-            "IsDirectory": r["is_directory"],
-        })
-
-    return JsonResponse({
-        "page": page,
-        "page_size": page_size,
-        "total": total,
-        "start_index": start + 1 if total else 0,
-        "end_index": min(start + page_size, total),
-        "rows": payload,
-    })
+    return qs, sort_map.get(sort_key, "entry_number"), order == "desc"
+
+def _mft_row(r: dict) -> dict:
+    return {
+        "EntryNumber": r["entry_number"],
+        "FileName": r["file_name"],
+        "FullPath": r["full_path"],
+        "Size": f'{r["size_bytes"]:,}',
+        "Created": r["created_ts"].isoformat() if r["created_ts"] else "",
+        "Modified": r["modified_ts"].isoformat() if r["modified_ts"] else "",
+        "IsDirectory": r["is_directory"],
+    }
 
-# ---------- Amcache (ORM) ----------
-def amcache_rows_api(request, ev_id):
+@respcache.cached_response("mft_rows")
+def mft_rows_api(request, ev_id):
     ev = Evidence.objects.filter(id=ev_id).first()
     if not ev:
         raise Http404("evidence not found")
 
     page = int(request.GET.get("page", 1))
     page_size = min(int(request.GET.get("page_size", 50)), 1000)
+    qs, sfield, desc = _mft_query(request, ev)
+    cursor, how = _paging_params(request)
+
+    try:
+        rows, meta = paginate(qs, MFT_FIELDS, sfield, desc, page, page_size, cursor)
+    except BadCursor as e:
+        return _bad_cursor(e)
+    total, exact = count_rows(ev, qs, how)
+
+    return JsonResponse({
+        **meta,
+        "total": total,
+        "total_exact": exact,
+        "rows": [_mft_row(r) for r in rows],
+    })
+
+@require_GET
+def mft_export_api(request, ev_id):
+    """แถวทั้งหมดที่ตรง filter / sort ของ mft_rows_api (ไม่จำกัด page_size) — Size เป็นจำนวน byte"""
+    ev = get_object_or_404(Evidence, id=ev_id)
+    qs, sfield, desc = _mft_query(request, ev)
+
+    def rows():
+        for r in ordered(qs, sfield, desc).values(*MFT_FIELDS).iterator(chunk_size=export.EXPORT_CHUNK):
+            yield {**_mft_row(r), "Size": r["size_bytes"]}
+
+    return _export_response(request, f"mft_ev{ev.pk}", MFT_EXPORT_COLUMNS, rows())
+
+# ---------- Amcache (ORM) ----------
+AMCACHE_FIELDS = ("app_name", "version", "publisher", "install_date", "file_path")
+AMCACHE_EXPORT_COLUMNS = ("AppName", "Version", "Publisher", "InstallDate", "FilePath")
+
+def _amcache_query(request, ev):
+    """queryset + (คอลัมน์ sort, desc) ตาม filter / sort ของ amcache_rows_api — export ใช้ชุดเดียวกัน"""
     q = (request.GET.get("q", "") or "").strip()
     publisher = (request.GET.get("publisher", "") or "").strip()
     sort_key = request.GET.get("sort", "AppName")
@@ -698,12 +606,7 @@ def amcache_rows_api(request, ev_id):
 
     qs = AmcacheEntry.objects.filter(evidence=ev)
     if q:
-        qs = qs.filter(
-            Q(app_name__icontains=q) |
-            Q(version__icontains=q) |
-            Q(publisher__icontains=q) |
-            Q(file_path__icontains=q)
-        )
+        qs = qs.filter(contains_filter(AMCACHE_SEARCH, q))
     if publisher:
         qs = qs.filter(publisher__iexact=publisher)
 
@@ -714,267 +617,65 @@ def amcache_rows_api(request, ev_id):
         "InstallDate": "install_date",
         "FilePath": "file_path",
     }
-    sfield = sort_map.get(sort_key, "app_name")
-    if order == "desc":
-        sfield = "-" + sfield
-    qs = qs.order_by(sfield)
-
-    total = qs.count()
-    start = (page - 1) * page_size
-    rows = list(qs.values("app_name","version","publisher","install_date","file_path")[start:start + page_size])
-
-    payload = []
-    for r in rows:
-        payload.append({
-            "AppName": r["app_name"],
-            "Version": r["version"] or "",
-            "Publisher": r["publisher"] or "",
-            "InstallDate": r["install_date"].isoformat() if r["install_date"] else "",
-            "FilePath": r["file_path"] or "",
-        })
+    return qs, sort_map.get(sort_key, "app_name"), order == "desc"
+
+def _amcache_row(r: dict) -> dict:
+    return {
+        "AppName": r["app_name"],
+        "Version": r["version"] or "",
+        "Publisher": r["publisher"] or "",
+        "InstallDate": r["install_date"].isoformat() if r["install_date"] else "",
+        "FilePath": r["file_path"] or "",
+    }
+
+@respcache.cached_response("amcache_rows")
+def amcache_rows_api(request, ev_id):
+    ev = Evidence.objects.filter(id=ev_id).first()
+    if not ev:
+        raise Http404("evidence not found")
 
-    publishers = list(
+    page = int(request.GET.get("page", 1))
+    page_size = min(int(request.GET.get("page_size", 50)), 1000)
+    qs, sfield, desc = _amcache_query(request, ev)
+    cursor, how = _paging_params(request)
+
+    try:
+        rows, meta = paginate(qs, AMCACHE_FIELDS, sfield, desc, page, page_size, cursor)
+    except BadCursor as e:
+        return _bad_cursor(e)
+    total, exact = count_rows(ev, qs, how)
+
+    # DISTINCT ทั้ง evidence ไม่ขึ้นกับ filter / หน้า → คำนวณครั้งเดียวต่อ data_version
+    publishers = json.loads(respcache.memo(ev, "amcache_publishers", lambda: json.dumps(list(
         AmcacheEntry.objects.filter(evidence=ev)
         .exclude(publisher__isnull=True)
         .exclude(publisher__exact="")
         .values_list("publisher", flat=True)
         .distinct()
         .order_by("publisher")
-    )
+    )).encode()))
 
     return JsonResponse({
-        "page": page,
-        "page_size": page_size,
+        **meta,
         "total": total,
-        "start_index": start + 1 if total else 0,
-        "end_index": min(start + page_size, total),
-        "rows": payload,
+        "total_exact": exact,
+        "rows": [_amcache_row(r) for r in rows],
         "publishers": publishers,
     })
 
-# === [ADD] helpers: normalizer + safe-int + ts parse ที่ใช้ซ้ำ ===
-def _norm_key(s: str) -> str:
-    return "".join(ch for ch in (s or "").lower() if ch.isalnum())
-
-def _canon_row(row: dict) -> dict:
-    return {_norm_key(k): v for k, v in row.items()}
-
-def _pick(nrow: dict, *aliases: str) -> str:
-    for a in aliases:
-        v = nrow.get(_norm_key(a), "")
-        if v not in (None, "", "NULL"):
-            return v
-    return ""
-
-def _to_int(s: str, default=0) -> int:
-    try:
-        return int(str(s or "0").replace(",", "").strip())
-    except Exception:
-        return default
-
-def _to_bool(s: str) -> bool:
-    return str(s or "").strip().lower() in ("1","true","yes")
-
-# === [ADD] Ingesters: อ่าน CSV ทีละบล็อกแล้ว bulk_create ลง DB ===
-def ingest_mft_csv_to_db(ev: Evidence, csv_path: Path, chunk=1000) -> int:
-    """
-    อ่าน parsed/mft.csv → MFTEntry แบบ batch เล็กลง (default 1000)
-    - ใช้ FileSize เป็นหลักตามโครง CSV ที่ให้มา
-    - ถ้าไม่มี FullPath ให้ประกอบ Path จาก ParentPath + FileName
-    - โฟลเดอร์ size เป็น 0 เสมอ
-    """
-    from .models import MFTEntry
-    saved = 0
-    batch = []
-
-    def _join_path(parent: str, name: str) -> str:
-        parent = (parent or "").strip()
-        name = (name or "").strip()
-        if not parent and not name:
-            return "."
-        if parent in (".", ""):
-            return name or "."
-        # ใช้สไตล์ Windows ให้สวยตา (กันซ้ำเครื่องหมายคั่น)
-        sep = "\\" if "\\" in parent or "\\" in name else "\\"
-        return parent.rstrip("\\/") + sep + name
-
-    with transaction.atomic():
-        with open(csv_path, "r", newline="", errors="ignore") as r:
-            dr = csv.DictReader(r)
-            for raw in dr:
-                n = _canon_row(raw)
-
-                entry_number = _to_int(_pick(n, "EntryNumber","Entry","RecordNumber"))
-
-                file_name  = _pick(n, "FileName","Name")
-                # ถ้า CSV ไม่มี FullPath (ตามตัวอย่าง) ให้สร้างจาก ParentPath + FileName
-                full_path  = _pick(n, "FullPath","FilePath")
-                if not full_path:
-                    parent = _pick(n, "ParentPath","Path")
-                    full_path = _join_path(parent, file_name)
-
-                # โฟลเดอร์?
-                is_dir = _to_bool(_pick(n, "IsDirectory","IsDir","Directory","Dir"))
-
-                # ขนาดไฟล์: ใช้ FileSize เป็นหลัก ตามที่คุณยืนยันมา
-                size_bytes = 0 if is_dir else _to_int(_pick(n, "FileSize","LogicalSize","Size"))
-
-                # เวลา
-                created  = _parse_ts_guess(_pick(n, "Created0x10","Created","CreationTime","CreationTimeUTC"))
-                modified = _parse_ts_guess(_pick(n, "LastModified0x10","Modified0x10","Modified","ModifiedTime","LastWriteTime"))
-                accessed = _parse_ts_guess(_pick(n, "LastAccess0x10","Accessed0x10","Accessed","AccessTime"))
-                mftchg   = _parse_ts_guess(_pick(n, "LastRecordChange0x10","MFTChanged0x10","MFTChanged","EntryModifiedTime"))
-
-                batch.append(MFTEntry(
-                    evidence=ev,
-                    entry_number=entry_number,
-                    is_directory=is_dir,
-                    file_name=file_name or "",
-                    full_path=full_path or ".",
-                    size_bytes=size_bytes,
-                    created_ts=created,
-                    modified_ts=modified,
-                    accessed_ts=accessed,
-                    mft_changed_ts=mftchg,
-                ))
-
-                if len(batch) >= chunk:
-                    MFTEntry.objects.bulk_create(batch, ignore_conflicts=True, batch_size=chunk)
-                    saved += len(batch)
-                    batch.clear()
-
-        if batch:
-            MFTEntry.objects.bulk_create(batch, ignore_conflicts=True, batch_size=chunk)
-            saved += len(batch)
-
-    return saved
-
-
-
-def ingest_amcache_csv_to_db(ev: Evidence, csv_path: Path, chunk=1000) -> int:
-    """
-    อ่าน amcache_UnassociatedFileEntries.csv → AmcacheEntry
-    ใช้ batch เล็กลงเพื่อลด peak memory และทำเวลาให้ aware
-    """
-    from .models import AmcacheEntry
-    saved = 0
-    batch = []
+@require_GET
+def amcache_export_api(request, ev_id):
+    """แถวทั้งหมดที่ตรง filter / sort ของ amcache_rows_api"""
+    ev = get_object_or_404(Evidence, id=ev_id)
+    qs, sfield, desc = _amcache_query(request, ev)
+    rows = ordered(qs, sfield, desc).values(*AMCACHE_FIELDS).iterator(chunk_size=export.EXPORT_CHUNK)
+    return _export_response(request, f"amcache_ev{ev.pk}", AMCACHE_EXPORT_COLUMNS, map(_amcache_row, rows))
 
-    with transaction.atomic():
-        with open(csv_path, "r", newline="", errors="ignore") as r:
-            dr = csv.DictReader(r)
-            for raw in dr:
-                n = _canon_row(raw)
-
-                app_name = _pick(n, "ProgramName","AppName","ProductName")
-                if not app_name:
-                    continue
-
-                version    = _pick(n, "Version","FileVersion","ProductVersion")
-                publisher  = _pick(n, "Publisher","Company","CompanyName")
-                install_dt = _parse_ts_guess(_pick(n, "InstallDate","InstallDateTime","InstallDateUTC","FirstInserted","FirstTime"))
-                file_path  = _pick(n, "Path","FilePath","FullPath","KeyPath")
-                sha1       = _pick(n, "SHA1","FileSHA1","SHA1Hash")
-                pe_hash    = _pick(n, "PEHash","PEHash32","PEHash64")
-
-                batch.append(AmcacheEntry(
-                    evidence=ev,
-                    app_name=app_name,
-                    version=version,
-                    publisher=publisher,
-                    install_date=install_dt,
-                    file_path=file_path,
-                    sha1=sha1,
-                    pe_hash=pe_hash,
-                    product_name=_pick(n, "ProductName"),
-                    extra={k: v for k, v in raw.items() if v not in (None, "")},
-                ))
-
-                if len(batch) >= chunk:
-                    AmcacheEntry.objects.bulk_create(batch, ignore_conflicts=True, batch_size=chunk)
-                    saved += len(batch)
-                    batch.clear()
-
-        if batch:
-            AmcacheEntry.objects.bulk_create(batch, ignore_conflicts=True, batch_size=chunk)
-            saved += len(batch)
-
-    return saved
-
-def ingest_evtx_csv_to_db(ev: Evidence, csv_path: Path, chunk=2000) -> int:
-    saved = 0
-    batch: list[SecurityEvent] = []
-
-    core_keys = {
-        "timestamp","timecreated","created",
-        "eventid","provider","channel","computer","user","userid","recordnumber","recordid",
-        "level","task","opcode","keywords","processid","threadid","message","sid","pid","tid","log","source"
-    }
 
-    with transaction.atomic():
-        with open(csv_path, "r", newline="", errors="ignore", encoding="utf-8-sig") as r:
-            dr = csv.DictReader(r)
-            for raw in dr:
-                n = _canon_row(raw)
-
-                eid = _to_int(_pick(n, "EventID"))
-                if eid == 0:
-                    continue
-
-                ts = _pick(n, "Timestamp","TimeCreated","Created")
-                dt = _parse_ts_guess(ts)
-
-                # --- แยกดิบที่เหลือเก็บลง event_data ---
-                ed = {k: v for k, v in raw.items()
-                      if v not in (None, "")
-                      and _norm_key(k) not in core_keys}
-
-                # message ดิบจาก CSV (ถ้ามี)
-                msg_raw = _pick(n, "Message")
-
-                # --- สร้าง description ตาม EventID (เก็บเพิ่ม ไม่ทับของดิบ) ---
-                desc, norm = describe_event(
-                    eid,
-                    {"event_id": eid, "message": msg_raw},
-                    ed
-                )
-                if msg_raw and desc != msg_raw:
-                    ed["MessageRaw"] = msg_raw  # เก็บของดิบไว้ด้วย
-                ed["__desc"] = desc           # เก็บคำอธิบายประกอบ
-                ed["__norm"] = norm           # เก็บ normalized fields เผื่อใช้ค้น/สรุปต่อ
-
-                event = SecurityEvent(
-                    evidence   = ev,
-                    timestamp  = dt,
-                    channel    = _pick(n, "Channel","Log"),
-                    provider   = _pick(n, "Provider","Source"),
-                    event_id   = eid,
-                    level      = _pick(n, "Level"),
-                    task       = _pick(n, "Task"),
-                    opcode     = _pick(n, "Opcode"),
-                    keywords   = _pick(n, "Keywords"),
-                    record_id  = _to_int(_pick(n, "RecordNumber","RecordId")),
-                    computer   = _pick(n, "Computer"),
-                    user_sid   = _pick(n, "UserID","Sid"),
-                    user_name  = _pick(n, "User"),
-                    process_id = _to_int(_pick(n, "ProcessID","PID")),
-                    thread_id  = _to_int(_pick(n, "ThreadID","TID")),
-                    # เก็บ message ให้ “อ่านรู้เรื่อง” ก่อน (ถ้าไม่มีจะว่างก็ได้ แต่เรามี desc แล้ว)
-                    message    = desc or msg_raw or "",
-                    event_data = ed,
-                )
-                batch.append(event)
-
-                if len(batch) >= chunk:
-                    SecurityEvent.objects.bulk_create(batch, ignore_conflicts=True, batch_size=chunk)
-                    saved += len(batch)
-                    batch.clear()
-
-        if batch:
-            SecurityEvent.objects.bulk_create(batch, ignore_conflicts=True, batch_size=chunk)
-            saved += len(batch)
-
-    return saved
+@require_GET
+def response_cache_stats_api(request):
+    """ตัวนับ hit / miss ของ cache ของ response (ของ process ที่ตอบ request นี้) + ขนาดที่ใช้อยู่"""
+    return JsonResponse({"ok": True, **respcache.stats()})
 
 
 @require_GET
@@ -983,6 +684,7 @@ def parser_preflight_api(request):
     ตรวจความพร้อมก่อน run parser:
       - docker cli
       - image มีในเครื่อง
+      - parser executor (docker-run / docker-exec / local) พร้อมใช้
       - media dirs เขียนได้
       - เนื้อที่ดิสก์เหลือพอ
     """
@@ -1000,6 +702,18 @@ def parser_preflight_api(request):
         checks["parser_image_ok"] = False
         checks["parser_image_output_tail"] = ""
 
+    # executor ที่ pipeline จะใช้ (PARSER_EXECUTOR) — local ไม่ต้องมี docker
+    try:
+        executor = get_executor()
+        ready, why = executor.available()
+        checks["parser_executor"] = executor.name
+        checks["parser_executor_ok"] = ready
+        checks["parser_executor_detail"] = why[-1000:]
+    except ValueError as e:
+        checks["parser_executor"] = getattr(settings, "PARSER_EXECUTOR", "")
+        checks["parser_executor_ok"] = False
+        checks["parser_executor_detail"] = str(e)
+
     # media dirs
     media_root = Path(settings.MEDIA_ROOT)
     parsed_root = media_root / "parsed"
@@ -1028,8 +742,7 @@ def parser_preflight_api(request):
     checks["disk_free_bytes"] = int(free)
 
     return JsonResponse({"ok": all([
-        checks["docker_cli"],
-        checks["parser_image_ok"],
+        checks["parser_executor_ok"],
         checks["media_root_writable"],
         checks["parsed_writable"],
         checks["extracted_writable"],
@@ -1037,57 +750,60 @@ def parser_preflight_api(request):
 
 
 # ---------- NEW: Security Events (ORM APIs) ----------
-@require_GET
-def security_events_rows_api(request, ev_id: int):
-    # --- ตรวจ evidence ---
-    try:
-        ev = Evidence.objects.get(id=ev_id)
-    except Evidence.DoesNotExist:
-        raise Http404("evidence not found")
-
+# ดึงฟิลด์ที่ต้องใช้ + event_data (JSON) สำหรับ Raw / รายละเอียดที่ไม่ได้เป็นคอลัมน์
+SECURITY_FIELDS = ("timestamp", "event_id", "message", "user_name", "computer", "event_data",
+                   "src_ip", "logon_type", "domain", "actor", "process", "auth_package", "failure_reason", "command_line")
+# CSV: คอลัมน์หลัก + Details แบนออกมา (NDJSON ได้แถวเต็มรวม Raw)
+SECURITY_EXPORT_COLUMNS = ("Timestamp", "EventID", "Description", "User", "SourceIP", "Computer",
+                           "LogonType", "WorkstationName", "ProcessName", "CommandLine", "FailureReason", "AuthPackage",
+                           "TargetUserName", "TargetDomainName", "SubjectUserName", "SubjectDomainName",
+                           "ServiceName", "ObjectName")
+
+def _security_query(request, ev):
+    """
+    queryset ตาม filter / ค้นหา / sort ของ security_events_rows_api — export ใช้ชุดเดียวกัน
+    → (qs, คอลัมน์ sort, desc, ranked (full-text มี rank), keyset (False = qs เรียงตาม rank มาแล้ว))
+    """
     # --- รับพารามิเตอร์จาก query ---
     q          = (request.GET.get("q") or "").strip()
+    mode       = (request.GET.get("mode") or "contains").strip().lower()   # contains | phrase | web
     event_id   = (request.GET.get("event_id") or "").strip()
     logon_type = (request.GET.get("logon_type") or "").strip()
-
-    try:
-        page = int(request.GET.get("page", "1"))
-        page_size = int(request.GET.get("page_size", "50"))
-    except ValueError:
-        page, page_size = 1, 50
-    page = max(1, page)
-    page_size = max(1, min(page_size, 1000))
+    channel    = (request.GET.get("channel") or "").strip()
+    start, end = _iso_param(request, "start"), _iso_param(request, "end")    # ช่วงเวลา [start, end) จาก timeline
 
     sort  = (request.GET.get("sort") or "Timestamp").strip()
     order = (request.GET.get("order") or "desc").strip().lower()
 
-    # ชื่อฟิลด์สำหรับ order_by (รองรับ SourceIP จาก __norm.src_ip ด้วย)
+    # ชื่อฟิลด์สำหรับ order_by (ทุกตัวเป็นคอลัมน์จริงที่มี index (evidence, col, id) ยกเว้น message)
     sortmap = {
         "Timestamp":   "timestamp",
         "EventID":     "event_id",
-        "User":        "user_name",
+        "User":        "actor",
         "Computer":    "computer",
         "Message":     "message",                 # UI เดิม
         "Description": "message",                 # UI ใหม่
-        "SourceIP":    "event_data____norm__src_ip",
+        "SourceIP":    "src_ip",
     }
     sort_field = sortmap.get(sort, "timestamp")
-    if order == "desc":
-        sort_field = f"-{sort_field}"
+    desc = order == "desc"
+    keyset = True               # rank ของ full-text ใช้ OFFSET
 
     # --- base queryset ---
-    qs = SecurityEvent.objects.filter(evidence=ev).order_by(sort_field)
-
-    # --- ค้นหาแบบกว้าง (มองทั้ง message, __desc, MessageRaw, user/computer/provider) ---
-    if q:
-        qs = qs.filter(
-            Q(message__icontains=q) |
-            Q(event_data____desc__icontains=q) |
-            Q(event_data__MessageRaw__icontains=q) |
-            Q(user_name__icontains=q) |
-            Q(computer__icontains=q) |
-            Q(provider__icontains=q)
-        )
+    qs = SecurityEvent.objects.filter(evidence=ev).order_by(f"-{sort_field}" if desc else sort_field)
+
+    # --- ค้นหา ---
+    #   mode=phrase / web: full-text บน search_vector (GIN) เรียงตาม rank ถ้าไม่ได้ระบุ sort
+    #   อื่น ๆ: substring แบบกว้าง (message (= __desc), MessageRaw, user/computer/provider) → trigram index
+    ranked = False
+    if q and mode in FTS_MODES and connection.vendor == "postgresql":
+        qs = ranked_search(qs, q, mode)
+        if not request.GET.get("sort"):
+            qs = qs.order_by("-rank", "-timestamp", "-id")
+            keyset = False
+        ranked = True
+    elif q:
+        qs = qs.filter(contains_filter(SECURITY_SEARCH, q))
 
     # --- filter ตาม event_id ---
     if event_id:
@@ -1097,97 +813,276 @@ def security_events_rows_api(request, ev_id: int):
         except ValueError:
             pass
 
-    # --- filter logon_type (ดูทั้งคีย์ดิบและคีย์ normalize) ---
+    # --- filter logon_type (คอลัมน์ที่ ingest รวมคีย์ดิบ + normalize ไว้แล้ว) ---
     if logon_type:
-        qs = qs.filter(
-            Q(event_id__in=[4624, 4625]) &
-            (
-                Q(event_data__LogonType=logon_type) |
-                Q(event_data__Logon_Type=logon_type) |
-                Q(event_data____norm__logon_type=logon_type)
-            )
-        )
+        qs = qs.filter(logon_type=logon_type, event_id__in=[4624, 4625])
+
+    # --- filter channel / ช่วงเวลา (index (evidence, timestamp, id)) ---
+    if channel:
+        qs = qs.filter(channel=channel)
+    if start:
+        qs = qs.filter(timestamp__gte=start)
+    if end:
+        qs = qs.filter(timestamp__lt=end)
+
+    return qs, sort_field, desc, ranked, keyset
+
+def _security_row(r: dict, ranked: bool = False) -> dict:
+    ts = r["timestamp"]
+    ts_str = ts.strftime("%Y-%m-%d %H:%M:%S") if isinstance(ts, datetime) else (str(ts) if ts else "")
+
+    ed = r.get("event_data") or {}
+
+    # Description: ใช้ message ที่เราประกอบตอน ingest ก่อน > __desc > MapDescription > Payload
+    desc = (
+        r.get("message") or
+        ed.get("__desc") or
+        ed.get("MapDescription") or
+        ed.get("Payload") or
+        ""
+    )
 
-    total = qs.count()
-    start = (page - 1) * page_size
-    end = start + page_size
-
-    rows = []
-    # ดึงฟิลด์ที่ต้องใช้ + event_data (JSON)
-    fields = ("timestamp", "event_id", "message", "user_name", "computer", "event_data")
-    for r in qs.values(*fields)[start:end]:
-        ts = r["timestamp"]
-        ts_str = ts.strftime("%Y-%m-%d %H:%M:%S") if isinstance(ts, datetime) else (str(ts) if ts else "")
-
-        ed = r.get("event_data") or {}
-        norm = (ed.get("__norm") or {}) if isinstance(ed, dict) else {}
-
-        # Source IP: ใช้ของ normalize ก่อน แล้วค่อย fallback
-        src_ip = (
-            norm.get("src_ip") or
-            ed.get("IpAddress") or ed.get("Ip") or ed.get("SourceIp") or
-            ed.get("SourceIPAddress") or ed.get("SourceNetworkAddress") or
-            ed.get("ClientAddress") or ed.get("RemoteHost") or ""
-        )
+    # ผู้ใช้: actor (normalize + fallback คีย์ดิบตอน ingest) ก่อน แล้วค่อย user_name ของ EVTX
+    user = r["actor"] or r.get("user_name") or ""
+    domain = r["domain"]
+    user_display = f"{domain}\\{user}" if domain and user else (user or "")
+
+    # รายละเอียดที่ forensic ใช้บ่อย (โชว์ในแถวขยาย)
+    details = {
+        "LogonType":         r["logon_type"] or None,
+        "WorkstationName":   ed.get("WorkstationName") or ed.get("Workstation"),
+        "ProcessName":       r["process"] or None,
+        "CommandLine":       r["command_line"] or None,
+        "FailureReason":     r["failure_reason"] or None,
+        "AuthPackage":       r["auth_package"] or None,
+        "TargetUserName":    ed.get("TargetUserName"),
+        "TargetDomainName":  ed.get("TargetDomainName"),
+        "SubjectUserName":   ed.get("SubjectUserName"),
+        "SubjectDomainName": ed.get("SubjectDomainName"),
+        "ServiceName":       ed.get("ServiceName"),
+        "ObjectName":        ed.get("ObjectName"),
+    }
 
-        # Description: ใช้ message ที่เราประกอบตอน ingest ก่อน > __desc > MapDescription > Payload
-        desc = (
-            r.get("message") or
-            ed.get("__desc") or
-            ed.get("MapDescription") or
-            ed.get("Payload") or
-            ""
-        )
+    row = {
+        "Timestamp": ts_str,
+        "EventID": r.get("event_id") or "",
+        "Description": desc,
+        "User": user_display,
+        "SourceIP": r["src_ip"] or "",
+        "Computer": r.get("computer") or "",
+        "Details": details,     # สำหรับ UI แสดงเพิ่มเติม (แถวขยาย)
+        "Raw": ed,              # JSON ดิบ เผื่อเปิดดู/คัดลอก
+    }
+    if ranked:
+        row["Rank"] = round(r["rank"], 4)
+    return row
 
-        # ผู้ใช้: ใช้ค่าที่ normalize ก่อน แล้วค่อย fallback ไปยังคีย์ดิบ
-        user = (norm.get("actor") or r.get("user_name") or
-                ed.get("TargetUserName") or ed.get("SubjectUserName") or
-                ed.get("AccountName") or "")
-        domain = (norm.get("domain") or
-                  ed.get("TargetDomainName") or ed.get("SubjectDomainName") or ed.get("DomainName") or "")
-        user_display = f"{domain}\\{user}" if domain and user else (user or "")
-
-        # รายละเอียดที่ forensic ใช้บ่อย (โชว์ในแถวขยาย)
-        details = {
-            "LogonType":         norm.get("logon_type") or ed.get("LogonType") or ed.get("Logon_Type"),
-            "WorkstationName":   ed.get("WorkstationName") or ed.get("Workstation"),
-            "ProcessName":       norm.get("process") or ed.get("ProcessName") or ed.get("NewProcessName") or ed.get("Image"),
-            "CommandLine":       ed.get("CommandLine") or ed.get("ProcessCommandLine") or ed.get("CmdLine"),
-            "FailureReason":     norm.get("failure_reason") or ed.get("FailureReason") or ed.get("Status") or ed.get("SubStatus"),
-            "AuthPackage":       norm.get("auth_package") or ed.get("AuthenticationPackageName") or ed.get("PackageName"),
-            "TargetUserName":    ed.get("TargetUserName"),
-            "TargetDomainName":  ed.get("TargetDomainName"),
-            "SubjectUserName":   ed.get("SubjectUserName"),
-            "SubjectDomainName": ed.get("SubjectDomainName"),
-            "ServiceName":       ed.get("ServiceName"),
-            "ObjectName":        ed.get("ObjectName"),
-        }
-
-        rows.append({
-            "Timestamp": ts_str,
-            "EventID": r.get("event_id") or "",
-            "Description": desc,
-            "User": user_display,
-            "SourceIP": src_ip or "",
-            "Computer": r.get("computer") or "",
-            "Details": details,     # สำหรับ UI แสดงเพิ่มเติม (แถวขยาย)
-            "Raw": ed,              # JSON ดิบ เผื่อเปิดดู/คัดลอก
-        })
+@require_GET
+@respcache.cached_response("security_rows")
+def security_events_rows_api(request, ev_id: int):
+    # --- ตรวจ evidence ---
+    try:
+        ev = Evidence.objects.get(id=ev_id)
+    except Evidence.DoesNotExist:
+        raise Http404("evidence not found")
 
+    try:
+        page = int(request.GET.get("page", "1"))
+        page_size = int(request.GET.get("page_size", "50"))
+    except ValueError:
+        page, page_size = 1, 50
+    page = max(1, page)
+    page_size = max(1, min(page_size, 1000))
+
+    qs, sort_field, desc, ranked, keyset = _security_query(request, ev)
+    cursor, how = _paging_params(request)
+
+    fields = SECURITY_FIELDS + (("rank",) if ranked else ())
+    try:
+        page_rows, meta = paginate(qs, fields, sort_field, desc, page, page_size, cursor, keyset=keyset)
+    except BadCursor as e:
+        return _bad_cursor(e)
+    total, exact = count_rows(ev, qs, how)
+
+    mode = (request.GET.get("mode") or "contains").strip().lower()
     return JsonResponse({
-        "page": page,
-        "page_size": page_size,
+        **meta,
         "total": total,
-        "start_index": start + 1 if total else 0,
-        "end_index": min(end, total),
-        "rows": rows,
+        "total_exact": exact,
+        "rows": [_security_row(r, ranked) for r in page_rows],
+        "mode": mode if ranked else "contains",
     })
 
+@require_GET
+def security_events_export_api(request, ev_id: int):
+    """แถวทั้งหมดที่ตรง filter / ค้นหา / sort ของ security_events_rows_api (CSV: Details แบนเป็นคอลัมน์)"""
+    ev = get_object_or_404(Evidence, id=ev_id)
+    qs, sort_field, desc, ranked, keyset = _security_query(request, ev)
+    if keyset:
+        qs = ordered(qs, sort_field, desc)
+    fields = SECURITY_FIELDS + (("rank",) if ranked else ())
+
+    flat = _export_format(request) == "csv"
+
+    def rows():
+        for r in qs.values(*fields).iterator(chunk_size=export.EXPORT_CHUNK):
+            row = _security_row(r, ranked)
+            yield {**row, **row["Details"]} if flat else row
+
+    columns = SECURITY_EXPORT_COLUMNS + (("Rank",) if ranked else ())
+    return _export_response(request, f"security_ev{ev.pk}", columns, rows())
+
 
+def _iso_param(request, name: str):
+    """พารามิเตอร์เวลาแบบ ISO-8601 (ไม่มี timezone = UTC); ว่าง / ผิดรูป → None"""
+    try:
+        dt = parse_datetime((request.GET.get(name) or "").strip())
+    except ValueError:
+        return None
+    if dt is not None and dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+@respcache.cached_response("security_summary")
 def security_events_summary_api(request, ev_id: int):
+    """
+    สรุป security events จาก SecurityEventStat (นับไว้ตอน ingest) ไม่ scan ตารางดิบ
+      dims:  event_id,channel,user,computer,logon_type,src_ip (ค่าเริ่มต้น = ทั้งหมด)
+      top:   จำนวนค่าต่อ dim (ค่าเริ่มต้น 10, 0 = ทั้งหมด)
+      start / end: ช่วงเวลาของ hours (รายชั่วโมง UTC)
+    """
+    ev = get_object_or_404(Evidence, id=ev_id)
+    if not aggregates.has_stats(ev.pk) and SecurityEvent.objects.filter(evidence=ev).exists():
+        aggregates.rebuild(ev.pk)       # ingest ก่อนมีตารางสรุป → สร้างครั้งเดียว
+
+    dims = [d.strip() for d in (request.GET.get("dims") or "").split(",") if d.strip()] or list(aggregates.DIMENSIONS)
+    dims = [d for d in dims if d in aggregates.DIMENSIONS]
+    top = max(0, _str_to_int_default(request.GET.get("top") or "10", 10))
+    start, end = _iso_param(request, "start"), _iso_param(request, "end")
+
+    total = aggregates.histogram(ev.pk, aggregates.TOTAL)
+    return JsonResponse({
+        "ok": True,
+        "total": total[0]["count"] if total else 0,
+        "dims": {d: aggregates.histogram(ev.pk, d, top or None) for d in dims},
+        "hours": aggregates.hours(ev.pk, start, end),
+    })
+
+
+def _csv_param(request, name: str) -> list:
+    return [v.strip() for v in (request.GET.get(name) or "").split(",") if v.strip()]
+
+@require_GET
+@respcache.cached_response("timeline")
+def timeline_api(request, ev_id: int):
+    """
+    จำนวนเหตุการณ์ต่อช่วงเวลา (UTC) จาก TimelineBucket (นับไว้ตอน ingest) ไม่ scan ตารางดิบ
+      source:     security,mft_created,mft_modified (ค่าเริ่มต้น = ทั้งหมด)
+      start / end: ช่วง [start, end) แบบ ISO-8601 (ค่าเริ่มต้น = ช่วงที่มีข้อมูลของ source ที่เลือก)
+      resolution: auto | minute | hour | day (auto = ละเอียดที่สุดที่ไม่เกิน buckets)
+      buckets:    จำนวน bucket สูงสุด (≤ TIMELINE_MAX_BUCKETS) — เกินก็รวมหลาย bucket เป็นหนึ่ง (step)
+      event_id / channel: คั่นด้วย , — กรองเฉพาะ source=security
+    """
+    ev = get_object_or_404(Evidence, id=ev_id)
+    sources = [s for s in (_csv_param(request, "source") or list(timeline.SOURCES)) if s in timeline.SOURCES]
+    if not sources:
+        return JsonResponse({"ok": False, "error": f"source must be one of {', '.join(timeline.SOURCES)}"}, status=400)
+    resolution = (request.GET.get("resolution") or "auto").strip().lower()
+    if resolution != "auto" and resolution not in timeline.RESOLUTIONS:
+        return JsonResponse({"ok": False, "error": "resolution must be auto, minute, hour or day"}, status=400)
+    try:
+        event_ids = [int(v) for v in _csv_param(request, "event_id")]
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "event_id must be integers"}, status=400)
+    channels = _csv_param(request, "channel")
+    buckets = _str_to_int_default(request.GET.get("buckets"), 0) or timeline.TIMELINE_MAX_BUCKETS
+    max_buckets = max(1, min(buckets, timeline.TIMELINE_MAX_BUCKETS))
+
+    for source in sources:
+        model, _field = timeline.SOURCES[source]
+        if not timeline.has_timeline(ev.pk, source) and model.objects.filter(evidence=ev).exists():
+            timeline.rebuild(ev.pk, source)     # ingest ก่อนมีตาราง timeline → สร้างครั้งเดียว
+
+    span = timeline.extent(ev.pk, sources)
+    start, end = _iso_param(request, "start"), _iso_param(request, "end")
+    if span is None and (start is None or end is None):
+        return JsonResponse({"ok": True, "resolution": None, "step": None, "start": None, "end": None,
+                             "extent": None, "series": {s: [] for s in sources}, "totals": {s: 0 for s in sources}})
+    start, end = start or span[0], end or span[1]
+    if end <= start:
+        return JsonResponse({"ok": False, "error": "end must be after start"}, status=400)
+
+    resolution, step = timeline.choose(start, end, None if resolution == "auto" else resolution, max_buckets)
+    start = timeline.floor(start, resolution)
+    series = {s: timeline.series(ev.pk, s, resolution, step, start, end, event_ids, channels) for s in sources}
+    return JsonResponse({
+        "ok": True,
+        "resolution": resolution,
+        "step": step,
+        "start": timeline.iso(start),
+        "end": timeline.iso(end),
+        "extent": {"start": timeline.iso(span[0]), "end": timeline.iso(span[1])} if span else None,
+        "series": series,
+        "totals": {s: sum(b["count"] for b in points) for s, points in series.items()},
+    })
+
+
+def _supertimeline_params(request):
+    """(ranks ของ stream, start, end) หรือ JsonResponse 400"""
+    sources = _csv_param(request, "source") or list(supertimeline.SOURCES)
+    unknown = [s for s in sources if s not in supertimeline.SOURCES]
+    if unknown:
+        return JsonResponse({"ok": False, "error": f"source must be one of {', '.join(supertimeline.SOURCES)}"},
+                            status=400)
+    macb = (request.GET.get("macb") or supertimeline.MACB).strip()
+    start, end = _iso_param(request, "start"), _iso_param(request, "end")
+    if start and end and end <= start:
+        return JsonResponse({"ok": False, "error": "end must be after start"}, status=400)
+    return supertimeline.streams(sources, macb), start, end
+
+@require_GET
+@respcache.cached_response("supertimeline")
+def supertimeline_api(request, ev_id: int):
+    """
+    super-timeline (MFT MACB + Amcache install + Security events) เรียงตามเวลา ทีละ limit แถว
+      source: mft,amcache,security (ค่าเริ่มต้น = ทั้งหมด) ; macb: เวลา MFT ที่ต้องการ (ค่าเริ่มต้น MACB)
+      start / end: ช่วง [start, end) แบบ ISO-8601 ; limit: แถวต่อหน้า (≤ 1000)
+      cursor: next_cursor ของหน้าก่อน
+    """
     ev = get_object_or_404(Evidence, id=ev_id)
-    total = SecurityEvent.objects.filter(evidence=ev).count()
-    return JsonResponse({"ok": True, "total": total})
+    params = _supertimeline_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    ranks, start, end = params
+    limit = max(1, min(_str_to_int_default(request.GET.get("limit") or "500", 500), 1000))
+    try:
+        rows, next_cursor = supertimeline.page(ev.pk, ranks, limit, start, end,
+                                               (request.GET.get("cursor") or "").strip())
+    except BadCursor as e:
+        return _bad_cursor(e)
+    return JsonResponse({
+        "ok": True,
+        "columns": supertimeline.COLUMNS,
+        "rows": rows,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    })
+
+@require_GET
+def supertimeline_export_api(request, ev_id: int):
+    """super-timeline ทั้งช่วงแบบ stream (พารามิเตอร์เดียวกับ supertimeline_api ยกเว้น limit + format / gzip)"""
+    ev = get_object_or_404(Evidence, id=ev_id)
+    params = _supertimeline_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    ranks, start, end = params
+    cursor = (request.GET.get("cursor") or "").strip()
+    try:
+        after = supertimeline.decode_cursor(cursor) if cursor else None
+    except BadCursor as e:
+        return _bad_cursor(e)
+    items = supertimeline.merged(ev.pk, ranks, start, end, after)
+    return _export_response(request, f"supertimeline_ev{ev.pk}", supertimeline.COLUMNS, map(supertimeline.row, items))
 
 @require_GET
 def dashboard_overview_api(request):
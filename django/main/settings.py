@@ -154,4 +154,66 @@ FILE_UPLOAD_HANDLERS = [
 
 # เพดานขนาด body และ memory buffer
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024 * 5   # 5 GB (ปรับตามจริง)
-FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024              # 1 MB (บังคับลงดิสก์เร็ว)
\ No newline at end of file
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024              # 1 MB (บังคับลงดิสก์เร็ว)
+
+# ===== Background parse workers (python manage.py run_workers) =====
+PARSE_WORKER_PROCESSES = int(environ.get("PARSE_WORKER_PROCESSES", "1"))
+PARSE_JOB_MAX_ATTEMPTS = int(environ.get("PARSE_JOB_MAX_ATTEMPTS", "3"))
+PARSE_JOB_HEARTBEAT_SECONDS = int(environ.get("PARSE_JOB_HEARTBEAT_SECONDS", "15"))
+PARSE_JOB_STALE_SECONDS = int(environ.get("PARSE_JOB_STALE_SECONDS", "300"))   # heartbeat ขาดเกินนี้ = worker ตาย
+
+# ===== Parser containers =====
+PARSER_MAX_PARALLEL = int(environ.get("PARSER_MAX_PARALLEL", "3"))     # mft/amcache/evtx รันพร้อมกันได้กี่ตัว
+PARSER_TIMEOUTS = {                                                    # วินาที ต่อ artifact (0 = ไม่จำกัด)
+    "mft": int(environ.get("PARSER_TIMEOUT_MFT", "3600")),
+    "amcache": int(environ.get("PARSER_TIMEOUT_AMCACHE", "900")),
+    "evtx-dir": int(environ.get("PARSER_TIMEOUT_EVTX", "7200")),
+}
+PARSER_EXECUTOR = environ.get("PARSER_EXECUTOR", "auto")              # auto | docker-run | docker-exec | local
+PARSER_CONTAINER = environ.get("PARSER_CONTAINER", "ez-parsers")       # container ที่รันค้างไว้ (docker-exec)
+PARSER_LOCAL_SCRIPT = environ.get("PARSER_LOCAL_SCRIPT", "")           # path ของ parse.sh บนเครื่อง (local)
+EVTX_FANOUT_BINS = int(environ.get("EVTX_FANOUT_BINS", "4"))         # winevt/Logs แบ่ง parse ขนานกันกี่ bin (1 = ปิด)
+EVTX_INGEST_PROFILE = environ.get("EVTX_INGEST_PROFILE", "full")      # ตัวกรอง EVTX ตอน ingest: full / security-core
+MFT_BACKEND = environ.get("MFT_BACKEND", "mftecmd")                   # mftecmd (CSV ผ่าน executor) | native (reader ในตัว ลง DB ตรง)
+MFT_NATIVE_WORKERS = int(environ.get("MFT_NATIVE_WORKERS", "4"))        # process ที่ถอดช่วง record ของ $MFT พร้อมกัน (1 = ปิด)
+EVTX_BACKEND = environ.get("EVTX_BACKEND", "evtxecmd")                # evtxecmd (CSV ผ่าน executor) | native (reader ในตัว ลง DB ตรง)
+EVTX_NATIVE_WORKERS = int(environ.get("EVTX_NATIVE_WORKERS", "4"))      # process ของ native reader (ไฟล์ละ process, 1 = ปิด)
+PARSERS_ENABLED = tuple(                                               # artifact ที่ parse (และแตกออกจาก ZIP)
+    k.strip() for k in environ.get("PARSERS_ENABLED", "mft,amcache,evtx").split(",") if k.strip()
+)
+
+# ===== CSV → DB ingest =====
+INGEST_BACKEND = environ.get("INGEST_BACKEND", "auto")                # auto (PostgreSQL ใช้ COPY) | copy | orm
+INGEST_COPY_CHUNK = int(environ.get("INGEST_COPY_CHUNK", "20000"))    # จำนวนแถวต่อหนึ่งรอบ COPY
+INGEST_PARALLEL_WORKERS = int(environ.get("INGEST_PARALLEL_WORKERS", "4"))                     # process ต่อ CSV ใหญ่ (1 = ปิด)
+INGEST_PARALLEL_MIN_BYTES = int(environ.get("INGEST_PARALLEL_MIN_BYTES", str(256 * 1024 * 1024)))  # CSV เล็กกว่านี้ ingest process เดียว
+ARTIFACT_PARTITIONING = environ.get("ARTIFACT_PARTITIONING", "1").lower() in ("1", "true", "yes")  # PostgreSQL: ตาราง artifact แบ่ง partition ตาม evidence
+
+# ===== Row APIs (mft / amcache / security) =====
+ROW_TOTAL_CACHE_SECONDS = int(environ.get("ROW_TOTAL_CACHE_SECONDS", "300"))   # total ที่นับแล้ว cache ไว้นานเท่านี้ (ต่อ evidence + filter)
+ROW_TOTAL_EXACT_BELOW = int(environ.get("ROW_TOTAL_EXACT_BELOW", "10000"))     # total=estimate: planner ประมาณต่ำกว่านี้นับจริง
+TIMELINE_MAX_BUCKETS = int(environ.get("TIMELINE_MAX_BUCKETS", "1500"))         # timeline API: จำนวน bucket สูงสุดต่อ series (auto เลือก resolution ตามนี้)
+SUPERTIMELINE_CHUNK = int(environ.get("SUPERTIMELINE_CHUNK", "2000"))           # super-timeline: แถวต่อรอบ fetch ของ server-side cursor แต่ละ stream
+EXPORT_CHUNK = int(environ.get("EXPORT_CHUNK", "2000"))                         # export (CSV / NDJSON): แถวต่อรอบ fetch ของ server-side cursor
+
+# ===== Response cache ของ read API (key ผูกกับ Evidence.data_version → ingest ใหม่แล้วของเก่าไม่ถูกส่ง) =====
+RESPONSE_CACHE_BACKEND = environ.get("RESPONSE_CACHE_BACKEND", "lru")              # lru (ใน process) / file (ใช้ร่วมทุก process) / django (CACHES) / off
+RESPONSE_CACHE_MAX_BYTES = int(environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 ** 2)))  # lru / file: ขนาดรวมสูงสุด (bytes) ก่อนไล่ตัวที่ใช้น้อยสุด
+RESPONSE_CACHE_SECONDS = int(environ.get("RESPONSE_CACHE_SECONDS", "3600"))       # django: TTL ของแต่ละ entry
+RESPONSE_CACHE_DIR = environ.get("RESPONSE_CACHE_DIR", "")                         # file: ว่าง = MEDIA_ROOT/response_cache
+RESPONSE_CACHE_ALIAS = environ.get("RESPONSE_CACHE_ALIAS", "default")             # django: alias ใน CACHES
+
+# ===== Parse cache (MEDIA_ROOT/parse_cache, key = sha256 ของ artifact + digest ของ parser image) =====
+PARSE_CACHE_ENABLED = environ.get("PARSE_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+PARSE_CACHE_MAX_BYTES = int(environ.get("PARSE_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))          # LRU เกินนี้ลบตัวเก่าสุด
+PARSE_CACHE_MIN_FREE_BYTES = int(environ.get("PARSE_CACHE_MIN_FREE_BYTES", str(2 * 1024 ** 3)))  # ดิสก์ว่างต่ำกว่านี้ evict เพิ่ม
+
+# ===== Chunked upload (/api/uploads/) =====
+UPLOAD_CHUNK_SIZE = int(environ.get("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))                # ขนาด chunk เริ่มต้น
+UPLOAD_HASH_BUFFER_BYTES = int(environ.get("UPLOAD_HASH_BUFFER_BYTES", str(64 * 1024 * 1024)))  # chunk ที่มาก่อนลำดับพักใน RAM ได้เท่านี้
+UPLOAD_SESSION_TTL_HOURS = int(environ.get("UPLOAD_SESSION_TTL_HOURS", "72"))                   # session ค้างเกินนี้ลบทิ้ง
+
+# ===== Extraction (start_extract_api) =====
+EXTRACT_MODE = environ.get("EXTRACT_MODE", "selective")   # selective (แตกเฉพาะไฟล์ที่ parser ใช้) | full
+EXTRACT_THREADS = int(environ.get("EXTRACT_THREADS", "4"))                                # thread แตกไฟล์พร้อมกัน
+EXTRACT_MIN_FREE_BYTES = int(environ.get("EXTRACT_MIN_FREE_BYTES", str(1024 ** 3)))      # เหลือเนื้อที่ว่างไว้อย่างน้อยเท่านี้หลังแตก
@@ -180,22 +180,50 @@
     evId: null,
     mft: { page: 1, page_size: 50, q: '', type: '', size_bucket: '', sort: 'EntryNumber', order: 'asc' },
     amc: { page: 1, page_size: 50, q: '', publisher: '', sort: 'AppName', order: 'asc' },
-    sec: { page: 1, page_size: 50, q: '', event_id: '', logon_type: '', sort: 'Timestamp', order: 'desc' },
+    sec: { page: 1, page_size: 50, q: '', event_id: '', logon_type: '', start: '', end: '', sort: 'Timestamp', order: 'desc' },
+    // ช่วงที่ซูมอยู่ของ timeline (ว่าง = ทั้งช่วงที่มีข้อมูล) — คลิก bucket ของ security กรองตารางด้วยช่วงเดียวกัน
+    tl: { source: 'security', start: '', end: '' },
   };
 
+  // Previous / Next ใช้ cursor ของหน้าปัจจุบัน (keyset) — กดเลขหน้าอื่นหรือเปลี่ยน filter ใช้ page ตามเดิม
+  // total ไม่ขอซ้ำตอนเดิน cursor (total=none) ใช้ค่าจากหน้าก่อน
+  const nav = { mft: {}, amc: {}, sec: {} };
+
+  function rowsQuery(kind) {
+    const p = new URLSearchParams(state[kind]);
+    if (nav[kind].cursor) {
+      p.set('cursor', nav[kind].cursor);
+      p.set('total', 'none');
+    }
+    nav[kind].cursor = '';
+    return p.toString();
+  }
+
+  function rowsTotal(kind, d) {
+    if (d.total !== null && d.total !== undefined) nav[kind].total = d.total;
+    return nav[kind].total || 0;
+  }
+
+  function turnPage(kind, d, to) {
+    const page = state[kind].page;
+    nav[kind].cursor = to === page + 1 ? (d.next_cursor || '') : to === page - 1 ? (d.prev_cursor || '') : '';
+    state[kind].page = to;
+  }
+
   // ===== Loaders =====
   async function loadMft() {
-    const p = new URLSearchParams(state.mft).toString();
+    const p = rowsQuery('mft');
     const r = await fetch(`/api/evidence/${state.evId}/mft/?${p}`);
     if (!r.ok) return;
     const d = await r.json();
+    const count = rowsTotal('mft', d);
 
     renderMftRows(d.rows);
-    setBadgeCount('mftCount', d.total);
-    setText('mftRecords', numberWithCommas(d.total));
+    setBadgeCount('mftCount', count);
+    setText('mftRecords', numberWithCommas(count));
 
-    buildPager('#mftPagination', state.mft.page, state.mft.page_size, d.total, (to) => {
-      state.mft.page = to;
+    buildPager('#mftPagination', state.mft.page, state.mft.page_size, count, (to) => {
+      turnPage('mft', d, to);
       loadMft();
     });
 
@@ -205,17 +233,18 @@
   }
 
   async function loadAmcache() {
-    const p = new URLSearchParams(state.amc).toString();
+    const p = rowsQuery('amc');
     const r = await fetch(`/api/evidence/${state.evId}/amcache/?${p}`);
     if (!r.ok) return;
     const d = await r.json();
+    const count = rowsTotal('amc', d);
 
     renderAmcacheRows(d.rows);
-    setBadgeCount('amcacheCount', d.total);
-    setText('amcacheRecords', numberWithCommas(d.total));
+    setBadgeCount('amcacheCount', count);
+    setText('amcacheRecords', numberWithCommas(count));
 
-    buildPager('#amcachePagination', state.amc.page, state.amc.page_size, d.total, (to) => {
-      state.amc.page = to;
+    buildPager('#amcachePagination', state.amc.page, state.amc.page_size, count, (to) => {
+      turnPage('amc', d, to);
       loadAmcache();
     });
 
@@ -235,17 +264,18 @@
   }
 
   async function loadSecurity() {
-    const p = new URLSearchParams(state.sec).toString();
+    const p = rowsQuery('sec');
     const r = await fetch(`/api/evidence/${state.evId}/security/?${p}`);
     if (!r.ok) return;
     const d = await r.json();
+    const count = rowsTotal('sec', d);
 
     renderSecurityRows(d.rows);
-    setBadgeCount('securityCount', d.total);
-    setText('eventLogRecords', numberWithCommas(d.total));
+    setBadgeCount('securityCount', count);
+    setText('eventLogRecords', numberWithCommas(count));
 
-    buildPager('#securityPagination', state.sec.page, state.sec.page_size, d.total, (to) => {
-      state.sec.page = to;
+    buildPager('#securityPagination', state.sec.page, state.sec.page_size, count, (to) => {
+      turnPage('sec', d, to);
       loadSecurity();
     });
 
@@ -253,6 +283,56 @@
     setText('totalRecords', numberWithCommas(total));
   }
 
+  async function loadTimeline() {
+    const p = new URLSearchParams({ source: state.tl.source });
+    if (state.tl.start) p.set('start', state.tl.start);
+    if (state.tl.end) p.set('end', state.tl.end);
+    if (state.tl.source === 'security' && state.sec.event_id) p.set('event_id', state.sec.event_id);
+    const r = await fetch(`/api/evidence/${state.evId}/timeline/?${p}`);
+    if (!r.ok) return;
+    renderTimeline(await r.json());
+  }
+
+  function renderTimeline(d) {
+    const chart = document.getElementById('timelineChart');
+    if (!chart) return;
+    chart.innerHTML = '';
+    const points = (d.series && d.series[state.tl.source]) || [];
+    const max = Math.max(1, ...points.map(b => b.count));
+    for (const b of points) {
+      const bar = document.createElement('div');
+      bar.className = 'tl-bar';
+      bar.style.height = b.count ? `${Math.max(2, b.count / max * 100)}%` : '0';
+      bar.title = `${b.t} — ${b.count.toLocaleString()} events`;
+      bar.addEventListener('click', () => zoomTimeline(b.t, d.step));
+      chart.appendChild(bar);
+    }
+    const step = d.step || 0;
+    const unit = step >= 86400 ? `${step / 86400}-day` : step >= 3600 ? `${step / 3600}-hour` : `${step / 60}-minute`;
+    const total = (d.totals && d.totals[state.tl.source]) || 0;
+    setText('timelineRange', points.length ? `${unit} buckets · ${total.toLocaleString()} events` : 'no timestamps');
+    setText('timelineStart', d.start || '');
+    setText('timelineEnd', d.end || '');
+  }
+
+  // คลิก bucket: ซูม timeline เข้าไปในช่วงนั้น + กรองตาราง security ด้วยช่วงเดียวกัน
+  function zoomTimeline(t, step) {
+    state.tl.start = t;
+    state.tl.end = new Date(Date.parse(t) + step * 1000).toISOString();
+    if (state.tl.source === 'security') {
+      state.sec.start = state.tl.start;
+      state.sec.end = state.tl.end;
+      state.sec.page = 1;
+      loadSecurity();
+    }
+    loadTimeline();
+  }
+
+  function resetTimeline() {
+    state.tl.start = state.tl.end = '';
+    state.sec.start = state.sec.end = '';
+  }
+
   // ===== Bindings =====
   function bindMftFilters() {
     const mftSearch = document.getElementById('mftSearch');
@@ -287,7 +367,7 @@
     if (q) q.addEventListener('input', () => { state.sec.q = q.value; state.sec.page = 1; loadSecurity(); });
     if (eventIdFilter) eventIdFilter.addEventListener('change', () => {
       state.sec.event_id = eventIdFilter.value || '';
-      state.sec.page = 1; loadSecurity();
+      state.sec.page = 1; loadSecurity(); loadTimeline();
     });
     if (logonTypeFilter) logonTypeFilter.addEventListener('change', () => {
       state.sec.logon_type = logonTypeFilter.value || '';
@@ -295,6 +375,17 @@
     });
   }
 
+  function bindTimeline() {
+    const source = document.getElementById('timelineSource');
+    const reset = document.getElementById('timelineReset');
+
+    if (source) source.addEventListener('change', () => { state.tl.source = source.value; loadTimeline(); });
+    if (reset) reset.addEventListener('click', () => {
+      resetTimeline();
+      state.sec.page = 1; loadSecurity(); loadTimeline();
+    });
+  }
+
   // ===== Exposed actions (onclick) =====
   window.clearFilters = function (section) {
     if (section === 'mft') {
@@ -318,14 +409,15 @@
       return;
     }
     if (section === 'security') {
-      state.sec = { page: 1, page_size: 50, q: '', event_id: '', logon_type: '', sort: 'Timestamp', order: 'desc' };
+      state.sec = { page: 1, page_size: 50, q: '', event_id: '', logon_type: '', start: '', end: '', sort: 'Timestamp', order: 'desc' };
+      resetTimeline();
       const q = document.getElementById('securitySearch');
       const e = document.getElementById('eventIdFilter');
       const l = document.getElementById('logonTypeFilter');
       if (q) q.value = '';
       if (e) e.value = '';
       if (l) l.value = '';
-      loadSecurity();
+      loadSecurity(); loadTimeline();
       return;
     }
   };
@@ -356,36 +448,21 @@
     }
   };
 
-  // Export CSV เฉพาะ tab ปัจจุบัน
+  // Export CSV ของ tab ปัจจุบัน: ทุกแถวที่ตรง filter / sort ตอนนี้ (server stream ออกมา ไม่จำกัดแค่หน้าที่เห็น)
   window.exportResults = function () {
     const active = document.querySelector('.tab-pane.active.show');
-    let table, fname = '';
-    if (active && active.id === 'mft') { table = document.getElementById('mftTable'); fname = 'mft_view.csv'; }
-    else if (active && active.id === 'amcache') { table = document.getElementById('amcacheTable'); fname = 'amcache_view.csv'; }
-    else if (active && active.id === 'security') { table = document.getElementById('securityTable'); fname = 'security_view.csv'; }
-    else return;
-
-    const rows = [];
-    const ths = table.querySelectorAll('thead th');
-    const headers = Array.from(ths).map(th => th.textContent.replace(/\s+$/,'').replace(/\s*\u{f0dc}\s*$/u,'').trim());
-    rows.push(headers.join(','));
-
-    const trs = table.querySelectorAll('tbody tr');
-    trs.forEach(tr => {
-      const cols = Array.from(tr.children).map(td => {
-        const t = (td.textContent || '').replaceAll('"', '""');
-        return `"${t}"`;
-      });
-      rows.push(cols.join(','));
-    });
-
-    const blob = new Blob([rows.join('\n')], { type: 'text/csv;charset=utf-8;' });
-    const url = URL.createObjectURL(blob);
+    const kinds = { mft: ['mft', 'mft'], amcache: ['amc', 'amcache'], security: ['sec', 'security'] };
+    if (!active || !kinds[active.id]) return;
+    const [kind, path] = kinds[active.id];
+
+    const p = new URLSearchParams(state[kind]);
+    p.delete('page');
+    p.delete('page_size');
+    p.set('format', 'csv');
     const a = document.createElement('a');
-    a.href = url; a.download = fname;
+    a.href = `/api/evidence/${state.evId}/${path}/export?${p}`;
     document.body.appendChild(a); a.click();
     document.body.removeChild(a);
-    URL.revokeObjectURL(url);
   };
 
   // ===== Init =====
@@ -396,8 +473,9 @@
     bindMftFilters();
     bindAmcacheFilters();
     bindSecurityFilters();
+    bindTimeline();
 
-    await Promise.all([loadMft(), loadAmcache(), loadSecurity()]);
+    await Promise.all([loadMft(), loadAmcache(), loadSecurity(), loadTimeline()]);
 
     // เติมสรุปจาก /api/evidence/<id>/ ถ้ามี
     try {
@@ -57,67 +57,149 @@
       });
     }
 
+    // ===== อัปโหลดแบบแบ่งชิ้น: ส่งขนานกันหลายชิ้น + resume ได้ถ้าหลุดกลางทาง =====
+    const UPLOAD_WORKERS = 4;
+    const CHUNK_RETRIES = 3;
+    const csrfHeaders = () => (csrftoken ? {'X-CSRFToken': csrftoken} : {});
+    const resumeKey = (f) => `upload:${f.name}:${f.size}:${f.lastModified}`;
+
+    function setUploadProgress(done, total) {
+      if (!progressBar) return;
+      const percent = total ? Math.round((done / total) * 100) : 0;
+      progressBar.style.width = percent + '%';
+      progressBar.textContent = percent + '%';
+    }
+
+    async function sha256Hex(buf) {
+      if (!(window.crypto && crypto.subtle)) return '';   // http ธรรมดา (ไม่ใช่ secure context) → ไม่ส่ง hash
+      const d = await crypto.subtle.digest('SHA-256', buf);
+      return Array.from(new Uint8Array(d)).map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    // session เดิมของไฟล์นี้ (ถ้ายังอัปโหลดอยู่) หรือเริ่ม session ใหม่
+    async function openSession(file) {
+      const saved = localStorage.getItem(resumeKey(file));
+      if (saved) {
+        try {
+          const r = await fetch(`/api/uploads/${saved}/`);
+          if (r.ok) {
+            const d = await r.json();
+            if (d.status === 'UPLOADING') return d;
+          }
+        } catch (e) {
+          // ติดต่อไม่ได้ → เริ่มใหม่
+        }
+        localStorage.removeItem(resumeKey(file));
+      }
+      const fd = new FormData(form);
+      fd.delete('evidence_file');
+      fd.set('filename', file.name);
+      fd.set('size', String(file.size));
+      const r = await fetch('/api/uploads/', {method: 'POST', body: fd, headers: csrfHeaders()});
+      if (!r.ok) throw new Error(await r.text());
+      const d = await r.json();
+      localStorage.setItem(resumeKey(file), d.upload_id);
+      return d;
+    }
+
+    async function putChunk(file, s, index) {
+      const start = index * s.chunk_size;
+      const buf = await file.slice(start, Math.min(start + s.chunk_size, file.size)).arrayBuffer();
+      const headers = Object.assign({'Content-Type': 'application/octet-stream'}, csrfHeaders());
+      const digest = await sha256Hex(buf);
+      if (digest) headers['X-Chunk-SHA256'] = digest;
+      let lastErr = null;
+      for (let attempt = 0; attempt < CHUNK_RETRIES; attempt++) {
+        try {
+          const r = await fetch(`/api/uploads/${s.upload_id}/chunks/${index}/`, {method: 'PUT', body: buf, headers});
+          if (r.ok) return buf.byteLength;
+          lastErr = new Error(await r.text());
+          if (r.status === 409) break;          // session ถูกยกเลิก/จบไปแล้ว ลองซ้ำไม่ช่วย
+        } catch (e) {
+          lastErr = e;
+        }
+        await new Promise(res => setTimeout(res, 1000 * (attempt + 1)));
+      }
+      throw lastErr;
+    }
+
+    async function chunkedUpload(file) {
+      const s = await openSession(file);
+      const received = new Set(s.received || []);
+      const todo = [];
+      for (let i = 0; i < s.total_chunks; i++) if (!received.has(i)) todo.push(i);
+
+      let done = 0;
+      received.forEach(i => { done += Math.min(s.chunk_size, file.size - i * s.chunk_size); });
+      setUploadProgress(done, file.size);
+
+      const worker = async () => {
+        while (todo.length) {
+          const i = todo.shift();
+          done += await putChunk(file, s, i);
+          setUploadProgress(done, file.size);
+        }
+      };
+      await Promise.all(Array.from({length: Math.min(UPLOAD_WORKERS, todo.length)}, worker));
+
+      const r = await fetch(`/api/uploads/${s.upload_id}/complete/`, {method: 'POST', headers: csrfHeaders()});
+      if (!r.ok) throw new Error(await r.text());
+      const d = await r.json();
+      localStorage.removeItem(resumeKey(file));
+      return d;
+    }
+
     if (form) {
-      form.addEventListener('submit', function (e) {
+      form.addEventListener('submit', async function (e) {
         e.preventDefault();
         if (!selectedFile) {
           alert('Please select a ZIP file first.');
           return;
         }
 
-        const formData = new FormData(form);
-        formData.set('evidence_file', selectedFile);
-
         if (uploadBtn) uploadBtn.disabled = true;
-        if (progressBar) {
-          progressBar.style.width = '0%';
-          progressBar.textContent = '';
-        }
+        setUploadProgress(0, 1);
+        if (progressBar) progressBar.textContent = '';
         if (analysisStatus) analysisStatus.style.display = 'none';
         if (csvLinks) csvLinks.style.display = 'none';
 
-        const xhr = new XMLHttpRequest();
-        xhr.open('POST', '/api/upload-evidence/', true);
-        xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
-        if (csrftoken) xhr.setRequestHeader('X-CSRFToken', csrftoken);
-
-        xhr.upload.onprogress = function (e) {
-          if (e.lengthComputable && progressBar) {
-            const percent = Math.round((e.loaded / e.total) * 100);
-            progressBar.style.width = percent + '%';
-            progressBar.textContent = percent + '%';
-          }
-        };
-
-        xhr.onload = function () {
-          if (xhr.status >= 200 && xhr.status < 300) {
-            try {
-              lastUploadResp = JSON.parse(xhr.responseText);
-            } catch (err) {
-              alert('Upload succeeded but response is not valid JSON.');
-              if (uploadBtn) uploadBtn.disabled = false;
-              return;
-            }
-            if (progressBar) {
-              progressBar.style.width = '100%';
-              progressBar.textContent = '100%';
-            }
-            if (analyzeBtn) analyzeBtn.style.display = 'inline-block';
-          } else {
-            alert('Upload failed: ' + xhr.responseText);
-            if (uploadBtn) uploadBtn.disabled = false;
-          }
-        };
-
-        xhr.onerror = function () {
-          alert('Network error during upload');
+        try {
+          lastUploadResp = await chunkedUpload(selectedFile);
+        } catch (err) {
+          // chunk ที่ส่งแล้วยังอยู่บน server → กด Upload อีกครั้งจะส่งต่อจากที่ค้าง
+          alert('Upload failed: ' + (err && err.message ? err.message : err));
           if (uploadBtn) uploadBtn.disabled = false;
-        };
-
-        xhr.send(formData);
+          return;
+        }
+        setUploadProgress(1, 1);
+        if (analyzeBtn) analyzeBtn.style.display = 'inline-block';
       });
     }
 
+    // poll /api/jobs/<id>/ ทุก 2 วินาที อัปเดต progress bar จาก Evidence.parse_progress
+    async function pollJob(jobId) {
+      for (;;) {
+        let d = null;
+        try {
+          const r = await fetch(`/api/jobs/${jobId}/`);
+          if (r.ok) d = await r.json();
+        } catch (e) {
+          // network สะดุดชั่วคราว ลองใหม่รอบหน้า
+        }
+        if (d) {
+          const pct = Math.max(20, Math.min(100, d.parse_progress || 0));
+          if (analysisProgress) analysisProgress.style.width = pct + '%';
+          if (statusText) {
+            statusText.textContent = d.status === 'QUEUED'
+              ? 'Queued for parsing...'
+              : `Parsing: ${d.parse_message || 'working'} (${d.parse_progress || 0}%)`;
+          }
+          if (d.status === 'DONE' || d.status === 'FAILED') return d;
+        }
+        await new Promise(res => setTimeout(res, 2000));
+      }
+    }
+
     if (analyzeBtn) {
       analyzeBtn.addEventListener('click', async function () {
         if (!lastUploadResp) {
@@ -136,12 +218,30 @@
 
         const fd1 = new FormData();
         fd1.append('id', id);
+        // ระหว่างแตก ZIP: poll /api/evidence/<id>/ ดู byte ที่แตกแล้ว (parse_progress) → 5..15%
+        let extracting = true;
+        const pollExtract = async () => {
+          while (extracting) {
+            await new Promise(res => setTimeout(res, 1000));
+            try {
+              const r = await fetch(`/api/evidence/${id}/`);
+              if (!r.ok || !extracting) continue;
+              const d = await r.json();
+              if (analysisProgress) analysisProgress.style.width = (5 + Math.round((d.parse_progress || 0) * 0.1)) + '%';
+              if (statusText && d.parse_message) statusText.textContent = 'Extracting KAPE bundle: ' + d.parse_message;
+            } catch (e) {
+              // ไม่เป็นไร รอบหน้าลองใหม่
+            }
+          }
+        };
+        pollExtract();
         try {
           const r1 = await fetch('/api/start-extract/', {
             method: 'POST',
             body: fd1,
             headers: csrftoken ? {'X-CSRFToken': csrftoken} : {}
           });
+          extracting = false;
           const d1 = await r1.json();
           if (!r1.ok || !d1.ok) {
             alert('Extraction failed: ' + (d1.error || r1.statusText));
@@ -150,14 +250,15 @@
             return;
           }
         } catch (e) {
+          extracting = false;
           alert('Network error during extraction: ' + e);
           if (statusText) statusText.textContent = 'Extraction failed.';
           analyzeBtn.disabled = false;
           return;
         }
 
-        if (statusText) statusText.textContent = 'Parsing to CSV (MFT, Amcache)...';
-        if (analysisProgress) analysisProgress.style.width = '60%';
+        if (statusText) statusText.textContent = 'Queued for parsing...';
+        if (analysisProgress) analysisProgress.style.width = '20%';
 
         const fd2 = new FormData();
         fd2.append('id', id);
@@ -168,12 +269,18 @@
             headers: csrftoken ? {'X-CSRFToken': csrftoken} : {}
           });
           const d2 = await r2.json();
+          if (!r2.ok || !d2.ok || !d2.job_id) {
+            alert('Parse failed: ' + (d2.error || r2.statusText));
+            if (statusText) statusText.textContent = 'Parse failed.';
+            analyzeBtn.disabled = false;
+            return;
+          }
 
-          const statusStr = String((d2 && d2.status) || '').toUpperCase();
-          const ok = r2.ok && (d2.ok === true || statusStr === 'PARSED' || statusStr === 'DONE');
-
-          if (!ok) {
-            alert('Parse failed: ' + (d2.log_tail || d2.error || r2.statusText));
+          // งาน parse ทำใน worker → poll สถานะจนกว่าจะ DONE/FAILED
+          const job = await pollJob(d2.job_id);
+          if (!job || job.status !== 'DONE') {
+            const res = (job && job.result) || {};
+            alert('Parse failed: ' + (res.log_tail || (job && job.error) || (job && job.parse_message) || 'unknown error'));
             if (statusText) statusText.textContent = 'Parse failed.';
             if (analysisProgress) analysisProgress.style.width = '100%';
             analyzeBtn.disabled = false;
@@ -182,15 +289,6 @@
 
           // ✅ สำเร็จ: พาไปหน้า result/<uuid>/
           window.location.href = `/result/${id}/`;
-
-          // (ถ้าจะยังคงโชว์ลิงก์ดาวน์โหลด ก็ปล่อยส่วนล่างนี้ไว้ได้)
-          /*
-          if (statusText) statusText.textContent = 'Done.';
-          if (analysisProgress) analysisProgress.style.width = '100%';
-          if (csvLinks) csvLinks.style.display = 'block';
-          if (d2.mft_csv) { if (mftLink) mftLink.href = d2.mft_csv; if (mftLinkRow) mftLinkRow.style.display = 'list-item'; }
-          if (d2.amcache_csv) { if (amcacheLink) amcacheLink.href = d2.amcache_csv; if (amcacheLinkRow) amcacheLinkRow.style.display = 'list-item'; }
-          */
         } catch (e) {
           alert('Network error during parse: ' + e);
           if (statusText) statusText.textContent = 'Parse failed.';
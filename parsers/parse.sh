@@ -9,9 +9,11 @@ usage() {
   exit 1
 }
 
-MFTE="/opt/tools/MFTECmd/MFTECmd.dll"
-AMC="/opt/tools/AmcacheParser/AmcacheParser.dll"
-EVTX="/opt/tools/EvtxECmd/EvtxECmd.dll"
+# รันนอก container ได้ (PARSER_EXECUTOR=local): ชี้ EZ_TOOLS_DIR ไปที่โฟลเดอร์ tools ของเครื่อง
+TOOLS="${EZ_TOOLS_DIR:-/opt/tools}"
+MFTE="$TOOLS/MFTECmd/MFTECmd.dll"
+AMC="$TOOLS/AmcacheParser/AmcacheParser.dll"
+EVTX="$TOOLS/EvtxECmd/EvtxECmd.dll"
 
 [[ $# -lt 3 ]] && usage
 
@@ -43,7 +45,6 @@ case "$cmd" in
     ;;
   evtx-dir)
     in="$1"; out="$2"; name="${3:-evtx_all.csv}"
-    EVTX="/opt/tools/EvtxECmd/EvtxECmd.dll"
     [[ -f "$EVTX" ]] || { echo "EvtxECmd not found at $EVTX"; exit 127; }
 
     mkdir -p "$out"